@@ -12,29 +12,96 @@ Usage from any Python session:
     
     arm64_browser.navigate("https://example.com")
     arm64_browser.screenshot("test.png")
+
+Each call starts its own server and browser, so nothing carries over between
+calls. To work on one page across calls (navigate, then click, wait_for, ...),
+open a persistent session first:
+
+    arm64_browser.open_session()
+    arm64_browser.navigate("https://example.com")
+    arm64_browser.wait_for(selector="h1")
+    arm64_browser.close_session()
 """
 
 import subprocess
 import json
 import os
+import mmap
+import hashlib
 import sys
-from typing import Dict, Any, Optional
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Union
 
 # Determine MCP server directory relative to this file
 MCP_SERVER_PATH = os.path.dirname(os.path.abspath(__file__))
 if MCP_SERVER_PATH not in sys.path:
     sys.path.append(MCP_SERVER_PATH)
 
-def call_mcp_tool(tool_name: str, **kwargs) -> str:
-    """Call an MCP tool with the given arguments.
+@dataclass
+class ToolResult:
+    """A decoded tool response.
+
+    ``data`` is the tool's ``structuredContent`` as native Python types
+    (e.g. ``{"value": [...]}`` for evaluate, ``{"issues": [...], "passed": bool}``
+    for audits), so callers never re-parse ``text``.
+    """
+    text: str
+    data: Dict[str, Any] = field(default_factory=dict)
+    is_error: bool = False
+
+
+# chromium_tool.MCPSession every call goes through, set by open_session()
+_session = None
+
+def open_session(env: Optional[Dict[str, str]] = None):
+    """Route every call of this module through one persistent server until close_session()
+
+    Returns the chromium_tool.MCPSession, which can also be passed to helpers
+    that take a `session` (perfdb, domsnap, profsummary, heapsnap).
+    """
+    global _session
+    from chromium_tool import MCPSession
+
+    close_session()
+    _session = MCPSession(env=env)
+    return _session
+
+def close_session() -> None:
+    """Close the session opened by open_session(), with its browser."""
+    global _session
+    if _session is not None:
+        _session.close()
+        _session = None
+
+def session_active() -> bool:
+    """True while open_session() routes calls to a persistent server."""
+    return _session is not None
+
+def call_mcp_tool_result(tool_name: str, _timeout: float = 30, _session_override=None, **kwargs) -> ToolResult:
+    """Call an MCP tool and decode its JSON-RPC response exactly once.
     
     Args:
         tool_name: Name of the MCP tool to call
+        _timeout: Seconds to wait for the server process
+        _session_override: chromium_tool.MCPSession to use instead of the
+            open_session() one or a fresh server process
         **kwargs: Arguments to pass to the tool
         
     Returns:
-        Tool result or error message
+        ToolResult with the text content and structured data
     """
+    session = _session_override or _session
+    if session is not None:
+        payload = session.call_tool(tool_name, kwargs, timeout=_timeout)
+        if "error" in payload:
+            return ToolResult(f"Error: {payload['error']}", is_error=True)
+        content = payload.get('content') or [{}]
+        return ToolResult(
+            text=content[0].get('text', f'Tool {tool_name} executed successfully'),
+            data=payload.get('structuredContent') or {},
+            is_error=bool(payload.get('isError')),
+        )
+
     request = {
         "jsonrpc": "2.0",
         "method": "tools/call",
@@ -48,31 +115,60 @@ def call_mcp_tool(tool_name: str, **kwargs) -> str:
             input=json.dumps(request),
             text=True,
             capture_output=True,
-            timeout=30,
+            timeout=_timeout,
             cwd=MCP_SERVER_PATH
         )
-        
-        # Parse both stdout and stderr for JSON responses
-        all_output = result.stdout + result.stderr
-        lines = [line for line in all_output.strip().split('\n') if line.startswith('{"')]
-        
-        for line in lines:
-            try:
-                response = json.loads(line)
-                if 'result' in response:
-                    content = response.get('result', {}).get('content', [{}])
-                    return content[0].get('text', f'Tool {tool_name} executed successfully')
-                elif 'error' in response:
-                    return f"Error: {response['error']['message']}"
-            except json.JSONDecodeError:
-                continue
-        
-        return f"No valid response found. Output: {all_output[:200]}"
-        
     except FileNotFoundError:
-        return f"MCP server not found. Please ensure Node.js is installed and index.js exists in {MCP_SERVER_PATH}"
+        return ToolResult(f"MCP server not found. Please ensure Node.js is installed and index.js exists in {MCP_SERVER_PATH}", is_error=True)
     except Exception as e:
-        return f"Tool execution error: {e}"
+        return ToolResult(f"Tool execution error: {e}", is_error=True)
+
+    # The server writes JSON-RPC messages to stdout, one per line; ours is the last.
+    for line in reversed(result.stdout.splitlines()):
+        if not line.startswith('{'):
+            continue
+        try:
+            response = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if 'result' in response:
+            payload = response['result']
+            content = payload.get('content') or [{}]
+            return ToolResult(
+                text=content[0].get('text', f'Tool {tool_name} executed successfully'),
+                data=payload.get('structuredContent') or {},
+                is_error=bool(payload.get('isError')),
+            )
+        if 'error' in response:
+            return ToolResult(f"Error: {response['error']['message']}", is_error=True)
+
+    all_output = result.stdout + result.stderr
+    return ToolResult(f"No valid response found. Output: {all_output[:200]}", is_error=True)
+
+
+def call_mcp_tool(tool_name: str, **kwargs) -> str:
+    """Call an MCP tool with the given arguments.
+    
+    Args:
+        tool_name: Name of the MCP tool to call
+        **kwargs: Arguments to pass to the tool
+        
+    Returns:
+        Tool result or error message
+    """
+    return call_mcp_tool_result(tool_name, **kwargs).text
+
+
+def evaluate_value(script: str) -> Any:
+    """Execute JavaScript and return the result as a native Python value.
+
+    Raises:
+        RuntimeError: if the script throws or the server reports an error
+    """
+    result = call_mcp_tool_result("evaluate", script=script)
+    if result.is_error:
+        raise RuntimeError(result.text)
+    return result.data.get("value")
 
 def navigate(url: str) -> str:
     """Navigate to a URL"""
@@ -90,6 +186,23 @@ def fill(selector: str, value: str) -> str:
     """Fill a form field"""
     return call_mcp_tool("fill", selector=selector, value=value)
 
+def fill_form(fields: Dict[str, Any], typing: Union[bool, List[str]] = False,
+              typing_delay_ms: int = 0) -> List[Dict[str, Any]]:
+    """Fill many fields in one call; returns a {"selector", "status", ...} dict per field
+
+    Values: strings for text fields, bools for checkboxes, a radio value to pick
+    within its group, a list for multi-selects, file paths for file inputs.
+    `typing` (True, or a list of selectors) sends real key events for fields
+    whose scripts listen for keystrokes.
+    """
+    kwargs: Dict[str, Any] = {"fields": fields}
+    if typing:
+        kwargs.update(typing=typing, typingDelayMs=typing_delay_ms)
+    result = call_mcp_tool_result("fill_form", **kwargs)
+    if result.is_error:
+        raise RuntimeError(result.text)
+    return result.data["fields"]
+
 def evaluate(script: str) -> str:
     """Execute JavaScript in the browser"""
     return call_mcp_tool("evaluate", script=script)
@@ -98,6 +211,154 @@ def get_content(content_type: str = "text") -> str:
     """Get page content (text or html)"""
     return call_mcp_tool("get_content", type=content_type)
 
+def wait_for(selector: Optional[str] = None, state: str = "visible", text: Optional[str] = None,
+             regex: bool = False, function: Optional[str] = None, network_idle: bool = False,
+             idle_ms: int = 500, max_inflight: int = 0, timeout: int = 30000) -> int:
+    """Wait in the browser until every given condition holds; returns the ms waited
+
+    Replaces sleep-and-evaluate polling loops: the page reacts to DOM mutations
+    and animation frames, and network quiet is tracked by the server. Waits on
+    the page of the open_session() session; a one-shot server has only a blank page.
+
+    Raises:
+        TimeoutError: if the conditions did not hold within `timeout` ms
+        RuntimeError: without an open session
+    """
+    if _session is None:
+        raise RuntimeError("wait_for needs a persistent session: call arm64_browser.open_session() first")
+    kwargs: Dict[str, Any] = {"state": state, "timeout": timeout}
+    if selector is not None:
+        kwargs["selector"] = selector
+    if text is not None:
+        kwargs.update(text=text, regex=regex)
+    if function is not None:
+        kwargs["function"] = function
+    if network_idle:
+        kwargs.update(networkIdle=True, idleMs=idle_ms, maxInflight=max_inflight)
+    result = call_mcp_tool_result("wait_for", _timeout=timeout / 1000 + 15, **kwargs)
+    if result.is_error:
+        if "Timed out" in result.text:
+            raise TimeoutError(result.text)
+        raise RuntimeError(result.text)
+    return result.data["waitedMs"]
+
+def get_content_delta(since: Optional[int] = None, doc_id: Optional[str] = None) -> Dict[str, Any]:
+    """Page text changes since a previous version (full snapshot on first use or after navigation)
+
+    Returns the tool's structuredContent: {"docId", "version", "full", "lines"}
+    for a full snapshot, or {"docId", "version", "since", "full": False, "hunks"}.
+    Feed it to apply_content_delta() to keep a local copy of the lines current.
+    """
+    kwargs: Dict[str, Any] = {}
+    if since is not None and doc_id is not None:
+        kwargs = {"since": since, "docId": doc_id}
+    result = call_mcp_tool_result("get_content_delta", **kwargs)
+    if result.is_error:
+        raise RuntimeError(result.text)
+    return result.data
+
+def apply_content_delta(lines: List[str], delta: Dict[str, Any]) -> List[str]:
+    """Return the page lines after applying a get_content_delta result"""
+    if delta["full"]:
+        return list(delta["lines"])
+    lines = list(lines)
+    for hunk in reversed(delta["hunks"]):
+        lines[hunk["start"]:hunk["start"] + hunk["deleteCount"]] = hunk["insert"]
+    return lines
+
+def get_content_spooled(content_type: str = "html") -> Dict[str, Any]:
+    """Stream page content to a spool file; returns {"path", "size", "sha256", ...}
+
+    Use open_spooled() on the result to read it without copying it into Python.
+    """
+    result = call_mcp_tool_result("get_content", type=content_type, transfer="file")
+    if result.is_error or "path" not in result.data:
+        raise RuntimeError(result.text)
+    return result.data
+
+def open_spooled(info: Dict[str, Any], verify: bool = False) -> mmap.mmap:
+    """Memory-map a spooled payload read-only (usable as a context manager)
+
+    Args:
+        info: structuredContent of a spooled result (needs "path"; "size" and
+            "sha256" are checked when present)
+        verify: also hash the mapped bytes and compare with info["sha256"]
+    """
+    with open(info["path"], "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if "size" in info and len(mapped) != info["size"]:
+        mapped.close()
+        raise ValueError(f"{info['path']}: expected {info['size']} bytes, found {len(mapped)}")
+    if verify and info.get("sha256") and hashlib.sha256(mapped).hexdigest() != info["sha256"]:
+        mapped.close()
+        raise ValueError(f"{info['path']}: sha256 mismatch")
+    return mapped
+
+def _pdf_options(paper: Union[str, Dict[str, Any]], margin: Any, landscape: bool,
+                 header_template: Optional[str], footer_template: Optional[str],
+                 page_ranges: Optional[str], print_background: bool) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"paper": paper, "landscape": landscape, "printBackground": print_background}
+    if margin is not None:
+        options["margin"] = margin
+    if header_template is not None:
+        options["headerTemplate"] = header_template
+    if footer_template is not None:
+        options["footerTemplate"] = footer_template
+    if page_ranges:
+        options["pageRanges"] = page_ranges
+    return options
+
+def print_pdf(path: Optional[str] = None, url: Optional[str] = None,
+              paper: Union[str, Dict[str, Any]] = "letter", margin: Any = None,
+              landscape: bool = False, header_template: Optional[str] = None,
+              footer_template: Optional[str] = None, page_ranges: Optional[str] = None,
+              print_background: bool = True, timeout: float = 150) -> Dict[str, Any]:
+    """Print the current page (or `url`, loaded first) to a PDF; returns {"path", "size", "sha256", "ms"}
+
+    `paper` is a name (letter, legal, tabloid, a3, a4, a5) or {"width", "height"};
+    `margin` is one length or {"top", "right", "bottom", "left"}. Lengths are
+    inches, or strings with a unit ("1cm", "10mm", "96px").
+    """
+    kwargs = _pdf_options(paper, margin, landscape, header_template, footer_template,
+                          page_ranges, print_background)
+    if path:
+        kwargs["path"] = path
+    if url:
+        kwargs["url"] = url
+    result = call_mcp_tool_result("print_pdf", _timeout=timeout, **kwargs)
+    if result.is_error:
+        raise RuntimeError(result.text)
+    return result.data
+
+def print_pdf_batch(urls: List[str], output_dir: Optional[str] = None, concurrency: int = 2,
+                    paper: Union[str, Dict[str, Any]] = "letter", margin: Any = None,
+                    landscape: bool = False, header_template: Optional[str] = None,
+                    footer_template: Optional[str] = None, page_ranges: Optional[str] = None,
+                    print_background: bool = True, timeout: float = 600) -> List[Dict[str, Any]]:
+    """Print each URL to NNN-<url>.pdf in `output_dir` (default: a new spool directory); returns one result dict per URL, in order
+
+    Failed URLs have an "error" key instead of "path". Options as in print_pdf().
+    """
+    kwargs = _pdf_options(paper, margin, landscape, header_template, footer_template,
+                          page_ranges, print_background)
+    kwargs.update(urls=urls, concurrency=concurrency)
+    if output_dir:
+        kwargs["outputDir"] = output_dir
+    result = call_mcp_tool_result("print_pdf_batch", _timeout=timeout, **kwargs)
+    if result.is_error:
+        raise RuntimeError(result.text)
+    return result.data["results"]
+
+def save_storage_state(path: str, origins: Optional[list] = None) -> str:
+    """Save cookies + localStorage/sessionStorage/IndexedDB to one file (.gz to compress)"""
+    if origins:
+        return call_mcp_tool("save_storage_state", path=path, origins=origins)
+    return call_mcp_tool("save_storage_state", path=path)
+
+def load_storage_state(path: str) -> str:
+    """Restore a saved storage state before the first navigation"""
+    return call_mcp_tool("load_storage_state", path=path)
+
 def close_browser() -> str:
     """Close the browser"""
     return call_mcp_tool("close_browser")
@@ -132,11 +393,27 @@ __all__ = [
     'screenshot', 
     'click',
     'fill',
+    'fill_form',
     'evaluate',
     'get_content',
+    'get_content_spooled',
+    'get_content_delta',
+    'wait_for',
+    'apply_content_delta',
+    'open_spooled',
+    'open_session',
+    'close_session',
+    'session_active',
+    'print_pdf',
+    'print_pdf_batch',
+    'save_storage_state',
+    'load_storage_state',
     'close_browser',
     'test_browser',
-    'call_mcp_tool'
+    'call_mcp_tool',
+    'call_mcp_tool_result',
+    'evaluate_value',
+    'ToolResult'
 ]
 
 if __name__ == "__main__":
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Artifact store - content-addressed screenshots with thumbnails and dedupe
+
+The screenshot tool writes /tmp/<name>, so captures overwrite each other by
+name and an unchanged page is stored again on every run. This store keys each
+image by its SHA-256: an identical capture costs one hash and one index row,
+never a second copy on disk. A SQLite index records every capture (URL,
+device, name, timestamp, hash), thumbnails are rendered in a background
+thread pool, and blobs are evicted least-recently-used once the store grows
+past its size budget.
+
+Usage:
+    import artifact_store
+    with artifact_store.ArtifactStore() as store:
+        cap = store.put("/tmp/home.png", url="https://example.com", device="pixel-9")
+        cap.new                  # False if the same image was already stored
+        store.changed("https://example.com", "pixel-9")
+        store.history("https://example.com", "pixel-9")
+
+CLI:
+    python3 artifact_store.py put /tmp/home.png --url https://example.com --device pixel-9
+    python3 artifact_store.py list --url https://example.com
+    python3 artifact_store.py stats
+    python3 artifact_store.py --budget-mb 512 gc
+
+Thumbnails use Pillow when installed, else ffmpeg, else they are skipped.
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    from PIL import Image
+except ImportError:  # thumbnails fall back to ffmpeg
+    Image = None
+
+DEFAULT_ROOT = os.environ.get(
+    "CHROMIUM_ARTIFACTS", os.path.join(os.path.expanduser("~"), ".mcp-chromium-arm64", "artifacts")
+)
+DEFAULT_BUDGET_MB = int(os.environ.get("CHROMIUM_ARTIFACTS_BUDGET_MB", "2048"))
+THUMB_SIZE = 320
+CHUNK = 1 << 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    ext TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    thumb_size INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_lru ON blobs (last_access);
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    device TEXT NOT NULL,
+    name TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    captured_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS captures_key ON captures (url, device, captured_at);
+CREATE INDEX IF NOT EXISTS captures_hash ON captures (hash);
+"""
+
+
+@dataclass
+class Capture:
+    """One indexed capture. `path` is None once its blob has been evicted,
+    `thumbnail` until one has been rendered (always None from put())."""
+    id: int
+    url: str
+    device: str
+    name: str
+    hash: str
+    captured_at: float
+    path: Optional[str]
+    thumbnail: Optional[str]
+    new: bool = False        # put() wrote a new blob (False = deduplicated)
+
+    def __str__(self) -> str:
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.captured_at))
+        return f"{when}  {self.hash[:12]}  {self.device:<14} {self.url}  {self.name}"
+
+
+def _sniff_ext(head: bytes) -> str:
+    if head.startswith(b"\x89PNG"):
+        return ".png"
+    if head.startswith(b"\xff\xd8"):
+        return ".jpg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return ".bin"
+
+
+def _hash_file(path: str) -> Tuple[str, bytes]:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        head = f.read(CHUNK)
+        digest.update(head)
+        for block in iter(lambda: f.read(CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest(), head[:16]
+
+
+class ArtifactStore:
+    """Content-addressed blob store with a SQLite capture index."""
+
+    def __init__(self, root: str = DEFAULT_ROOT, budget_mb: Optional[int] = DEFAULT_BUDGET_MB,
+                 thumb_workers: int = 2, thumb_size: int = THUMB_SIZE):
+        self.root = root
+        self.budget = budget_mb * 1024 * 1024 if budget_mb else None
+        self.thumb_size = thumb_size
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "thumbs"), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        # WAL + NORMAL: one fsync per checkpoint instead of one per commit (SD cards).
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.total = self.conn.execute("SELECT COALESCE(SUM(size + thumb_size), 0) FROM blobs").fetchone()[0]
+        self.thumbnailer = self._pick_thumbnailer()
+        self.pool = ThreadPoolExecutor(max_workers=thumb_workers, thread_name_prefix="thumb") if self.thumbnailer else None
+        self.pending: List[Future] = []
+
+    def close(self) -> None:
+        """Wait for outstanding thumbnails, then close the index."""
+        if self.pool:
+            self.pool.shutdown(wait=True)
+        self.conn.close()
+
+    def __enter__(self) -> "ArtifactStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def blob_path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest + ext)
+
+    def thumb_path(self, digest: str) -> str:
+        return os.path.join(self.root, "thumbs", digest[:2], digest + ".jpg")
+
+    def put(self, source: Union[str, bytes], url: str = "", device: str = "desktop", name: Optional[str] = None,
+            captured_at: Optional[float] = None, move: bool = False) -> Capture:
+        """Index one capture from a file path or raw bytes.
+
+        The blob is written only if its hash is new. With move=True a path
+        source is renamed into the store (same filesystem) or removed after
+        copying, so /tmp does not keep a second copy either.
+        """
+        now = captured_at if captured_at is not None else time.time()
+        if isinstance(source, bytes):
+            digest, head = hashlib.sha256(source).hexdigest(), source[:16]
+            name = name or digest[:12]
+        else:
+            digest, head = _hash_file(source)
+            name = name or os.path.basename(source)
+        ext = _sniff_ext(head)
+
+        with self.lock:
+            row = self.conn.execute("SELECT ext FROM blobs WHERE hash = ?", (digest,)).fetchone()
+            new = row is None
+            if new:
+                size = self._write_blob(source, digest, ext, move)
+                self.total += size
+            else:
+                ext = row[0]
+                if move and not isinstance(source, bytes):
+                    os.unlink(source)
+            with self.conn:
+                if new:
+                    self.conn.execute(
+                        "INSERT INTO blobs (hash, ext, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                        (digest, ext, size, now, now),
+                    )
+                else:
+                    self.conn.execute("UPDATE blobs SET last_access = ? WHERE hash = ?", (now, digest))
+                cur = self.conn.execute(
+                    "INSERT INTO captures (url, device, name, hash, captured_at) VALUES (?, ?, ?, ?, ?)",
+                    (url, device, name, digest, now),
+                )
+        if new and self.pool:
+            self.pending = [f for f in self.pending if not f.done()]
+            self.pending.append(self.pool.submit(self._thumbnail, digest, ext))
+        if new and self.budget and self.total > self.budget:
+            self.evict(self.budget, keep={digest})
+        # The thumbnail is still queued (or may never render), so it is left out here;
+        # history() reports it once wait_thumbnails() has returned.
+        return Capture(cur.lastrowid, url, device, name, digest, now, self.blob_path(digest, ext), None, new)
+
+    def _write_blob(self, source: Union[str, bytes], digest: str, ext: str, move: bool) -> int:
+        target = self.blob_path(digest, ext)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if isinstance(source, bytes):
+            staging = f"{target}.tmp-{os.getpid()}"
+            with open(staging, "wb") as f:
+                f.write(source)
+            os.replace(staging, target)
+            return len(source)
+        if move:
+            try:
+                os.replace(source, target)
+                return os.path.getsize(target)
+            except OSError:  # different filesystem: copy, then drop the source
+                pass
+        staging = f"{target}.tmp-{os.getpid()}"
+        shutil.copyfile(source, staging)
+        os.replace(staging, target)
+        if move:
+            os.unlink(source)
+        return os.path.getsize(target)
+
+    def _pick_thumbnailer(self):
+        if Image is not None:
+            return self._thumb_pillow
+        if shutil.which("ffmpeg"):
+            return self._thumb_ffmpeg
+        return None
+
+    def _thumb_pillow(self, src: str, dst: str) -> None:
+        with Image.open(src) as img:
+            img.thumbnail((self.thumb_size, self.thumb_size))
+            img.convert("RGB").save(dst, "JPEG", quality=80)
+
+    def _thumb_ffmpeg(self, src: str, dst: str) -> None:
+        scale = f"scale='min({self.thumb_size},iw)':-2"
+        subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-i", src, "-vf", scale, "-frames:v", "1", dst],
+                       check=True, capture_output=True, timeout=60)
+
+    def _thumbnail(self, digest: str, ext: str) -> Optional[str]:
+        src, dst = self.blob_path(digest, ext), self.thumb_path(digest)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        try:
+            self.thumbnailer(src, dst)
+            size = os.path.getsize(dst)
+        except Exception:
+            return None  # not an image we can decode, or evicted meanwhile
+        with self.lock:
+            with self.conn:
+                cur = self.conn.execute("UPDATE blobs SET thumb_size = ? WHERE hash = ?", (size, digest))
+            if cur.rowcount:
+                self.total += size
+            else:
+                os.unlink(dst)
+        return dst
+
+    def wait_thumbnails(self) -> None:
+        """Block until every queued thumbnail has been written."""
+        for future in self.pending:
+            future.result()
+        self.pending = []
+
+    def rebuild_thumbnails(self) -> int:
+        """Queue thumbnails for blobs that have none; returns how many were queued."""
+        if not self.pool:
+            return 0
+        with self.lock:
+            rows = self.conn.execute("SELECT hash, ext FROM blobs WHERE thumb_size = 0").fetchall()
+        self.pending.extend(self.pool.submit(self._thumbnail, digest, ext) for digest, ext in rows)
+        return len(rows)
+
+    def evict(self, budget_bytes: int, keep: Optional[set] = None) -> int:
+        """Drop least-recently-used blobs until the store fits budget_bytes.
+
+        Capture rows are kept, so history and change detection still work
+        after the image itself is gone. Returns the number of blobs removed.
+        """
+        keep = keep or set()
+        removed = 0
+        with self.lock:
+            if self.total <= budget_bytes:
+                return 0
+            victims = []
+            for digest, ext, size, thumb_size in self.conn.execute(
+                    "SELECT hash, ext, size, thumb_size FROM blobs ORDER BY last_access"):
+                if self.total <= budget_bytes:
+                    break
+                if digest in keep:
+                    continue
+                victims.append(digest)
+                for path in (self.blob_path(digest, ext), self.thumb_path(digest)):
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                self.total -= size + thumb_size
+                removed += 1
+            with self.conn:
+                self.conn.executemany("DELETE FROM blobs WHERE hash = ?", [(d,) for d in victims])
+        return removed
+
+    def _captures(self, where: str, params: tuple, limit: Optional[int]) -> List[Capture]:
+        sql = ("SELECT c.id, c.url, c.device, c.name, c.hash, c.captured_at, b.ext, b.thumb_size "
+               f"FROM captures c LEFT JOIN blobs b ON b.hash = c.hash WHERE {where} ORDER BY c.captured_at DESC, c.id DESC")
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [Capture(cid, url, device, name, digest, at,
+                        self.blob_path(digest, ext) if ext else None,
+                        self.thumb_path(digest) if thumb_size else None)
+                for cid, url, device, name, digest, at, ext, thumb_size in rows]
+
+    def history(self, url: Optional[str] = None, device: Optional[str] = None,
+                limit: Optional[int] = 50) -> List[Capture]:
+        """Captures newest first, optionally filtered by URL and device."""
+        clauses, params = ["1 = 1"], []
+        if url is not None:
+            clauses.append("c.url = ?")
+            params.append(url)
+        if device is not None:
+            clauses.append("c.device = ?")
+            params.append(device)
+        return self._captures(" AND ".join(clauses), tuple(params), limit)
+
+    def latest(self, url: str, device: str = "desktop") -> Optional[Capture]:
+        """Most recent capture of url on device."""
+        found = self.history(url, device, limit=1)
+        return found[0] if found else None
+
+    def changed(self, url: str, device: str = "desktop") -> Optional[bool]:
+        """Whether the last capture differs from the one before it (None if fewer than two)."""
+        last_two = self.history(url, device, limit=2)
+        if len(last_two) < 2:
+            return None
+        return last_two[0].hash != last_two[1].hash
+
+    def open(self, digest: str) -> Optional[str]:
+        """Path of a blob by (prefix of) its hash, marking it recently used."""
+        with self.lock:
+            row = self.conn.execute("SELECT hash, ext FROM blobs WHERE hash LIKE ? LIMIT 2",
+                                    (digest + "%",)).fetchall()
+            if len(row) != 1:
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE blobs SET last_access = ? WHERE hash = ?", (time.time(), row[0][0]))
+        return self.blob_path(*row[0])
+
+    def stats(self) -> Dict[str, Any]:
+        """Blob/capture counts, bytes on disk and the dedupe ratio."""
+        with self.lock:
+            blobs, size, thumbs = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(thumb_size), 0) FROM blobs").fetchone()
+            captures, distinct = self.conn.execute("SELECT COUNT(*), COUNT(DISTINCT hash) FROM captures").fetchone()
+        return {
+            "blobs": blobs,
+            "captures": captures,
+            "distinct_images": distinct,
+            "bytes": size,
+            "thumbnail_bytes": thumbs,
+            "budget_bytes": self.budget,
+            "dedupe_ratio": round(captures / distinct, 2) if distinct else None,
+        }
+
+
+def main():
+    """CLI interface for the artifact store."""
+    parser = argparse.ArgumentParser(description="Content-addressed screenshot store")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Store directory (default: $CHROMIUM_ARTIFACTS)")
+    parser.add_argument("--budget-mb", type=int, default=DEFAULT_BUDGET_MB,
+                        help="Size budget in MB, 0 = unlimited (default: $CHROMIUM_ARTIFACTS_BUDGET_MB or 2048)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    put = sub.add_parser("put", help="Add image files to the store")
+    put.add_argument("files", nargs="+")
+    put.add_argument("--url", default="")
+    put.add_argument("--device", default="desktop")
+    put.add_argument("--move", action="store_true", help="Remove the source files after storing them")
+
+    lst = sub.add_parser("list", help="Captures, newest first")
+    lst.add_argument("--url")
+    lst.add_argument("--device")
+    lst.add_argument("--limit", type=int, default=50)
+
+    sub.add_parser("stats", help="Store size and dedupe ratio")
+
+    gc = sub.add_parser("gc", help="Evict least-recently-used blobs down to the budget")
+    gc.add_argument("--thumbnails", action="store_true", help="Also render missing thumbnails")
+
+    args = parser.parse_args()
+    store = ArtifactStore(args.root, args.budget_mb or None)
+    try:
+        if args.command == "put":
+            for path in args.files:
+                cap = store.put(path, url=args.url, device=args.device, move=args.move)
+                print(f"{'stored' if cap.new else 'dedupe'}  {cap.hash[:12]}  {path}")
+            store.wait_thumbnails()
+        elif args.command == "list":
+            for cap in store.history(args.url, args.device, args.limit):
+                print(cap if cap.path else f"{cap}  (evicted)")
+        elif args.command == "stats":
+            for key, value in store.stats().items():
+                print(f"{key:>16}: {value}")
+        elif args.command == "gc":
+            removed = store.evict(store.budget) if store.budget else 0
+            print(f"Evicted {removed} blob(s)")
+            if args.thumbnails:
+                print(f"Rendering {store.rebuild_thumbnails()} thumbnail(s)")
+                store.wait_thumbnails()
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
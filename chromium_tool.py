@@ -2,24 +2,138 @@
 """
 ARM64 Chromium Tool for Claude Code
 A direct tool implementation that bypasses MCP server issues
+
+Scenario runner:
+    python3 chromium_tool.py run --instances 4 --junit results.xml scenarios/*.jsonl
 """
 
 import subprocess
 import json
 import sys
 import os
+import queue
 import tempfile
-from typing import Dict, Any, Optional
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+try:
+    import yaml
+except ImportError:  # YAML scenarios are optional; JSONL needs nothing extra
+    yaml = None
+
+
+class MCPSession:
+    """One long-lived MCP server process, driven with JSON-RPC lines over stdio.
+
+    Every call reuses the same node process and browser, instead of paying a
+    process launch (and a DevTools reconnect) per tool call.
+    """
+
+    def __init__(self, env: Optional[Dict[str, str]] = None, timeout: float = 30):
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        self.timeout = timeout
+        self._next_id = 0
+        self._responses: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self.process = subprocess.Popen(
+            ["node", os.path.join(script_dir, "index.js")],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+            cwd=script_dir,
+            env={**os.environ, **(env or {})},
+        )
+        threading.Thread(target=self._read_responses, daemon=True).start()
+        try:
+            self.request("initialize", {
+                "protocolVersion": "2025-06-18",
+                "capabilities": {},
+                "clientInfo": {"name": "chromium_tool", "version": "1.0.0"},
+            })
+        except TimeoutError:
+            self.process.kill()
+            raise
+        self._send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    def _read_responses(self):
+        for line in self.process.stdout:
+            line = line.strip()
+            if not line.startswith("{"):
+                continue
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if message.get("id") is not None:
+                self._responses.put(message)
+
+    def _send(self, message: Dict[str, Any]):
+        self.process.stdin.write(json.dumps(message) + "\n")
+        self.process.stdin.flush()
+
+    def request(self, method: str, params: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Send one JSON-RPC request and wait for its response."""
+        self._next_id += 1
+        request_id = self._next_id
+        self._send({"jsonrpc": "2.0", "method": method, "params": params, "id": request_id})
+        deadline = time.monotonic() + (timeout or self.timeout)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self.process.poll() is not None:
+                raise TimeoutError(f"{method}: no response from MCP server")
+            try:
+                message = self._responses.get(timeout=min(remaining, 1.0))
+            except queue.Empty:
+                continue
+            if message.get("id") == request_id:
+                return message
+
+    def call_tool(self, name: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Call a tool; returns the result dict, or {"error": ...} like a one-shot call."""
+        try:
+            response = self.request("tools/call", {"name": name, "arguments": arguments}, timeout)
+        except (TimeoutError, OSError) as e:
+            return {"error": str(e)}
+        if "error" in response:
+            return {"error": response["error"].get("message", str(response["error"]))}
+        return response.get("result", {})
+
+    def close(self):
+        """Close the browser and stop the server process."""
+        if self.process.poll() is None:
+            self.call_tool("close_browser", {}, timeout=10)
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 
 class ChromiumARM64Tool:
-    def __init__(self):
+    def __init__(self, session: Optional[MCPSession] = None):
         # Dynamically determine paths based on script location
         script_dir = os.path.dirname(os.path.abspath(__file__))
         self.server_path = os.path.join(script_dir, "index.js")
         self.working_dir = script_dir
+        # With a session, calls go to its persistent server instead of a fresh process each
+        self.session = session
         
     def _call_mcp_server(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Call our MCP server directly and return the result."""
+        if self.session is not None:
+            return self.session.call_tool(method, params)
+        
         request = {
             "jsonrpc": "2.0",
             "method": "tools/call",
@@ -58,6 +172,15 @@ class ChromiumARM64Tool:
         except Exception as e:
             return {"error": f"Unexpected error: {e}"}
     
+    def structured(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Call a tool and return its structuredContent as native Python types."""
+        result = self._call_mcp_server(method, params or {})
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        if result.get("isError"):
+            raise RuntimeError(result.get("content", [{}])[0].get("text", f"{method} failed"))
+        return result.get("structuredContent") or {}
+    
     def navigate(self, url: str) -> str:
         """Navigate to a URL."""
         result = self._call_mcp_server("navigate", {"url": url})
@@ -103,6 +226,10 @@ class ChromiumARM64Tool:
         content = result.get("content", [{}])
         return content[0].get("text", "Script executed")
     
+    def evaluate_value(self, script: str) -> Any:
+        """Execute JavaScript and return the value itself (list, dict, number, ...)."""
+        return self.structured("evaluate", {"script": script}).get("value")
+    
     def get_content(self, content_type: str = "text") -> str:
         """Get page content (html or text)."""
         result = self._call_mcp_server("get_content", {"type": content_type})
@@ -112,6 +239,27 @@ class ChromiumARM64Tool:
         content = result.get("content", [{}])
         return content[0].get("text", "No content")
     
+    def save_storage_state(self, path: str, origins: Optional[list] = None) -> str:
+        """Save cookies plus localStorage/sessionStorage/IndexedDB to one file."""
+        params: Dict[str, Any] = {"path": path}
+        if origins:
+            params["origins"] = origins
+        result = self._call_mcp_server("save_storage_state", params)
+        if "error" in result:
+            return f"Error: {result['error']}"
+        
+        content = result.get("content", [{}])
+        return content[0].get("text", "Storage state saved")
+    
+    def load_storage_state(self, path: str) -> str:
+        """Restore a saved storage state; call before the first navigation."""
+        result = self._call_mcp_server("load_storage_state", {"path": path})
+        if "error" in result:
+            return f"Error: {result['error']}"
+        
+        content = result.get("content", [{}])
+        return content[0].get("text", "Storage state loaded")
+    
     def close_browser(self) -> str:
         """Close the browser instance."""
         result = self._call_mcp_server("close_browser", {})
@@ -121,13 +269,243 @@ class ChromiumARM64Tool:
         content = result.get("content", [{}])
         return content[0].get("text", "Browser closed")
 
+
+# --- Scenario runner ---------------------------------------------------------
+#
+# A scenario is a list of steps, one JSON object per line (.jsonl) or a YAML
+# list / {name, steps} mapping (.yaml/.yml, needs PyYAML). Each step names an
+# "action"; the other keys are its arguments:
+#
+#   {"action": "navigate", "url": "https://example.com/login"}
+#   {"action": "fill", "selector": "#email", "value": "a@b.c"}
+#   {"action": "click", "selector": "button[type=submit]"}
+#   {"action": "wait", "selector": ".dashboard", "timeout": 10000}   # wait_for arguments
+#   {"action": "assert", "text": "Welcome"}                          # or selector / script + equals
+#   {"action": "screenshot", "name": "dashboard.png"}
+#
+# Any other action is called as the MCP tool of that name (e.g. emulate_device).
+
+@dataclass
+class StepResult:
+    index: int
+    action: str
+    label: str
+    status: str  # passed | failed | skipped
+    seconds: float = 0.0
+    message: str = ""
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    path: str
+    instance: int
+    steps: List[StepResult] = field(default_factory=list)
+    error: str = ""
+
+    @property
+    def passed(self) -> bool:
+        return not self.error and all(step.status != "failed" for step in self.steps)
+
+    @property
+    def seconds(self) -> float:
+        return sum(step.seconds for step in self.steps)
+
+
+def load_scenario(path: str) -> Dict[str, Any]:
+    """Read a .jsonl or .yaml/.yml scenario file into {name, path, steps}."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ImportError("YAML scenarios need PyYAML: pip install pyyaml")
+            data = yaml.safe_load(f) or []
+            if isinstance(data, dict):
+                name = data.get("name", name)
+                data = data.get("steps", [])
+            steps = data
+        else:
+            steps = [json.loads(line) for line in f if line.strip() and not line.lstrip().startswith("#")]
+    for i, step in enumerate(steps, 1):
+        if not isinstance(step, dict) or "action" not in step:
+            raise ValueError(f"{path}: step {i} has no action")
+    return {"name": name, "path": path, "steps": steps}
+
+
+def _step_label(step: Dict[str, Any]) -> str:
+    target = step.get("url") or step.get("selector") or step.get("text") or step.get("script") or step.get("name") or ""
+    return f"{step['action']} {target}".strip()
+
+
+def _assert_step(tool: ChromiumARM64Tool, step: Dict[str, Any]) -> str:
+    """Check one assertion; returns a failure message, or "" when it holds."""
+    selector = step.get("selector")
+    if "script" in step:
+        value = tool.evaluate_value(step["script"])
+        if "equals" in step:
+            return "" if value == step["equals"] else f"expected {step['equals']!r}, got {value!r}"
+        return "" if value else f"{step['script']} is {value!r}"
+    if "text" in step:
+        root = f"document.querySelector({json.dumps(selector)})" if selector else "document.body"
+        found = tool.evaluate_value(f"(() => {{ const el = {root}; return !!el && el.innerText.includes({json.dumps(step['text'])}); }})()")
+        return "" if found else f"text {step['text']!r} not found" + (f" in {selector}" if selector else "")
+    if selector:
+        found = tool.evaluate_value(f"!!document.querySelector({json.dumps(selector)})")
+        return "" if found else f"no element matches {selector}"
+    raise ValueError("assert needs script, text or selector")
+
+
+def run_step(tool: ChromiumARM64Tool, step: Dict[str, Any], scenario: str, index: int) -> str:
+    """Run one step; returns a failure message, or "" on success."""
+    action = step["action"]
+    args = {k: v for k, v in step.items() if k != "action"}
+    if action == "assert":
+        return _assert_step(tool, args)
+    if action == "wait":
+        action = "wait_for"
+    elif action == "screenshot":
+        # Screenshots land in /tmp/<name>; keep parallel scenarios from overwriting each other
+        args.setdefault("name", f"{scenario}-{index:02d}.png")
+    timeout = max(30, args.get("timeout", 0) / 1000 + 10)
+    result = tool.session.call_tool(action, args, timeout=timeout)
+    if "error" in result:
+        return result["error"]
+    if result.get("isError"):
+        return result.get("content", [{}])[0].get("text", f"{action} failed")
+    return ""
+
+
+def run_scenario(tool: ChromiumARM64Tool, scenario: Dict[str, Any], instance: int = 0) -> ScenarioResult:
+    """Run a scenario's steps in order, stopping at the first failure."""
+    result = ScenarioResult(scenario["name"], scenario["path"], instance)
+    failed = False
+    for index, step in enumerate(scenario["steps"], 1):
+        label = _step_label(step)
+        if failed:
+            result.steps.append(StepResult(index, step["action"], label, "skipped"))
+            continue
+        start = time.perf_counter()
+        try:
+            message = run_step(tool, step, scenario["name"], index)
+        except Exception as e:
+            message = f"{type(e).__name__}: {e}"
+        failed = bool(message)
+        result.steps.append(StepResult(index, step["action"], label, "failed" if failed else "passed",
+                                       time.perf_counter() - start, message))
+    return result
+
+
+def run_scenarios(paths: List[str], instances: int = 1, base_port: int = 9300,
+                  isolate: bool = False) -> List[ScenarioResult]:
+    """Run scenario files across `instances` browsers; results in input order.
+
+    Each instance is one persistent MCP server with its own browser on
+    base_port + i. Scenarios that share an instance share its browser: between
+    scenarios the page is reset to about:blank and emulation is cleared, and
+    with isolate=True the browser is closed so the next one starts on a fresh
+    profile (cookies and storage included) at the cost of a relaunch.
+    """
+    free: "queue.Queue[int]" = queue.Queue()
+    for i in range(instances):
+        free.put(i)
+    sessions: Dict[int, MCPSession] = {}
+
+    def run_one(path: str) -> ScenarioResult:
+        instance = free.get()
+        try:
+            try:
+                scenario = load_scenario(path)
+            except Exception as e:
+                return ScenarioResult(os.path.basename(path), path, instance, error=f"{type(e).__name__}: {e}")
+            if instance not in sessions:
+                try:
+                    sessions[instance] = MCPSession({"CHROMIUM_DEBUGGING_PORT": str(base_port + instance)})
+                except Exception as e:
+                    return ScenarioResult(scenario["name"], path, instance, error=f"MCP server failed to start: {e}")
+            session = sessions[instance]
+            result = run_scenario(ChromiumARM64Tool(session), scenario, instance)
+            if isolate:
+                session.call_tool("close_browser", {})
+            else:
+                session.call_tool("navigate", {"url": "about:blank"})
+                session.call_tool("reset_emulation", {})
+            return result
+        finally:
+            free.put(instance)
+
+    try:
+        with ThreadPoolExecutor(max_workers=instances) as pool:
+            return list(pool.map(run_one, paths))
+    finally:
+        for session in sessions.values():
+            session.close()
+
+
+def write_junit(results: List[ScenarioResult], path: str):
+    """Write JUnit XML: one testsuite per scenario, one testcase per step."""
+    suites = ET.Element("testsuites", name="chromium scenarios", tests=str(sum(len(r.steps) for r in results)),
+                        failures=str(sum(1 for r in results for s in r.steps if s.status == "failed")),
+                        errors=str(sum(1 for r in results if r.error)),
+                        time=f"{sum(r.seconds for r in results):.3f}")
+    for r in results:
+        suite = ET.SubElement(suites, "testsuite", name=r.name, file=r.path, tests=str(len(r.steps)),
+                              failures=str(sum(1 for s in r.steps if s.status == "failed")),
+                              errors="1" if r.error else "0",
+                              skipped=str(sum(1 for s in r.steps if s.status == "skipped")),
+                              time=f"{r.seconds:.3f}", hostname=f"instance-{r.instance}")
+        if r.error:
+            ET.SubElement(suite, "error", message=r.error)
+        for s in r.steps:
+            case = ET.SubElement(suite, "testcase", classname=r.name, name=f"{s.index:02d} {s.label}",
+                                 time=f"{s.seconds:.3f}")
+            if s.status == "failed":
+                ET.SubElement(case, "failure", message=s.message).text = s.message
+            elif s.status == "skipped":
+                ET.SubElement(case, "skipped")
+    ET.indent(suites)
+    ET.ElementTree(suites).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def run_main(argv: List[str]) -> int:
+    """`run` subcommand: execute scenario files, print timings, exit 1 on failure."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="chromium_tool.py run", description="Run JSONL/YAML browser scenarios")
+    parser.add_argument("scenarios", nargs="+", help=".jsonl / .yaml scenario files")
+    parser.add_argument("--instances", type=int, default=1, help="browsers to run scenarios on in parallel (default: 1)")
+    parser.add_argument("--base-port", type=int, default=9300, help="DevTools port of the first instance (default: 9300)")
+    parser.add_argument("--isolate", action="store_true", help="fresh browser profile for every scenario")
+    parser.add_argument("--junit", help="write JUnit XML to this path")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every step's timing, not just failures")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = run_scenarios(args.scenarios, max(1, args.instances), args.base_port, args.isolate)
+    for r in results:
+        print(f"{'PASS' if r.passed else 'FAIL'} {r.name} ({r.seconds:.2f}s, instance {r.instance})")
+        if r.error:
+            print(f"    {r.error}")
+        for s in r.steps:
+            if args.verbose or s.status == "failed":
+                print(f"    {s.index:02d} {s.status:<7} {s.seconds * 1000:8.0f}ms  {s.label}" +
+                      (f"  -- {s.message}" if s.message else ""))
+    failed = sum(1 for r in results if not r.passed)
+    print(f"{len(results) - failed}/{len(results)} scenarios passed in {time.perf_counter() - start:.1f}s")
+    if args.junit:
+        write_junit(results, args.junit)
+    return 1 if failed else 0
+
+
 def main():
     """CLI interface for the tool."""
     if len(sys.argv) < 2:
         print("Usage: python3 chromium_tool.py <command> [args...]")
-        print("Commands: navigate, screenshot, click, fill, evaluate, get_content, close_browser")
+        print("Commands: navigate, screenshot, click, fill, evaluate, get_content, save_storage_state, load_storage_state, close_browser, run")
         return
     
+    if sys.argv[1] == "run":
+        sys.exit(run_main(sys.argv[2:]))
+    
     tool = ChromiumARM64Tool()
     command = sys.argv[1]
     
@@ -146,6 +524,10 @@ def main():
         elif command == "get_content":
             content_type = sys.argv[2] if len(sys.argv) >= 3 else "text"
             result = tool.get_content(content_type)
+        elif command == "save_storage_state" and len(sys.argv) >= 3:
+            result = tool.save_storage_state(sys.argv[2], sys.argv[3:] or None)
+        elif command == "load_storage_state" and len(sys.argv) >= 3:
+            result = tool.load_storage_state(sys.argv[2])
         elif command == "close_browser":
             result = tool.close_browser()
         else:
@@ -0,0 +1,633 @@
+#!/usr/bin/env python3
+"""
+Cluster mode - spread audits, scenarios and captures over several ARM boards
+
+A coordinator holds the job queue and collects results; a worker daemon on
+each node runs `capacity` persistent MCP server sessions (one browser each,
+see chromium_tool.MCPSession) and pulls jobs as its slots free up.
+
+Protocol: newline-delimited JSON over one TCP connection per worker.
+    worker -> coordinator   hello {worker, host, capacity}
+                            pull {slots}          ask for up to `slots` jobs
+                            started {job_id}
+                            result {job_id, ok, result | error, retryable, seconds}
+                            heartbeat {running, queued}
+    coordinator -> worker   jobs {jobs: [{id, kind, payload}, ...]}   (may be empty)
+                            revoke {job_id}       drop the job if it has not started
+                            shutdown
+
+Workers prefetch a few jobs beyond their free slots to hide the round trip.
+When the central queue is empty, a pulling worker steals prefetched jobs that
+another worker has not started yet. A worker that disconnects or misses
+heartbeats is dropped and its unfinished jobs are requeued (up to
+max_attempts); jobs that fail with a retryable error (browser crash) are
+retried the same way. If a stolen job ends up running twice, the first
+result wins.
+
+Job kinds:
+    audit     {url, audits: ["performance", ...], device, conditioning}
+    capture   {url, device, fullPage, wait: {wait_for arguments}}
+    scenario  {scenario: {name, path, steps}}   (see chromium_tool.load_scenario)
+
+CLI:
+    python3 cluster.py coordinator --listen 0.0.0.0:7700 --audit https://example.com --out results.jsonl
+    python3 cluster.py worker --coordinator pi-01.local:7700 --capacity 2
+    python3 cluster.py local --workers 3 --scenario scenarios/*.jsonl --capture https://example.com
+"""
+
+import argparse
+import base64
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from chromium_tool import ChromiumARM64Tool, MCPSession, load_scenario, run_scenario
+
+DEFAULT_PORT = 7700
+# Audit kinds, each run as the run_<name>_audit tool.
+AUDITS = ("performance", "accessibility", "seo", "best_practices", "nextjs")
+
+
+def _send(sock: socket.socket, lock: threading.Lock, message: Dict[str, Any]) -> bool:
+    data = (json.dumps(message) + "\n").encode()
+    try:
+        with lock:
+            sock.sendall(data)
+        return True
+    except OSError:
+        return False
+
+
+def _parse_address(value: str, default_host: str = "127.0.0.1") -> Tuple[str, int]:
+    host, _, port = value.rpartition(":")
+    return (host or default_host), int(port or DEFAULT_PORT)
+
+
+# --- Coordinator ---------------------------------------------------------------
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    payload: Dict[str, Any]
+    state: str = "queued"  # queued | assigned | running | done | failed
+    attempts: int = 0
+    workers: Set[str] = field(default_factory=set)
+    worker: str = ""  # worker that produced the result
+    result: Any = None
+    error: str = ""
+    seconds: float = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {"id": self.id, "kind": self.kind, "payload": self.payload, "ok": self.state == "done",
+                "result": self.result, "error": self.error, "worker": self.worker,
+                "attempts": self.attempts, "seconds": round(self.seconds, 3)}
+
+
+class _WorkerConn:
+    def __init__(self, sock: socket.socket, address):
+        self.sock = sock
+        self.address = address
+        self.send_lock = threading.Lock()
+        self.id = ""
+        self.capacity = 0
+        self.jobs: Dict[str, str] = {}  # job id -> assigned | running, in assignment order
+        self.last_seen = time.monotonic()
+
+    def send(self, message: Dict[str, Any]) -> bool:
+        return _send(self.sock, self.send_lock, message)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class Coordinator:
+    """Job queue plus TCP server that workers connect to."""
+
+    def __init__(self, host: str = "0.0.0.0", port: int = DEFAULT_PORT, heartbeat_timeout: float = 15.0,
+                 max_attempts: int = 3, steal: bool = True):
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts
+        self.steal = steal
+        self.jobs: Dict[str, Job] = {}
+        self.workers: Dict[str, _WorkerConn] = {}
+        self._queue: Deque[str] = deque()
+        self._cond = threading.Condition()
+        self._next_id = 0
+        self._stop = threading.Event()
+        self._server = socket.create_server((host, port))
+        self.address = self._server.getsockname()[:2]
+
+    def submit(self, kind: str, payload: Dict[str, Any]) -> str:
+        """Queue a job; returns its id."""
+        with self._cond:
+            self._next_id += 1
+            job = Job(f"job-{self._next_id}", kind, payload)
+            self.jobs[job.id] = job
+            self._queue.append(job.id)
+            return job.id
+
+    def start(self):
+        """Accept workers and watch heartbeats in background threads."""
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        threading.Thread(target=self._reap_loop, daemon=True).start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every submitted job is done or failed."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: all(job.state in ("done", "failed") for job in self.jobs.values()), timeout)
+
+    def close(self, shutdown_workers: bool = False):
+        """Stop accepting workers; optionally tell connected workers to exit."""
+        self._stop.set()
+        self._server.close()
+        with self._cond:
+            workers = list(self.workers.values())
+        for worker in workers:
+            if shutdown_workers:
+                worker.send({"type": "shutdown"})
+            worker.close()
+
+    def results(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            return [job.summary() for job in self.jobs.values()]
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                sock, address = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve_worker, args=(_WorkerConn(sock, address),), daemon=True).start()
+
+    def _reap_loop(self):
+        while not self._stop.wait(1.0):
+            now = time.monotonic()
+            with self._cond:
+                stale = [w for w in self.workers.values() if now - w.last_seen > self.heartbeat_timeout]
+            for worker in stale:
+                print(f"[cluster] worker {worker.id} missed heartbeats, dropping it", file=sys.stderr)
+                worker.close()  # the reader thread sees EOF and requeues its jobs
+
+    def _serve_worker(self, worker: _WorkerConn):
+        try:
+            for line in worker.sock.makefile("r", encoding="utf-8"):
+                if not line.strip():
+                    continue
+                message = json.loads(line)
+                worker.last_seen = time.monotonic()
+                kind = message.get("type")
+                if kind == "hello":
+                    worker.id = message.get("worker") or f"{worker.address[0]}:{worker.address[1]}"
+                    worker.capacity = int(message.get("capacity", 1))
+                    with self._cond:
+                        self.workers[worker.id] = worker
+                    print(f"[cluster] worker {worker.id} joined ({worker.capacity} slots)", file=sys.stderr)
+                elif kind == "pull":
+                    self._assign(worker, int(message.get("slots", 1)))
+                elif kind == "started":
+                    with self._cond:
+                        job = self.jobs.get(message["job_id"])
+                        if job and job.id in worker.jobs:
+                            worker.jobs[job.id] = "running"
+                            if job.state == "assigned":
+                                job.state = "running"
+                elif kind == "result":
+                    self._complete(worker, message)
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._worker_lost(worker)
+
+    def _assign(self, worker: _WorkerConn, slots: int):
+        revokes: List[Tuple[_WorkerConn, str]] = []
+        given: List[Job] = []
+        with self._cond:
+            while slots and self._queue:
+                job = self.jobs[self._queue.popleft()]
+                if job.state != "queued":
+                    continue
+                given.append(job)
+                slots -= 1
+            if slots and self.steal:
+                # Steal the most recently prefetched, not yet started jobs from the
+                # worker with the longest backlog.
+                victims = sorted((w for w in self.workers.values() if w is not worker),
+                                 key=lambda w: sum(1 for s in w.jobs.values() if s == "assigned"), reverse=True)
+                for victim in victims:
+                    for job_id in reversed([j for j, s in victim.jobs.items() if s == "assigned"]):
+                        if not slots:
+                            break
+                        del victim.jobs[job_id]
+                        self.jobs[job_id].workers.discard(victim.id)
+                        self.jobs[job_id].attempts -= 1  # not a new attempt, just a move
+                        revokes.append((victim, job_id))
+                        given.append(self.jobs[job_id])
+                        slots -= 1
+            for job in given:
+                job.state = "assigned"
+                job.attempts += 1
+                job.workers.add(worker.id)
+                worker.jobs[job.id] = "assigned"
+        for victim, job_id in revokes:
+            victim.send({"type": "revoke", "job_id": job_id})
+        worker.send({"type": "jobs", "jobs": [{"id": j.id, "kind": j.kind, "payload": j.payload} for j in given]})
+
+    def _complete(self, worker: _WorkerConn, message: Dict[str, Any]):
+        revokes: List[Tuple[_WorkerConn, str]] = []
+        with self._cond:
+            job = self.jobs.get(message.get("job_id"))
+            worker.jobs.pop(message.get("job_id"), None)
+            if job is None or job.state in ("done", "failed"):
+                return  # unknown job, or a duplicate after a steal
+            job.workers.discard(worker.id)
+            # A failed run while another worker still holds the job (after a
+            # steal) changes nothing; that worker's result decides.
+            if message.get("ok"):
+                job.state, job.result, job.error = "done", message.get("result"), ""
+            elif message.get("retryable") and job.attempts < self.max_attempts and not job.workers:
+                job.state, job.error = "queued", message.get("error", "")
+                self._queue.appendleft(job.id)
+            elif not job.workers:
+                job.state, job.result, job.error = "failed", message.get("result"), message.get("error", "")
+            else:
+                return
+            job.worker, job.seconds = worker.id, message.get("seconds", 0.0)
+            if job.state == "done":
+                for other in job.workers:
+                    if other in self.workers:
+                        self.workers[other].jobs.pop(job.id, None)
+                        revokes.append((self.workers[other], job.id))
+                job.workers.clear()
+            self._cond.notify_all()
+        for other, job_id in revokes:
+            other.send({"type": "revoke", "job_id": job_id})
+
+    def _worker_lost(self, worker: _WorkerConn):
+        worker.close()
+        with self._cond:
+            if self.workers.get(worker.id) is worker:
+                del self.workers[worker.id]
+            for job_id in reversed(list(worker.jobs)):
+                job = self.jobs[job_id]
+                job.workers.discard(worker.id)
+                if job.state in ("done", "failed") or job.workers:
+                    continue
+                if job.attempts >= self.max_attempts:
+                    job.state, job.error = "failed", f"worker {worker.id} lost (attempt {job.attempts})"
+                else:
+                    job.state = "queued"
+                    self._queue.appendleft(job_id)
+            requeued = len(worker.jobs)
+            worker.jobs.clear()
+            self._cond.notify_all()
+        print(f"[cluster] worker {worker.id} left, {requeued} job(s) requeued", file=sys.stderr)
+
+
+# --- Worker ------------------------------------------------------------------------
+
+class JobError(Exception):
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def _call(session: MCPSession, name: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+    result = session.call_tool(name, arguments, timeout)
+    if "error" in result:
+        raise JobError(result["error"], retryable=True)  # the server process itself failed
+    if result.get("isError"):
+        structured = result.get("structuredContent") or {}
+        raise JobError(result.get("content", [{}])[0].get("text", f"{name} failed"), bool(structured.get("retryable")))
+    return result
+
+
+def _open_page(session: MCPSession, payload: Dict[str, Any]):
+    if payload.get("device") or payload.get("conditioning"):
+        emulation = {key: payload[key] for key in ("device", "conditioning") if payload.get(key)}
+        _call(session, "emulate_device", emulation)
+    else:
+        _call(session, "reset_emulation", {})  # sessions are reused: drop the previous job's throttling
+    _call(session, "navigate", {"url": payload["url"]})
+    if payload.get("wait"):
+        wait = payload["wait"]
+        _call(session, "wait_for", wait, timeout=max(30, wait.get("timeout", 0) / 1000 + 10))
+
+
+def _audit_name(name: str) -> str:
+    """Normalize an audit name ("best-practices" -> "best_practices"); raises ValueError if unknown."""
+    audit = name.strip().lower().replace("-", "_")
+    if audit not in AUDITS:
+        raise ValueError(f"Unknown audit: {name} (use {', '.join(AUDITS)})")
+    return audit
+
+
+def run_job(session: MCPSession, job: Dict[str, Any]) -> Tuple[bool, Any]:
+    """Execute one job on a session; returns (ok, result). Raises JobError on failure."""
+    kind, payload = job["kind"], job["payload"]
+    if kind == "audit":
+        _open_page(session, payload)
+        audits = {}
+        for audit in payload.get("audits", ["performance"]):
+            try:
+                audit = _audit_name(audit)
+            except ValueError as e:
+                raise JobError(str(e))
+            result = _call(session, f"run_{audit}_audit", {}, timeout=120)
+            audits[audit] = result.get("structuredContent") or result.get("content", [{}])[0].get("text")
+        return True, audits
+    if kind == "capture":
+        _open_page(session, payload)
+        name = f"cluster-{os.getpid()}-{job['id']}.png"
+        shot = _call(session, "screenshot", {"name": name, "fullPage": payload.get("fullPage", False)}, timeout=60)
+        path = (shot.get("structuredContent") or {}).get("path", f"/tmp/{name}")
+        with open(path, "rb") as f:
+            png = f.read()
+        os.remove(path)
+        return True, {"png_base64": base64.b64encode(png).decode(), "size": len(png)}
+    if kind == "scenario":
+        result = run_scenario(ChromiumARM64Tool(session), payload["scenario"])
+        steps = [vars(step) for step in result.steps]
+        return result.passed, {"name": result.name, "passed": result.passed, "seconds": result.seconds, "steps": steps}
+    raise JobError(f"Unknown job kind: {kind}")
+
+
+class Worker:
+    """Worker daemon: runs jobs from a coordinator on `capacity` browser sessions."""
+
+    def __init__(self, host: str, port: int = DEFAULT_PORT, capacity: int = 1, prefetch: int = 1,
+                 base_port: int = 9400, heartbeat_interval: float = 5.0, name: Optional[str] = None):
+        self.address = (host, port)
+        self.capacity = capacity
+        self.prefetch = prefetch
+        self.base_port = base_port
+        self.heartbeat_interval = heartbeat_interval
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self._cond = threading.Condition()
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._running = 0
+        self._pulling = False
+        self._next_pull = 0.0
+        self._sock: Optional[socket.socket] = None
+        self._send_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run(self):
+        """Connect (and reconnect) to the coordinator until it sends shutdown."""
+        slots = [threading.Thread(target=self._slot_loop, args=(slot,), daemon=True) for slot in range(self.capacity)]
+        for thread in slots:
+            thread.start()
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                sock = socket.create_connection(self.address, timeout=10)
+            except OSError:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 10.0)
+                continue
+            backoff = 1.0
+            sock.settimeout(None)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            with self._cond:
+                self._sock, self._pulling, self._next_pull = sock, False, 0.0
+            self.send({"type": "hello", "worker": self.name, "host": socket.gethostname(), "capacity": self.capacity})
+            reader = threading.Thread(target=self._read_loop, args=(sock,), daemon=True)
+            reader.start()
+            self._connected_loop(reader)
+            with self._cond:
+                self._sock = None
+                self._queue.clear()  # the coordinator requeues everything we had not finished
+            sock.close()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in slots:
+            thread.join(timeout=30)  # lets each slot close its browser
+
+    def send(self, message: Dict[str, Any]) -> bool:
+        sock = self._sock
+        return sock is not None and _send(sock, self._send_lock, message)
+
+    def _connected_loop(self, reader: threading.Thread):
+        last_heartbeat = 0.0
+        while reader.is_alive() and not self._stop.is_set():
+            now = time.monotonic()
+            if now - last_heartbeat >= self.heartbeat_interval:
+                with self._cond:
+                    beat = {"type": "heartbeat", "running": self._running, "queued": len(self._queue)}
+                self.send(beat)
+                last_heartbeat = now
+            with self._cond:
+                want = self.capacity + self.prefetch - self._running - len(self._queue)
+                if want > 0 and not self._pulling and now >= self._next_pull:
+                    self._pulling = True
+                    self.send({"type": "pull", "slots": want})
+                self._cond.wait(timeout=0.25)
+
+    def _read_loop(self, sock: socket.socket):
+        try:
+            for line in sock.makefile("r", encoding="utf-8"):
+                if not line.strip():
+                    continue
+                message = json.loads(line)
+                kind = message.get("type")
+                with self._cond:
+                    if kind == "jobs":
+                        self._queue.extend(message["jobs"])
+                        self._pulling = False
+                        if not message["jobs"]:
+                            self._next_pull = time.monotonic() + 1.0
+                    elif kind == "revoke":
+                        self._queue = deque(j for j in self._queue if j["id"] != message["job_id"])
+                    elif kind == "shutdown":
+                        self._stop.set()
+                    self._cond.notify_all()
+                if kind == "shutdown":
+                    return
+        except (OSError, ValueError):
+            pass
+
+    def _slot_loop(self, slot: int):
+        session: Optional[MCPSession] = None
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._queue or self._stop.is_set())
+                    if self._stop.is_set():
+                        return
+                    job = self._queue.popleft()
+                    self._running += 1
+                self.send({"type": "started", "job_id": job["id"]})
+                start = time.perf_counter()
+                message: Dict[str, Any] = {"type": "result", "job_id": job["id"]}
+                try:
+                    if session is None or session.process.poll() is not None:
+                        session = MCPSession({"CHROMIUM_DEBUGGING_PORT": str(self.base_port + slot)})
+                    ok, result = run_job(session, job)
+                    message.update(ok=ok, result=result, error="" if ok else f"{job['kind']} failed")
+                except JobError as e:
+                    message.update(ok=False, error=str(e), retryable=e.retryable)
+                except Exception as e:
+                    message.update(ok=False, error=f"{type(e).__name__}: {e}", retryable=True)
+                finally:
+                    if session is not None and session.process.poll() is None:
+                        session.call_tool("navigate", {"url": "about:blank"})
+                        session.call_tool("reset_emulation", {})
+                message["seconds"] = time.perf_counter() - start
+                self.send(message)
+                with self._cond:
+                    self._running -= 1
+                    self._cond.notify_all()
+        finally:
+            if session is not None:
+                session.close()
+
+
+# --- CLI -------------------------------------------------------------------------------
+
+def _submit_jobs(coordinator: Coordinator, args) -> int:
+    count = 0
+    audits = [_audit_name(a) for a in args.audits.split(",") if a.strip()]
+    for url in args.audit or []:
+        coordinator.submit("audit", {"url": url, "audits": audits, "device": args.device, "conditioning": args.conditioning})
+        count += 1
+    for url in args.capture or []:
+        coordinator.submit("capture", {"url": url, "device": args.device, "fullPage": args.full_page})
+        count += 1
+    for path in args.scenario or []:
+        coordinator.submit("scenario", {"scenario": load_scenario(path)})
+        count += 1
+    if args.jobs:
+        with open(args.jobs) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    coordinator.submit(entry["kind"], entry["payload"])
+                    count += 1
+    return count
+
+
+def _write_results(results: List[Dict[str, Any]], out: Optional[str], captures_dir: str):
+    for r in results:
+        if r["kind"] == "capture" and r["ok"]:
+            os.makedirs(captures_dir, exist_ok=True)
+            path = os.path.join(captures_dir, f"{r['id']}.png")
+            with open(path, "wb") as f:
+                f.write(base64.b64decode(r["result"].pop("png_base64")))
+            r["result"]["path"] = path
+        label = r["payload"].get("url") or r["payload"].get("scenario", {}).get("name", "")
+        status = "ok  " if r["ok"] else "FAIL"
+        print(f"{status} {r['id']:<8} {r['kind']:<8} {r['seconds']:7.2f}s  {r['worker'] or '-':<20} {label}"
+              + (f"  -- {r['error']}" if r["error"] else ""))
+    if out:
+        with open(out, "w") as f:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
+
+
+def _run_coordinator(coordinator: Coordinator, args) -> int:
+    total = _submit_jobs(coordinator, args)
+    if not total:
+        print("No jobs given (use --audit, --capture, --scenario or --jobs)")
+        return 2
+    coordinator.start()
+    print(f"[cluster] coordinator on {coordinator.address[0]}:{coordinator.address[1]} with {total} job(s)", file=sys.stderr)
+    start = time.monotonic()
+    try:
+        coordinator.wait()
+    except KeyboardInterrupt:
+        print("[cluster] interrupted, reporting finished jobs", file=sys.stderr)
+    finally:
+        coordinator.close(shutdown_workers=args.shutdown_workers)
+    results = coordinator.results()
+    _write_results(results, args.out, args.captures_dir)
+    failed = sum(1 for r in results if not r["ok"])
+    print(f"{total - failed}/{total} jobs succeeded in {time.monotonic() - start:.1f}s")
+    return 1 if failed else 0
+
+
+def main():
+    """CLI interface for cluster mode."""
+    parser = argparse.ArgumentParser(description="Distribute browser jobs over several worker nodes")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def job_options(p):
+        p.add_argument("--audit", action="append", metavar="URL", help="URL to audit (repeatable)")
+        p.add_argument("--audits", default="performance", help="Comma-separated audits per URL: performance, accessibility, seo, best-practices, nextjs (default: performance)")
+        p.add_argument("--capture", action="append", metavar="URL", help="URL to screenshot (repeatable)")
+        p.add_argument("--full-page", action="store_true", help="Full-page captures")
+        p.add_argument("--device", help="Device preset for audits and captures")
+        p.add_argument("--conditioning", action="append",
+                       help="Network/CPU conditioning profile for audits, e.g. slow-4g, cpu-4x (repeatable)")
+        p.add_argument("--scenario", nargs="+", help="Scenario files (.jsonl / .yaml)")
+        p.add_argument("--jobs", help="JSONL file of {kind, payload} jobs")
+        p.add_argument("--out", help="Write one JSON result per job to this file")
+        p.add_argument("--captures-dir", default="captures", help="Where capture PNGs are written (default: captures)")
+        p.add_argument("--max-attempts", type=int, default=3, help="Attempts per job across workers (default: 3)")
+        p.add_argument("--heartbeat-timeout", type=float, default=15.0, help="Drop silent workers after N s (default: 15)")
+
+    coord = sub.add_parser("coordinator", help="Queue jobs and serve them to workers")
+    coord.add_argument("--listen", default=f"0.0.0.0:{DEFAULT_PORT}", help=f"host:port (default: 0.0.0.0:{DEFAULT_PORT})")
+    coord.add_argument("--shutdown-workers", action="store_true", help="Tell workers to exit when all jobs are done")
+    job_options(coord)
+
+    work = sub.add_parser("worker", help="Run jobs from a coordinator")
+    work.add_argument("--coordinator", required=True, help="host:port of the coordinator")
+    work.add_argument("--capacity", type=int, default=1, help="Browser sessions on this node (default: 1)")
+    work.add_argument("--prefetch", type=int, default=1, help="Jobs queued beyond free slots (default: 1)")
+    work.add_argument("--base-port", type=int, default=9400, help="DevTools port of the first session (default: 9400)")
+    work.add_argument("--heartbeat", type=float, default=5.0, help="Heartbeat interval in s (default: 5)")
+    work.add_argument("--name", help="Worker name (default: hostname-pid)")
+
+    local = sub.add_parser("local", help="Coordinator plus N worker processes on this machine")
+    local.add_argument("--workers", type=int, default=2, help="Worker processes (default: 2)")
+    local.add_argument("--capacity", type=int, default=1, help="Sessions per worker (default: 1)")
+    local.add_argument("--base-port", type=int, default=9400, help="First DevTools port (default: 9400)")
+    job_options(local)
+
+    args = parser.parse_args()
+    if args.command != "worker":
+        try:
+            [_audit_name(a) for a in args.audits.split(",") if a.strip()]
+        except ValueError as e:
+            parser.error(str(e))
+    if args.command == "worker":
+        host, port = _parse_address(args.coordinator)
+        Worker(host, port, args.capacity, args.prefetch, args.base_port, args.heartbeat, args.name).run()
+        return 0
+    if args.command == "coordinator":
+        host, port = _parse_address(args.listen, "0.0.0.0")
+        coordinator = Coordinator(host, port, args.heartbeat_timeout, args.max_attempts)
+        return _run_coordinator(coordinator, args)
+
+    coordinator = Coordinator("127.0.0.1", 0, args.heartbeat_timeout, args.max_attempts)
+    args.shutdown_workers = True
+    port = coordinator.address[1]
+    workers = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "worker", "--coordinator", f"127.0.0.1:{port}",
+                          "--capacity", str(args.capacity), "--base-port", str(args.base_port + i * args.capacity),
+                          "--name", f"local-{i + 1}"])
+        for i in range(args.workers)
+    ]
+    try:
+        return _run_coordinator(coordinator, args)
+    finally:
+        for proc in workers:
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
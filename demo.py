@@ -11,7 +11,9 @@ This demo shows how Claude Code + ARM64 browser automation enables:
 - API validation through frontend
 """
 
+import artifact_store
 import simple_browser
+import os
 import time
 import json
 from datetime import datetime
@@ -19,12 +21,21 @@ from datetime import datetime
 class SaaSTestingDemo:
     def __init__(self):
         self.test_results = {}
-        self.screenshots = []
+        self.store = artifact_store.ArtifactStore()
+        self.screenshots = []  # artifact_store.Capture records of this run
         
     def log(self, message, level="INFO"):
         timestamp = datetime.now().strftime("%H:%M:%S")
         print(f"🕐 {timestamp} [{level}] {message}")
         
+    def store_screenshot(self, path, url, device="desktop"):
+        """Move a /tmp screenshot into the content-addressed store (dedupes unchanged captures)"""
+        if not os.path.exists(path):
+            return None
+        capture = self.store.put(path, url=url, device=device, move=True)
+        self.screenshots.append(capture)
+        return capture
+        
     def run_demo(self):
         print("🚀" + "="*70)
         print("🚀 CLAUDE CODE ARM64 BROWSER AUTOMATION - DEMO")
@@ -65,17 +76,17 @@ class SaaSTestingDemo:
             # Take screenshot for baseline
             self.log("📸 Capturing signup page screenshot...")
             screenshot = simple_browser.browser_screenshot("github_signup_page.png")
-            self.screenshots.append("github_signup_page.png")
+            self.store_screenshot("/tmp/github_signup_page.png", "https://github.com/signup")
             self.log(f"📷 Screenshot: {screenshot}")
             
             # Analyze page structure
             self.log("🔍 Analyzing page structure...")
-            form_exists = simple_browser.browser_evaluate("document.querySelector('#signup_button') !== null")
+            form_exists = simple_browser.browser_evaluate_value("document.querySelector('#signup_button') !== null")
             self.log(f"🎯 Signup form detected: {form_exists}")
             
             # Check responsive design
             self.log("📱 Testing mobile responsiveness...")
-            mobile_test = simple_browser.browser_evaluate("""
+            mobile_test = simple_browser.browser_evaluate_value("""
                 window.innerWidth = 375;
                 document.body.style.width = '375px';
                 document.querySelector('body').classList.contains('mobile') || 
@@ -85,8 +96,8 @@ class SaaSTestingDemo:
             
             self.test_results['e2e_testing'] = {
                 'navigation': 'PASS',
-                'form_detection': 'PASS' if 'Result: true' in form_exists else 'FAIL',
-                'mobile_responsive': 'PASS' if 'Result: true' in mobile_test else 'UNKNOWN'
+                'form_detection': 'PASS' if form_exists is True else 'FAIL',
+                'mobile_responsive': 'PASS' if mobile_test is True else 'UNKNOWN'
             }
             
         except Exception as e:
@@ -109,7 +120,7 @@ class SaaSTestingDemo:
             
             # Capture API testing interface
             screenshot = simple_browser.browser_screenshot("api_interface.png")
-            self.screenshots.append("api_interface.png")
+            self.store_screenshot("/tmp/api_interface.png", "https://jsonplaceholder.typicode.com/")
             self.log(f"📷 API interface captured: {screenshot}")
             
             # Test API endpoints through browser
@@ -159,12 +170,12 @@ class SaaSTestingDemo:
             # Capture full page screenshot
             self.log("📸 Capturing full-page baseline screenshot...")
             baseline = simple_browser.browser_screenshot("visual_baseline.png", True)
-            self.screenshots.append("visual_baseline.png")
+            self.store_screenshot("/tmp/visual_baseline.png", "https://httpbin.org")
             self.log(f"📷 Baseline captured: {baseline}")
             
             # Test element visibility
             self.log("🔍 Testing critical element visibility...")
-            elements_visible = simple_browser.browser_evaluate("""
+            elements_visible = simple_browser.browser_evaluate_value("""
                 const criticalElements = ['h1', 'p', 'a'];
                 criticalElements.every(selector => {
                     const element = document.querySelector(selector);
@@ -175,7 +186,7 @@ class SaaSTestingDemo:
             
             # Test color contrast (accessibility)
             self.log("🎨 Testing color contrast for accessibility...")
-            contrast_check = simple_browser.browser_evaluate("""
+            contrast_check = simple_browser.browser_evaluate_value("""
                 const body = document.body;
                 const style = window.getComputedStyle(body);
                 const bgColor = style.backgroundColor;
@@ -186,8 +197,8 @@ class SaaSTestingDemo:
             
             self.test_results['visual_testing'] = {
                 'baseline_captured': 'PASS',
-                'elements_visible': 'PASS' if 'Result: true' in elements_visible else 'FAIL',
-                'contrast_check': 'PASS' if 'Result: true' in contrast_check else 'FAIL'
+                'elements_visible': 'PASS' if elements_visible is True else 'FAIL',
+                'contrast_check': 'PASS' if contrast_check is True else 'FAIL'
             }
             
         except Exception as e:
@@ -203,44 +214,30 @@ class SaaSTestingDemo:
         self.log("Testing mobile, tablet, and desktop compatibility")
         
         try:
-            viewports = [
-                {"name": "Mobile", "width": 375, "height": 667},
-                {"name": "Tablet", "width": 768, "height": 1024},
-                {"name": "Desktop", "width": 1920, "height": 1080}
-            ]
+            # One call renders every preset in its own isolated tab, in parallel,
+            # with real device metrics instead of resizing a single window.
+            devices = ["iphone-se", "pixel-9", "ipad-air-m2", "galaxy-tab-s9"]
+            self.log(f"📐 Rendering {len(devices)} device presets in parallel...")
+            matrix = simple_browser.browser_emulate_matrix("https://httpbin.org", devices)
+            if matrix is None:
+                raise RuntimeError("emulate_matrix returned no result")
+            self.log(f"⏱️ Matrix completed in {matrix['elapsedMs']}ms")
             
-            for viewport in viewports:
-                self.log(f"📐 Testing {viewport['name']} viewport ({viewport['width']}x{viewport['height']})...")
-                
-                # Set viewport size
-                resize_result = simple_browser.browser_evaluate(f"""
-                    window.resizeTo({viewport['width']}, {viewport['height']});
-                    document.documentElement.style.width = '{viewport['width']}px';
-                    'Viewport set to {viewport['width']}x{viewport['height']}'
-                """)
-                self.log(f"🔧 Viewport adjusted: {resize_result}")
-                
-                # Navigate to responsive test site
-                result = simple_browser.browser_navigate("https://httpbin.org")
-                self.log(f"✅ {viewport['name']} navigation: {result}")
-                
-                # Capture viewport-specific screenshot
-                screenshot_name = f"responsive_{viewport['name'].lower()}.png"
-                screenshot = simple_browser.browser_screenshot(screenshot_name)
-                self.screenshots.append(screenshot_name)
-                self.log(f"📷 {viewport['name']} screenshot: {screenshot}")
+            for entry in matrix['results']:
+                device = entry['device']
+                if 'error' in entry:
+                    self.log(f"❌ {device}: {entry['error']}", "ERROR")
+                    self.test_results[f'responsive_{device}'] = {'status': 'ERROR', 'message': entry['error']}
+                    continue
                 
-                # Test responsive elements
-                responsive_check = simple_browser.browser_evaluate("""
-                    const body = document.body;
-                    const width = body.offsetWidth;
-                    width > 0 && document.querySelector('h1') !== null
-                """)
-                self.log(f"✅ {viewport['name']} responsive check: {responsive_check}")
+                self.store_screenshot(entry['screenshot'], "https://httpbin.org", device)
+                self.log(f"📷 {device} ({entry['width']}x{entry['height']}): {entry['screenshot']}")
+                if entry['overflowX']:
+                    self.log(f"⚠️ {device} overflows horizontally: {', '.join(entry['overflowElements'])}", "WARN")
                 
-                self.test_results[f'responsive_{viewport["name"].lower()}'] = {
-                    'viewport_set': 'PASS',
-                    'content_accessible': 'PASS' if 'Result: true' in responsive_check else 'FAIL',
+                self.test_results[f'responsive_{device}'] = {
+                    'no_horizontal_overflow': 'FAIL' if entry['overflowX'] else 'PASS',
+                    'layout_stable': 'PASS' if entry['cls'] < 0.1 else 'FAIL',
                     'screenshot_captured': 'PASS'
                 }
                 
@@ -263,7 +260,7 @@ class SaaSTestingDemo:
             self.log(f"🌐 404 page loaded: {result}")
             
             # Detect error status
-            error_detected = simple_browser.browser_evaluate("""
+            error_detected = simple_browser.browser_evaluate_value("""
                 document.title.includes('404') || 
                 document.body.textContent.includes('404') ||
                 document.body.textContent.includes('Not Found')
@@ -276,7 +273,7 @@ class SaaSTestingDemo:
             self.log(f"✅ Recovery navigation: {recovery_result}")
             
             # Verify recovery success
-            recovery_check = simple_browser.browser_evaluate("""
+            recovery_check = simple_browser.browser_evaluate_value("""
                 !document.title.includes('404') && 
                 document.querySelector('h1') !== null
             """)
@@ -296,8 +293,8 @@ class SaaSTestingDemo:
             self.log(f"⚡ JavaScript error handling: {js_error_test}")
             
             self.test_results['error_handling'] = {
-                '404_detection': 'PASS' if 'Result: true' in error_detected else 'FAIL',
-                'autonomous_recovery': 'PASS' if 'Result: true' in recovery_check else 'FAIL',
+                '404_detection': 'PASS' if error_detected is True else 'FAIL',
+                'autonomous_recovery': 'PASS' if recovery_check is True else 'FAIL',
                 'js_error_handling': 'PASS' if 'Error caught' in js_error_test else 'FAIL'
             }
             
@@ -332,8 +329,10 @@ class SaaSTestingDemo:
         print(f"   📊 Success Rate: {(passed_tests/total_tests*100):.1f}%" if total_tests > 0 else "   📊 No tests completed")
         
         print(f"\n📸 SCREENSHOTS CAPTURED:")
-        for screenshot in self.screenshots:
-            print(f"   📷 /tmp/{screenshot}")
+        for capture in self.screenshots:
+            status = "new" if capture.new else "unchanged, deduplicated"
+            print(f"   📷 {capture.name} ({capture.device}, {status}): {capture.path}")
+        self.store.close()
             
         print(f"\n🚀 WHAT THIS DEMO PROVES:")
         print("   ✅ Zero human debugging needed")
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+DOM snapshot loader - columnar NumPy view of the dom_snapshot tool
+
+dom_snapshot returns CDP's DOMSnapshot.captureSnapshot result: a shared string
+table plus per-document columns (parent index, node name, layout bounds,
+computed style codes, ...). This module keeps that layout and exposes it as
+NumPy arrays, so layout checks over tens of thousands of nodes are array
+operations instead of per-element JavaScript round trips.
+
+Usage:
+    import domsnap
+    from chromium_tool import MCPSession
+    with MCPSession() as s:
+        s.call_tool("navigate", {"url": "https://example.com"})
+        snap = domsnap.capture(session=s)    # calls the dom_snapshot tool
+    snap = domsnap.load("/tmp/mcp-chromium-spool/snapshot-....json")
+
+    snap.boxes                               # (M, 4) float x, y, width, height per layout node
+    snap.offscreen(1280, 720)                # layout rows entirely outside the viewport
+    snap.small_tap_targets(48)               # clickable rows smaller than 48x48 CSS px
+    snap.overlapping_pairs(snap.clickable_rows())
+
+Requires NumPy (pip install numpy).
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed by this module
+    np = None
+
+
+class DomSnapshot:
+    """One document of a snapshot as NumPy columns.
+
+    Node columns (length N, one per DOM node):
+        parent       int32, parent node index (-1 for the root)
+        node_type    int32, DOM nodeType
+        node_name    int32, string-table code of the node name
+        backend_id   int64, backendNodeId (usable with DOM.* commands)
+        clickable    bool, node has a click listener or is natively clickable
+
+    Layout columns (length M, one per node with a layout object):
+        layout_node  int32, node index the row belongs to
+        boxes        float64 (M, 4), x, y, width, height in CSS px
+        styles       int32 (M, S), string codes per style in `style_names` (-1 = unset)
+        text         int32, string code of the layout text (-1 = none)
+    """
+
+    def __init__(self, raw: Dict[str, Any], document: int = 0):
+        if np is None:
+            raise ImportError("domsnap needs NumPy: pip install numpy")
+        self.strings: List[str] = raw["strings"]
+        self.style_names: List[str] = raw.get("computedStyles", [])
+        self.documents = len(raw["documents"])
+        doc = raw["documents"][document]
+        self.url = self.string(doc.get("documentURL", -1))
+
+        nodes = doc["nodes"]
+        self.parent = np.asarray(nodes["parentIndex"], dtype=np.int32)
+        self.node_type = np.asarray(nodes["nodeType"], dtype=np.int32)
+        self.node_name = np.asarray(nodes["nodeName"], dtype=np.int32)
+        self.backend_id = np.asarray(nodes["backendNodeId"], dtype=np.int64)
+        self.clickable = np.zeros(len(self.parent), dtype=bool)
+        self.clickable[np.asarray(nodes.get("isClickable", {}).get("index", []), dtype=np.int64)] = True
+        self._attributes = nodes.get("attributes", [])
+        self._subtree_end: Optional["np.ndarray"] = None
+
+        layout = doc["layout"]
+        self.layout_node = np.asarray(layout["nodeIndex"], dtype=np.int32)
+        self.boxes = np.asarray(layout["bounds"], dtype=np.float64).reshape(-1, 4)
+        self.styles = np.asarray(layout["styles"], dtype=np.int32).reshape(len(self.layout_node), len(self.style_names))
+        self.text = np.asarray(layout["text"], dtype=np.int32)
+
+    def string(self, code: int) -> Optional[str]:
+        """Decode one string-table code (-1 -> None)."""
+        return self.strings[code] if code >= 0 else None
+
+    def decode(self, codes) -> "np.ndarray":
+        """Decode an array of string codes to an object array of str/None."""
+        table = np.asarray(self.strings + [None], dtype=object)
+        codes = np.asarray(codes)
+        return table[np.where(codes >= 0, codes, len(self.strings))]
+
+    def code(self, value: str) -> int:
+        """String-table code of value, or -1 if it does not occur."""
+        try:
+            return self.strings.index(value)
+        except ValueError:
+            return -1
+
+    def style(self, name: str) -> "np.ndarray":
+        """String codes of one computed style, per layout row."""
+        return self.styles[:, self.style_names.index(name)]
+
+    def attributes(self, node: int) -> Dict[str, str]:
+        """Attributes of one node as a dict."""
+        flat = self._attributes[node] if node < len(self._attributes) else []
+        return {self.strings[flat[i]]: self.strings[flat[i + 1]] for i in range(0, len(flat), 2)}
+
+    def names(self, rows) -> "np.ndarray":
+        """Lower-case node names of layout rows."""
+        return np.char.lower(self.decode(self.node_name[self.layout_node[rows]]).astype(str))
+
+    def visible_rows(self) -> "np.ndarray":
+        """Layout rows with a non-empty box that are not hidden by visibility/display."""
+        mask = (self.boxes[:, 2] > 0) & (self.boxes[:, 3] > 0)
+        if "visibility" in self.style_names:
+            mask &= self.style("visibility") != self.code("hidden")
+        if "display" in self.style_names:
+            mask &= self.style("display") != self.code("none")
+        return np.flatnonzero(mask)
+
+    def clickable_rows(self) -> "np.ndarray":
+        """Visible layout rows whose node is clickable."""
+        rows = self.visible_rows()
+        return rows[self.clickable[self.layout_node[rows]]]
+
+    def offscreen(self, viewport_width: float, viewport_height: Optional[float] = None) -> "np.ndarray":
+        """Visible rows entirely left/right of the viewport (or below it, if a height is given)."""
+        rows = self.visible_rows()
+        x, y, w, h = self.boxes[rows].T
+        mask = (x + w <= 0) | (x >= viewport_width) | (y + h <= 0)
+        if viewport_height is not None:
+            mask |= y >= viewport_height
+        return rows[mask]
+
+    def overflowing(self, viewport_width: float) -> "np.ndarray":
+        """Visible rows that stick out past the right edge of the viewport."""
+        rows = self.visible_rows()
+        return rows[self.boxes[rows, 0] + self.boxes[rows, 2] > viewport_width + 1]
+
+    def small_tap_targets(self, min_size: float = 48) -> "np.ndarray":
+        """Clickable rows narrower or shorter than min_size CSS px."""
+        rows = self.clickable_rows()
+        return rows[(self.boxes[rows, 2] < min_size) | (self.boxes[rows, 3] < min_size)]
+
+    def overlapping_pairs(self, rows, chunk: int = 2048) -> "np.ndarray":
+        """(K, 2) pairs of rows whose boxes intersect, excluding a node and its ancestors.
+
+        Pairwise intersection is computed in chunks of `chunk` rows, so memory
+        stays at chunk x len(rows) booleans.
+        """
+        rows = np.asarray(rows)
+        x1, y1 = self.boxes[rows, 0], self.boxes[rows, 1]
+        x2, y2 = x1 + self.boxes[rows, 2], y1 + self.boxes[rows, 3]
+        pairs = []
+        for start in range(0, len(rows), chunk):
+            sl = slice(start, start + chunk)
+            hit = ((x1[sl, None] < x2[None, :]) & (x2[sl, None] > x1[None, :]) &
+                   (y1[sl, None] < y2[None, :]) & (y2[sl, None] > y1[None, :]))
+            i, j = np.nonzero(hit)
+            i += start
+            keep = i < j
+            pairs.append(np.stack([rows[i[keep]], rows[j[keep]]], axis=1))
+        found = np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+        a, b = self.layout_node[found[:, 0]], self.layout_node[found[:, 1]]
+        end = self.subtree_end()
+        nested = ((a < b) & (b < end[a])) | ((b < a) & (a < end[b]))
+        return found[~nested]
+
+    def subtree_end(self) -> "np.ndarray":
+        """Per node, one past the last node index of its subtree.
+
+        Snapshot nodes are in document (depth-first) order, so the subtree of
+        node i is the index range [i, end[i]) and "a is an ancestor of b" is
+        a < b < end[a]. Children come after their parent, so one reverse pass
+        over the nodes sums every subtree size.
+        """
+        if self._subtree_end is None:
+            n = len(self.parent)
+            parents = self.parent.tolist()
+            sizes = [1] * n
+            for node in range(n - 1, 0, -1):
+                if parents[node] >= 0:
+                    sizes[parents[node]] += sizes[node]
+            size = np.asarray(sizes, dtype=np.int64)
+            end = np.arange(n, dtype=np.int64) + size
+            child = np.flatnonzero(self.parent >= 0)
+            parent = self.parent[child]
+            if not np.all((parent < child) & (child < end[parent])):
+                raise ValueError("snapshot nodes are not in document order")
+            self._subtree_end = end
+        return self._subtree_end
+
+    def describe(self, row: int) -> str:
+        """Short selector-like label for a layout row (tag#id.class)."""
+        node = int(self.layout_node[row])
+        attrs = self.attributes(node)
+        label = (self.string(int(self.node_name[node])) or "").lower()
+        if attrs.get("id"):
+            label += f"#{attrs['id']}"
+        if attrs.get("class"):
+            label += "." + attrs["class"].split()[0]
+        return label
+
+
+def load(source: Union[str, Dict[str, Any]], document: int = 0) -> DomSnapshot:
+    """Load a snapshot from a spool file path, a structuredContent dict, or a raw snapshot."""
+    if isinstance(source, str):
+        with open(source) as f:
+            raw = json.load(f)
+    elif "snapshot" in source:
+        raw = source["snapshot"]
+    elif "path" in source:
+        with open(source["path"]) as f:
+            raw = json.load(f)
+    else:
+        raw = source
+    return DomSnapshot(raw, document)
+
+
+def capture(computed_styles: Optional[List[str]] = None, document: int = 0, session: Any = None) -> DomSnapshot:
+    """Call the dom_snapshot tool on the current page and load the result.
+
+    Pass the chromium_tool.MCPSession that loaded the page. Without one, the
+    call starts a fresh server, whose current page is blank.
+    """
+    kwargs: Dict[str, Any] = {}
+    if computed_styles:
+        kwargs["computedStyles"] = computed_styles
+    if session is not None:
+        result = session.call_tool("dom_snapshot", kwargs, timeout=120)
+        if "error" in result or result.get("isError"):
+            raise RuntimeError(result.get("error") or result.get("content", [{}])[0].get("text", "dom_snapshot failed"))
+        return load(result.get("structuredContent") or {}, document)
+
+    import arm64_browser
+
+    result = arm64_browser.call_mcp_tool_result("dom_snapshot", **kwargs)
+    if result.is_error:
+        raise RuntimeError(result.text)
+    return load(result.data, document)
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Heap snapshot parser - array-backed .heapsnapshot tables and snapshot diffs
+
+take_heap_snapshot and leak_check write V8 .heapsnapshot files: flat integer
+arrays of nodes and edges plus a string table. This module streams the file
+into NumPy node/edge tables (no per-node Python objects), computes the
+dominator tree and retained sizes, and diffs two snapshots of the same page:
+retained-size growth by constructor and DOM trees that became detached.
+
+Usage:
+    import heapsnap
+    before = heapsnap.load("/tmp/mcp-chromium-spool/heap-1.heapsnapshot")
+    after = heapsnap.load("/tmp/mcp-chromium-spool/heap-2.heapsnapshot")
+    diff = heapsnap.diff(before, after)
+    diff.classes[:10]              # ClassDelta, largest retained growth first
+    diff.detached_trees            # new detached DOM trees with retained size
+
+    heapsnap.leak_check("https://app.local/a", "https://app.local/b", iterations=5)
+
+CLI:
+    python3 heapsnap.py summary heap.heapsnapshot
+    python3 heapsnap.py diff before.heapsnapshot after.heapsnapshot --top 20
+    python3 heapsnap.py leak-check --url-a https://app.local/a --url-b https://app.local/b -n 5
+
+Requires NumPy (pip install numpy). Dominators are computed in Python, which
+takes some seconds per million nodes.
+"""
+
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed by this module
+    np = None
+
+CHUNK = 4 * 1024 * 1024
+# The root and GC-root groups; not objects, so left out of per-class tables.
+SYNTHETIC = "(synthetic)"
+
+
+class _Reader:
+    """Incremental reader over the snapshot text, for the flat int arrays."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+
+    def until(self, key: str, opener: str = "") -> str:
+        """Consume up to and including `"key":` plus `opener`, with any JSON
+        whitespace in between; returns the text before it."""
+        marker = re.compile(rf'"{key}"\s*:\s*' + re.escape(opener))
+        while True:
+            match = marker.search(self.buf)
+            if match:
+                before, self.buf = self.buf[:match.start()], self.buf[match.end():]
+                return before
+            more = self.f.read(CHUNK)
+            if not more:
+                raise ValueError(f"Not a heap snapshot: \"{key}\" not found")
+            self.buf += more
+
+    def ints(self) -> "np.ndarray":
+        """Parse a [1,2,3] array body (the '[' already consumed) chunk by chunk."""
+        parts = []
+        while True:
+            end = self.buf.find("]")
+            if end >= 0:
+                parts.append(_parse_ints(self.buf[:end]))
+                self.buf = self.buf[end + 1:]
+                return np.concatenate(parts)
+            cut = self.buf.rfind(",")
+            if cut >= 0:
+                parts.append(_parse_ints(self.buf[:cut]))
+                self.buf = self.buf[cut + 1:]
+            more = self.f.read(CHUNK)
+            if not more:
+                raise ValueError("Truncated heap snapshot")
+            self.buf += more
+
+    def rest(self) -> str:
+        return self.buf + self.f.read()
+
+
+def _parse_ints(text: str) -> "np.ndarray":
+    text = text.replace("\n", "").strip().strip(",")
+    if not text:
+        return np.empty(0, dtype=np.int64)
+    return np.array(text.split(","), dtype=np.int64)
+
+
+@dataclass
+class ClassDelta:
+    """Change of one constructor between two snapshots."""
+    name: str
+    count_before: int
+    count_after: int
+    new_objects: int          # objects in `after` whose id is not in `before`
+    self_size_delta: int
+    retained_before: int
+    retained_after: int
+
+    @property
+    def retained_delta(self) -> int:
+        return self.retained_after - self.retained_before
+
+    def __str__(self) -> str:
+        return (f"{self.retained_delta:>+12,} retained {self.self_size_delta:>+12,} self "
+                f"{self.count_after - self.count_before:>+8} objects ({self.new_objects} new)  {self.name}")
+
+
+@dataclass
+class DetachedTree:
+    """A detached DOM subtree: its root node and what it keeps alive."""
+    node_id: int
+    name: str
+    nodes: int
+    retained_size: int
+
+    def __str__(self) -> str:
+        return f"{self.retained_size:>12,} retained {self.nodes:>6} nodes  @{self.node_id} {self.name}"
+
+
+@dataclass
+class SnapshotDiff:
+    classes: List[ClassDelta]
+    detached_trees: List[DetachedTree]
+    total_before: int
+    total_after: int
+
+
+class HeapSnapshot:
+    """One snapshot as NumPy columns (length N, one per heap node).
+
+        kind         int32, index into node_types (object, closure, native, ...)
+        name         int32, string-table code of the node name
+        ids          int64, object id, stable across snapshots of one page session
+        self_size    int64, shallow size in bytes
+        detached     bool, DOM node that is not attached to a document
+        idom         int64, immediate dominator (-1 = unreachable)
+        retained     int64, retained size in bytes
+    """
+
+    def __init__(self, meta: Dict[str, Any], nodes: "np.ndarray", edges: "np.ndarray", strings: List[str]):
+        if np is None:
+            raise ImportError("heapsnap needs NumPy: pip install numpy")
+        node_fields, edge_fields = meta["node_fields"], meta["edge_fields"]
+        self.node_types: List[str] = meta["node_types"][0]
+        edge_types: List[str] = meta["edge_types"][0]
+        self.strings = strings
+        nf, ef = len(node_fields), len(edge_fields)
+        nodes = nodes.reshape(-1, nf)
+        edges = edges.reshape(-1, ef)
+
+        self.kind = nodes[:, node_fields.index("type")].astype(np.int32)
+        self.name = nodes[:, node_fields.index("name")].astype(np.int32)
+        self.ids = nodes[:, node_fields.index("id")]
+        self.self_size = nodes[:, node_fields.index("self_size")]
+        edge_count = nodes[:, node_fields.index("edge_count")]
+        self.first_edge = np.concatenate([[0], np.cumsum(edge_count)])
+        self.edge_to = edges[:, edge_fields.index("to_node")] // nf
+        self.edge_kind = edges[:, edge_fields.index("type")].astype(np.int32)
+        self.weak = self.edge_kind == edge_types.index("weak") if "weak" in edge_types else np.zeros(len(edges), bool)
+
+        if "detachedness" in node_fields:
+            self.detached = nodes[:, node_fields.index("detachedness")] == 2
+        else:
+            prefix = np.array([s.startswith("Detached ") for s in strings], dtype=bool)
+            self.detached = prefix[self.name]
+        self._dominators()
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    def class_names(self) -> "np.ndarray":
+        """DevTools-style constructor name per node: the name for objects and
+        native nodes, "(type)" for everything else (closures, strings, ...)."""
+        table = np.array(self.strings, dtype=object)
+        names = table[self.name]
+        kinds = np.array([f"({t})" for t in self.node_types], dtype=object)[self.kind]
+        named = np.isin(self.kind, [self.node_types.index(t) for t in ("object", "native") if t in self.node_types])
+        return np.where(named, names, kinds)
+
+    def _dominators(self) -> None:
+        """Iterative dominators (Cooper, Harvey, Kennedy) over strong edges,
+        then retained sizes bottom-up in DFS postorder."""
+        n = len(self.kind)
+        first = self.first_edge.tolist()
+        to = self.edge_to.tolist()
+        weak = self.weak.tolist()
+
+        # DFS postorder from the synthetic root (node 0)
+        post = [-1] * n
+        order: List[int] = []
+        seen = bytearray(n)
+        seen[0] = 1
+        stack = [[0, first[0]]]
+        while stack:
+            top = stack[-1]
+            node, e = top
+            end = first[node + 1]
+            while e < end and (weak[e] or seen[to[e]]):
+                e += 1
+            if e < end:
+                top[1] = e + 1
+                child = to[e]
+                seen[child] = 1
+                stack.append([child, first[child]])
+            else:
+                stack.pop()
+                post[node] = len(order)
+                order.append(node)
+
+        # Predecessors of every node over strong edges from reachable nodes
+        src = np.repeat(np.arange(n), np.diff(self.first_edge))
+        reach = np.frombuffer(bytes(seen), dtype=np.uint8).astype(bool)
+        keep = ~self.weak & reach[src]
+        pred_src, pred_dst = src[keep], self.edge_to[keep]
+        by_dst = np.argsort(pred_dst, kind="stable")
+        pred_src = pred_src[by_dst].tolist()
+        pred_first = np.searchsorted(pred_dst[by_dst], np.arange(n + 1)).tolist()
+
+        idom = [-1] * n
+        idom[0] = 0
+        changed = True
+        while changed:
+            changed = False
+            for b in reversed(order[:-1]):  # reverse postorder without the root
+                new = -1
+                for i in range(pred_first[b], pred_first[b + 1]):
+                    p = pred_src[i]
+                    if idom[p] == -1:
+                        continue
+                    if new == -1:
+                        new = p
+                        continue
+                    x, y = p, new
+                    while x != y:
+                        while post[x] < post[y]:
+                            x = idom[x]
+                        while post[y] < post[x]:
+                            y = idom[y]
+                    new = x
+                if idom[b] != new:
+                    idom[b] = new
+                    changed = True
+
+        retained = self.self_size.tolist()
+        for node in order[:-1]:
+            retained[idom[node]] += retained[node]
+        self._order = order
+        self.idom = np.asarray(idom, dtype=np.int64)
+        self.retained = np.asarray(retained, dtype=np.int64)
+
+    def class_retained(self) -> Dict[str, int]:
+        """Retained size per constructor, counting an object only if no object
+        of the same constructor dominates it (so nested instances are not
+        counted twice)."""
+        classes = self.class_names()
+        codes_of: Dict[str, int] = {}
+        code = [codes_of.setdefault(c, len(codes_of)) for c in classes.tolist()]
+        idom = self.idom.tolist()
+        retained = self.retained.tolist()
+        # Dominator-tree children, visited depth first with a per-class counter
+        children: List[List[int]] = [[] for _ in range(len(idom))]
+        for node in self._order[:-1]:
+            children[idom[node]].append(node)
+        active = [0] * len(codes_of)
+        totals = [0] * len(codes_of)
+        stack = [(0, True)]
+        while stack:
+            node, entering = stack.pop()
+            c = code[node]
+            if not entering:
+                active[c] -= 1
+                continue
+            if active[c] == 0:
+                totals[c] += retained[node]
+            active[c] += 1
+            stack.append((node, False))
+            stack.extend((child, True) for child in children[node])
+        names = list(codes_of)
+        return {names[i]: totals[i] for i in range(len(names)) if totals[i]}
+
+    def detached_trees(self) -> List[DetachedTree]:
+        """Detached DOM nodes not dominated by another detached node, with the
+        size of what they keep alive."""
+        reachable = self.idom >= 0
+        roots = np.flatnonzero(self.detached & reachable & ~self.detached[np.maximum(self.idom, 0)])
+        counts = np.ones(len(self), dtype=np.int64).tolist()
+        idom = self.idom.tolist()
+        for node in self._order[:-1]:
+            counts[idom[node]] += counts[node]
+        return sorted(
+            (DetachedTree(int(self.ids[r]), self.strings[self.name[r]], counts[r], int(self.retained[r])) for r in roots),
+            key=lambda t: t.retained_size, reverse=True,
+        )
+
+    def summary(self, top: int = 20) -> List[Dict[str, Any]]:
+        """Constructors by retained size: count, self size, retained size."""
+        classes = self.class_names()
+        retained = self.class_retained()
+        names, inverse, counts = np.unique(classes.astype(str), return_inverse=True, return_counts=True)
+        self_sizes = np.bincount(inverse, weights=self.self_size)
+        rows = [{"name": str(name), "count": int(counts[i]), "self_size": int(self_sizes[i]),
+                 "retained_size": int(retained.get(str(name), 0))} for i, name in enumerate(names) if name != SYNTHETIC]
+        return sorted(rows, key=lambda r: r["retained_size"], reverse=True)[:top]
+
+
+def load(source: Any) -> HeapSnapshot:
+    """Load a .heapsnapshot from a path or a take_heap_snapshot structuredContent dict."""
+    if isinstance(source, dict):
+        source = source["path"]
+    with open(source, encoding="utf-8") as f:
+        reader = _Reader(f)
+        header = reader.until("nodes", "[")
+        meta = json.loads(header.rstrip().rstrip(",") + "}")["snapshot"]["meta"]
+        nodes = reader.ints()
+        reader.until("edges", "[")
+        edges = reader.ints()
+        reader.until("strings")
+        strings, _ = json.JSONDecoder().raw_decode(reader.rest().lstrip())
+    return HeapSnapshot(meta, nodes, edges, strings)
+
+
+def diff(before: HeapSnapshot, after: HeapSnapshot) -> SnapshotDiff:
+    """Growth by constructor and detached DOM trees that are new in `after`."""
+    classes_a, classes_b = before.class_names().astype(str), after.class_names().astype(str)
+    retained_a, retained_b = before.class_retained(), after.class_retained()
+    is_new = ~np.isin(after.ids, before.ids)
+
+    def per_class(classes, values):
+        names, inverse = np.unique(classes, return_inverse=True)
+        return dict(zip(names.tolist(), np.bincount(inverse, weights=values).astype(np.int64).tolist()))
+
+    count_a = per_class(classes_a, np.ones(len(before)))
+    count_b = per_class(classes_b, np.ones(len(after)))
+    self_a = per_class(classes_a, before.self_size)
+    self_b = per_class(classes_b, after.self_size)
+    new_b = per_class(classes_b, is_new.astype(np.int64))
+
+    deltas = [
+        ClassDelta(name, count_a.get(name, 0), count_b.get(name, 0), new_b.get(name, 0),
+                   self_b.get(name, 0) - self_a.get(name, 0), retained_a.get(name, 0), retained_b.get(name, 0))
+        for name in set(count_a) | set(count_b) if name != SYNTHETIC
+    ]
+    deltas = [d for d in deltas if d.retained_delta or d.self_size_delta or d.count_after != d.count_before]
+    deltas.sort(key=lambda d: d.retained_delta, reverse=True)
+
+    old_ids = set(before.ids[before.detached].tolist())
+    trees = [t for t in after.detached_trees() if t.node_id not in old_ids]
+    return SnapshotDiff(deltas, trees, int(before.retained[0]), int(after.retained[0]))
+
+
+def leak_check(url_a: Optional[str] = None, url_b: Optional[str] = None, iterations: int = 5,
+               cycle: Optional[List[Dict[str, str]]] = None, settle_ms: int = 500,
+               session: Any = None) -> SnapshotDiff:
+    """Run the leak_check tool (A -> B -> A cycles) and diff its two snapshots.
+
+    Without url_a the cycle runs on the current page, which needs a persistent
+    server: pass a chromium_tool.MCPSession or use arm64_browser.open_session().
+    """
+    import arm64_browser
+
+    if not url_a and session is None and not arm64_browser.session_active():
+        raise RuntimeError("leak_check on the current page needs a persistent session (pass session= or call arm64_browser.open_session())")
+
+    kwargs: Dict[str, Any] = {"iterations": iterations, "settleMs": settle_ms}
+    if url_a:
+        kwargs["urlA"] = url_a
+    if url_b:
+        kwargs["urlB"] = url_b
+    if cycle:
+        kwargs["cycle"] = cycle
+    result = arm64_browser.call_mcp_tool_result("leak_check", _timeout=900, _session_override=session, **kwargs)
+    if result.is_error:
+        raise RuntimeError(result.text)
+    return diff(load(result.data["baseline"]), load(result.data["final"]))
+
+
+def print_diff(result: SnapshotDiff, top: int = 20) -> None:
+    growth = result.total_after - result.total_before
+    print(f"Reachable heap {result.total_before:,} -> {result.total_after:,} bytes ({growth:+,})")
+    print("\nConstructors by retained growth:")
+    for delta in result.classes[:top]:
+        print(f"  {delta}")
+    print(f"\nNew detached DOM trees: {len(result.detached_trees)}")
+    for tree in result.detached_trees[:top]:
+        print(f"  {tree}")
+
+
+def main():
+    """CLI interface for heap snapshot analysis."""
+    parser = argparse.ArgumentParser(description="Parse and diff V8 heap snapshots")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    summ = sub.add_parser("summary", help="Largest constructors by retained size")
+    summ.add_argument("file")
+    summ.add_argument("--top", type=int, default=20)
+
+    dif = sub.add_parser("diff", help="Growth between two snapshots of the same page session")
+    dif.add_argument("before")
+    dif.add_argument("after")
+    dif.add_argument("--top", type=int, default=20)
+
+    leak = sub.add_parser("leak-check", help="Run leak_check through the MCP server and diff the result")
+    leak.add_argument("--url-a", required=True, help="Start page")
+    leak.add_argument("--url-b", required=True, help="Page visited and left in every cycle")
+    leak.add_argument("-n", "--iterations", type=int, default=5)
+    leak.add_argument("--settle-ms", type=int, default=500)
+    leak.add_argument("--top", type=int, default=20)
+
+    args = parser.parse_args()
+    if args.command == "summary":
+        snap = load(args.file)
+        print(f"{len(snap):,} nodes, {int(snap.retained[0]):,} bytes reachable, "
+              f"{len(snap.detached_trees())} detached DOM tree(s)")
+        for row in snap.summary(args.top):
+            print(f"{row['retained_size']:>14,} retained {row['self_size']:>12,} self {row['count']:>8}x  {row['name']}")
+    elif args.command == "diff":
+        print_diff(diff(load(args.before), load(args.after)), args.top)
+    elif args.command == "leak-check":
+        result = leak_check(args.url_a, args.url_b, args.iterations, settle_ms=args.settle_ms)
+        print_diff(result, args.top)
+        return 1 if result.detached_trees else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
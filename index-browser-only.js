@@ -9,6 +9,7 @@ import http from 'http';
 import fs from 'fs';
 import path from 'path';
 import os from 'os';
+import { resolveLaunchProfile, applyLaunchProfile } from './launch-profiles.js';
 
 // Global browser instance
 let chromiumProcess = null;
@@ -338,6 +339,7 @@ class BrowserOnlyMCPServer {
 
     return new Promise((resolve, reject) => {
       const chromiumPath = getChromiumPath();
+      const launchProfile = resolveLaunchProfile();
       const args = [
         '--headless',
         '--no-sandbox',
@@ -368,9 +370,9 @@ class BrowserOnlyMCPServer {
         userDataDir = managedProfileDir;
       }
       args.push(`--user-data-dir=${userDataDir}`);
-      // Cap the on-disk HTTP cache so a profile can't balloon (default 100MB).
-      const diskCacheSize = parseInt(process.env.CHROMIUM_DISK_CACHE_SIZE || '104857600', 10);
-      args.push(`--disk-cache-size=${diskCacheSize}`);
+      // CHROMIUM_LAUNCH_PROFILE adds its flag set and caps the on-disk HTTP
+      // cache so a profile can't balloon (default profile: 100MB).
+      args.splice(0, args.length, ...applyLaunchProfile(args, launchProfile));
       // Headful mode: set CHROMIUM_HEADLESS=false to launch a visible window
       // (e.g. to log in to a site by hand once into a persistent profile).
       if (process.env.CHROMIUM_HEADLESS === 'false' || process.env.CHROMIUM_HEADLESS === '0') {
@@ -2,22 +2,54 @@
 
 import { Server } from '@modelcontextprotocol/sdk/server/index.js';
 import { StdioServerTransport } from '@modelcontextprotocol/sdk/server/stdio.js';
-import { CallToolRequestSchema, ListToolsRequestSchema } from '@modelcontextprotocol/sdk/types.js';
-import { spawn, execSync, execFileSync } from 'child_process';
+import { StreamableHTTPServerTransport } from '@modelcontextprotocol/sdk/server/streamableHttp.js';
+import { CallToolRequestSchema, ListToolsRequestSchema, isInitializeRequest } from '@modelcontextprotocol/sdk/types.js';
+import { Worker, isMainThread, parentPort, workerData } from 'worker_threads';
+import { AsyncLocalStorage } from 'async_hooks';
+import { spawn, execSync } from 'child_process';
 import { WebSocket } from 'ws';
 import http from 'http';
 import fs from 'fs';
 import path from 'path';
 import os from 'os';
+import zlib from 'zlib';
+import crypto from 'crypto';
+import { resolveLaunchProfile, applyLaunchProfile } from './launch-profiles.js';
 
 // Global browser instance
 let chromiumProcess = null;
 let wsConnection = null;
 let currentTabId = null;
-let debuggingPort = 9222;
+// One port per browser; parallel servers (e.g. the scenario runner) each need their own.
+let debuggingPort = parseInt(process.env.CHROMIUM_DEBUGGING_PORT || '9222', 10);
 const chromiumWindowSize = process.env.CHROMIUM_WINDOW_SIZE || '1280,720';
 let managedProfileDir = null; // server-owned temp profile dir, deleted on close
+
+// Transport: stdio (one client per process) or http, where one server and one
+// browser serve many clients. Each HTTP client runs in its own worker thread
+// (so every module-level global below is per client) and drives its own
+// browser context in the browser owned by the main thread.
+const TRANSPORT = process.env.CHROMIUM_TRANSPORT || 'stdio'; // stdio | http
+const HTTP_HOST = process.env.CHROMIUM_HTTP_HOST || '127.0.0.1';
+const HTTP_PORT = parseInt(process.env.CHROMIUM_HTTP_PORT || '3100', 10);
+const SESSION_IDLE_MS = parseInt(process.env.CHROMIUM_SESSION_IDLE_MS || '600000', 10); // 0 = never reclaim
+// Host names an HTTP request may address (Host header, and Origin when a browser
+// sends one): loopback, the bind address, and CHROMIUM_HTTP_ALLOWED_HOSTS.
+// Anything else is refused, so a web page cannot reach the server through DNS
+// rebinding or a cross-site request.
+const HTTP_ALLOWED_HOSTS = new Set([
+  'localhost', '127.0.0.1', '[::1]',
+  ...(['0.0.0.0', '::'].includes(HTTP_HOST) ? [] : [HTTP_HOST.includes(':') ? `[${HTTP_HOST}]` : HTTP_HOST]),
+  ...(process.env.CHROMIUM_HTTP_ALLOWED_HOSTS || '').split(',').map((h) => h.trim().toLowerCase()).filter(Boolean),
+]);
+const CLIENT_WORKER = !isMainThread && workerData?.role === 'client';
+let clientContextId = null; // this client's browser context (HTTP clients only)
+const mainThreadRequests = new Map(); // id -> resolve/reject, answered by the main thread
+let nextMainThreadRequest = 1;
 const MANAGED_PROFILE_PREFIX = 'mcp-chromium-profile-';
+// Pre-warmed profile cloned into each managed profile (ignored with CHROMIUM_USER_DATA_DIR).
+const PROFILE_TEMPLATE = process.env.CHROMIUM_PROFILE_TEMPLATE || null;
+const PROFILE_CLONE_MODE = process.env.CHROMIUM_PROFILE_CLONE || 'auto'; // auto | reflink | hardlink | copy
 
 // Log storage
 let consoleLogs = [];
@@ -25,12 +57,492 @@ let consoleErrors = [];
 let networkLogs = [];
 let networkErrors = [];
 
+// Event capture level: which CDP event streams the page connection subscribes to.
+//   off     Page + Inspector only (navigation, screencast, crash detection)
+//   errors  + Runtime and Network without body buffering; only console
+//           warnings/errors and 4xx/5xx responses are kept
+//   full    + DOM; every console message and response is kept (default)
+// In off/errors, logging tools and wait_for's networkIdle enable the domain
+// they need on first use.
+const CAPTURE_DOMAINS = { off: [], errors: ['Runtime', 'Network'], full: ['Runtime', 'Network', 'DOM'] };
+let captureLevel = CAPTURE_DOMAINS[process.env.CHROMIUM_CAPTURE] ? process.env.CHROMIUM_CAPTURE : 'full';
+const enabledDomains = new Set(); // optional domains enabled on the current page connection
+// Runtime.enable replays the console messages V8 still holds; anything at or
+// before the newest timestamp seen was already handled.
+let lastConsoleTimestamp = 0;
+
 // Screencast state
 let screencastRecording = false;
-let screencastFrames = [];
+let screencastFrames = []; // { file, timestamp } for each distinct frame, written as it arrives
+let screencastFramesDir = null;
 let screencastStartTime = null;
 let screencastFormat = 'jpeg';
 let screencastQuality = 80;
+let screencastDedupe = 'exact'; // off | exact | near
+let screencastLastHash = null;
+let screencastDropped = 0;
+let screencastPendingWrites = new Set();
+// Adaptive rate: everyNthFrame doubles (up to SCREENCAST_MAX_NTH) while the
+// recent frames are nearly all duplicates, and drops back once the page moves.
+let screencastParams = null; // Page.startScreencast params, re-sent when the rate changes
+let screencastBaseNth = 1;
+let screencastAdaptive = true;
+let screencastRecent = []; // 1 = changed, 0 = duplicate
+const SCREENCAST_ACTIVITY_WINDOW = 30;
+const SCREENCAST_MAX_NTH = 8;
+
+// An HTTP client's recording would be cut short if the main thread recycled
+// the shared browser under it, so it tells the main thread while it records.
+function setScreencastRecording(active) {
+  screencastRecording = active;
+  if (CLIENT_WORKER) parentPort.postMessage({ type: 'screencast', active });
+}
+
+// Screencast encoding runs as background ffmpeg jobs, at most
+// ENCODE_CONCURRENCY at a time (default: half the cores, ffmpeg is threaded).
+const ENCODE_CONCURRENCY = parseInt(process.env.CHROMIUM_ENCODE_CONCURRENCY || String(Math.max(1, Math.floor(os.cpus().length / 2))), 10);
+const encodeJobs = new Map(); // id -> job, last 100 kept
+const encodeQueue = [];
+let runningEncodes = 0;
+let nextEncodeJobId = 1;
+let activeToolCalls = 0;
+
+// Jobs still queued or running when the process exits would leave a frames
+// directory and a truncated output behind: stop their ffmpeg and remove both.
+function discardUnfinishedEncodes() {
+  for (const job of encodeJobs.values()) {
+    if (job.status !== 'queued' && job.status !== 'running') continue;
+    try { job.proc?.kill('SIGKILL'); } catch {}
+    try { fs.rmSync(job.framesDir, { recursive: true, force: true }); } catch {}
+    try { fs.rmSync(job.output, { force: true }); } catch {}
+  }
+}
+process.on('exit', discardUnfinishedEncodes);
+
+// evaluate results whose JSON is larger than this are summarized in the text
+// content and returned only once, as structuredContent.value.
+const EVALUATE_TEXT_LIMIT = 64 * 1024;
+
+// Out-of-band transfer: get_content results above the threshold (bytes) are
+// streamed from the page through a CDP IO handle into a spool file, and the
+// response carries only path, size and sha256.
+const SPOOL_DIR = process.env.CHROMIUM_SPOOL_DIR || path.join(os.tmpdir(), 'mcp-chromium-spool');
+const SPOOL_THRESHOLD = parseInt(process.env.CHROMIUM_SPOOL_THRESHOLD || String(1024 * 1024), 10);
+const IO_READ_CHUNK = 1024 * 1024;
+// Spool retention: entries older than this many hours are deleted (default: 24,
+// 0 = keep), then the oldest until the directory fits in CHROMIUM_SPOOL_MAX_MB
+// (default: 2048, 0 = no cap). Swept at startup and at most every 10 minutes.
+const SPOOL_RETENTION_HOURS = parseFloat(process.env.CHROMIUM_SPOOL_RETENTION_HOURS || '24');
+const SPOOL_MAX_MB = parseInt(process.env.CHROMIUM_SPOOL_MAX_MB || '2048', 10);
+const SPOOL_SWEEP_INTERVAL_MS = 10 * 60 * 1000;
+// Names spoolFilePath() produces (<prefix>-<ms>-<hex>[.ext]); nothing else in
+// the directory is ever deleted.
+const SPOOL_ENTRY = /-\d{13}-[0-9a-f]{8}(\.[a-z0-9]+)?$/;
+let lastSpoolSweep = 0;
+
+// get_content_delta: installed in the page on first use. A MutationObserver
+// only marks the text dirty; the innerText is re-read and diffed lazily when
+// asked for. The last CONTENT_DELTA_HISTORY versions are kept as line arrays so
+// any recent version can be diffed against the current one directly.
+const CONTENT_DELTA_HISTORY = 8;
+function contentDeltaExpression(since, docId) {
+  return `(() => {
+  let state = window.__mcpContentDelta;
+  if (!state) {
+    state = window.__mcpContentDelta = {
+      docId: Math.random().toString(36).slice(2) + Date.now().toString(36),
+      version: 0, dirty: true, versions: new Map(),
+    };
+    new MutationObserver(() => { state.dirty = true; })
+      .observe(document, { subtree: true, childList: true, characterData: true, attributes: true });
+  }
+  if (state.dirty) {
+    state.dirty = false;
+    const lines = document.body ? document.body.innerText.split('\\n') : [];
+    const last = state.versions.get(state.version);
+    if (!last || last.length !== lines.length || last.some((l, i) => l !== lines[i])) {
+      state.version++;
+      state.versions.set(state.version, lines);
+      for (const v of state.versions.keys()) {
+        if (v <= state.version - ${CONTENT_DELTA_HISTORY}) state.versions.delete(v);
+      }
+    }
+  }
+  const current = state.versions.get(state.version);
+  const since = ${JSON.stringify(since)};
+  const base = ${JSON.stringify(docId)} === state.docId ? state.versions.get(since) : undefined;
+  if (!base) {
+    return { docId: state.docId, version: state.version, full: true, lines: current };
+  }
+
+  // Hunks turning base into current; apply from the last one backwards with
+  // lines.splice(start, deleteCount, ...insert). Common prefix/suffix are
+  // trimmed, then an LCS over the middle splits it into separate hunks when
+  // that is cheap enough.
+  let pre = 0;
+  while (pre < base.length && pre < current.length && base[pre] === current[pre]) pre++;
+  let suf = 0;
+  while (suf < base.length - pre && suf < current.length - pre &&
+         base[base.length - 1 - suf] === current[current.length - 1 - suf]) suf++;
+  const a = base.slice(pre, base.length - suf);
+  const b = current.slice(pre, current.length - suf);
+  const hunks = [];
+  if (a.length * b.length > 0 && a.length * b.length <= 1000000) {
+    const w = b.length + 1;
+    const lcs = new Uint32Array((a.length + 1) * w);
+    for (let i = a.length - 1; i >= 0; i--) {
+      for (let j = b.length - 1; j >= 0; j--) {
+        lcs[i * w + j] = a[i] === b[j] ? lcs[(i + 1) * w + j + 1] + 1 : Math.max(lcs[(i + 1) * w + j], lcs[i * w + j + 1]);
+      }
+    }
+    let i = 0, j = 0, hunk = null;
+    const flush = () => { if (hunk) { hunks.push(hunk); hunk = null; } };
+    while (i < a.length || j < b.length) {
+      if (i < a.length && j < b.length && a[i] === b[j]) {
+        flush(); i++; j++;
+      } else if (j < b.length && (i === a.length || lcs[i * w + j + 1] >= lcs[(i + 1) * w + j])) {
+        hunk = hunk || { start: pre + i, deleteCount: 0, remove: [], insert: [] };
+        hunk.insert.push(b[j++]);
+      } else {
+        hunk = hunk || { start: pre + i, deleteCount: 0, remove: [], insert: [] };
+        hunk.remove.push(a[i++]);
+        hunk.deleteCount++;
+      }
+    }
+    flush();
+  } else if (a.length > 0 || b.length > 0) {
+    hunks.push({ start: pre, deleteCount: a.length, remove: a, insert: b });
+  }
+  return { docId: state.docId, version: state.version, since, full: false, hunks };
+})()`;
+}
+
+// wait_for: resolves inside the page as soon as the condition holds. Checked
+// on every DOM mutation batch and animation frame, plus a 100ms interval since
+// requestAnimationFrame is paused in background tabs.
+function waitForExpression({ selector, state, text, regex, predicate }, timeoutMs) {
+  return `new Promise((resolve) => {
+  const started = performance.now();
+  const selector = ${JSON.stringify(selector ?? null)};
+  const state = ${JSON.stringify(state)};
+  const text = ${JSON.stringify(text ?? null)};
+  const pattern = ${text != null && regex ? `new RegExp(${JSON.stringify(text)})` : 'null'};
+  const predicate = ${predicate ? `() => { const v = (${predicate}); return typeof v === 'function' ? v() : v; }` : 'null'};
+  const visible = (el) => {
+    if (!el || el.getClientRects().length === 0) return false;
+    const style = getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.display !== 'none';
+  };
+  const test = () => {
+    let scope = document.body;
+    if (selector) {
+      const el = document.querySelector(selector);
+      if (state === 'detached') return !el;
+      if (state === 'hidden') return !visible(el);
+      if (!el || (state === 'visible' && !visible(el))) return false;
+      scope = el;
+    }
+    if (text !== null) {
+      const content = scope ? scope.innerText || scope.textContent || '' : '';
+      if (pattern ? !pattern.test(content) : !content.includes(text)) return false;
+    }
+    return predicate ? !!predicate() : true;
+  };
+  const check = () => { try { return test(); } catch (e) { return false; } };
+  if (check()) { resolve({ ok: true, waitedMs: 0 }); return; }
+
+  let done = false;
+  const finish = (ok) => {
+    if (done) return;
+    done = true;
+    observer.disconnect();
+    clearInterval(poll);
+    clearTimeout(timer);
+    resolve({ ok, waitedMs: Math.round(performance.now() - started) });
+  };
+  const observer = new MutationObserver(() => { if (check()) finish(true); });
+  observer.observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+  const frame = () => { if (done) return; if (check()) finish(true); else requestAnimationFrame(frame); };
+  requestAnimationFrame(frame);
+  const poll = setInterval(() => { if (check()) finish(true); }, 100);
+  const timer = setTimeout(() => finish(false), ${Math.max(0, Math.round(timeoutMs))});
+})`;
+}
+
+// Computed styles captured by dom_snapshot unless the caller lists its own.
+const SNAPSHOT_DEFAULT_STYLES = ['display', 'visibility', 'opacity', 'position', 'z-index', 'overflow', 'font-size', 'color', 'background-color'];
+
+// fill_form: sets every field in one pass inside the page. Values go through
+// the prototype's value setter (so framework value trackers see the change)
+// and fire bubbling input + change events. Checkboxes and radios are clicked
+// when their state must change. File inputs and fields to type for real
+// (those listed, or with typing === true every text-like input, textarea and
+// contenteditable) are only located here; the server finishes them with
+// DOM.setFileInputFiles and key events.
+const FILL_FORM_FUNCTION = `function (fields, typing) {
+  const TEXT_TYPES = ['', 'text', 'search', 'email', 'url', 'tel', 'password', 'number'];
+  const fire = (el, ...types) => types.forEach((t) => el.dispatchEvent(new Event(t, { bubbles: true })));
+  const setValue = (el, value) => {
+    const proto = Object.getPrototypeOf(el);
+    const setter = Object.getOwnPropertyDescriptor(proto, 'value')?.set;
+    if (setter) setter.call(el, value); else el.value = value;
+  };
+  const truthy = (v) => v === true || v === 'true' || v === 'on' || v === 1 || v === '1';
+  return Object.entries(fields).map(([selector, value]) => {
+    const el = document.querySelector(selector);
+    if (!el) return { selector, status: 'not_found' };
+    if (el.disabled) return { selector, status: 'disabled' };
+    if (el.readOnly) return { selector, status: 'readonly' };
+    const tag = el.tagName.toLowerCase();
+    const type = (el.getAttribute('type') || '').toLowerCase();
+    try {
+      if (tag === 'input' && type === 'file') {
+        return { selector, status: 'file' };
+      }
+      const textLike = (tag === 'input' && TEXT_TYPES.includes(type)) || tag === 'textarea' || el.isContentEditable;
+      if (typing === true ? textLike : typing.includes(selector)) {
+        return { selector, status: 'type' };
+      }
+      if (tag === 'input' && (type === 'checkbox' || type === 'radio')) {
+        let target = el;
+        if (type === 'radio' && typeof value === 'string' && !['true', 'false', 'on', ''].includes(value)) {
+          // A value picks the radio of that value in the same group
+          const scope = el.form || document;
+          target = [...scope.querySelectorAll('input[type=radio]')].find((r) => r.name === el.name && r.value === value);
+          if (!target) return { selector, status: 'no_option', value: el.value };
+          value = true;
+        }
+        if (target.checked !== truthy(value)) target.click();
+        return { selector, status: target.checked === truthy(value) ? 'filled' : 'not_toggled', value: target.checked };
+      }
+      if (tag === 'select') {
+        const wanted = (Array.isArray(value) ? value : [value]).map(String);
+        const options = [...el.options];
+        if (!wanted.every((w) => options.some((o) => o.value === w || o.text === w))) {
+          return { selector, status: 'no_option', value: el.value };
+        }
+        options.forEach((o) => { o.selected = wanted.includes(o.value) || wanted.includes(o.text); });
+        fire(el, 'input', 'change');
+        return { selector, status: 'filled', value: el.multiple ? options.filter((o) => o.selected).map((o) => o.value) : el.value };
+      }
+      if (el.isContentEditable) {
+        el.textContent = String(value);
+        fire(el, 'input');
+        return { selector, status: 'filled', value: el.textContent };
+      }
+      if (!('value' in el)) return { selector, status: 'not_fillable' };
+      setValue(el, String(value));
+      fire(el, 'input', 'change');
+      return { selector, status: 'filled', value: el.value };
+    } catch (e) {
+      return { selector, status: 'error', error: String(e && e.message || e) };
+    }
+  });
+}`;
+
+// Memory watchdog: periodically samples the browser's RSS and JS heap and, when
+// a limit is crossed, recycles the browser between tool calls. 0 disables a limit.
+const WATCHDOG_INTERVAL_MS = parseInt(process.env.CHROMIUM_WATCHDOG_INTERVAL_MS || '30000', 10);
+const WATCHDOG_MAX_RSS_MB = parseInt(process.env.CHROMIUM_MAX_RSS_MB || '0', 10);
+const WATCHDOG_MAX_JS_HEAP_MB = parseInt(process.env.CHROMIUM_MAX_JS_HEAP_MB || '0', 10);
+const WATCHDOG_MAX_PAGES = parseInt(process.env.CHROMIUM_RECYCLE_AFTER_PAGES || '0', 10);
+let memorySamples = [];
+let recycleEvents = [];
+let recycleReason = null; // set by the watchdog, acted on before the next tool call
+let pagesSinceLaunch = 0;
+
+// One more page load. The page limit is the browser's, so HTTP clients report
+// their loads to the main thread, which owns the browser.
+function countPage() {
+  if (CLIENT_WORKER) {
+    parentPort.postMessage({ type: 'page' });
+    return;
+  }
+  pagesSinceLaunch++;
+  if (WATCHDOG_MAX_PAGES && pagesSinceLaunch >= WATCHDOG_MAX_PAGES && !recycleReason) {
+    recycleReason = `page limit reached (${pagesSinceLaunch} >= ${WATCHDOG_MAX_PAGES})`;
+  }
+}
+
+// Session journal: the state needed to rebuild a session after a crash or a
+// recycle. Cookies are refreshed after each tool call; the URL follows
+// main-frame navigations.
+let sessionJournal = { cookies: [], emulation: null, userAgent: null, url: null };
+let sessionLost = false; // browser died unexpectedly; replay the journal on relaunch
+let browserClosing = false;
+let browserStarting = null; // in-flight ensureChromium(), shared by concurrent callers
+// Tools that are safe to re-run once after a retryable connection loss.
+const RETRY_IDEMPOTENT = !['0', 'false'].includes(process.env.CHROMIUM_RETRY_IDEMPOTENT);
+const IDEMPOTENT_TOOLS = new Set([
+  'navigate', 'screenshot', 'get_content', 'get_content_delta', 'wait_for', 'hover', 'get_selected_element', 'dom_snapshot',
+  'run_accessibility_audit', 'run_performance_audit', 'run_seo_audit',
+  'run_best_practices_audit', 'run_nextjs_audit', 'run_debugger_mode', 'run_audit_mode',
+  'emulate_device', 'reset_emulation', 'emulate_matrix', 'set_cookies', 'get_cookies', 'set_capture_level',
+  'print_pdf', 'print_pdf_batch',
+]);
+
+// print_pdf paper sizes in inches, the unit Page.printToPDF takes.
+const PAPER_SIZES = {
+  letter: [8.5, 11],
+  legal: [8.5, 14],
+  tabloid: [11, 17],
+  a3: [11.69, 16.54],
+  a4: [8.27, 11.69],
+  a5: [5.83, 8.27],
+};
+const PDF_UNITS = { in: 1, cm: 1 / 2.54, mm: 1 / 25.4, px: 1 / 96 };
+
+// Options shared by print_pdf and print_pdf_batch.
+const PDF_OPTION_PROPERTIES = {
+  paper: {
+    description: `Paper size: ${Object.keys(PAPER_SIZES).join(', ')} (default: letter), or {width, height} in inches or with a unit ("210mm")`,
+    oneOf: [
+      { type: 'string', enum: Object.keys(PAPER_SIZES) },
+      {
+        type: 'object',
+        properties: { width: { type: ['number', 'string'] }, height: { type: ['number', 'string'] } },
+        required: ['width', 'height'],
+      },
+    ],
+  },
+  margin: {
+    description: 'Page margins: one length for all sides, or {top, right, bottom, left}; numbers are inches, strings may use in/cm/mm/px (default: Chrome\'s ~0.4in)',
+    oneOf: [
+      { type: ['number', 'string'] },
+      {
+        type: 'object',
+        properties: {
+          top: { type: ['number', 'string'] },
+          right: { type: ['number', 'string'] },
+          bottom: { type: ['number', 'string'] },
+          left: { type: ['number', 'string'] },
+        },
+      },
+    ],
+  },
+  landscape: {
+    type: 'boolean',
+    description: 'Landscape orientation (default: false)',
+  },
+  printBackground: {
+    type: 'boolean',
+    description: 'Print background colors and images (default: true)',
+  },
+  scale: {
+    type: 'number',
+    description: 'Rendering scale, 0.1 to 2 (default: 1)',
+  },
+  pageRanges: {
+    type: 'string',
+    description: 'Pages to print, e.g. "1-5, 8, 11-13" (default: all)',
+  },
+  headerTemplate: {
+    type: 'string',
+    description: 'HTML for the page header; elements with class date, title, url, pageNumber or totalPages get those values. Setting either template turns headers and footers on',
+  },
+  footerTemplate: {
+    type: 'string',
+    description: 'HTML for the page footer, same classes as headerTemplate, e.g. <div style="font-size:8px;margin:auto"><span class="pageNumber"></span>/<span class="totalPages"></span></div>',
+  },
+  preferCSSPageSize: {
+    type: 'boolean',
+    description: 'Use the page\'s CSS @page size over paper (default: false)',
+  },
+  timeoutMs: {
+    type: 'number',
+    description: 'Time allowed for loading and for rendering each PDF (default: 120000)',
+  },
+};
+
+// Tools that can change cookies (by navigating, submitting or setting them);
+// the session journal's cookie snapshot is refreshed after these only.
+const COOKIE_TOOLS = new Set([
+  'navigate', 'click', 'fill', 'fill_form', 'select', 'evaluate', 'set_cookies', 'load_storage_state',
+  'print_pdf', 'profile_page', 'leak_check',
+]);
+
+// Request scheduler. Tool calls arrive concurrently, but there is one tab per
+// process: tools that change it run alone (write), tools that only read it
+// share it (read), and tools that never touch it or only wait on it (free)
+// bypass the queue. Waiting calls are served interactive lane first, FIFO
+// within a lane; a batch call waiting longer than SCHED_AGING_MS is served as
+// interactive so it cannot starve. Unlisted tools count as writes.
+const FREE_TOOLS = new Set([
+  'get_console_logs', 'get_console_errors', 'get_network_logs', 'get_network_errors', 'wipe_logs',
+  'wait_for', 'screencast_status', 'screencast_job_status', 'get_memory_stats', 'scheduler_stats',
+]);
+const READ_TOOLS = new Set([
+  'get_content', 'get_content_delta', 'get_selected_element', 'dom_snapshot', 'get_cookies',
+  'run_accessibility_audit', 'run_performance_audit', 'run_seo_audit', 'run_best_practices_audit',
+  'run_nextjs_audit', 'run_debugger_mode', 'run_audit_mode', 'emulate_matrix', 'print_pdf_batch',
+]);
+const SCHED_LANES = ['interactive', 'batch'];
+const SCHED_AGING_MS = parseInt(process.env.CHROMIUM_SCHED_AGING_MS || '5000', 10);
+// Default per-call deadline in ms (0 = none); a call's deadlineMs overrides it.
+const DEFAULT_DEADLINE_MS = parseInt(process.env.CHROMIUM_DEADLINE_MS || '0', 10);
+// { name, deadline, signal, active } of the tool call the current async code
+// belongs to. `active` goes false when the call ends, so work it spawned that
+// outlives it (timers, socket listeners) is not bound by its deadline.
+const callContext = new AsyncLocalStorage();
+const schedQueue = []; // { mode, lane, seq, enqueued, grant }
+let schedReaders = 0;
+let schedWriter = false;
+let schedSeq = 0;
+const schedStats = {
+  lanes: Object.fromEntries(SCHED_LANES.map(lane => [lane, { granted: 0, completed: 0, failed: 0 }])),
+  free: 0, cancelled: 0, deadlineExceeded: 0, maxQueueDepth: 0,
+  waitMs: [], runMs: [], // last 500 of each
+};
+
+// CDP command correlation: one listener per connection resolves responses by id.
+const pendingCommands = new Map(); // id -> { ws, method, resolve, reject, timer }
+let nextCommandId = 1;
+const eventWaiters = []; // { method, resolve, timer } for waitForCDPEvent
+// CSS.styleSheetAdded headers (styleSheetId -> header) while profile_page runs.
+let profiledStyleSheets = null;
+// HeapProfiler.addHeapSnapshotChunk target ({ fd, hash, size }) while a heap
+// snapshot is being written.
+let heapSnapshotSink = null;
+
+// Requests of the current tab still in flight, for wait_for's network-quiet check.
+const inflightRequests = new Set();
+const networkIdleWaiters = new Set(); // { check } re-armed on every network event
+
+// emulate_matrix renders each device in its own browser context; this caps how
+// many of those renderers run at once (default: two per CPU core).
+const MATRIX_CONCURRENCY = parseInt(process.env.CHROMIUM_MATRIX_CONCURRENCY || String(os.cpus().length * 2), 10);
+
+// Installed before any page script in each matrix target: accumulates the
+// layout-shift score (CLS, ignoring shifts right after user input).
+const LAYOUT_SHIFT_OBSERVER = `(() => {
+  window.__mcpCLS = 0;
+  try {
+    new PerformanceObserver((list) => {
+      for (const e of list.getEntries()) if (!e.hadRecentInput) window.__mcpCLS += e.value;
+    }).observe({ type: 'layout-shift', buffered: true });
+  } catch (e) { /* layout-shift entries unsupported */ }
+})()`;
+
+// Horizontal overflow check run in each matrix target after load.
+const LAYOUT_METRICS_EXPRESSION = `(() => {
+  const vw = document.documentElement.clientWidth;
+  const offenders = [];
+  for (const el of document.querySelectorAll('body *')) {
+    const r = el.getBoundingClientRect();
+    if (r.width > 0 && r.right > vw + 1) {
+      offenders.push(el.tagName.toLowerCase() + (el.id ? '#' + el.id : '') + (el.classList[0] ? '.' + el.classList[0] : ''));
+      if (offenders.length >= 10) break;
+    }
+  }
+  return {
+    viewportWidth: vw,
+    scrollWidth: document.documentElement.scrollWidth,
+    scrollHeight: document.documentElement.scrollHeight,
+    overflowX: document.documentElement.scrollWidth > vw,
+    overflowElements: offenders,
+    cls: Math.round((window.__mcpCLS || 0) * 1000) / 1000,
+  };
+})()`;
 
 // Mobile device presets
 const DEVICE_PRESETS = {
@@ -57,6 +569,52 @@ const DEVICE_PRESETS = {
   'galaxy-tab-s9': { width: 800, height: 1280, deviceScaleFactor: 2, mobile: true, userAgent: 'Mozilla/5.0 (Linux; Android 14; SM-X710) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36' },
 };
 
+// Network/CPU conditioning profiles for emulate_device, combinable with a
+// device preset. Latency is ms and throughput bytes/s, as in the DevTools
+// network presets; cpu is the Emulation.setCPUThrottlingRate slowdown factor.
+const CONDITIONING_PROFILES = {
+  'slow-3g': { network: { latency: 2000, downloadThroughput: 50000, uploadThroughput: 50000 } },
+  'fast-3g': { network: { latency: 563, downloadThroughput: 180000, uploadThroughput: 84375 } },
+  'slow-4g': { network: { latency: 150, downloadThroughput: 204800, uploadThroughput: 96000 } },
+  'fast-4g': { network: { latency: 165, downloadThroughput: 1012500, uploadThroughput: 168750 } },
+  'offline': { network: { offline: true, latency: 0, downloadThroughput: 0, uploadThroughput: 0 } },
+  'cpu-2x': { cpu: 2 },
+  'cpu-4x': { cpu: 4 },
+  'cpu-6x': { cpu: 6 },
+  // Lighthouse's mobile defaults: a mid-range phone on slow 4G.
+  'mid-range-phone': { network: { latency: 150, downloadThroughput: 204800, uploadThroughput: 96000 }, cpu: 4 },
+  'low-end-phone': { network: { latency: 563, downloadThroughput: 180000, uploadThroughput: 84375 }, cpu: 6 },
+};
+const NO_CONDITIONING = { profiles: [], network: null, cpu: 1 };
+const UNTHROTTLED_NETWORK = { offline: false, latency: 0, downloadThroughput: -1, uploadThroughput: -1 };
+
+// Merge conditioning profile names (one name or an array) into
+// { profiles, network, cpu }; later profiles win per dimension.
+function resolveConditioning(names) {
+  const list = !names ? [] : Array.isArray(names) ? names : [names];
+  if (list.length === 0) return null;
+  const unknown = list.filter(n => !CONDITIONING_PROFILES[n]);
+  if (unknown.length > 0) {
+    throw new Error(`Unknown conditioning profile: "${unknown.join('", "')}". Available: ${Object.keys(CONDITIONING_PROFILES).join(', ')}`);
+  }
+  const merged = { profiles: list, network: null, cpu: 1 };
+  for (const name of list) {
+    const profile = CONDITIONING_PROFILES[name];
+    if (profile.network) merged.network = { offline: false, ...profile.network };
+    if (profile.cpu) merged.cpu = profile.cpu;
+  }
+  return merged;
+}
+
+function describeConditioning(c) {
+  const parts = [];
+  if (c.network) {
+    parts.push(c.network.offline ? 'offline' : `${c.network.latency}ms RTT, ${Math.round(c.network.downloadThroughput * 8 / 1000)}/${Math.round(c.network.uploadThroughput * 8 / 1000)} kbps down/up`);
+  }
+  if (c.cpu > 1) parts.push(`CPU ${c.cpu}x slower`);
+  return `${c.profiles.join('+')} (${parts.join(', ')})`;
+}
+
 // Helper function to find Chromium executable
 function getChromiumPath() {
   // Explicit override always wins — point at any Chromium-family binary
@@ -140,19 +698,541 @@ function cleanupManagedProfile() {
   try { fs.rmSync(managedProfileDir, { recursive: true, force: true }); } catch {}
   managedProfileDir = null;
 }
+function isProcessAlive(pid) {
+  try {
+    process.kill(pid, 0);
+    return true;
+  } catch (e) {
+    return e.code === 'EPERM';
+  }
+}
 function sweepStaleProfiles() {
   // Remove server-owned profiles left behind by prior crashed / hard-killed runs.
+  // Profiles are named <prefix><owner pid>-XXXXXX; parallel servers keep theirs.
   try {
     const tmp = os.tmpdir();
     for (const name of fs.readdirSync(tmp)) {
       if (name.startsWith(MANAGED_PROFILE_PREFIX)) {
+        const owner = parseInt(name.slice(MANAGED_PROFILE_PREFIX.length), 10);
+        if (owner && owner !== process.pid && isProcessAlive(owner)) continue;
         try { fs.rmSync(path.join(tmp, name), { recursive: true, force: true }); } catch {}
       }
     }
   } catch {}
 }
-sweepStaleProfiles();
-process.on('exit', cleanupManagedProfile);
+
+// --- Profile templates: clone a saved, pre-warmed profile instead of starting empty ---
+// Per-instance lock/port files must never be shared between browsers.
+const PROFILE_CLONE_SKIP = new Set(['SingletonLock', 'SingletonSocket', 'SingletonCookie', 'lockfile', 'DevToolsActivePort']);
+// Directories whose files Chrome treats as cache; only these are hardlinked.
+const PROFILE_CACHE_DIRS = new Set(['Cache', 'Code Cache', 'GPUCache', 'ScriptCache', 'CacheStorage', 'GrShaderCache', 'ShaderCache']);
+
+// Copy a profile tree as cheaply as the filesystem allows. 'auto' reflinks
+// (copy-on-write: btrfs, XFS, APFS, ...) and falls back to a plain copy per
+// file; 'hardlink' additionally shares cache files with the template, so
+// clones write through to it — only use it for throwaway caches.
+function cloneProfileTree(src, dst, mode = PROFILE_CLONE_MODE) {
+  const stats = { files: 0, bytes: 0, linked: 0 };
+  const copyFlags = mode === 'copy' ? 0
+    : mode === 'reflink' ? fs.constants.COPYFILE_FICLONE_FORCE
+    : fs.constants.COPYFILE_FICLONE;
+
+  const walk = (from, to, inCache) => {
+    fs.mkdirSync(to, { recursive: true });
+    for (const entry of fs.readdirSync(from, { withFileTypes: true })) {
+      if (PROFILE_CLONE_SKIP.has(entry.name)) continue;
+      const source = path.join(from, entry.name);
+      const target = path.join(to, entry.name);
+      if (entry.isDirectory()) {
+        walk(source, target, inCache || PROFILE_CACHE_DIRS.has(entry.name));
+      } else if (entry.isFile()) {
+        if (mode === 'hardlink' && inCache) {
+          try {
+            fs.linkSync(source, target);
+            stats.linked++;
+            continue;
+          } catch (e) {
+            // Cross-device or unsupported: fall through to a copy
+          }
+        }
+        fs.copyFileSync(source, target, copyFlags);
+        stats.files++;
+        stats.bytes += fs.statSync(source).size;
+      }
+    }
+  };
+  walk(src, dst, false);
+  return stats;
+}
+// Only the main thread owns a profile; client workers share its pid.
+if (isMainThread) {
+  sweepStaleProfiles();
+  sweepSpoolDir();
+  process.on('exit', cleanupManagedProfile);
+}
+
+// Resident memory of a process and all its descendants, in kB (Linux /proc only).
+// Chromium is multi-process (browser, renderers, GPU, utility), so the browser
+// pid alone badly under-reports what the OOM killer sees.
+function readProcessTreeRssKb(rootPid) {
+  if (os.platform() !== 'linux' || !rootPid) return null;
+  const children = new Map();
+  try {
+    for (const entry of fs.readdirSync('/proc')) {
+      if (!/^\d+$/.test(entry)) continue;
+      try {
+        const stat = fs.readFileSync(`/proc/${entry}/stat`, 'utf8');
+        // comm can contain spaces and parens; the fixed fields start after the last ')'.
+        const ppid = parseInt(stat.slice(stat.lastIndexOf(')') + 2).split(' ')[1], 10);
+        if (!children.has(ppid)) children.set(ppid, []);
+        children.get(ppid).push(parseInt(entry, 10));
+      } catch {}
+    }
+  } catch {
+    return null;
+  }
+  let totalKb = 0;
+  const stack = [rootPid];
+  while (stack.length > 0) {
+    const pid = stack.pop();
+    try {
+      const match = fs.readFileSync(`/proc/${pid}/status`, 'utf8').match(/^VmRSS:\s+(\d+)\s+kB/m);
+      if (match) totalKb += parseInt(match[1], 10);
+    } catch {}
+    stack.push(...(children.get(pid) || []));
+  }
+  return totalKb;
+}
+
+// Errors for calls that failed only because the browser went away; the
+// caller (or the idempotent-tool retry) can safely try again.
+function retryableError(message) {
+  const error = new Error(message);
+  error.retryable = true;
+  return error;
+}
+
+function failPendingCommands(ws, reason) {
+  for (const [id, pending] of pendingCommands) {
+    if (pending.ws !== ws) continue;
+    pendingCommands.delete(id);
+    clearTimeout(pending.timer);
+    pending.reject(retryableError(`${reason} during ${pending.method}; the browser is being relaunched, retry the call`));
+  }
+}
+
+function activeCall() {
+  const call = callContext.getStore();
+  return call && call.active ? call : null;
+}
+
+function deadlineError(call) {
+  const error = new Error(`Deadline of ${call.deadlineMs}ms exceeded in ${call.name}`);
+  error.deadline = true;
+  return error;
+}
+
+function cancelledError(call) {
+  const error = new Error(`${call.name} cancelled by the client`);
+  error.cancelled = true;
+  return error;
+}
+
+function schedRank(entry, now) {
+  return entry.lane === 'interactive' || now - entry.enqueued >= SCHED_AGING_MS ? 0 : 1;
+}
+
+// Grant the tab to waiting calls in order: one writer alone, or a run of
+// readers. A waiting writer also holds back readers queued behind it.
+function pumpScheduler() {
+  const now = Date.now();
+  schedQueue.sort((a, b) => schedRank(a, now) - schedRank(b, now) || a.seq - b.seq);
+  while (schedQueue.length > 0 && !schedWriter) {
+    const next = schedQueue[0];
+    if (next.mode === 'write' && schedReaders > 0) break;
+    schedQueue.shift();
+    if (next.mode === 'write') {
+      schedWriter = true;
+    } else {
+      schedReaders++;
+    }
+    next.grant();
+  }
+}
+
+// Wait for the tab in `mode` ('read' | 'write'); rejects if the call's
+// deadline passes or the client cancels while it is still queued.
+function acquireTab(mode, lane, call) {
+  return new Promise((resolve, reject) => {
+    const entry = { mode, lane, seq: schedSeq++, enqueued: Date.now() };
+    let timer;
+    const onAbort = () => leave(cancelledError(call));
+    const cleanup = () => {
+      clearTimeout(timer);
+      call.signal?.removeEventListener('abort', onAbort);
+    };
+    const leave = (error) => {
+      const i = schedQueue.indexOf(entry);
+      if (i !== -1) schedQueue.splice(i, 1);
+      cleanup();
+      reject(error);
+      pumpScheduler();
+    };
+    entry.grant = () => {
+      cleanup();
+      schedStats.lanes[lane].granted++;
+      pushSample(schedStats.waitMs, Date.now() - entry.enqueued);
+      resolve();
+    };
+    if (call.signal?.aborted) {
+      reject(cancelledError(call));
+      return;
+    }
+    if (call.deadline) {
+      timer = setTimeout(() => leave(deadlineError(call)), Math.max(call.deadline - Date.now(), 0));
+    }
+    call.signal?.addEventListener('abort', onAbort, { once: true });
+    schedQueue.push(entry);
+    schedStats.maxQueueDepth = Math.max(schedStats.maxQueueDepth, schedQueue.length);
+    pumpScheduler();
+  });
+}
+
+function releaseTab(mode) {
+  if (mode === 'write') {
+    schedWriter = false;
+  } else {
+    schedReaders--;
+  }
+  pumpScheduler();
+}
+
+function pushSample(samples, value) {
+  samples.push(value);
+  if (samples.length > 500) samples.shift();
+}
+
+function percentiles(samples) {
+  if (samples.length === 0) return null;
+  const sorted = [...samples].sort((a, b) => a - b);
+  const at = (q) => sorted[Math.min(sorted.length - 1, Math.floor(q * sorted.length))];
+  return { p50: at(0.5), p95: at(0.95), p99: at(0.99), max: sorted[sorted.length - 1], n: sorted.length };
+}
+
+// --- Storage state: cookies + per-origin Web Storage / IndexedDB in one file ---
+// Evaluated in the page: dumps the current origin's storage. IndexedDB values
+// must be JSON-serializable (Blobs / ArrayBuffers / Dates do not round-trip).
+const STORAGE_DUMP_EXPRESSION = `(async () => {
+  const entries = (store) => Object.keys(store).map((k) => [k, store.getItem(k)]);
+  const request = (r) => new Promise((resolve, reject) => { r.onsuccess = () => resolve(r.result); r.onerror = () => reject(r.error); });
+  const databases = [];
+  if (indexedDB.databases) {
+    for (const info of await indexedDB.databases()) {
+      const db = await request(indexedDB.open(info.name));
+      const names = Array.from(db.objectStoreNames);
+      const stores = [];
+      if (names.length > 0) {
+        const tx = db.transaction(names, 'readonly');
+        for (const name of names) {
+          const store = tx.objectStore(name);
+          const [keys, values] = await Promise.all([request(store.getAllKeys()), request(store.getAll())]);
+          stores.push({
+            name,
+            keyPath: store.keyPath,
+            autoIncrement: store.autoIncrement,
+            indexes: Array.from(store.indexNames).map((n) => {
+              const index = store.index(n);
+              return { name: n, keyPath: index.keyPath, unique: index.unique, multiEntry: index.multiEntry };
+            }),
+            records: keys.map((key, i) => [key, values[i]]),
+          });
+        }
+      }
+      databases.push({ name: db.name, version: db.version, stores });
+      db.close();
+    }
+  }
+  return { origin: location.origin, localStorage: entries(localStorage), sessionStorage: entries(sessionStorage), indexedDB: databases };
+})()`;
+
+// Source for Page.addScriptToEvaluateOnNewDocument that seeds each saved origin
+// the first time a document of that origin loads in this session. Web Storage
+// is written synchronously before page scripts run; IndexedDB is rebuilt async.
+function storageSeedScript(origins) {
+  const byOrigin = {};
+  for (const o of origins) byOrigin[o.origin] = JSON.stringify(o);
+  return `(() => {
+    const saved = ${JSON.stringify(byOrigin)}[location.origin];
+    const marker = '__mcpStorageStateSeeded';
+    if (!saved || sessionStorage.getItem(marker)) return;
+    const state = JSON.parse(saved);
+    for (const [k, v] of state.localStorage || []) localStorage.setItem(k, v);
+    for (const [k, v] of state.sessionStorage || []) sessionStorage.setItem(k, v);
+    sessionStorage.setItem(marker, '1');
+    for (const dump of state.indexedDB || []) {
+      indexedDB.deleteDatabase(dump.name);
+      const open = indexedDB.open(dump.name, dump.version);
+      open.onupgradeneeded = () => {
+        for (const s of dump.stores) {
+          const store = open.result.createObjectStore(s.name, { keyPath: s.keyPath, autoIncrement: s.autoIncrement });
+          for (const i of s.indexes) store.createIndex(i.name, i.keyPath, { unique: i.unique, multiEntry: i.multiEntry });
+        }
+      };
+      open.onsuccess = () => {
+        const db = open.result;
+        const names = dump.stores.map((s) => s.name);
+        if (names.length === 0) { db.close(); return; }
+        const tx = db.transaction(names, 'readwrite');
+        for (const s of dump.stores) {
+          const store = tx.objectStore(s.name);
+          for (const [key, value] of s.records) {
+            if (s.keyPath === null) store.put(value, key); else store.put(value);
+          }
+        }
+        tx.oncomplete = () => db.close();
+      };
+    }
+  })()`;
+}
+
+function writeStateFile(filePath, data) {
+  const json = JSON.stringify(data);
+  fs.writeFileSync(filePath, filePath.endsWith('.gz') ? zlib.gzipSync(json) : json);
+  return fs.statSync(filePath).size;
+}
+
+function readStateFile(filePath) {
+  const raw = fs.readFileSync(filePath);
+  return JSON.parse((filePath.endsWith('.gz') ? zlib.gunzipSync(raw) : raw).toString('utf8'));
+}
+
+// A fresh path in SPOOL_DIR; without `ext` it names a directory for a
+// multi-file result.
+function spoolFilePath(prefix, ext) {
+  if (Date.now() - lastSpoolSweep > SPOOL_SWEEP_INTERVAL_MS) sweepSpoolDir();
+  fs.mkdirSync(SPOOL_DIR, { recursive: true });
+  const stamp = `${Date.now()}-${crypto.randomBytes(4).toString('hex')}`;
+  return path.join(SPOOL_DIR, ext ? `${prefix}-${stamp}.${ext}` : `${prefix}-${stamp}`);
+}
+
+function spoolEntrySize(entryPath) {
+  const stat = fs.statSync(entryPath);
+  if (!stat.isDirectory()) return stat.size;
+  return fs.readdirSync(entryPath).reduce((sum, name) => sum + spoolEntrySize(path.join(entryPath, name)), 0);
+}
+
+// Drop spool entries past SPOOL_RETENTION_HOURS, then the oldest ones until
+// the directory is under SPOOL_MAX_MB. Entries touched in the last minute may
+// still be being written and are always kept.
+function sweepSpoolDir() {
+  lastSpoolSweep = Date.now();
+  let entries;
+  try {
+    entries = fs.readdirSync(SPOOL_DIR).filter(name => SPOOL_ENTRY.test(name)).map((name) => {
+      const entryPath = path.join(SPOOL_DIR, name);
+      return { path: entryPath, mtime: fs.statSync(entryPath).mtimeMs, size: spoolEntrySize(entryPath) };
+    });
+  } catch {
+    return;
+  }
+  const now = Date.now();
+  const remove = (entry) => {
+    try { fs.rmSync(entry.path, { recursive: true, force: true }); } catch {}
+  };
+  entries.sort((a, b) => a.mtime - b.mtime);
+  let total = entries.reduce((sum, entry) => sum + entry.size, 0);
+  for (const entry of entries) {
+    if (now - entry.mtime < 60000) break;
+    const expired = SPOOL_RETENTION_HOURS > 0 && now - entry.mtime > SPOOL_RETENTION_HOURS * 3600000;
+    const overBudget = SPOOL_MAX_MB > 0 && total > SPOOL_MAX_MB * 1024 * 1024;
+    if (!expired && !overBudget) continue;
+    remove(entry);
+    total -= entry.size;
+  }
+}
+
+// A print_pdf length: a number of inches, or a string such as "1cm", "10mm", "96px".
+function pdfInches(value, what) {
+  if (typeof value === 'number') return value;
+  const match = /^\s*(\d+(?:\.\d+)?)\s*(in|cm|mm|px)?\s*$/.exec(String(value));
+  if (!match) {
+    throw new Error(`Invalid ${what}: "${value}" (use inches, or a length in in, cm, mm or px)`);
+  }
+  return parseFloat(match[1]) * PDF_UNITS[match[2] || 'in'];
+}
+
+// Page.printToPDF parameters for print_pdf options. The PDF is returned as an
+// IO stream handle rather than one base64 string.
+function printToPdfParams(args) {
+  const params = {
+    transferMode: 'ReturnAsStream',
+    landscape: !!args.landscape,
+    printBackground: args.printBackground !== false,
+    preferCSSPageSize: !!args.preferCSSPageSize,
+  };
+  if (args.scale !== undefined) params.scale = args.scale;
+  const paper = args.paper || 'letter';
+  if (typeof paper === 'string') {
+    const size = PAPER_SIZES[paper.toLowerCase()];
+    if (!size) {
+      throw new Error(`Unknown paper size "${paper}". Available: ${Object.keys(PAPER_SIZES).join(', ')}, or {width, height}`);
+    }
+    [params.paperWidth, params.paperHeight] = size;
+  } else {
+    params.paperWidth = pdfInches(paper.width, 'paper width');
+    params.paperHeight = pdfInches(paper.height, 'paper height');
+  }
+  const margin = args.margin ?? {};
+  for (const side of ['top', 'right', 'bottom', 'left']) {
+    const value = typeof margin === 'object' ? margin[side] : margin;
+    if (value !== undefined) {
+      params[`margin${side[0].toUpperCase()}${side.slice(1)}`] = pdfInches(value, `${side} margin`);
+    }
+  }
+  // An empty template would print Chrome's default date/title/URL line.
+  if (args.headerTemplate !== undefined || args.footerTemplate !== undefined) {
+    params.displayHeaderFooter = true;
+    params.headerTemplate = args.headerTemplate || '<span></span>';
+    params.footerTemplate = args.footerTemplate || '<span></span>';
+  }
+  if (args.pageRanges) params.pageRanges = args.pageRanges;
+  return params;
+}
+
+// print_pdf_batch file name: position in the batch plus a readable slug of the URL.
+function pdfFileName(index, url) {
+  const slug = url.replace(/^[a-z]+:\/\//i, '').replace(/[^a-z0-9]+/gi, '-').replace(/^-+|-+$/g, '').slice(0, 60);
+  return `${String(index + 1).padStart(3, '0')}-${slug || 'page'}.pdf`;
+}
+
+// Unused length of one script from Profiler.takePreciseCoverage block ranges.
+// Ranges nest, so painting them outermost first leaves each offset with the
+// count of its innermost range. Offsets are UTF-16 units (= bytes for ASCII).
+function coverageUsage(functions) {
+  const ranges = functions.flatMap(fn => fn.ranges);
+  const total = ranges.reduce((max, r) => Math.max(max, r.endOffset), 0);
+  ranges.sort((a, b) => a.startOffset - b.startOffset || b.endOffset - a.endOffset);
+  const used = new Uint8Array(total);
+  for (const r of ranges) used.fill(r.count > 0 ? 1 : 0, r.startOffset, r.endOffset);
+  let unused = 0;
+  for (let i = 0; i < total; i++) if (!used[i]) unused++;
+  return { totalBytes: total, unusedBytes: unused };
+}
+
+// Self time per function and per script URL from a Profiler.stop profile.
+// timeDeltas[i + 1] is the time between sample i and the next one.
+function profileSelfTimes(profile) {
+  const frames = new Map(profile.nodes.map(n => [n.id, n.callFrame]));
+  const selfUs = new Map();
+  const { samples = [], timeDeltas = [] } = profile;
+  for (let i = 0; i < samples.length; i++) {
+    selfUs.set(samples[i], (selfUs.get(samples[i]) || 0) + (timeDeltas[i + 1] || 0));
+  }
+  const functions = new Map();
+  const urls = new Map();
+  for (const [id, us] of selfUs) {
+    const frame = frames.get(id);
+    if (frame.functionName === '(idle)' || frame.functionName === '(root)') continue;
+    const key = `${frame.functionName}\u0000${frame.url}\u0000${frame.lineNumber}`;
+    const fn = functions.get(key) || { functionName: frame.functionName || '(anonymous)', url: frame.url, line: frame.lineNumber + 1, selfMs: 0 };
+    fn.selfMs += us / 1000;
+    functions.set(key, fn);
+    if (frame.url) urls.set(frame.url, (urls.get(frame.url) || 0) + us / 1000);
+  }
+  const round = (ms) => Math.round(ms * 100) / 100;
+  return {
+    functions: [...functions.values()].sort((a, b) => b.selfMs - a.selfMs).map(f => ({ ...f, selfMs: round(f.selfMs) })),
+    urls: [...urls].sort((a, b) => b[1] - a[1]).map(([url, ms]) => ({ url, selfMs: round(ms) })),
+  };
+}
+
+// Write a .cpuprofile a batch of nodes at a time instead of one JSON.stringify
+// of the whole profile (hundreds of MB for long recordings).
+function writeCpuProfile(filePath, profile) {
+  const hash = crypto.createHash('sha256');
+  const fd = fs.openSync(filePath, 'w');
+  let size = 0;
+  const write = (str) => {
+    const buf = Buffer.from(str);
+    fs.writeSync(fd, buf);
+    hash.update(buf);
+    size += buf.length;
+  };
+  try {
+    write('{"nodes":[');
+    for (let i = 0; i < profile.nodes.length; i += 1000) {
+      write((i ? ',' : '') + profile.nodes.slice(i, i + 1000).map(n => JSON.stringify(n)).join(','));
+    }
+    write(`],"startTime":${profile.startTime},"endTime":${profile.endTime}`);
+    for (const key of ['samples', 'timeDeltas']) {
+      const values = profile[key] || [];
+      write(`,"${key}":[`);
+      for (let i = 0; i < values.length; i += 10000) {
+        write((i ? ',' : '') + values.slice(i, i + 10000).join(','));
+      }
+      write(']');
+    }
+    write('}');
+  } finally {
+    fs.closeSync(fd);
+  }
+  return { path: filePath, size, sha256: hash.digest('hex') };
+}
+
+// Turn a Network.getAllCookies entry back into a Network.setCookies param.
+function cookieParamFromJar(c) {
+  const out = { name: c.name, value: c.value, domain: c.domain, path: c.path, secure: c.secure, httpOnly: c.httpOnly };
+  if (c.sameSite) out.sameSite = c.sameSite;
+  if (!c.session && c.expires > 0) out.expires = c.expires;
+  return out;
+}
+
+// Client worker: ask the main thread, which owns the shared browser, for
+// 'browser' (make sure it is up, relaunching it after a crash or a recycle) or
+// 'memory' (its watchdog stats). Resolves with the main thread's result.
+function requestMainThread(type) {
+  return new Promise((resolve, reject) => {
+    const id = nextMainThreadRequest++;
+    mainThreadRequests.set(id, { resolve, reject });
+    parentPort.postMessage({ type, id });
+  });
+}
+
+// MCP transport between a client worker and the main thread, which relays
+// messages to and from that client's StreamableHTTPServerTransport.
+class ParentPortTransport {
+  async start() {
+    parentPort.on('message', (msg) => {
+      if (msg.type === 'mcp') {
+        this.onmessage?.(msg.message);
+      } else if (msg.type === 'browser' || msg.type === 'memory') {
+        const pending = mainThreadRequests.get(msg.id);
+        mainThreadRequests.delete(msg.id);
+        if (msg.error) pending?.reject(new Error(msg.error));
+        else pending?.resolve(msg.result);
+      } else if (msg.type === 'shutdown') {
+        this.onshutdown?.();
+      }
+    });
+  }
+
+  async send(message, options) {
+    parentPort.postMessage({ type: 'mcp', message, relatedRequestId: options?.relatedRequestId });
+  }
+
+  async close() {
+    this.onclose?.();
+  }
+}
+
+function readRequestBody(req) {
+  return new Promise((resolve, reject) => {
+    const chunks = [];
+    req.on('data', (chunk) => chunks.push(chunk));
+    req.on('end', () => resolve(Buffer.concat(chunks).toString('utf8')));
+    req.on('error', reject);
+  });
+}
 
 class DirectChromiumMCPServer {
   constructor() {
@@ -164,12 +1244,14 @@ class DirectChromiumMCPServer {
       {
         capabilities: {
           tools: {},
+          logging: {},
         },
       }
     );
 
     this.setupToolHandlers();
     this.setupErrorHandling();
+    this.startMemoryWatchdog();
   }
 
   setupToolHandlers() {
@@ -208,6 +1290,52 @@ class DirectChromiumMCPServer {
             },
           },
         },
+        {
+          name: 'print_pdf',
+          description: 'Print the current page (or a URL, loaded first) to a PDF file. The PDF is streamed to disk in chunks, so long reports print with bounded memory and keep selectable text.',
+          inputSchema: {
+            type: 'object',
+            properties: {
+              url: {
+                type: 'string',
+                description: 'URL to load in the current tab before printing (default: print the current page)',
+              },
+              path: {
+                type: 'string',
+                description: 'Output file (default: a print-*.pdf file in CHROMIUM_SPOOL_DIR)',
+              },
+              ...PDF_OPTION_PROPERTIES,
+            },
+          },
+        },
+        {
+          name: 'print_pdf_batch',
+          description: 'Print a list of URLs to PDF files, several at a time in isolated tabs that share the session cookies. Each PDF is streamed to disk. The current tab is left untouched.',
+          inputSchema: {
+            type: 'object',
+            properties: {
+              urls: {
+                type: 'array',
+                items: { type: 'string' },
+                description: 'URLs to print, in order; files are named NNN-<url>.pdf',
+              },
+              outputDir: {
+                type: 'string',
+                description: 'Directory for the PDFs (default: a new pdf-* directory per run in CHROMIUM_SPOOL_DIR)',
+              },
+              concurrency: {
+                type: 'number',
+                description: 'Maximum pages printed at once (default: 2)',
+              },
+              settleMs: {
+                type: 'number',
+                description: 'Extra time after the load event before printing (default: 0)',
+              },
+              ...PDF_OPTION_PROPERTIES,
+            },
+            required: ['urls'],
+          },
+        },
         {
           name: 'click',
           description: 'Click an element on the page',
@@ -266,41 +1394,140 @@ class DirectChromiumMCPServer {
                 description: 'Type of content to get',
                 default: 'text',
               },
+              transfer: {
+                type: 'string',
+                enum: ['auto', 'inline', 'file'],
+                description: 'inline returns the content in the response; file streams it to a spool file and returns path, size and sha256; auto (default) spools only above CHROMIUM_SPOOL_THRESHOLD bytes',
+                default: 'auto',
+              },
             },
           },
         },
         {
-          name: 'hover',
-          description: 'Hover over an element on the page',
+          name: 'wait_for',
+          description: 'Wait until a condition holds, reacting the moment it does: a selector is attached/detached/visible/hidden, text appears (page-wide or inside the selector), a JavaScript predicate becomes truthy, and/or the network is quiet. Conditions given together must all hold. Returns the time waited.',
           inputSchema: {
             type: 'object',
             properties: {
               selector: {
                 type: 'string',
-                description: 'CSS selector for the element to hover',
+                description: 'CSS selector to wait for',
+              },
+              state: {
+                type: 'string',
+                enum: ['attached', 'detached', 'visible', 'hidden'],
+                description: 'Selector state to wait for (default: visible)',
+                default: 'visible',
+              },
+              text: {
+                type: 'string',
+                description: 'Text to wait for in the page (or in the selector\'s element)',
+              },
+              regex: {
+                type: 'boolean',
+                description: 'Treat text as a regular expression (default: false)',
+                default: false,
+              },
+              function: {
+                type: 'string',
+                description: 'JavaScript expression or function (e.g. "() => window.appReady") that must become truthy',
+              },
+              networkIdle: {
+                type: 'boolean',
+                description: 'Also wait until no more than maxInflight requests have been in flight for idleMs (default: false)',
+                default: false,
+              },
+              idleMs: {
+                type: 'number',
+                description: 'Quiet period for networkIdle in ms (default: 500)',
+                default: 500,
+              },
+              maxInflight: {
+                type: 'number',
+                description: 'Requests allowed to stay open during the quiet period, e.g. long polls (default: 0)',
+                default: 0,
+              },
+              timeout: {
+                type: 'number',
+                description: 'Maximum time to wait in ms (default: 30000)',
+                default: 30000,
               },
             },
-            required: ['selector'],
           },
         },
         {
-          name: 'select',
-          description: 'Select an option from a dropdown',
+          name: 'get_content_delta',
+          description: 'Get the page text as a delta: pass the docId and version from the previous call to receive only the changed lines (hunks) since then. The first call, or any call after a navigation, returns a full snapshot.',
           inputSchema: {
             type: 'object',
             properties: {
-              selector: {
+              docId: {
                 type: 'string',
-                description: 'CSS selector for the select element',
+                description: 'docId returned by the previous call',
               },
-              value: {
-                type: 'string',
-                description: 'Value to select',
+              since: {
+                type: 'number',
+                description: 'version returned by the previous call',
+              },
+            },
+          },
+        },
+        {
+          name: 'hover',
+          description: 'Hover over an element on the page',
+          inputSchema: {
+            type: 'object',
+            properties: {
+              selector: {
+                type: 'string',
+                description: 'CSS selector for the element to hover',
+              },
+            },
+            required: ['selector'],
+          },
+        },
+        {
+          name: 'select',
+          description: 'Select an option from a dropdown',
+          inputSchema: {
+            type: 'object',
+            properties: {
+              selector: {
+                type: 'string',
+                description: 'CSS selector for the select element',
+              },
+              value: {
+                type: 'string',
+                description: 'Value to select',
               },
             },
             required: ['selector', 'value'],
           },
         },
+        {
+          name: 'fill_form',
+          description: 'Fill many form fields in one pass: text inputs, textareas, selects (a value or an array for multi-selects), checkboxes/radios (true/false, or a radio value to pick within its group), contenteditable elements and file inputs (a path or array of paths). Fires input/change events like a user edit. Fields listed in "typing" are typed with real key events instead. Returns a status per field.',
+          inputSchema: {
+            type: 'object',
+            properties: {
+              fields: {
+                type: 'object',
+                description: 'Map of CSS selector to value, e.g. {"#email": "a@b.c", "#terms": true, "#country": "DE", "#avatar": "/tmp/me.png"}',
+                additionalProperties: true,
+              },
+              typing: {
+                description: 'true to type every text input, textarea and contenteditable field with key events (other fields are set as usual), or a list of selectors that need them (default: none)',
+                oneOf: [{ type: 'boolean' }, { type: 'array', items: { type: 'string' } }],
+              },
+              typingDelayMs: {
+                type: 'number',
+                description: 'Pause between typed characters in ms (default: 0, keys are sent in one burst)',
+                default: 0,
+              },
+            },
+            required: ['fields'],
+          },
+        },
         {
           name: 'get_console_logs',
           description: 'Get browser console logs',
@@ -349,6 +1576,31 @@ class DirectChromiumMCPServer {
             properties: {},
           },
         },
+        {
+          name: 'dom_snapshot',
+          description: 'Capture the whole page (all frames) with DOMSnapshot.captureSnapshot: node names, attributes, text, computed styles and layout boxes in CDP\'s columnar string-table form. Large snapshots are written to a spool file. Load it in Python with domsnap.load() for NumPy arrays.',
+          inputSchema: {
+            type: 'object',
+            properties: {
+              computedStyles: {
+                type: 'array',
+                items: { type: 'string' },
+                description: `Computed style properties to capture per layout node (default: ${SNAPSHOT_DEFAULT_STYLES.join(', ')})`,
+              },
+              includePaintOrder: {
+                type: 'boolean',
+                description: 'Include paint order per layout node (default: false)',
+                default: false,
+              },
+              transfer: {
+                type: 'string',
+                enum: ['auto', 'inline', 'file'],
+                description: 'inline returns the snapshot in structuredContent; file writes it to a spool file; auto (default) uses a file above CHROMIUM_SPOOL_THRESHOLD bytes',
+                default: 'auto',
+              },
+            },
+          },
+        },
         {
           name: 'run_accessibility_audit',
           description: 'Run an accessibility audit on the current page',
@@ -365,6 +1617,43 @@ class DirectChromiumMCPServer {
             properties: {},
           },
         },
+        {
+          name: 'profile_page',
+          description: 'Profile a navigation or an interaction: CPU profile (hot functions by self time, written to a .cpuprofile file for DevTools or profsummary.py) plus precise JS coverage and CSS rule usage, reported as unused bytes per file',
+          inputSchema: {
+            type: 'object',
+            properties: {
+              url: {
+                type: 'string',
+                description: 'Navigate here while profiling and wait for the load event',
+              },
+              script: {
+                type: 'string',
+                description: 'JavaScript to run while profiling (an interaction); promises are awaited',
+              },
+              settleMs: {
+                type: 'number',
+                description: 'Keep recording this long after the load/script finishes (default: 1000)',
+                default: 1000,
+              },
+              samplingIntervalUs: {
+                type: 'number',
+                description: 'CPU sampling interval in microseconds (default: 1000)',
+                default: 1000,
+              },
+              top: {
+                type: 'number',
+                description: 'Hot functions and files to list (default: 20)',
+                default: 20,
+              },
+              timeoutMs: {
+                type: 'number',
+                description: 'Maximum wait for the load event or the script (default: 30000)',
+                default: 30000,
+              },
+            },
+          },
+        },
         {
           name: 'run_seo_audit',
           description: 'Run an SEO audit on the current page',
@@ -407,7 +1696,7 @@ class DirectChromiumMCPServer {
         },
         {
           name: 'emulate_device',
-          description: `Emulate a mobile device (viewport, user agent, touch, device pixel ratio). Available presets: ${Object.keys(DEVICE_PRESETS).join(', ')}. Or pass custom width/height/userAgent.`,
+          description: `Emulate a mobile device (viewport, user agent, touch, device pixel ratio), optionally with network/CPU conditioning. Available presets: ${Object.keys(DEVICE_PRESETS).join(', ')}. Or pass custom width/height/userAgent.`,
           inputSchema: {
             type: 'object',
             properties: {
@@ -439,17 +1728,56 @@ class DirectChromiumMCPServer {
                 type: 'boolean',
                 description: 'Use landscape orientation (swaps width/height, default: false)',
               },
+              conditioning: {
+                oneOf: [{ type: 'string' }, { type: 'array', items: { type: 'string' } }],
+                description: `Network/CPU conditioning profile(s), combinable, e.g. ["slow-4g", "cpu-4x"]: ${Object.keys(CONDITIONING_PROFILES).join(', ')}. Given without a device or size, only the conditioning changes`,
+              },
             },
           },
         },
         {
           name: 'reset_emulation',
-          description: 'Reset device emulation back to desktop mode',
+          description: 'Reset device emulation and network/CPU conditioning back to desktop mode',
           inputSchema: {
             type: 'object',
             properties: {},
           },
         },
+        {
+          name: 'emulate_matrix',
+          description: 'Render a URL under several device presets (default: all) in parallel isolated tabs; returns a screenshot plus layout metrics (horizontal overflow, CLS) per device. The current tab is left untouched.',
+          inputSchema: {
+            type: 'object',
+            properties: {
+              url: {
+                type: 'string',
+                description: 'URL to render',
+              },
+              devices: {
+                type: 'array',
+                items: { type: 'string' },
+                description: `Device presets to render (default: all): ${Object.keys(DEVICE_PRESETS).join(', ')}`,
+              },
+              landscape: {
+                type: 'boolean',
+                description: 'Render every device in landscape orientation (default: false)',
+              },
+              fullPage: {
+                type: 'boolean',
+                description: 'Capture full-page screenshots instead of the viewport (default: false)',
+              },
+              settleMs: {
+                type: 'number',
+                description: 'Extra time after the load event before measuring, so late layout shifts are counted (default: 500)',
+              },
+              concurrency: {
+                type: 'number',
+                description: 'Maximum devices rendered at once (default: CHROMIUM_MATRIX_CONCURRENCY)',
+              },
+            },
+            required: ['url'],
+          },
+        },
         {
           name: 'start_screencast',
           description: 'Start recording a screencast of browser activity. Captures frames via CDP and encodes to MP4/GIF/WebM on stop.',
@@ -482,12 +1810,23 @@ class DirectChromiumMCPServer {
                 description: 'Capture every Nth frame (default: 1 = every frame)',
                 default: 1,
               },
+              adaptive: {
+                type: 'boolean',
+                description: 'Lower the capture rate (up to every 8th frame) while the page is idle and restore it on activity (default: true)',
+                default: true,
+              },
+              dedupe: {
+                type: 'string',
+                enum: ['off', 'exact', 'near'],
+                description: 'Drop identical frames as they arrive (exact, default); near additionally drops visually near-identical frames at encode time (ffmpeg mpdecimate)',
+                default: 'exact',
+              },
             },
           },
         },
         {
           name: 'stop_screencast',
-          description: 'Stop recording and encode the screencast to a video file. Returns the file path.',
+          description: 'Stop recording and queue encoding of the screencast to a video file in the background. Returns the output path and a job id for screencast_job_status.',
           inputSchema: {
             type: 'object',
             properties: {
@@ -503,9 +1842,19 @@ class DirectChromiumMCPServer {
               },
               fps: {
                 type: 'number',
-                description: 'Output frame rate (default: auto-detected from capture)',
+                description: 'Constant output frame rate (default: 0 = keep each frame\'s real on-screen duration)',
                 default: 0,
               },
+              wait: {
+                type: 'boolean',
+                description: 'Wait for encoding to finish before returning (default: false = return a job id immediately; poll screencast_job_status)',
+                default: false,
+              },
+              notify: {
+                type: 'boolean',
+                description: 'Send a notifications/message log notification when the encoding job finishes (default: true)',
+                default: true,
+              },
             },
           },
         },
@@ -517,6 +1866,19 @@ class DirectChromiumMCPServer {
             properties: {},
           },
         },
+        {
+          name: 'screencast_job_status',
+          description: 'Report progress of screencast encoding jobs started by stop_screencast (all recent jobs when jobId is omitted).',
+          inputSchema: {
+            type: 'object',
+            properties: {
+              jobId: {
+                type: 'number',
+                description: 'Job id returned by stop_screencast',
+              },
+            },
+          },
+        },
         {
           name: 'set_cookies',
           description: 'Import cookies (e.g. exported after logging in elsewhere) so the browser is authenticated without scripting the login form. Accepts an array of cookie objects. Auth-critical cookies like x.com auth_token are httpOnly and must come from a real export (DevTools / Cookie-Editor), not document.cookie.',
@@ -547,6 +1909,131 @@ class DirectChromiumMCPServer {
             properties: {},
           },
         },
+        {
+          name: 'get_memory_stats',
+          description: 'Report browser memory samples (process-tree RSS, JS heap), watchdog limits, pages since launch, and recycle events. Use it to tune CHROMIUM_MAX_RSS_MB / CHROMIUM_MAX_JS_HEAP_MB / CHROMIUM_RECYCLE_AFTER_PAGES.',
+          inputSchema: {
+            type: 'object',
+            properties: {},
+          },
+        },
+        {
+          name: 'scheduler_stats',
+          description: 'Report the request scheduler: calls running and queued per lane, grants and completions, cancellations, deadline misses, and queue-wait / run-time percentiles. Never waits for the tab.',
+          inputSchema: {
+            type: 'object',
+            properties: {},
+          },
+        },
+        {
+          name: 'take_heap_snapshot',
+          description: 'Write a V8 heap snapshot of the current page to a .heapsnapshot spool file, streamed chunk by chunk (never held whole in memory). Opens in the DevTools Memory panel; diff two with heapsnap.py.',
+          inputSchema: {
+            type: 'object',
+            properties: {},
+          },
+        },
+        {
+          name: 'leak_check',
+          description: 'Memory-leak check: run a cycle of actions (default: navigate to urlB and back to urlA) once to warm up, take a heap snapshot, repeat the cycle N times, take a second snapshot. Returns both snapshot files and the JS heap growth; diff them with heapsnap.py for growth by constructor and new detached DOM trees.',
+          inputSchema: {
+            type: 'object',
+            properties: {
+              urlA: {
+                type: 'string',
+                description: 'Start page, loaded before the warm-up (default: stay on the current page)',
+              },
+              urlB: {
+                type: 'string',
+                description: 'Page to visit and leave again in each cycle (shorthand for cycle [{navigate: urlB}, {navigate: urlA}])',
+              },
+              cycle: {
+                type: 'array',
+                items: {
+                  type: 'object',
+                  properties: {
+                    navigate: { type: 'string', description: 'URL to load (waits for the load event)' },
+                    click: { type: 'string', description: 'CSS selector to click, e.g. an SPA route link' },
+                    script: { type: 'string', description: 'JavaScript to run; promises are awaited' },
+                  },
+                },
+                description: 'Actions of one cycle, for SPA route changes, e.g. [{"click": "a[href=\'/b\']"}, {"click": "a[href=\'/a\']"}]',
+              },
+              iterations: {
+                type: 'number',
+                description: 'Cycles between the two snapshots (default: 5)',
+                default: 5,
+              },
+              settleMs: {
+                type: 'number',
+                description: 'Pause after each action (default: 500)',
+                default: 500,
+              },
+            },
+          },
+        },
+        {
+          name: 'save_storage_state',
+          description: 'Save the session (all cookies plus localStorage / sessionStorage / IndexedDB of the current page origin and any extra origins) to one compact JSON file (gzip if the path ends in .gz). Restore it with load_storage_state to skip login flows.',
+          inputSchema: {
+            type: 'object',
+            properties: {
+              path: {
+                type: 'string',
+                description: 'File to write, e.g. /tmp/auth-state.json.gz',
+              },
+              origins: {
+                type: 'array',
+                items: { type: 'string' },
+                description: 'Extra origins (e.g. https://accounts.example.com) whose localStorage/sessionStorage to include. IndexedDB is captured for the current page origin only.',
+              },
+            },
+            required: ['path'],
+          },
+        },
+        {
+          name: 'load_storage_state',
+          description: 'Restore a file written by save_storage_state: sets all cookies at once and seeds each origin\'s storage before its first page script runs. Call before the first navigation.',
+          inputSchema: {
+            type: 'object',
+            properties: {
+              path: {
+                type: 'string',
+                description: 'File written by save_storage_state',
+              },
+            },
+            required: ['path'],
+          },
+        },
+        {
+          name: 'save_profile_template',
+          description: 'Save the current browser profile (cookies, logins, HTTP cache, service workers) as a reusable template. Launch later sessions with CHROMIUM_PROFILE_TEMPLATE=<path> to start already authenticated with a warm cache. The browser is restarted to flush the profile; the session is restored afterwards.',
+          inputSchema: {
+            type: 'object',
+            properties: {
+              path: {
+                type: 'string',
+                description: 'Directory to write the template to (replaced if it exists)',
+              },
+            },
+            required: ['path'],
+          },
+        },
+        {
+          name: 'set_capture_level',
+          description: 'Choose which browser events this session records: "off" (no console/network capture, cheapest), "errors" (console warnings/errors and 4xx/5xx responses only) or "full" (everything). Logging tools enable what they need on first use. Every tool also accepts a "capture" argument that applies a level to that call only.',
+          inputSchema: {
+            type: 'object',
+            properties: {
+              level: {
+                type: 'string',
+                enum: Object.keys(CAPTURE_DOMAINS),
+                description: 'Capture level for the session',
+              },
+            },
+            required: ['level'],
+          },
+        },
         {
           name: 'close_browser',
           description: 'Close the browser instance',
@@ -555,97 +2042,249 @@ class DirectChromiumMCPServer {
             properties: {},
           },
         },
-      ],
+      ].map((tool) => ({
+        ...tool,
+        inputSchema: {
+          ...tool.inputSchema,
+          properties: {
+            ...tool.inputSchema.properties,
+            ...(tool.name === 'set_capture_level' ? {} : {
+              capture: {
+                type: 'string',
+                enum: Object.keys(CAPTURE_DOMAINS),
+                description: 'Capture level for this call only (default: the session level)',
+              },
+            }),
+            priority: {
+              type: 'string',
+              enum: SCHED_LANES,
+              description: 'Scheduling lane: interactive calls are served before queued batch calls (default: interactive)',
+            },
+            deadlineMs: {
+              type: 'number',
+              description: 'Time budget for the whole call, queueing included; also caps every browser command it sends (default: CHROMIUM_DEADLINE_MS, 0 = none)',
+            },
+          },
+        },
+      })),
     }));
 
-    this.server.setRequestHandler(CallToolRequestSchema, async (request) => {
+    this.server.setRequestHandler(CallToolRequestSchema, async (request, extra) => {
+      const { name, arguments: args } = request.params;
+      const lane = args?.priority === 'batch' ? 'batch' : 'interactive';
+      const deadlineMs = args?.deadlineMs ?? DEFAULT_DEADLINE_MS;
+      const call = { name, deadlineMs, deadline: deadlineMs > 0 ? Date.now() + deadlineMs : 0, signal: extra?.signal, active: true };
+      // A launch, a recycle or a per-call capture level changes state every
+      // other call depends on, so those calls take the tab exclusively.
+      const connected = wsConnection && wsConnection.readyState === WebSocket.OPEN;
+      const mode = recycleReason || args?.capture || !connected ? 'write'
+        : FREE_TOOLS.has(name) ? 'free' : READ_TOOLS.has(name) ? 'read' : 'write';
+      let held = false;
+      let started = 0;
+      activeToolCalls++;
       try {
-        const { name, arguments: args } = request.params;
-
-        switch (name) {
-          case 'navigate':
-            return await this.navigate(args.url);
-          case 'screenshot':
-            return await this.screenshot(args.name || 'screenshot.png', args.fullPage || false);
-          case 'click':
-            return await this.click(args.selector);
-          case 'fill':
-            return await this.fill(args.selector, args.value);
-          case 'evaluate':
-            return await this.evaluate(args.script);
-          case 'get_content':
-            return await this.getContent(args.type || 'text');
-          case 'hover':
-            return await this.hover(args.selector);
-          case 'select':
-            return await this.select(args.selector, args.value);
-          case 'get_console_logs':
-            return await this.getConsoleLogs();
-          case 'get_console_errors':
-            return await this.getConsoleErrors();
-          case 'get_network_logs':
-            return await this.getNetworkLogs();
-          case 'get_network_errors':
-            return await this.getNetworkErrors();
-          case 'wipe_logs':
-            return await this.wipeLogs();
-          case 'get_selected_element':
-            return await this.getSelectedElement();
-          case 'run_accessibility_audit':
-            return await this.runAccessibilityAudit();
-          case 'run_performance_audit':
-            return await this.runPerformanceAudit();
-          case 'run_seo_audit':
-            return await this.runSEOAudit();
-          case 'run_best_practices_audit':
-            return await this.runBestPracticesAudit();
-          case 'run_nextjs_audit':
-            return await this.runNextJSAudit();
-          case 'run_debugger_mode':
-            return await this.runDebuggerMode();
-          case 'run_audit_mode':
-            return await this.runAuditMode();
-          case 'emulate_device':
-            return await this.emulateDevice(args);
-          case 'reset_emulation':
-            return await this.resetEmulation();
-          case 'start_screencast':
-            return await this.startScreencast(args);
-          case 'stop_screencast':
-            return await this.stopScreencast(args);
-          case 'screencast_status':
-            return await this.screencastStatus();
-          case 'set_cookies':
-            return await this.setCookies(args.cookies, args.url, args.cookieHeader);
-          case 'get_cookies':
-            return await this.getCookies();
-          case 'close_browser':
-            return await this.closeBrowser();
-          default:
-            throw new Error(`Unknown tool: ${name}`);
+        if (mode === 'free') {
+          schedStats.free++;
+        } else {
+          await acquireTab(mode, lane, call);
+          held = true;
         }
+        started = Date.now();
+        const result = await callContext.run(call, () => this.runToolCall(name, args, mode === 'write'));
+        if (held) schedStats.lanes[lane].completed++;
+        return result;
       } catch (error) {
+        if (error.deadline) schedStats.deadlineExceeded++;
+        if (error.cancelled) schedStats.cancelled++;
+        if (held) schedStats.lanes[lane].failed++;
         return {
           content: [{ type: 'text', text: `Error: ${error.message}` }],
+          structuredContent: { error: error.message, retryable: !!error.retryable },
           isError: true,
         };
+      } finally {
+        activeToolCalls--;
+        call.active = false;
+        if (started && held) pushSample(schedStats.runMs, Date.now() - started);
+        if (held) releaseTab(mode);
       }
     });
   }
 
-  async ensureChromium() {
+  async runToolCall(name, args, exclusive) {
+    // Recycle between tool calls, never in the middle of one.
+    if (recycleReason && exclusive && name !== 'close_browser') {
+      await this.recycleBrowser();
+    }
+
+    // A per-call capture level is applied for this call, then restored.
+    const previousCapture = args?.capture ? captureLevel : null;
+    let result;
+    try {
+      if (previousCapture) await this.setCaptureLevel(args.capture);
+      try {
+        result = await this.callTool(name, args);
+      } catch (error) {
+        // The browser went away mid-call: ensureChromium() relaunches and
+        // replays the journal, so a safe-to-repeat tool gets one more try.
+        if (!(error.retryable && RETRY_IDEMPOTENT && IDEMPOTENT_TOOLS.has(name))) {
+          throw error;
+        }
+        result = await this.callTool(name, args);
+      }
+    } finally {
+      if (previousCapture) await this.setCaptureLevel(previousCapture).catch(() => {});
+    }
+    // Awaited while the call still holds the tab, so the cookie read cannot
+    // interleave with the next call; outside the call's deadline.
+    if (COOKIE_TOOLS.has(name)) {
+      await callContext.exit(() => this.refreshSessionJournal());
+    }
+    return result;
+  }
+
+  async callTool(name, args) {
+    switch (name) {
+      case 'navigate':
+        return await this.navigate(args.url);
+      case 'screenshot':
+        return await this.screenshot(args.name || 'screenshot.png', args.fullPage || false);
+      case 'print_pdf':
+        return await this.printPdf(args);
+      case 'print_pdf_batch':
+        return await this.printPdfBatch(args);
+      case 'click':
+        return await this.click(args.selector);
+      case 'fill':
+        return await this.fill(args.selector, args.value);
+      case 'evaluate':
+        return await this.evaluate(args.script);
+      case 'get_content':
+        return await this.getContent(args.type || 'text', args.transfer || 'auto');
+      case 'wait_for':
+        return await this.waitFor(args);
+      case 'get_content_delta':
+        return await this.getContentDelta(args.since, args.docId);
+      case 'hover':
+        return await this.hover(args.selector);
+      case 'select':
+        return await this.select(args.selector, args.value);
+      case 'fill_form':
+        return await this.fillForm(args);
+      case 'get_console_logs':
+        return await this.getConsoleLogs();
+      case 'get_console_errors':
+        return await this.getConsoleErrors();
+      case 'get_network_logs':
+        return await this.getNetworkLogs();
+      case 'get_network_errors':
+        return await this.getNetworkErrors();
+      case 'wipe_logs':
+        return await this.wipeLogs();
+      case 'get_selected_element':
+        return await this.getSelectedElement();
+      case 'dom_snapshot':
+        return await this.domSnapshot(args);
+      case 'run_accessibility_audit':
+        return await this.runAccessibilityAudit();
+      case 'run_performance_audit':
+        return await this.runPerformanceAudit();
+      case 'profile_page':
+        return await this.profilePage(args);
+      case 'run_seo_audit':
+        return await this.runSEOAudit();
+      case 'run_best_practices_audit':
+        return await this.runBestPracticesAudit();
+      case 'run_nextjs_audit':
+        return await this.runNextJSAudit();
+      case 'run_debugger_mode':
+        return await this.runDebuggerMode();
+      case 'run_audit_mode':
+        return await this.runAuditMode();
+      case 'emulate_device':
+        return await this.emulateDevice(args);
+      case 'reset_emulation':
+        return await this.resetEmulation();
+      case 'emulate_matrix':
+        return await this.emulateMatrix(args);
+      case 'start_screencast':
+        return await this.startScreencast(args);
+      case 'stop_screencast':
+        return await this.stopScreencast(args);
+      case 'screencast_status':
+        return await this.screencastStatus();
+      case 'screencast_job_status':
+        return await this.screencastJobStatus(args.jobId);
+      case 'set_cookies':
+        return await this.setCookies(args.cookies, args.url, args.cookieHeader);
+      case 'get_cookies':
+        return await this.getCookies();
+      case 'get_memory_stats':
+        return await this.getMemoryStats();
+      case 'scheduler_stats':
+        return this.getSchedulerStats();
+      case 'take_heap_snapshot':
+        return await this.takeHeapSnapshot();
+      case 'leak_check':
+        return await this.leakCheck(args);
+      case 'save_storage_state':
+        return await this.saveStorageState(args.path, args.origins);
+      case 'load_storage_state':
+        return await this.loadStorageState(args.path);
+      case 'save_profile_template':
+        return await this.saveProfileTemplate(args.path);
+      case 'set_capture_level':
+        return await this.setCaptureLevelTool(args.level);
+      case 'close_browser':
+        return await this.closeBrowser();
+      default:
+        throw new Error(`Unknown tool: ${name}`);
+    }
+  }
+
+  // Concurrent calls (readers, free tools) share one launch, connect and
+  // journal replay instead of each starting their own.
+  ensureChromium() {
+    if (!browserStarting) {
+      browserStarting = this.startOrConnectBrowser().finally(() => { browserStarting = null; });
+    }
+    return browserStarting;
+  }
+
+  async startOrConnectBrowser() {
+    if (CLIENT_WORKER) {
+      // HTTP client: the main thread owns the browser; we only own a context in it.
+      if (!wsConnection || wsConnection.readyState !== WebSocket.OPEN) {
+        await requestMainThread('browser');
+        await this.openClientTarget();
+        if (sessionLost) {
+          sessionLost = false;
+          await this.replaySessionJournal();
+        }
+      }
+      return;
+    }
+
+    let relaunched = false;
     if (!chromiumProcess || chromiumProcess.exitCode !== null) {
       await this.startChromium();
+      relaunched = true;
     }
     
     if (!wsConnection || wsConnection.readyState !== WebSocket.OPEN) {
       await this.connectToChromium();
     }
+
+    if (relaunched && sessionLost) {
+      sessionLost = false;
+      await this.replaySessionJournal();
+    }
   }
 
   async startChromium() {
     return new Promise((resolve, reject) => {
       const chromiumPath = getChromiumPath();
+      const launchProfile = resolveLaunchProfile();
       const args = [
         '--headless',
         '--no-sandbox',
@@ -670,22 +2309,35 @@ class DirectChromiumMCPServer {
       let userDataDir = process.env.CHROMIUM_USER_DATA_DIR;
       if (!userDataDir) {
         cleanupManagedProfile();
-        managedProfileDir = fs.mkdtempSync(path.join(os.tmpdir(), MANAGED_PROFILE_PREFIX));
+        managedProfileDir = fs.mkdtempSync(path.join(os.tmpdir(), `${MANAGED_PROFILE_PREFIX}${process.pid}-`));
+        if (PROFILE_TEMPLATE) {
+          if (!fs.existsSync(PROFILE_TEMPLATE)) {
+            throw new Error(`Profile template not found: ${PROFILE_TEMPLATE} (create one with save_profile_template)`);
+          }
+          cloneProfileTree(PROFILE_TEMPLATE, managedProfileDir);
+        }
         userDataDir = managedProfileDir;
       }
       args.push(`--user-data-dir=${userDataDir}`);
-      // Cap the on-disk HTTP cache so a profile can't balloon (default 100MB).
-      const diskCacheSize = parseInt(process.env.CHROMIUM_DISK_CACHE_SIZE || '104857600', 10);
-      args.push(`--disk-cache-size=${diskCacheSize}`);
+      // CHROMIUM_LAUNCH_PROFILE adds its flag set and caps the on-disk HTTP
+      // cache so a profile can't balloon (default profile: 100MB).
+      args.splice(0, args.length, ...applyLaunchProfile(args, launchProfile));
       // Headful mode: set CHROMIUM_HEADLESS=false to launch a visible window
       // (e.g. to log in to a site by hand once into a persistent profile).
       if (process.env.CHROMIUM_HEADLESS === 'false' || process.env.CHROMIUM_HEADLESS === '0') {
         const i = args.indexOf('--headless');
         if (i !== -1) args.splice(i, 1);
       }
-      chromiumProcess = spawn(chromiumPath, args);
+      const proc = spawn(chromiumPath, args);
+      chromiumProcess = proc;
+      pagesSinceLaunch = 0;
 
-      chromiumProcess.on('error', reject);
+      proc.on('error', reject);
+      proc.on('exit', () => {
+        if (proc === chromiumProcess && !browserClosing) {
+          this.handleBrowserLost('Chromium exited');
+        }
+      });
       
       // Wait for chromium to start
       setTimeout(resolve, 2000);
@@ -716,139 +2368,420 @@ class DirectChromiumMCPServer {
         wsUrl = newTab.webSocketDebuggerUrl;
       }
 
-      // Connect to WebSocket
-      return new Promise((resolve, reject) => {
-        wsConnection = new WebSocket(wsUrl);
-        
-        wsConnection.on('open', async () => {
-          await this.setupEventListeners();
-          resolve();
-        });
-        
-        wsConnection.on('error', reject);
-        
-        // Add timeout for connection
-        setTimeout(() => {
-          if (wsConnection.readyState !== WebSocket.OPEN) {
-            reject(new Error('WebSocket connection timeout'));
-          }
-        }, 5000);
-      });
+      return await this.connectToPage(wsUrl);
     } catch (error) {
       throw new Error(`Failed to connect to chromium: ${error.message}`);
     }
   }
 
-  async setupEventListeners() {
-    // Enable domains in sequence
+  // HTTP client: open a tab in this client's own browser context (created on
+  // first use, or again after the shared browser was relaunched) and connect.
+  async openClientTarget() {
+    const browser = await this.openBrowserConnection(() => {});
     try {
-      await this.sendCDPCommand('Runtime.enable');
-      await this.sendCDPCommand('Page.enable');
-      await this.sendCDPCommand('Network.enable');
-      await this.sendCDPCommand('DOM.enable');
-    } catch (error) {
-      console.error('Failed to enable CDP domains:', error.message);
+      const createTarget = () => this.sendCDPCommand('Target.createTarget', {
+        url: 'about:blank',
+        browserContextId: clientContextId,
+      }, { ws: browser });
+      let target;
+      try {
+        if (!clientContextId) throw new Error('no context yet');
+        target = await createTarget();
+      } catch (error) {
+        ({ browserContextId: clientContextId } = await this.sendCDPCommand('Target.createBrowserContext', {}, { ws: browser }));
+        target = await createTarget();
+      }
+      currentTabId = target.targetId;
+    } finally {
+      browser.close();
     }
+    await this.connectToPage(`ws://localhost:${debuggingPort}/devtools/page/${currentTabId}`);
+  }
 
-    // Set up event listeners for logging (separate from command responses)
-    wsConnection.on('message', (data) => {
+  // HTTP client: drop this client's context (its tabs, cookies and storage).
+  async disposeClientContext() {
+    const contextId = clientContextId;
+    clientContextId = null;
+    try {
+      const browser = await this.openBrowserConnection(() => {});
       try {
-        const message = JSON.parse(data.toString());
-        
-        // Only handle events (methods), not command responses (ids)
-        if (message.method && !message.id) {
-          if (message.method === 'Runtime.consoleAPICalled') {
-            const logEntry = {
-              type: message.params.type,
-              text: message.params.args.map(arg => arg.value || arg.description).join(' '),
-              timestamp: new Date().toISOString()
-            };
-            
-            consoleLogs.push(logEntry);
-            
-            if (['error', 'warning'].includes(message.params.type)) {
-              consoleErrors.push(logEntry);
-            }
-            
-            // Keep only last 100 entries
-            if (consoleLogs.length > 100) consoleLogs.shift();
-            if (consoleErrors.length > 100) consoleErrors.shift();
-          }
-
-          if (message.method === 'Page.screencastFrame' && screencastRecording) {
-            screencastFrames.push({
-              data: message.params.data,
-              timestamp: message.params.metadata.timestamp,
-            });
-            // ACK the frame so CDP keeps sending them
-            this.sendCDPCommand('Page.screencastFrameAck', {
-              sessionId: message.params.sessionId,
-            }).catch(() => {});
-          }
-
-          if (message.method === 'Network.responseReceived') {
-            const logEntry = {
-              url: message.params.response.url,
-              status: message.params.response.status,
-              statusText: message.params.response.statusText,
-              method: message.params.response.requestMethod || 'GET',
-              timestamp: new Date().toISOString()
-            };
-            
-            networkLogs.push(logEntry);
-            
-            if (message.params.response.status >= 400) {
-              networkErrors.push(logEntry);
-            }
-            
-            // Keep only last 100 entries
-            if (networkLogs.length > 100) networkLogs.shift();
-            if (networkErrors.length > 100) networkErrors.shift();
-          }
-        }
-      } catch (e) {
-        // Ignore parse errors
+        await this.sendCDPCommand('Target.disposeBrowserContext', { browserContextId: contextId }, { ws: browser });
+      } finally {
+        browser.close();
       }
-    });
+    } catch (e) {
+      // Browser already gone: so is the context
+    }
   }
 
-  async sendCDPCommand(method, params = {}) {
-    if (!wsConnection || wsConnection.readyState !== WebSocket.OPEN) {
-      throw new Error('WebSocket not ready for CDP command');
-    }
-
+  // Connect the page-level DevTools socket that every tool call goes through.
+  connectToPage(wsUrl) {
     return new Promise((resolve, reject) => {
-      const id = Math.floor(Math.random() * 1000000);
-      const command = { id, method, params };
+      const ws = new WebSocket(wsUrl);
+      wsConnection = ws;
+
+      ws.on('message', (data) => this.handleCDPMessage(data));
+      ws.on('close', () => {
+        if (ws === wsConnection) {
+          this.handleBrowserLost('DevTools connection closed');
+        } else {
+          failPendingCommands(ws, 'DevTools connection closed');
+        }
+      });
+      
+      ws.on('open', async () => {
+        await this.setupEventListeners();
+        resolve();
+      });
+      
+      ws.on('error', reject);
       
-      const timeout = setTimeout(() => {
-        wsConnection.removeListener('message', messageHandler);
-        reject(new Error(`CDP command timeout: ${method}`));
-      }, 10000);
+      // Add timeout for connection
+      setTimeout(() => {
+        if (ws.readyState !== WebSocket.OPEN) {
+          reject(new Error('WebSocket connection timeout'));
+        }
+      }, 5000);
+    });
+  }
 
-      const messageHandler = (data) => {
-        try {
-          const response = JSON.parse(data.toString());
-          if (response.id === id) {
-            clearTimeout(timeout);
-            wsConnection.removeListener('message', messageHandler);
-            
-            if (response.error) {
-              reject(new Error(`CDP Error: ${response.error.message}`));
-            } else {
-              resolve(response.result || {});
-            }
-          }
-        } catch (e) {
-          // Ignore parse errors for events
+  async setupEventListeners() {
+    // Enable domains in sequence; Page and Inspector are always on, the rest
+    // follow the capture level.
+    enabledDomains.clear();
+    try {
+      await this.sendCDPCommand('Page.enable');
+      await this.sendCDPCommand('Inspector.enable');
+      await this.ensureDomains(CAPTURE_DOMAINS[captureLevel]);
+    } catch (error) {
+      console.error('Failed to enable CDP domains:', error.message);
+    }
+  }
+
+  // Enable optional domains on the live page connection (no-op when there is
+  // none: the next connection enables what the capture level asks for).
+  async ensureDomains(domains) {
+    if (!wsConnection || wsConnection.readyState !== WebSocket.OPEN) return;
+    for (const domain of domains) {
+      if (enabledDomains.has(domain)) continue;
+      // In "errors" the browser keeps no response/post bodies for us
+      const params = domain === 'Network' && captureLevel === 'errors'
+        ? { maxTotalBufferSize: 0, maxResourceBufferSize: 0, maxPostDataSize: 0 }
+        : {};
+      await this.sendCDPCommand(`${domain}.enable`, params);
+      enabledDomains.add(domain);
+    }
+  }
+
+  async setCaptureLevel(level) {
+    if (!CAPTURE_DOMAINS[level]) {
+      throw new Error(`Unknown capture level "${level}" (use ${Object.keys(CAPTURE_DOMAINS).join(', ')})`);
+    }
+    const bufferingChanged = (captureLevel === 'errors') !== (level === 'errors');
+    captureLevel = level;
+    if (!wsConnection || wsConnection.readyState !== WebSocket.OPEN) return;
+
+    const wanted = new Set(CAPTURE_DOMAINS[level]);
+    // Network throttling lives in the Network domain: keep it on, and
+    // re-apply the conditions if the domain had to be re-enabled.
+    const throttled = resolveConditioning(sessionJournal.emulation?.conditioning)?.network;
+    if (throttled) wanted.add('Network');
+    let networkReset = false;
+    for (const domain of [...enabledDomains]) {
+      if (!wanted.has(domain) || (domain === 'Network' && bufferingChanged)) {
+        await this.sendCDPCommand(`${domain}.disable`);
+        enabledDomains.delete(domain);
+        if (domain === 'Network') {
+          inflightRequests.clear();
+          networkReset = true;
         }
+      }
+    }
+    await this.ensureDomains([...wanted]);
+    if (throttled && networkReset) {
+      await this.sendCDPCommand('Network.emulateNetworkConditions', throttled);
+    }
+  }
+
+  async setCaptureLevelTool(level) {
+    const previous = captureLevel;
+    await this.setCaptureLevel(level);
+    return {
+      content: [{ type: 'text', text: `Capture level ${previous} -> ${level} (domains: ${['Page', 'Inspector', ...enabledDomains].join(', ')})` }],
+      structuredContent: { level, previous, domains: ['Page', 'Inspector', ...enabledDomains] },
+    };
+  }
+
+  handleCDPMessage(data) {
+    let message;
+    try {
+      message = JSON.parse(data.toString());
+    } catch (e) {
+      return; // Ignore parse errors
+    }
+
+    // Command responses carry the id we sent; everything else is an event
+    if (message.id !== undefined) {
+      this.resolvePendingCommand(message);
+    } else if (message.method) {
+      this.handleCDPEvent(message);
+    }
+  }
+
+  resolvePendingCommand(message) {
+    const pending = pendingCommands.get(message.id);
+    if (!pending) return;
+    pendingCommands.delete(message.id);
+    clearTimeout(pending.timer);
+    if (message.error) {
+      pending.reject(new Error(`CDP Error: ${message.error.message}`));
+    } else {
+      pending.resolve(message.result || {});
+    }
+  }
+
+  // Open a browser-level DevTools connection next to the page connection. It
+  // drives extra targets through flattened sessions: commands carry a
+  // sessionId, and each session's events go to onEvent(sessionId, message).
+  async openBrowserConnection(onEvent) {
+    const version = JSON.parse(await this.httpRequest(`http://localhost:${debuggingPort}/json/version`));
+    const ws = new WebSocket(version.webSocketDebuggerUrl);
+
+    ws.on('message', (data) => {
+      let message;
+      try {
+        message = JSON.parse(data.toString());
+      } catch (e) {
+        return;
+      }
+      if (message.id !== undefined) {
+        this.resolvePendingCommand(message);
+      } else if (message.sessionId) {
+        onEvent(message.sessionId, message);
+      }
+    });
+    ws.on('close', () => failPendingCommands(ws, 'Browser connection closed'));
+
+    await new Promise((resolve, reject) => {
+      const timer = setTimeout(() => reject(new Error('Browser connection timeout')), 5000);
+      ws.once('open', () => { clearTimeout(timer); resolve(); });
+      ws.once('error', (e) => { clearTimeout(timer); reject(e); });
+    });
+    return ws;
+  }
+
+  handleCDPEvent(message) {
+    for (let i = eventWaiters.length - 1; i >= 0; i--) {
+      if (eventWaiters[i].method === message.method) {
+        const waiter = eventWaiters.splice(i, 1)[0];
+        clearTimeout(waiter.timer);
+        waiter.resolve(message.params);
+      }
+    }
+
+    const replayedConsole = message.method === 'Runtime.consoleAPICalled' && message.params.timestamp <= lastConsoleTimestamp;
+    if (message.method === 'Runtime.consoleAPICalled' && !replayedConsole) {
+      lastConsoleTimestamp = message.params.timestamp;
+    }
+    if (message.method === 'Runtime.consoleAPICalled' && !replayedConsole &&
+        (captureLevel !== 'errors' || ['error', 'warning'].includes(message.params.type))) {
+      const logEntry = {
+        type: message.params.type,
+        text: message.params.args.map(arg => arg.value || arg.description).join(' '),
+        timestamp: new Date().toISOString()
+      };
+      
+      consoleLogs.push(logEntry);
+      
+      if (['error', 'warning'].includes(message.params.type)) {
+        consoleErrors.push(logEntry);
+      }
+      
+      // Keep only last 100 entries
+      if (consoleLogs.length > 100) consoleLogs.shift();
+      if (consoleErrors.length > 100) consoleErrors.shift();
+    }
+
+    if (message.method === 'Page.screencastFrame' && screencastRecording) {
+      this.recordScreencastFrame(message.params);
+      // ACK the frame so CDP keeps sending them
+      this.sendCDPCommand('Page.screencastFrameAck', {
+        sessionId: message.params.sessionId,
+      }).catch(() => {});
+    }
+
+    if (message.method === 'Network.requestWillBeSent') {
+      inflightRequests.add(message.params.requestId);
+      this.notifyNetworkActivity();
+    }
+
+    if (message.method === 'Network.loadingFinished' || message.method === 'Network.loadingFailed') {
+      inflightRequests.delete(message.params.requestId);
+      this.notifyNetworkActivity();
+    }
+
+    if (message.method === 'Network.responseReceived' &&
+        (captureLevel !== 'errors' || message.params.response.status >= 400)) {
+      const logEntry = {
+        url: message.params.response.url,
+        status: message.params.response.status,
+        statusText: message.params.response.statusText,
+        method: message.params.response.requestMethod || 'GET',
+        timestamp: new Date().toISOString()
+      };
+      
+      networkLogs.push(logEntry);
+      
+      if (message.params.response.status >= 400) {
+        networkErrors.push(logEntry);
+      }
+      
+      // Keep only last 100 entries
+      if (networkLogs.length > 100) networkLogs.shift();
+      if (networkErrors.length > 100) networkErrors.shift();
+    }
+
+    if (message.method === 'HeapProfiler.addHeapSnapshotChunk' && heapSnapshotSink) {
+      const buf = Buffer.from(message.params.chunk);
+      fs.writeSync(heapSnapshotSink.fd, buf);
+      heapSnapshotSink.hash.update(buf);
+      heapSnapshotSink.size += buf.length;
+    }
+
+    if (message.method === 'CSS.styleSheetAdded' && profiledStyleSheets) {
+      profiledStyleSheets.set(message.params.header.styleSheetId, message.params.header);
+    }
+
+    if (message.method === 'Page.frameNavigated' && !message.params.frame.parentId) {
+      sessionJournal.url = message.params.frame.url;
+    }
+
+    if (message.method === 'Inspector.targetCrashed') {
+      this.handleBrowserLost('Renderer crashed');
+    }
+  }
+
+  // Resolve with the params of the next `method` event, or reject after timeoutMs.
+  waitForCDPEvent(method, timeoutMs = 10000) {
+    const call = activeCall();
+    const remaining = call?.deadline ? call.deadline - Date.now() : Infinity;
+    return new Promise((resolve, reject) => {
+      const waiter = { method, resolve };
+      waiter.timer = setTimeout(() => {
+        const i = eventWaiters.indexOf(waiter);
+        if (i !== -1) eventWaiters.splice(i, 1);
+        reject(remaining < timeoutMs ? deadlineError(call) : new Error(`Timed out waiting for ${method}`));
+      }, Math.max(Math.min(timeoutMs, remaining), 0));
+      eventWaiters.push(waiter);
+    });
+  }
+
+  // The browser process, renderer or DevTools socket went away without
+  // close_browser: fail in-flight calls now instead of at their timeout, and
+  // make the next ensureChromium() relaunch and replay the session journal.
+  handleBrowserLost(reason) {
+    if (browserClosing) return;
+    sessionLost = true;
+
+    const ws = wsConnection;
+    wsConnection = null;
+    if (ws) {
+      failPendingCommands(ws, reason);
+      try { ws.terminate(); } catch (e) { /* ignore */ }
+    }
+
+    const proc = chromiumProcess;
+    chromiumProcess = null;
+    if (proc && proc.exitCode === null) {
+      proc.kill('SIGKILL');
+    }
+    currentTabId = null;
+    inflightRequests.clear();
+    process.stderr.write(`[MCP] ${reason}; session will be restored on the next call\n`);
+  }
+
+  async replaySessionJournal() {
+    const { cookies, emulation, url } = sessionJournal;
+    if (cookies.length > 0) {
+      await this.sendCDPCommand('Network.setCookies', { cookies: cookies.map(cookieParamFromJar) });
+    }
+    if (emulation) {
+      await this.applyEmulation(emulation);
+    }
+    if (url && /^https?:/.test(url)) {
+      const loaded = this.waitForCDPEvent('Page.loadEventFired', 10000).catch(() => {});
+      await this.sendCDPCommand('Page.navigate', { url });
+      await loaded;
+    }
+  }
+
+  async refreshSessionJournal() {
+    if (!wsConnection || wsConnection.readyState !== WebSocket.OPEN) return;
+    try {
+      const result = await this.sendCDPCommand('Network.getAllCookies');
+      sessionJournal.cookies = result.cookies || [];
+    } catch (e) {
+      // Keep the last good snapshot
+    }
+  }
+
+  // By default commands go to the current tab; pass { ws, sessionId } to
+  // address a target attached through openBrowserConnection(), and timeoutMs
+  // for commands that legitimately run longer than 10s.
+  // Inside a tool call, the call's deadline caps timeoutMs and a client
+  // cancellation fails the command at once.
+  async sendCDPCommand(method, params = {}, { ws = wsConnection, sessionId, timeoutMs = 10000 } = {}) {
+    if (!ws || ws.readyState !== WebSocket.OPEN) {
+      throw retryableError('WebSocket not ready for CDP command');
+    }
+    const call = activeCall();
+    if (call?.signal?.aborted) throw cancelledError(call);
+    const remaining = call?.deadline ? call.deadline - Date.now() : Infinity;
+    if (remaining <= 0) throw deadlineError(call);
+
+    return new Promise((resolve, reject) => {
+      const id = nextCommandId++;
+      const onAbort = () => pendingCommands.get(id)?.reject(cancelledError(call));
+      const settle = (fn) => (value) => {
+        pendingCommands.delete(id);
+        clearTimeout(timer);
+        call?.signal?.removeEventListener('abort', onAbort);
+        fn(value);
       };
+      const timer = setTimeout(() => {
+        pendingCommands.get(id)?.reject(remaining < timeoutMs ? deadlineError(call) : new Error(`CDP command timeout: ${method}`));
+      }, Math.min(timeoutMs, remaining));
 
-      wsConnection.on('message', messageHandler);
-      wsConnection.send(JSON.stringify(command));
+      pendingCommands.set(id, { ws, method, resolve: settle(resolve), reject: settle(reject), timer });
+      call?.signal?.addEventListener('abort', onAbort, { once: true });
+      ws.send(JSON.stringify(sessionId ? { id, method, params, sessionId } : { id, method, params }));
     });
   }
 
+  // Drain a CDP stream handle (IO.read) into filePath chunk by chunk, hashing
+  // as it goes, so the payload is never held in memory as one string.
+  async readIOStream(handle, filePath, target = {}) {
+    const hash = crypto.createHash('sha256');
+    const fd = fs.openSync(filePath, 'w');
+    let size = 0;
+    try {
+      for (;;) {
+        const chunk = await this.sendCDPCommand('IO.read', { handle, size: IO_READ_CHUNK }, target);
+        if (chunk.data) {
+          const buf = Buffer.from(chunk.data, chunk.base64Encoded ? 'base64' : 'utf8');
+          fs.writeSync(fd, buf);
+          hash.update(buf);
+          size += buf.length;
+        }
+        if (chunk.eof) break;
+      }
+    } finally {
+      fs.closeSync(fd);
+      await this.sendCDPCommand('IO.close', { handle }, target).catch(() => {});
+    }
+    return { path: filePath, size, sha256: hash.digest('hex') };
+  }
+
   async httpRequest(url) {
     return new Promise((resolve, reject) => {
       http.get(url, (res) => {
@@ -862,9 +2795,11 @@ class DirectChromiumMCPServer {
   async navigate(url) {
     await this.ensureChromium();
     await this.sendCDPCommand('Page.navigate', { url });
+    countPage();
     
     return {
       content: [{ type: 'text', text: `Successfully navigated to ${url}` }],
+      structuredContent: { url },
     };
   }
 
@@ -918,10 +2853,15 @@ class DirectChromiumMCPServer {
     const result = await this.sendCDPCommand('Page.captureScreenshot', screenshotParams);
     const screenshotPath = `/tmp/${name}`;
     
-    fs.writeFileSync(screenshotPath, result.data, 'base64');
+    const png = Buffer.from(result.data, 'base64');
+    fs.writeFileSync(screenshotPath, png);
     
     return {
       content: [{ type: 'text', text: `Screenshot saved to ${screenshotPath}${truncationNote}` }],
+      structuredContent: {
+        path: screenshotPath, size: png.length, sha256: crypto.createHash('sha256').update(png).digest('hex'),
+        fullPage, truncated: truncationNote !== '',
+      },
     };
   }
 
@@ -962,6 +2902,7 @@ class DirectChromiumMCPServer {
     
     return {
       content: [{ type: 'text', text: `Clicked element: ${selector}` }],
+      structuredContent: { selector, x, y },
     };
   }
 
@@ -974,6 +2915,7 @@ class DirectChromiumMCPServer {
     
     return {
       content: [{ type: 'text', text: `Filled ${selector} with: ${value}` }],
+      structuredContent: { selector, value },
     };
   }
 
@@ -983,30 +2925,191 @@ class DirectChromiumMCPServer {
       expression: script,
       returnByValue: true
     });
+    const value = result.result?.value;
+
+    // Large values travel once, in structuredContent; the text gets a summary
+    // instead of a second JSON encoding of the same data.
+    let text = `Result: ${JSON.stringify(value)}`;
+    if (text.length > EVALUATE_TEXT_LIMIT) {
+      const shape = Array.isArray(value) ? `array of ${value.length} items` : typeof value;
+      text = `Result: <${shape}, ${(text.length / 1024).toFixed(0)}KB as JSON> (full value in structuredContent.value)`;
+    }
     
     return {
-      content: [{ type: 'text', text: `Result: ${JSON.stringify(result.result?.value)}` }],
+      content: [{ type: 'text', text }],
+      structuredContent: { value: value === undefined ? null : value },
     };
   }
 
-  async getContent(type) {
+  async getContent(type, transfer = 'auto') {
     await this.ensureChromium();
-    
-    let content;
-    if (type === 'html') {
-      const doc = await this.sendCDPCommand('DOM.getDocument');
-      const html = await this.sendCDPCommand('DOM.getOuterHTML', { nodeId: doc.root.nodeId });
-      content = html.outerHTML;
-    } else {
-      const result = await this.sendCDPCommand('Runtime.evaluate', {
-        expression: 'document.body.innerText',
-        returnByValue: true
-      });
-      content = result.result?.value || '';
+
+    // One evaluate serializes the page once: a payload under the threshold
+    // comes back as a string, a larger one (or any with transfer: 'file')
+    // stays in the page as a Blob and is streamed to a spool file.
+    const source = type === 'html'
+      ? `(document.doctype ? new XMLSerializer().serializeToString(document.doctype) : '') + document.documentElement.outerHTML`
+      : `document.body ? document.body.innerText : ''`;
+    // Bytes above which the payload is spooled: -1 never (inline), 0 always (file).
+    const limit = transfer === 'inline' ? -1 : transfer === 'file' ? 0 : SPOOL_THRESHOLD;
+    const evaluated = await this.sendCDPCommand('Runtime.evaluate', {
+      expression: `(() => {
+        const text = ${source};
+        const limit = ${limit};
+        if (limit < 0 || (limit > 0 && text.length * 3 <= limit)) return text;
+        const blob = new Blob([text], { type: 'text/plain' });
+        return limit > 0 && blob.size <= limit ? text : blob;
+      })()`,
+    });
+    if (evaluated.exceptionDetails) {
+      throw new Error(`Failed to read page content: ${evaluated.exceptionDetails.exception?.description || evaluated.exceptionDetails.text}`);
     }
-    
+
+    const objectId = evaluated.result?.objectId;
+    if (objectId) {
+      try {
+        const { uuid } = await this.sendCDPCommand('IO.resolveBlob', { objectId });
+        const spooled = await this.readIOStream(`blob:${uuid}`, spoolFilePath('content', type === 'html' ? 'html' : 'txt'));
+        return {
+          content: [{ type: 'text', text: `Content (${type}, ${spooled.size} bytes) written to ${spooled.path}\nsha256: ${spooled.sha256}` }],
+          structuredContent: { type, transfer: 'file', ...spooled },
+        };
+      } finally {
+        await this.sendCDPCommand('Runtime.releaseObject', { objectId }).catch(() => {});
+      }
+    }
+
+    const content = evaluated.result?.value || '';
     return {
       content: [{ type: 'text', text: content }],
+      structuredContent: { type, transfer: 'inline', length: content.length },
+    };
+  }
+
+  async waitFor(args = {}) {
+    await this.ensureChromium();
+
+    const { selector, text, networkIdle } = args;
+    const predicate = args.function;
+    if (!selector && text == null && !predicate && !networkIdle) {
+      throw new Error('wait_for needs at least one of selector, text, function or networkIdle');
+    }
+    if (networkIdle) {
+      // With capture off, request tracking starts here (requests already in
+      // flight are not seen)
+      await this.ensureDomains(['Network']);
+    }
+    const state = args.state || 'visible';
+    const timeout = args.timeout ?? 30000;
+    const started = Date.now();
+    const remaining = () => timeout - (Date.now() - started);
+    const condition = [
+      selector && `${selector} ${state}`,
+      text != null && `text ${args.regex ? `/${text}/` : JSON.stringify(text)}`,
+      predicate && `function ${predicate}`,
+      networkIdle && `network idle ${args.idleMs ?? 500}ms`,
+    ].filter(Boolean).join(' and ');
+
+    if (selector || text != null || predicate) {
+      // A navigation destroys the execution context the promise lives in;
+      // start over in the new document until the deadline.
+      for (;;) {
+        let result;
+        try {
+          result = await this.sendCDPCommand('Runtime.evaluate', {
+            expression: waitForExpression({ selector, state, text, regex: args.regex, predicate }, Math.max(remaining(), 0)),
+            awaitPromise: true,
+            returnByValue: true,
+          }, { timeoutMs: Math.max(remaining(), 0) + 5000 });
+        } catch (error) {
+          if (/context|Inspected target navigated/i.test(error.message) && remaining() > 0) {
+            await new Promise(resolve => setTimeout(resolve, 50));
+            continue;
+          }
+          throw error;
+        }
+        if (result.exceptionDetails) {
+          throw new Error(`wait_for failed: ${result.exceptionDetails.exception?.description || result.exceptionDetails.text}`);
+        }
+        if (!result.result?.value?.ok) {
+          throw new Error(`Timed out after ${Date.now() - started}ms waiting for ${condition}`);
+        }
+        break;
+      }
+    }
+
+    if (networkIdle) {
+      const idle = await this.waitForNetworkIdle(args.idleMs ?? 500, args.maxInflight ?? 0, Math.max(remaining(), 0));
+      if (!idle) {
+        throw new Error(`Timed out after ${Date.now() - started}ms waiting for ${condition} (${inflightRequests.size} requests in flight)`);
+      }
+    }
+
+    const waitedMs = Date.now() - started;
+    return {
+      content: [{ type: 'text', text: `Condition met after ${waitedMs}ms: ${condition}` }],
+      structuredContent: { ok: true, waitedMs, condition },
+    };
+  }
+
+  // Resolve true once at most maxInflight requests have stayed open for
+  // idleMs with no new network activity, or false at the deadline.
+  waitForNetworkIdle(idleMs, maxInflight, timeoutMs) {
+    return new Promise((resolve) => {
+      const waiter = {};
+      const finish = (ok) => {
+        clearTimeout(waiter.idleTimer);
+        clearTimeout(waiter.deadline);
+        networkIdleWaiters.delete(waiter);
+        resolve(ok);
+      };
+      waiter.check = () => {
+        clearTimeout(waiter.idleTimer);
+        if (inflightRequests.size <= maxInflight) {
+          waiter.idleTimer = setTimeout(() => finish(true), idleMs);
+        }
+      };
+      waiter.deadline = setTimeout(() => finish(false), timeoutMs);
+      networkIdleWaiters.add(waiter);
+      waiter.check();
+    });
+  }
+
+  notifyNetworkActivity() {
+    for (const waiter of networkIdleWaiters) {
+      waiter.check();
+    }
+  }
+
+  async getContentDelta(since, docId) {
+    await this.ensureChromium();
+
+    const result = await this.sendCDPCommand('Runtime.evaluate', {
+      expression: contentDeltaExpression(since ?? null, docId ?? null),
+      returnByValue: true
+    });
+    if (result.exceptionDetails) {
+      throw new Error(`Content delta failed: ${result.exceptionDetails.exception?.description || result.exceptionDetails.text}`);
+    }
+    const delta = result.result.value;
+
+    let text;
+    if (delta.full) {
+      text = `Content v${delta.version} (full snapshot, docId ${delta.docId}):\n${delta.lines.join('\n')}`;
+    } else if (delta.hunks.length === 0) {
+      text = `No changes since v${delta.since} (docId ${delta.docId})`;
+    } else {
+      const body = delta.hunks.map(h => [
+        `@@ line ${h.start + 1} @@`,
+        ...h.remove.map(l => `- ${l}`),
+        ...h.insert.map(l => `+ ${l}`),
+      ].join('\n'));
+      text = `Content v${delta.since} -> v${delta.version} (docId ${delta.docId}):\n${body.join('\n')}`;
+    }
+
+    return {
+      content: [{ type: 'text', text }],
+      structuredContent: delta,
     };
   }
 
@@ -1035,6 +3138,7 @@ class DirectChromiumMCPServer {
     
     return {
       content: [{ type: 'text', text: `Hovered over element: ${selector}` }],
+      structuredContent: { selector, x, y },
     };
   }
 
@@ -1059,31 +3163,131 @@ class DirectChromiumMCPServer {
     
     return {
       content: [{ type: 'text', text: `Selected '${value}' in ${selector}` }],
+      structuredContent: { selector, value },
+    };
+  }
+
+  async fillForm(args = {}) {
+    await this.ensureChromium();
+    const fields = args.fields || {};
+    const selectors = Object.keys(fields);
+    if (selectors.length === 0) {
+      throw new Error('fill_form requires "fields": { selector: value, ... }');
+    }
+    const typing = args.typing === true || (Array.isArray(args.typing) ? args.typing : []);
+
+    // One round trip sets everything that doesn't need the browser's help
+    const pass = await this.sendCDPCommand('Runtime.evaluate', {
+      expression: `(${FILL_FORM_FUNCTION})(${JSON.stringify(fields)}, ${JSON.stringify(typing)})`,
+      returnByValue: true,
+    });
+    if (pass.exceptionDetails) {
+      throw new Error(`fill_form failed in page: ${pass.exceptionDetails.exception?.description || pass.exceptionDetails.text}`);
+    }
+    const results = pass.result.value;
+
+    for (const field of results) {
+      if (field.status !== 'file' && field.status !== 'type') continue;
+      const value = fields[field.selector];
+      const element = await this.sendCDPCommand('Runtime.evaluate', {
+        expression: `document.querySelector(${JSON.stringify(field.selector)})`,
+      });
+      const objectId = element.result?.objectId;
+      try {
+        if (field.status === 'file') {
+          const files = (Array.isArray(value) ? value : [value]).map((f) => path.resolve(String(f)));
+          const missing = files.filter((f) => !fs.existsSync(f));
+          if (missing.length > 0) {
+            Object.assign(field, { status: 'file_not_found', error: missing.join(', ') });
+            continue;
+          }
+          // Sets the files and fires input/change like a real file picker
+          await this.sendCDPCommand('DOM.setFileInputFiles', { files, objectId });
+          Object.assign(field, { status: 'filled', value: files.map((f) => path.basename(f)) });
+        } else {
+          await this.sendCDPCommand('Runtime.callFunctionOn', {
+            objectId,
+            functionDeclaration: `function () {
+              this.focus();
+              if (typeof this.select === 'function') this.select();
+              else if (this.isContentEditable) document.execCommand('selectAll');
+            }`,
+          });
+          await this.typeText(String(value), args.typingDelayMs || 0);
+          const typed = await this.sendCDPCommand('Runtime.callFunctionOn', {
+            objectId,
+            functionDeclaration: 'function () { return this.isContentEditable ? this.textContent : this.value; }',
+            returnByValue: true,
+          });
+          Object.assign(field, { status: 'typed', value: typed.result?.value });
+        }
+      } catch (error) {
+        Object.assign(field, { status: 'error', error: error.message });
+      } finally {
+        if (objectId) this.sendCDPCommand('Runtime.releaseObject', { objectId }).catch(() => {});
+      }
+    }
+
+    const done = results.filter((f) => f.status === 'filled' || f.status === 'typed');
+    const problems = results.filter((f) => !done.includes(f));
+    const summary = `Filled ${done.length}/${results.length} field(s)` +
+      (problems.length ? `; ${problems.map((f) => `${f.selector}: ${f.status}${f.error ? ' (' + f.error + ')' : ''}`).join(', ')}` : '');
+    return {
+      content: [{ type: 'text', text: summary }],
+      structuredContent: { fields: results, filled: done.length, failed: problems.length },
     };
   }
 
+  // Real typing: keyDown (with text, so keypress/beforeinput/input fire) and
+  // keyUp per character. Without a delay all keys go out in one burst and are
+  // processed in order.
+  async typeText(text, delayMs = 0) {
+    const events = [];
+    for (const ch of text) {
+      const key = ch === '\n' ? 'Enter' : ch;
+      const typed = ch === '\n' ? '\r' : ch;
+      events.push({ type: 'keyDown', key, text: typed, unmodifiedText: typed }, { type: 'keyUp', key });
+    }
+    if (delayMs > 0) {
+      for (const params of events) {
+        await this.sendCDPCommand('Input.dispatchKeyEvent', params);
+        if (params.type === 'keyUp') await new Promise((resolve) => setTimeout(resolve, delayMs));
+      }
+    } else {
+      await Promise.all(events.map((params) => this.sendCDPCommand('Input.dispatchKeyEvent', params)));
+    }
+  }
+
   // Logging methods (same as before)
   async getConsoleLogs() {
+    await this.ensureDomains(['Runtime']);
     return {
       content: [{ type: 'text', text: JSON.stringify(consoleLogs, null, 2) }],
+      structuredContent: { entries: consoleLogs },
     };
   }
 
   async getConsoleErrors() {
+    await this.ensureDomains(['Runtime']);
     return {
       content: [{ type: 'text', text: JSON.stringify(consoleErrors, null, 2) }],
+      structuredContent: { entries: consoleErrors },
     };
   }
 
   async getNetworkLogs() {
+    await this.ensureDomains(['Network']);
     return {
       content: [{ type: 'text', text: JSON.stringify(networkLogs, null, 2) }],
+      structuredContent: { entries: networkLogs },
     };
   }
 
   async getNetworkErrors() {
+    await this.ensureDomains(['Network']);
     return {
       content: [{ type: 'text', text: JSON.stringify(networkErrors, null, 2) }],
+      structuredContent: { entries: networkErrors },
     };
   }
 
@@ -1095,6 +3299,7 @@ class DirectChromiumMCPServer {
     
     return {
       content: [{ type: 'text', text: 'All logs cleared from memory' }],
+      structuredContent: { cleared: true },
     };
   }
 
@@ -1125,6 +3330,43 @@ class DirectChromiumMCPServer {
     
     return {
       content: [{ type: 'text', text: selectedElement ? JSON.stringify(selectedElement, null, 2) : 'No element currently selected' }],
+      structuredContent: { element: selectedElement },
+    };
+  }
+
+  async domSnapshot(args = {}) {
+    await this.ensureChromium();
+
+    const computedStyles = args.computedStyles && args.computedStyles.length > 0 ? args.computedStyles : SNAPSHOT_DEFAULT_STYLES;
+    const snapshot = await this.sendCDPCommand('DOMSnapshot.captureSnapshot', {
+      computedStyles,
+      includeDOMRects: true,
+      includePaintOrder: !!args.includePaintOrder,
+    });
+    // Record which style each column of layout.styles holds, so the file is
+    // self-describing.
+    snapshot.computedStyles = computedStyles;
+
+    const nodes = snapshot.documents.reduce((n, d) => n + d.nodes.parentIndex.length, 0);
+    const layoutNodes = snapshot.documents.reduce((n, d) => n + d.layout.nodeIndex.length, 0);
+    const summary = `DOM snapshot: ${snapshot.documents.length} document(s), ${nodes} nodes, ${layoutNodes} layout nodes, ${snapshot.strings.length} strings`;
+
+    const json = JSON.stringify(snapshot);
+    const transfer = args.transfer || 'auto';
+    if (transfer === 'file' || (transfer === 'auto' && Buffer.byteLength(json) > SPOOL_THRESHOLD)) {
+      const filePath = spoolFilePath('snapshot', 'json');
+      const buf = Buffer.from(json);
+      fs.writeFileSync(filePath, buf);
+      const sha256 = crypto.createHash('sha256').update(buf).digest('hex');
+      return {
+        content: [{ type: 'text', text: `${summary}\nWritten to ${filePath} (${buf.length} bytes)` }],
+        structuredContent: { transfer: 'file', path: filePath, size: buf.length, sha256, nodes, layoutNodes },
+      };
+    }
+
+    return {
+      content: [{ type: 'text', text: summary }],
+      structuredContent: { transfer: 'inline', nodes, layoutNodes, snapshot },
     };
   }
 
@@ -1150,7 +3392,7 @@ class DirectChromiumMCPServer {
           results.push('No heading structure found on page');
         }
         
-        JSON.stringify(results.length > 0 ? results : ['Basic accessibility checks passed']);
+        JSON.stringify(results);
       `,
       returnByValue: true
     });
@@ -1158,22 +3400,42 @@ class DirectChromiumMCPServer {
     const auditResults = JSON.parse(result.result?.value || '[]');
     
     return {
-      content: [{ type: 'text', text: `Accessibility Audit Results:\\n${auditResults.join('\\n')}` }],
+      content: [{ type: 'text', text: `Accessibility Audit Results:\\n${(auditResults.length > 0 ? auditResults : ['Basic accessibility checks passed']).join('\\n')}` }],
+      structuredContent: { issues: auditResults, passed: auditResults.length === 0 },
     };
   }
 
   async runPerformanceAudit() {
     await this.ensureChromium();
     
+    // LCP and CLS are only exposed through buffered PerformanceObservers,
+    // which deliver their entries asynchronously.
     const result = await this.sendCDPCommand('Runtime.evaluate', {
-      expression: `
+      expression: `(async () => {
         const perfData = performance.getEntriesByType('navigation')[0];
         const timing = performance.timing;
+        const observed = (type) => new Promise((resolve) => {
+          const entries = [];
+          try {
+            const observer = new PerformanceObserver((list) => entries.push(...list.getEntries()));
+            observer.observe({ type, buffered: true });
+            setTimeout(() => { observer.disconnect(); resolve(entries); }, 100);
+          } catch (e) {
+            resolve(entries);
+          }
+        });
+        const lcpEntries = await observed('largest-contentful-paint');
+        const shifts = await observed('layout-shift');
+        const fcp = performance.getEntriesByName('first-contentful-paint')[0];
         
-        JSON.stringify({
+        return JSON.stringify({
           domContentLoaded: perfData ? Math.round(perfData.domContentLoadedEventEnd - perfData.domContentLoadedEventStart) : 0,
           loadComplete: perfData ? Math.round(perfData.loadEventEnd - perfData.loadEventStart) : 0,
           firstPaint: timing ? timing.loadEventEnd - timing.navigationStart : 0,
+          ttfb: perfData ? Math.round(perfData.responseStart) : null,
+          fcp: fcp ? Math.round(fcp.startTime) : null,
+          lcp: lcpEntries.length ? Math.round(lcpEntries[lcpEntries.length - 1].startTime) : null,
+          cls: Math.round(shifts.filter(e => !e.hadRecentInput).reduce((sum, e) => sum + e.value, 0) * 1000) / 1000,
           resourceCount: performance.getEntriesByType('resource').length,
           memoryUsage: performance.memory ? {
             used: Math.round(performance.memory.usedJSHeapSize / 1024 / 1024),
@@ -1181,14 +3443,121 @@ class DirectChromiumMCPServer {
             limit: Math.round(performance.memory.jsHeapSizeLimit / 1024 / 1024)
           } : 'Not available'
         });
-      `,
+      })()`,
+      awaitPromise: true,
       returnByValue: true
     });
     
     const performanceMetrics = JSON.parse(result.result?.value || '{}');
+    const conditions = this.emulationConditions();
+    const conditionsText = `${conditions.device}${conditions.conditioning ? `, ${describeConditioning(conditions.conditioning)}` : ', unthrottled'}`;
     
     return {
-      content: [{ type: 'text', text: `Performance Audit Results:\\n${JSON.stringify(performanceMetrics, null, 2)}` }],
+      content: [{ type: 'text', text: `Performance Audit Results (${conditionsText}):\\n${JSON.stringify(performanceMetrics, null, 2)}` }],
+      structuredContent: { metrics: performanceMetrics, conditions },
+    };
+  }
+
+  // CPU profile + JS coverage + CSS rule usage around one navigation or script.
+  // Coverage starts before the navigation so scripts are counted from their
+  // first compile; the profile goes to a spool file, not into the response.
+  async profilePage(args = {}) {
+    await this.ensureChromium();
+    const top = args.top || 20;
+    const timeoutMs = args.timeoutMs || 30000;
+    const settleMs = args.settleMs ?? 1000;
+
+    await this.sendCDPCommand('Profiler.enable');
+    await this.sendCDPCommand('Profiler.setSamplingInterval', { interval: args.samplingIntervalUs || 1000 });
+    await this.sendCDPCommand('Profiler.startPreciseCoverage', { callCount: false, detailed: true });
+    profiledStyleSheets = new Map();
+    await this.sendCDPCommand('DOM.enable');
+    await this.sendCDPCommand('CSS.enable');
+    await this.sendCDPCommand('CSS.startRuleUsageTracking');
+    await this.sendCDPCommand('Profiler.start');
+
+    const started = Date.now();
+    let profile, coverage, ruleUsage;
+    try {
+      if (args.url) {
+        const loaded = this.waitForCDPEvent('Page.loadEventFired', timeoutMs);
+        await this.sendCDPCommand('Page.navigate', { url: args.url });
+        countPage();
+        await loaded;
+      }
+      if (args.script) {
+        const result = await this.sendCDPCommand('Runtime.evaluate', {
+          expression: args.script, awaitPromise: true, returnByValue: true,
+        }, { timeoutMs });
+        if (result.exceptionDetails) {
+          throw new Error(`Script error: ${result.exceptionDetails.exception?.description || result.exceptionDetails.text}`);
+        }
+      }
+      await new Promise(resolve => setTimeout(resolve, settleMs));
+    } finally {
+      // Long recordings make large profiles; give the transfer more than 10s.
+      profile = (await this.sendCDPCommand('Profiler.stop', {}, { timeoutMs: 60000 }).catch(() => ({}))).profile;
+      coverage = (await this.sendCDPCommand('Profiler.takePreciseCoverage', {}, { timeoutMs: 60000 }).catch(() => ({}))).result || [];
+      ruleUsage = (await this.sendCDPCommand('CSS.stopRuleUsageTracking').catch(() => ({}))).ruleUsage || [];
+      await this.sendCDPCommand('Profiler.stopPreciseCoverage').catch(() => {});
+      await this.sendCDPCommand('Profiler.disable').catch(() => {});
+      await this.sendCDPCommand('CSS.disable').catch(() => {});
+      if (!enabledDomains.has('DOM')) await this.sendCDPCommand('DOM.disable').catch(() => {});
+    }
+    const styleSheets = profiledStyleSheets;
+    profiledStyleSheets = null;
+    const elapsedMs = Date.now() - started;
+
+    // A URL parsed more than once (e.g. reloaded) keeps its best-used copy.
+    const js = new Map();
+    for (const script of coverage) {
+      if (!script.url) continue; // evaluate() and other injected scripts
+      const usage = coverageUsage(script.functions);
+      const seen = js.get(script.url);
+      if (!seen || usage.unusedBytes < seen.unusedBytes) js.set(script.url, { url: script.url, ...usage });
+    }
+    const css = new Map();
+    for (const rule of ruleUsage) {
+      const header = styleSheets.get(rule.styleSheetId);
+      if (!header) continue;
+      const entry = css.get(rule.styleSheetId) || {
+        url: header.isInline ? `${header.sourceURL} (inline)` : header.sourceURL || '(constructed)',
+        totalBytes: Math.round(header.length), unusedBytes: 0,
+      };
+      if (!rule.used) entry.unusedBytes += rule.endOffset - rule.startOffset;
+      css.set(rule.styleSheetId, entry);
+    }
+    const withPct = (entries) => [...entries].map(e => ({
+      ...e, unusedPct: e.totalBytes ? Math.round(e.unusedBytes / e.totalBytes * 1000) / 10 : 0,
+    })).sort((a, b) => b.unusedBytes - a.unusedBytes);
+    const jsFiles = withPct(js.values());
+    const cssFiles = withPct(css.values());
+    const sum = (files, key) => files.reduce((n, f) => n + f[key], 0);
+    const totals = {
+      jsBytes: sum(jsFiles, 'totalBytes'), jsUnusedBytes: sum(jsFiles, 'unusedBytes'),
+      cssBytes: sum(cssFiles, 'totalBytes'), cssUnusedBytes: sum(cssFiles, 'unusedBytes'),
+    };
+
+    const self = profile ? profileSelfTimes(profile) : { functions: [], urls: [] };
+    const cpuprofile = profile ? writeCpuProfile(spoolFilePath('profile', 'cpuprofile'), profile) : null;
+    const hotFunctions = self.functions.slice(0, top);
+    const hotFiles = self.urls.slice(0, top);
+
+    const kb = (n) => `${(n / 1024).toFixed(1)} KB`;
+    const lines = [
+      `Profiled ${args.url || 'current page'} for ${elapsedMs}ms`,
+      `JS: ${kb(totals.jsUnusedBytes)} of ${kb(totals.jsBytes)} unused in ${jsFiles.length} file(s)`,
+      ...jsFiles.slice(0, top).map(f => `  ${kb(f.unusedBytes)} unused (${f.unusedPct}%) ${f.url}`),
+      `CSS: ${kb(totals.cssUnusedBytes)} of ${kb(totals.cssBytes)} unused in ${cssFiles.length} sheet(s)`,
+      ...cssFiles.slice(0, top).map(f => `  ${kb(f.unusedBytes)} unused (${f.unusedPct}%) ${f.url}`),
+      'Hot functions (self time):',
+      ...hotFunctions.map(f => `  ${f.selfMs}ms ${f.functionName} ${f.url || '(native)'}${f.url ? `:${f.line}` : ''}`),
+    ];
+    if (cpuprofile) lines.push(`CPU profile written to ${cpuprofile.path} (${cpuprofile.size} bytes)`);
+
+    return {
+      content: [{ type: 'text', text: lines.join('\n') }],
+      structuredContent: { url: args.url || null, elapsedMs, totals, js: jsFiles, css: cssFiles, hotFunctions, hotFiles, cpuprofile },
     };
   }
 
@@ -1222,7 +3591,7 @@ class DirectChromiumMCPServer {
           results.push('Missing canonical link');
         }
         
-        JSON.stringify(results.length > 0 ? results : ['Basic SEO checks passed']);
+        JSON.stringify(results);
       `,
       returnByValue: true
     });
@@ -1230,7 +3599,8 @@ class DirectChromiumMCPServer {
     const seoResults = JSON.parse(result.result?.value || '[]');
     
     return {
-      content: [{ type: 'text', text: `SEO Audit Results:\\n${seoResults.join('\\n')}` }],
+      content: [{ type: 'text', text: `SEO Audit Results:\\n${(seoResults.length > 0 ? seoResults : ['Basic SEO checks passed']).join('\\n')}` }],
+      structuredContent: { issues: seoResults, passed: seoResults.length === 0 },
     };
   }
 
@@ -1262,7 +3632,7 @@ class DirectChromiumMCPServer {
           results.push('Missing viewport meta tag for mobile optimization');
         }
         
-        JSON.stringify(results.length > 0 ? results : ['Best practices checks passed']);
+        JSON.stringify(results);
       `,
       returnByValue: true
     });
@@ -1270,7 +3640,8 @@ class DirectChromiumMCPServer {
     const bestPracticesResults = JSON.parse(result.result?.value || '[]');
     
     return {
-      content: [{ type: 'text', text: `Best Practices Audit Results:\\n${bestPracticesResults.join('\\n')}` }],
+      content: [{ type: 'text', text: `Best Practices Audit Results:\\n${(bestPracticesResults.length > 0 ? bestPracticesResults : ['Best practices checks passed']).join('\\n')}` }],
+      structuredContent: { issues: bestPracticesResults, passed: bestPracticesResults.length === 0 },
     };
   }
 
@@ -1302,7 +3673,7 @@ class DirectChromiumMCPServer {
             results.push('Consider using Next.js Head component for better SEO');
           }
           
-          JSON.stringify(results.length > 0 ? results : ['Next.js specific checks passed']);
+          JSON.stringify(results);
         }
       `,
       returnByValue: true
@@ -1311,7 +3682,8 @@ class DirectChromiumMCPServer {
     const nextjsResults = JSON.parse(result.result?.value || '[]');
     
     return {
-      content: [{ type: 'text', text: `Next.js Audit Results:\\n${nextjsResults.join('\\n')}` }],
+      content: [{ type: 'text', text: `Next.js Audit Results:\\n${(nextjsResults.length > 0 ? nextjsResults : ['Next.js specific checks passed']).join('\\n')}` }],
+      structuredContent: { issues: nextjsResults, passed: nextjsResults.length === 0 },
     };
   }
 
@@ -1344,6 +3716,7 @@ class DirectChromiumMCPServer {
     
     return {
       content: [{ type: 'text', text: `Debugger Mode Results:\\n${JSON.stringify(debugInfo, null, 2)}` }],
+      structuredContent: { info: debugInfo },
     };
   }
 
@@ -1366,14 +3739,45 @@ class DirectChromiumMCPServer {
     
     return {
       content: [{ type: 'text', text: `Comprehensive Audit Mode Results:\\n\\nSUMMARY:\\n${summary}\\n\\nFULL REPORT:${fullReport}` }],
+      structuredContent: Object.fromEntries(
+        Object.entries(results).map(([category, result]) => [category, result.structuredContent])
+      ),
     };
   }
 
   async emulateDevice(args) {
     await this.ensureChromium();
+    const settings = await this.applyEmulation(args);
+    const { device, width, height, deviceScaleFactor, mobile, landscape, userAgent, conditioning } = settings;
+    const conditioned = conditioning ? `, conditioning ${describeConditioning(conditioning)}` : '';
+    if (!device) {
+      // Conditioning only: the current device emulation stays as it is
+      sessionJournal.emulation = { ...(sessionJournal.emulation || {}), conditioning: args.conditioning };
+      return {
+        content: [{ type: 'text', text: `Conditioning ${describeConditioning(conditioning)}` }],
+        structuredContent: settings,
+      };
+    }
+    sessionJournal.emulation = { ...args };
+    return {
+      content: [{ type: 'text', text: `Emulating ${device}: ${width}x${height} @${deviceScaleFactor}x, mobile=${mobile}${landscape ? ', landscape' : ''}${userAgent ? ', UA overridden' : ''}${conditioned}` }],
+      structuredContent: settings,
+    };
+  }
 
+  // `target` ({ ws, sessionId }) applies the emulation to a matrix tab
+  // instead of the current tab, without touching the session journal.
+  async applyEmulation(args, target) {
     let width, height, deviceScaleFactor, mobile, userAgent;
 
+    const conditioning = resolveConditioning(args.conditioning);
+    if (!target || conditioning) {
+      await this.applyConditioning(conditioning || NO_CONDITIONING, target);
+    }
+    if (conditioning && !args.device && args.width === undefined && args.height === undefined && !args.userAgent) {
+      return { device: null, conditioning };
+    }
+
     if (args.device) {
       const preset = DEVICE_PRESETS[args.device];
       if (!preset) {
@@ -1401,22 +3805,59 @@ class DirectChromiumMCPServer {
         angle: args.landscape ? 90 : 0,
         type: args.landscape ? 'landscapePrimary' : 'portraitPrimary',
       },
-    });
+    }, target);
 
     await this.sendCDPCommand('Emulation.setTouchEmulationEnabled', {
       enabled: mobile,
       maxTouchPoints: mobile ? 5 : 0,
-    });
+    }, target);
 
     if (userAgent) {
       await this.sendCDPCommand('Emulation.setUserAgentOverride', {
         userAgent,
-      });
+      }, target);
+    }
+    if (!target) {
+      sessionJournal.userAgent = userAgent || null;
     }
 
-    const deviceName = args.device || 'custom';
     return {
-      content: [{ type: 'text', text: `Emulating ${deviceName}: ${width}x${height} @${deviceScaleFactor}x, mobile=${mobile}${args.landscape ? ', landscape' : ''}${userAgent ? ', UA overridden' : ''}` }],
+      device: args.device || 'custom',
+      width,
+      height,
+      deviceScaleFactor,
+      mobile,
+      landscape: !!args.landscape,
+      userAgent: userAgent || null,
+      conditioning,
+    };
+  }
+
+  // Network.emulateNetworkConditions needs the Network domain, so conditioning
+  // keeps it enabled whatever the capture level. Without a network profile the
+  // link is unthrottled again (only needed if Network is on already).
+  async applyConditioning(conditioning, target) {
+    if (conditioning.network) {
+      if (target) {
+        await this.sendCDPCommand('Network.enable', {}, target);
+      } else {
+        await this.ensureDomains(['Network']);
+      }
+      await this.sendCDPCommand('Network.emulateNetworkConditions', conditioning.network, target);
+    } else if (!target && enabledDomains.has('Network')) {
+      await this.sendCDPCommand('Network.emulateNetworkConditions', UNTHROTTLED_NETWORK);
+    }
+    await this.sendCDPCommand('Emulation.setCPUThrottlingRate', { rate: conditioning.cpu }, target);
+  }
+
+  // Device and conditioning the current tab runs under, for audit results.
+  emulationConditions() {
+    const emulation = sessionJournal.emulation;
+    const custom = emulation && (emulation.width !== undefined || emulation.height !== undefined || emulation.userAgent);
+    return {
+      device: emulation?.device || (custom ? 'custom' : 'desktop'),
+      landscape: !!emulation?.landscape,
+      conditioning: resolveConditioning(emulation?.conditioning),
     };
   }
 
@@ -1426,9 +3867,242 @@ class DirectChromiumMCPServer {
     await this.sendCDPCommand('Emulation.clearDeviceMetricsOverride');
     await this.sendCDPCommand('Emulation.setTouchEmulationEnabled', { enabled: false });
     await this.sendCDPCommand('Emulation.setUserAgentOverride', { userAgent: '' });
+    await this.applyConditioning(NO_CONDITIONING);
+    sessionJournal.emulation = null;
+    sessionJournal.userAgent = null;
+
+    return {
+      content: [{ type: 'text', text: 'Device emulation and conditioning reset to desktop mode' }],
+      structuredContent: { reset: true },
+    };
+  }
+
+  async emulateMatrix(args) {
+    await this.ensureChromium();
+
+    const devices = args.devices && args.devices.length > 0 ? args.devices : Object.keys(DEVICE_PRESETS);
+    const unknown = devices.filter(d => !DEVICE_PRESETS[d]);
+    if (unknown.length > 0) {
+      throw new Error(`Unknown device preset: "${unknown.join('", "')}". Available: ${Object.keys(DEVICE_PRESETS).join(', ')}`);
+    }
+    const settleMs = args.settleMs !== undefined ? args.settleMs : 500;
+    const concurrency = Math.max(1, args.concurrency || MATRIX_CONCURRENCY);
+    // One directory per run, so concurrent or repeated matrices never share files.
+    const outputDir = spoolFilePath('matrix', null);
+    fs.mkdirSync(outputDir, { recursive: true });
+
+    // Each device gets a fresh browser context (own cookies, cache, storage),
+    // seeded with the current session's cookies so logged-in pages render.
+    const { cookies } = await this.sendCDPCommand('Network.getAllCookies');
+    const loadWaiters = new Map(); // sessionId -> resolve
+    const ws = await this.openBrowserConnection((sessionId, message) => {
+      if (message.method === 'Page.loadEventFired' && loadWaiters.has(sessionId)) {
+        loadWaiters.get(sessionId)();
+        loadWaiters.delete(sessionId);
+      }
+    });
+
+    const renderDevice = async (device) => {
+      const started = Date.now();
+      let browserContextId;
+      try {
+        ({ browserContextId } = await this.sendCDPCommand('Target.createBrowserContext', { disposeOnDetach: true }, { ws }));
+        if (cookies.length > 0) {
+          await this.sendCDPCommand('Storage.setCookies', { cookies: cookies.map(cookieParamFromJar), browserContextId }, { ws });
+        }
+        const { targetId } = await this.sendCDPCommand('Target.createTarget', { url: 'about:blank', browserContextId }, { ws });
+        const { sessionId } = await this.sendCDPCommand('Target.attachToTarget', { targetId, flatten: true }, { ws });
+        const target = { ws, sessionId };
+
+        await this.sendCDPCommand('Page.enable', {}, target);
+        const settings = await this.applyEmulation({ device, landscape: args.landscape }, target);
+        await this.sendCDPCommand('Page.addScriptToEvaluateOnNewDocument', { source: LAYOUT_SHIFT_OBSERVER }, target);
+
+        const loaded = new Promise((resolve) => {
+          loadWaiters.set(sessionId, resolve);
+          setTimeout(resolve, 15000).unref();
+        });
+        await this.sendCDPCommand('Page.navigate', { url: args.url }, target);
+        await loaded;
+        loadWaiters.delete(sessionId);
+        await new Promise(resolve => setTimeout(resolve, settleMs));
+
+        const metrics = await this.sendCDPCommand('Runtime.evaluate', {
+          expression: LAYOUT_METRICS_EXPRESSION,
+          returnByValue: true,
+        }, target);
+
+        const shotParams = { format: 'png' };
+        if (args.fullPage) {
+          const layout = await this.sendCDPCommand('Page.getLayoutMetrics', {}, target);
+          const content = layout.cssContentSize || layout.contentSize;
+          const maxHeight = parseInt(process.env.CHROMIUM_MAX_SCREENSHOT_HEIGHT || '32768', 10);
+          shotParams.clip = { x: 0, y: 0, width: Math.ceil(content.width), height: Math.min(Math.ceil(content.height), maxHeight), scale: 1 };
+          shotParams.captureBeyondViewport = true;
+        }
+        const shot = await this.sendCDPCommand('Page.captureScreenshot', shotParams, target);
+        const screenshotPath = path.join(outputDir, `${device}${args.landscape ? '-landscape' : ''}.png`);
+        fs.writeFileSync(screenshotPath, shot.data, 'base64');
+
+        return {
+          device,
+          width: settings.width,
+          height: settings.height,
+          screenshot: screenshotPath,
+          ...metrics.result?.value,
+          ms: Date.now() - started,
+        };
+      } catch (error) {
+        return { device, error: error.message, ms: Date.now() - started };
+      } finally {
+        if (browserContextId) {
+          await this.sendCDPCommand('Target.disposeBrowserContext', { browserContextId }, { ws }).catch(() => {});
+        }
+      }
+    };
+
+    const started = Date.now();
+    const results = new Array(devices.length);
+    let next = 0;
+    const worker = async () => {
+      while (next < devices.length) {
+        const i = next++;
+        results[i] = await renderDevice(devices[i]);
+      }
+    };
+    try {
+      await Promise.all(Array.from({ length: Math.min(concurrency, devices.length) }, worker));
+    } finally {
+      ws.close();
+    }
+    const elapsedMs = Date.now() - started;
+
+    const lines = results.map(r => r.error
+      ? `  ${r.device}: ERROR ${r.error}`
+      : `  ${r.device} (${r.width}x${r.height}): ${r.overflowX ? `OVERFLOW ${r.scrollWidth}px > ${r.viewportWidth}px` : 'no overflow'}, CLS ${r.cls} -> ${r.screenshot}`);
+    const failures = results.filter(r => r.error || r.overflowX).length;
+    return {
+      content: [{ type: 'text', text: `Device matrix for ${args.url} (${devices.length} devices, ${elapsedMs}ms, ${failures} with issues):\n${lines.join('\n')}` }],
+      structuredContent: { url: args.url, outputDir, elapsedMs, results },
+    };
+  }
+
+  // Page.printToPDF hands back a stream handle; the PDF is drained to filePath
+  // with IO.read, so its size never has to fit in memory at once.
+  async writePdf(params, filePath, target = {}, timeoutMs = 120000) {
+    const { stream } = await this.sendCDPCommand('Page.printToPDF', params, { ...target, timeoutMs });
+    return this.readIOStream(stream, filePath, target);
+  }
+
+  async printPdf(args = {}) {
+    await this.ensureChromium();
+    const params = printToPdfParams(args);
+    const timeoutMs = args.timeoutMs || 120000;
+    if (args.url) {
+      const loaded = this.waitForCDPEvent('Page.loadEventFired', timeoutMs);
+      await this.sendCDPCommand('Page.navigate', { url: args.url });
+      countPage();
+      await loaded;
+    }
+    const started = Date.now();
+    const filePath = args.path ? path.resolve(args.path) : spoolFilePath('print', 'pdf');
+    fs.mkdirSync(path.dirname(filePath), { recursive: true });
+    const pdf = await this.writePdf(params, filePath, {}, timeoutMs);
+    const result = { url: args.url || null, ...pdf, ms: Date.now() - started };
+    return {
+      content: [{ type: 'text', text: `PDF saved: ${pdf.path} (${(pdf.size / 1024).toFixed(1)}KB, ${result.ms}ms)` }],
+      structuredContent: result,
+    };
+  }
+
+  async printPdfBatch(args) {
+    await this.ensureChromium();
+    const urls = args.urls || [];
+    if (urls.length === 0) {
+      throw new Error('print_pdf_batch needs at least one URL');
+    }
+    const params = printToPdfParams(args);
+    const timeoutMs = args.timeoutMs || 120000;
+    const settleMs = args.settleMs || 0;
+    const concurrency = Math.max(1, args.concurrency || 2);
+    // Without outputDir each run gets its own spool directory, so concurrent
+    // batches don't overwrite each other's NNN-*.pdf and the sweep removes it
+    const outputDir = args.outputDir ? path.resolve(args.outputDir) : spoolFilePath('pdf', null);
+    fs.mkdirSync(outputDir, { recursive: true });
+
+    // Same isolation as emulate_matrix: a fresh browser context per URL,
+    // seeded with the session's cookies so logged-in pages print.
+    const { cookies } = await this.sendCDPCommand('Network.getAllCookies');
+    const loadWaiters = new Map(); // sessionId -> resolve
+    const ws = await this.openBrowserConnection((sessionId, message) => {
+      if (message.method === 'Page.loadEventFired' && loadWaiters.has(sessionId)) {
+        loadWaiters.get(sessionId)();
+        loadWaiters.delete(sessionId);
+      }
+    });
+
+    const printUrl = async (url, index) => {
+      const started = Date.now();
+      let browserContextId;
+      try {
+        ({ browserContextId } = await this.sendCDPCommand('Target.createBrowserContext', { disposeOnDetach: true }, { ws }));
+        if (cookies.length > 0) {
+          await this.sendCDPCommand('Storage.setCookies', { cookies: cookies.map(cookieParamFromJar), browserContextId }, { ws });
+        }
+        const { targetId } = await this.sendCDPCommand('Target.createTarget', { url: 'about:blank', browserContextId }, { ws });
+        const { sessionId } = await this.sendCDPCommand('Target.attachToTarget', { targetId, flatten: true }, { ws });
+        const target = { ws, sessionId };
+
+        await this.sendCDPCommand('Page.enable', {}, target);
+        let timer;
+        const loaded = new Promise((resolve, reject) => {
+          loadWaiters.set(sessionId, resolve);
+          timer = setTimeout(() => reject(new Error(`Timed out loading ${url}`)), timeoutMs);
+        });
+        try {
+          await this.sendCDPCommand('Page.navigate', { url }, target);
+          await loaded;
+        } finally {
+          clearTimeout(timer);
+          loadWaiters.delete(sessionId);
+        }
+        if (settleMs) await new Promise(resolve => setTimeout(resolve, settleMs));
+
+        const pdf = await this.writePdf(params, path.join(outputDir, pdfFileName(index, url)), target, timeoutMs);
+        return { url, ...pdf, ms: Date.now() - started };
+      } catch (error) {
+        return { url, error: error.message, ms: Date.now() - started };
+      } finally {
+        if (browserContextId) {
+          await this.sendCDPCommand('Target.disposeBrowserContext', { browserContextId }, { ws }).catch(() => {});
+        }
+      }
+    };
+
+    const started = Date.now();
+    const results = new Array(urls.length);
+    let next = 0;
+    const worker = async () => {
+      while (next < urls.length) {
+        const i = next++;
+        results[i] = await printUrl(urls[i], i);
+      }
+    };
+    try {
+      await Promise.all(Array.from({ length: Math.min(concurrency, urls.length) }, worker));
+    } finally {
+      ws.close();
+    }
+    const elapsedMs = Date.now() - started;
 
+    const failures = results.filter(r => r.error).length;
+    const totalBytes = results.reduce((sum, r) => sum + (r.size || 0), 0);
+    const lines = results.map(r => r.error
+      ? `  ${r.url}: ERROR ${r.error}`
+      : `  ${r.url} -> ${r.path} (${(r.size / 1024).toFixed(1)}KB)`);
     return {
-      content: [{ type: 'text', text: 'Device emulation reset to desktop mode' }],
+      content: [{ type: 'text', text: `Printed ${urls.length - failures}/${urls.length} PDFs to ${outputDir} (${elapsedMs}ms):\n${lines.join('\n')}` }],
+      structuredContent: { outputDir, elapsedMs, totalBytes, failures, results },
     };
   }
 
@@ -1439,25 +4113,88 @@ class DirectChromiumMCPServer {
       throw new Error('Screencast already recording. Stop the current one first.');
     }
 
-    screencastFrames = [];
-    screencastRecording = true;
+    this.discardScreencastFrames();
     screencastStartTime = Date.now();
     screencastFormat = args.format || 'jpeg';
     screencastQuality = args.quality || 80;
+    screencastDedupe = args.dedupe || 'exact';
+    screencastAdaptive = args.adaptive !== false;
+    screencastBaseNth = args.everyNthFrame || 1;
+    const timestamp = new Date(screencastStartTime).toISOString().replace(/[:.]/g, '-').slice(0, 19);
+    screencastFramesDir = `/tmp/screencast-frames-${timestamp}-${process.pid}`;
+    fs.mkdirSync(screencastFramesDir, { recursive: true });
 
-    await this.sendCDPCommand('Page.startScreencast', {
+    screencastParams = {
       format: screencastFormat,
       quality: screencastFormat === 'jpeg' ? screencastQuality : undefined,
       maxWidth: args.maxWidth || 1280,
       maxHeight: args.maxHeight || 720,
-      everyNthFrame: args.everyNthFrame || 1,
-    });
+      everyNthFrame: screencastBaseNth,
+    };
+    setScreencastRecording(true);
+    await this.sendCDPCommand('Page.startScreencast', screencastParams);
 
     return {
-      content: [{ type: 'text', text: `Screencast recording started (${screencastFormat}, quality=${screencastQuality})` }],
+      content: [{ type: 'text', text: `Screencast recording started (${screencastFormat}, quality=${screencastQuality}, dedupe=${screencastDedupe}${screencastAdaptive ? ', adaptive rate' : ''})` }],
+      structuredContent: { recording: true, format: screencastFormat, quality: screencastQuality, dedupe: screencastDedupe, adaptive: screencastAdaptive },
     };
   }
 
+  // Keep a frame only if it differs from the last kept one, and stream it to
+  // disk right away so long recordings don't accumulate in memory.
+  recordScreencastFrame(params) {
+    const hash = screencastDedupe === 'off' ? null : crypto.createHash('sha1').update(params.data).digest('hex');
+    const duplicate = hash !== null && hash === screencastLastHash;
+    this.adaptScreencastRate(duplicate);
+    if (duplicate) {
+      screencastDropped++;
+      return;
+    }
+    screencastLastHash = hash;
+
+    const ext = screencastFormat === 'png' ? 'png' : 'jpg';
+    const file = path.join(screencastFramesDir, `frame-${String(screencastFrames.length).padStart(6, '0')}.${ext}`);
+    screencastFrames.push({ file, timestamp: params.metadata?.timestamp || Date.now() / 1000 });
+    const write = fs.promises.writeFile(file, params.data, 'base64')
+      .catch(() => {})
+      .finally(() => screencastPendingWrites.delete(write));
+    screencastPendingWrites.add(write);
+  }
+
+  adaptScreencastRate(duplicate) {
+    if (!screencastAdaptive) return;
+    screencastRecent.push(duplicate ? 0 : 1);
+    if (screencastRecent.length > SCREENCAST_ACTIVITY_WINDOW) screencastRecent.shift();
+
+    const current = screencastParams.everyNthFrame;
+    let nth = current;
+    const recent = screencastRecent.slice(-4);
+    if (current > screencastBaseNth && recent.length === 4 && recent.every(Boolean)) {
+      nth = screencastBaseNth; // activity again: back to the requested rate
+    } else if (screencastRecent.length === SCREENCAST_ACTIVITY_WINDOW &&
+        screencastRecent.filter(Boolean).length <= SCREENCAST_ACTIVITY_WINDOW * 0.1) {
+      nth = Math.min(current * 2, SCREENCAST_MAX_NTH);
+    }
+    if (nth === current) return;
+
+    screencastParams = { ...screencastParams, everyNthFrame: nth };
+    screencastRecent = [];
+    this.sendCDPCommand('Page.stopScreencast')
+      .then(() => screencastRecording && this.sendCDPCommand('Page.startScreencast', screencastParams))
+      .catch(() => {});
+  }
+
+  discardScreencastFrames() {
+    if (screencastFramesDir) {
+      fs.rmSync(screencastFramesDir, { recursive: true, force: true });
+    }
+    screencastFramesDir = null;
+    screencastFrames = [];
+    screencastLastHash = null;
+    screencastDropped = 0;
+    screencastRecent = [];
+  }
+
   async stopScreencast(args = {}) {
     await this.ensureChromium();
 
@@ -1466,12 +4203,16 @@ class DirectChromiumMCPServer {
     }
 
     await this.sendCDPCommand('Page.stopScreencast');
-    screencastRecording = false;
+    setScreencastRecording(false);
+    const stopTimestamp = Date.now() / 1000;
+    await Promise.all([...screencastPendingWrites]);
 
     const frameCount = screencastFrames.length;
     if (frameCount === 0) {
+      this.discardScreencastFrames();
       return {
         content: [{ type: 'text', text: 'Screencast stopped but no frames were captured. Try recording for longer or interacting with the page.' }],
+        structuredContent: { path: null, frames: 0 },
       };
     }
 
@@ -1480,82 +4221,241 @@ class DirectChromiumMCPServer {
     const timestamp = new Date().toISOString().replace(/[:.]/g, '-').slice(0, 19);
     const baseName = args.name || `screencast-${timestamp}`;
     const outputPath = `/tmp/${baseName}.${outputFormat}`;
-    const framesDir = `/tmp/screencast-frames-${timestamp}`;
+    const framesDir = screencastFramesDir;
+
+    // Each frame stays on screen until the next distinct frame arrived, so
+    // dropped duplicates simply lengthen the frame before them. The concat
+    // demuxer needs the last file repeated for its duration to apply.
+    const concatLines = ['ffconcat version 1.0'];
+    screencastFrames.forEach((frame, i) => {
+      const next = i + 1 < frameCount ? screencastFrames[i + 1].timestamp : stopTimestamp;
+      concatLines.push(`file '${path.basename(frame.file)}'`, `duration ${Math.max(next - frame.timestamp, 0.04).toFixed(3)}`);
+    });
+    concatLines.push(`file '${path.basename(screencastFrames[frameCount - 1].file)}'`);
+    const listPath = path.join(framesDir, 'frames.ffconcat');
+    fs.writeFileSync(listPath, concatLines.join('\n') + '\n');
 
-    // Write frames to temp directory
-    fs.mkdirSync(framesDir, { recursive: true });
+    // Real frame durations give variable frame rate output; an explicit fps
+    // resamples to a constant rate instead.
+    const input = ['-f', 'concat', '-safe', '0', '-i', listPath];
+    const decimate = screencastDedupe === 'near' ? 'mpdecimate,' : '';
+    const rate = args.fps ? ['-r', String(Math.min(Math.max(args.fps, 1), 60))] : ['-vsync', 'vfr'];
+    const fps = args.fps || Math.max(Math.round(frameCount / Math.max(durationSec, 1)), 1);
+    const gifFps = Math.min(args.fps || 15, 15);
 
-    const ext = screencastFormat === 'png' ? 'png' : 'jpg';
-    for (let i = 0; i < screencastFrames.length; i++) {
-      const framePath = path.join(framesDir, `frame-${String(i).padStart(6, '0')}.${ext}`);
-      fs.writeFileSync(framePath, screencastFrames[i].data, 'base64');
+    let passes;
+    if (outputFormat === 'gif') {
+      const palettePath = path.join(framesDir, 'palette.png');
+      passes = [[
+        '-y', ...input,
+        '-vf', `${decimate}fps=${gifFps},scale=trunc(iw/2)*2:trunc(ih/2)*2:flags=lanczos,palettegen`,
+        palettePath,
+      ], [
+        '-y', ...input,
+        '-i', palettePath,
+        '-lavfi', `${decimate}fps=${gifFps},scale=trunc(iw/2)*2:trunc(ih/2)*2:flags=lanczos[x];[x][1:v]paletteuse`,
+        outputPath,
+      ]];
+    } else if (outputFormat === 'webm') {
+      passes = [[
+        '-y', ...input,
+        '-vf', `${decimate}scale=trunc(iw/2)*2:trunc(ih/2)*2`, ...rate,
+        '-c:v', 'libvpx-vp9', '-crf', '30', '-b:v', '0',
+        '-pix_fmt', 'yuv420p',
+        outputPath,
+      ]];
+    } else {
+      passes = [[
+        '-y', ...input,
+        '-vf', `${decimate}scale=trunc(iw/2)*2:trunc(ih/2)*2`, ...rate,
+        '-c:v', 'libx264', '-preset', 'fast', '-crf', '23',
+        '-pix_fmt', 'yuv420p', '-movflags', '+faststart',
+        outputPath,
+      ]];
     }
 
-    // Calculate fps from frame timestamps if not specified
-    let fps = args.fps || 0;
-    if (!fps && screencastFrames.length >= 2) {
-      const firstTs = screencastFrames[0].timestamp;
-      const lastTs = screencastFrames[screencastFrames.length - 1].timestamp;
-      const spanSec = lastTs - firstTs;
-      fps = spanSec > 0 ? Math.round(screencastFrames.length / spanSec) : 10;
+    // The frames directory now belongs to the job, which deletes it when done.
+    const capturedFrames = frameCount;
+    const droppedFrames = screencastDropped;
+    screencastFramesDir = null;
+    this.discardScreencastFrames();
+
+    const job = this.queueEncodeJob({
+      output: outputPath, format: outputFormat, framesDir, passes,
+      mediaSec: durationSec, notify: args.notify !== false,
+      frames: capturedFrames, droppedFrames, fps, variableFrameRate: !args.fps,
+    });
+    const summary = `Format: ${outputFormat} | Frames: ${capturedFrames} (${droppedFrames} duplicates dropped) | Duration: ${durationSec.toFixed(1)}s | FPS: ${args.fps ? fps : `~${fps} (variable)`}`;
+
+    if (args.wait) {
+      await job.done;
+      if (job.status === 'failed') {
+        throw new Error(`ffmpeg encoding failed: ${job.error}`);
+      }
+      const sizeMB = (job.sizeBytes / (1024 * 1024)).toFixed(2);
+      return {
+        content: [{ type: 'text', text: `Screencast saved: ${outputPath}\n${summary} | Size: ${sizeMB}MB` }],
+        structuredContent: { ...this.encodeJobInfo(job), durationSec },
+      };
+    }
+
+    return {
+      content: [{ type: 'text', text: `Screencast encoding queued (job ${job.id}): ${outputPath}\n${summary}\nPoll screencast_job_status with jobId ${job.id} for progress.` }],
+      structuredContent: { ...this.encodeJobInfo(job), durationSec },
+    };
+  }
+
+  queueEncodeJob(spec) {
+    const job = {
+      id: nextEncodeJobId++,
+      status: 'queued',
+      ...spec,
+      pass: 0,
+      progressSec: 0,
+      percent: 0,
+      error: null,
+      sizeBytes: null,
+      queuedAt: new Date().toISOString(),
+      finishedAt: null,
+    };
+    job.done = new Promise(resolve => { job.resolveDone = resolve; });
+    encodeJobs.set(job.id, job);
+    // Keep only last 100 jobs
+    if (encodeJobs.size > 100) {
+      const oldest = [...encodeJobs.values()].find(j => j.status !== 'queued' && j.status !== 'running');
+      if (oldest) encodeJobs.delete(oldest.id);
     }
-    fps = Math.max(fps || 10, 1);
-    fps = Math.min(fps, 60);
+    encodeQueue.push(job);
+    this.drainEncodeQueue();
+    return job;
+  }
 
-    const inputPattern = path.join(framesDir, `frame-%06d.${ext}`);
-    const gifFps = Math.min(fps, 15);
+  drainEncodeQueue() {
+    while (runningEncodes < Math.max(1, ENCODE_CONCURRENCY) && encodeQueue.length > 0) {
+      const job = encodeQueue.shift();
+      runningEncodes++;
+      this.runEncodeJob(job).finally(() => {
+        runningEncodes--;
+        this.drainEncodeQueue();
+      });
+    }
+  }
 
-    // Encode with ffmpeg using execFileSync (no shell)
+  async runEncodeJob(job) {
+    job.status = 'running';
     try {
-      if (outputFormat === 'gif') {
-        const palettePath = path.join(framesDir, 'palette.png');
-        execFileSync('ffmpeg', [
-          '-y', '-framerate', String(fps),
-          '-i', inputPattern,
-          '-vf', `fps=${gifFps},scale=trunc(iw/2)*2:trunc(ih/2)*2:flags=lanczos,palettegen`,
-          palettePath,
-        ], { timeout: 30000, stdio: 'pipe' });
-
-        execFileSync('ffmpeg', [
-          '-y', '-framerate', String(fps),
-          '-i', inputPattern,
-          '-i', palettePath,
-          '-lavfi', `fps=${gifFps},scale=trunc(iw/2)*2:trunc(ih/2)*2:flags=lanczos[x];[x][1:v]paletteuse`,
-          outputPath,
-        ], { timeout: 60000, stdio: 'pipe' });
-      } else if (outputFormat === 'webm') {
-        execFileSync('ffmpeg', [
-          '-y', '-framerate', String(fps),
-          '-i', inputPattern,
-          '-c:v', 'libvpx-vp9', '-crf', '30', '-b:v', '0',
-          '-pix_fmt', 'yuv420p',
-          outputPath,
-        ], { timeout: 60000, stdio: 'pipe' });
-      } else {
-        execFileSync('ffmpeg', [
-          '-y', '-framerate', String(fps),
-          '-i', inputPattern,
-          '-c:v', 'libx264', '-preset', 'fast', '-crf', '23',
-          '-pix_fmt', 'yuv420p', '-movflags', '+faststart',
-          outputPath,
-        ], { timeout: 60000, stdio: 'pipe' });
+      for (let i = 0; i < job.passes.length; i++) {
+        job.pass = i + 1;
+        await this.runFfmpeg(job.passes[i], job);
       }
-    } catch (ffmpegError) {
-      fs.rmSync(framesDir, { recursive: true, force: true });
-      throw new Error(`ffmpeg encoding failed: ${ffmpegError.stderr?.toString() || ffmpegError.message}`);
+      job.sizeBytes = fs.statSync(job.output).size;
+      job.status = 'done';
+      job.percent = 100;
+    } catch (error) {
+      job.status = 'failed';
+      job.error = error.message;
+    } finally {
+      fs.rmSync(job.framesDir, { recursive: true, force: true });
+      job.finishedAt = new Date().toISOString();
+      job.resolveDone();
     }
 
-    // Clean up frames
-    fs.rmSync(framesDir, { recursive: true, force: true });
+    if (job.notify) {
+      this.server.sendLoggingMessage({
+        level: job.status === 'done' ? 'info' : 'error',
+        logger: 'screencast',
+        data: this.encodeJobInfo(job),
+      }).catch(() => {});
+    }
+  }
 
-    const stats = fs.statSync(outputPath);
-    const sizeMB = (stats.size / (1024 * 1024)).toFixed(2);
+  // Run one ffmpeg pass without blocking the event loop; `-progress` writes
+  // key=value lines to stdout, which drive job.percent.
+  runFfmpeg(args, job, timeoutMs = 10 * 60 * 1000) {
+    return new Promise((resolve, reject) => {
+      const proc = spawn('ffmpeg', ['-hide_banner', '-nostats', '-progress', 'pipe:1', ...args]);
+      job.proc = proc;
+      let stderrTail = '';
+      let buffered = '';
+      const timer = setTimeout(() => proc.kill('SIGKILL'), timeoutMs);
 
-    const capturedFrames = screencastFrames.length;
-    screencastFrames = [];
+      proc.stdout.on('data', (data) => {
+        buffered += data.toString();
+        const lines = buffered.split('\n');
+        buffered = lines.pop();
+        for (const line of lines) {
+          const [key, value] = line.trim().split('=');
+          // out_time_ms is in microseconds too (long-standing ffmpeg quirk)
+          if ((key === 'out_time_us' || key === 'out_time_ms') && /^\d+$/.test(value)) {
+            job.progressSec = parseInt(value, 10) / 1e6;
+            const passShare = 100 / job.passes.length;
+            const within = job.mediaSec > 0 ? Math.min(job.progressSec / job.mediaSec, 1) : 0;
+            job.percent = Math.round(passShare * (job.pass - 1) + passShare * within);
+          }
+        }
+      });
+      proc.stderr.on('data', (data) => {
+        stderrTail = (stderrTail + data.toString()).slice(-4000);
+      });
+      proc.on('error', (error) => {
+        clearTimeout(timer);
+        reject(error);
+      });
+      proc.on('close', (code, signal) => {
+        clearTimeout(timer);
+        if (code === 0) {
+          resolve();
+        } else {
+          reject(new Error(stderrTail.trim() || `ffmpeg exited with ${signal || code}`));
+        }
+      });
+    });
+  }
 
+  encodeJobInfo(job) {
     return {
-      content: [{ type: 'text', text: `Screencast saved: ${outputPath}\nFormat: ${outputFormat} | Frames: ${capturedFrames} | Duration: ${durationSec.toFixed(1)}s | FPS: ${fps} | Size: ${sizeMB}MB` }],
+      jobId: job.id,
+      status: job.status,
+      path: job.output,
+      format: job.format,
+      percent: job.percent,
+      pass: job.pass,
+      passes: job.passes.length,
+      frames: job.frames,
+      droppedFrames: job.droppedFrames,
+      fps: job.fps,
+      variableFrameRate: job.variableFrameRate,
+      sizeBytes: job.sizeBytes,
+      error: job.error,
+      queuedAt: job.queuedAt,
+      finishedAt: job.finishedAt,
+    };
+  }
+
+  async screencastJobStatus(jobId) {
+    let jobs;
+    if (jobId !== undefined) {
+      const job = encodeJobs.get(jobId);
+      if (!job) {
+        throw new Error(`Unknown screencast job: ${jobId}`);
+      }
+      jobs = [job];
+    } else {
+      jobs = [...encodeJobs.values()];
+    }
+
+    const describe = (job) => {
+      switch (job.status) {
+        case 'queued': return `Job ${job.id}: queued -> ${job.output}`;
+        case 'running': return `Job ${job.id}: encoding ${job.percent}% (pass ${job.pass}/${job.passes.length}) -> ${job.output}`;
+        case 'done': return `Job ${job.id}: done -> ${job.output} (${(job.sizeBytes / (1024 * 1024)).toFixed(2)}MB)`;
+        default: return `Job ${job.id}: failed -> ${job.error}`;
+      }
+    };
+
+    return {
+      content: [{ type: 'text', text: jobs.length > 0 ? jobs.map(describe).join('\n') : 'No screencast encoding jobs.' }],
+      structuredContent: jobId !== undefined ? this.encodeJobInfo(jobs[0]) : { jobs: jobs.map(j => this.encodeJobInfo(j)), running: runningEncodes, queued: encodeQueue.length },
     };
   }
 
@@ -1563,16 +4463,19 @@ class DirectChromiumMCPServer {
     const status = {
       recording: screencastRecording,
       frames: screencastFrames.length,
+      droppedFrames: screencastDropped,
+      everyNthFrame: screencastRecording ? screencastParams.everyNthFrame : null,
       duration: screencastRecording ? `${((Date.now() - screencastStartTime) / 1000).toFixed(1)}s` : null,
       format: screencastRecording ? screencastFormat : null,
     };
 
     const text = screencastRecording
-      ? `Recording: ${status.frames} frames captured over ${status.duration} (${screencastFormat})`
+      ? `Recording: ${status.frames} frames captured over ${status.duration} (${screencastFormat}, ${status.droppedFrames} duplicates dropped, every ${status.everyNthFrame} frame(s))`
       : `Not recording. ${screencastFrames.length > 0 ? `${screencastFrames.length} frames buffered from last recording.` : 'No frames buffered.'}`;
 
     return {
       content: [{ type: 'text', text }],
+      structuredContent: status,
     };
   }
 
@@ -1597,7 +4500,6 @@ class DirectChromiumMCPServer {
     if (list.length === 0) {
       throw new Error('set_cookies requires "cookies" (array) and/or "cookieHeader" (string)');
     }
-    await this.sendCDPCommand('Network.enable');
 
     const normSameSite = (s) => {
       if (!s) return undefined;
@@ -1632,53 +4534,393 @@ class DirectChromiumMCPServer {
     await this.sendCDPCommand('Network.setCookies', { cookies: prepared });
     return {
       content: [{ type: 'text', text: `Set ${prepared.length} cookie(s)${url ? ' (default url ' + url + ')' : ''}. Navigate to the target page to use the authenticated session.` }],
+      structuredContent: { count: prepared.length },
     };
   }
 
   async getCookies() {
     await this.ensureChromium();
-    await this.sendCDPCommand('Network.enable');
     const result = await this.sendCDPCommand('Network.getAllCookies');
     const cookies = result.cookies || [];
     return {
       content: [{ type: 'text', text: JSON.stringify(cookies, null, 2) }],
+      structuredContent: { cookies },
+    };
+  }
+
+  async saveStorageState(filePath, extraOrigins = []) {
+    await this.ensureChromium();
+    if (!filePath) {
+      throw new Error('save_storage_state requires a "path"');
+    }
+
+    const jar = await this.sendCDPCommand('Network.getAllCookies');
+    const origins = [];
+    const dump = await this.sendCDPCommand('Runtime.evaluate', {
+      expression: STORAGE_DUMP_EXPRESSION,
+      awaitPromise: true,
+      returnByValue: true,
+    });
+    const current = dump.result?.value;
+    if (current && current.origin && current.origin !== 'null') {
+      origins.push(current);
+    }
+
+    // Other origins: Web Storage via DOMStorage, no page visit needed.
+    const extra = (extraOrigins || []).filter((o) => !current || o !== current.origin);
+    if (extra.length > 0) {
+      await this.sendCDPCommand('DOMStorage.enable');
+      for (const origin of extra) {
+        const read = async (isLocalStorage) => {
+          const items = await this.sendCDPCommand('DOMStorage.getDOMStorageItems', {
+            storageId: { securityOrigin: origin, isLocalStorage },
+          });
+          return items.entries || [];
+        };
+        origins.push({ origin, localStorage: await read(true), sessionStorage: await read(false), indexedDB: [] });
+      }
+    }
+
+    const state = { version: 1, savedAt: new Date().toISOString(), cookies: jar.cookies || [], origins };
+    const size = writeStateFile(path.resolve(filePath), state);
+    const summary = origins.map((o) => `${o.origin} (${o.localStorage.length} local, ${o.sessionStorage.length} session, ${o.indexedDB.length} IndexedDB)`).join(', ');
+    return {
+      content: [{ type: 'text', text: `Storage state saved to ${path.resolve(filePath)} (${(size / 1024).toFixed(1)}KB): ${state.cookies.length} cookie(s)${summary ? '; ' + summary : ''}` }],
+      structuredContent: { path: path.resolve(filePath), sizeBytes: size, cookies: state.cookies.length, origins: origins.map((o) => o.origin) },
+    };
+  }
+
+  async loadStorageState(filePath) {
+    await this.ensureChromium();
+    if (!filePath) {
+      throw new Error('load_storage_state requires a "path"');
+    }
+
+    const state = readStateFile(path.resolve(filePath));
+    const cookies = state.cookies || [];
+    const origins = state.origins || [];
+    if (cookies.length > 0) {
+      await this.sendCDPCommand('Network.setCookies', { cookies: cookies.map(cookieParamFromJar) });
+    }
+    if (origins.length > 0) {
+      await this.sendCDPCommand('Page.addScriptToEvaluateOnNewDocument', { source: storageSeedScript(origins) });
+    }
+    return {
+      content: [{ type: 'text', text: `Loaded ${cookies.length} cookie(s) and storage for ${origins.length} origin(s)${origins.length ? ' (' + origins.map((o) => o.origin).join(', ') + ')' : ''}. Storage is seeded on the first navigation to each origin.` }],
+      structuredContent: { cookies: cookies.length, origins: origins.map((o) => o.origin) },
+    };
+  }
+
+  startMemoryWatchdog() {
+    // HTTP clients have no browser process of their own: the main thread samples
+    if (!WATCHDOG_INTERVAL_MS || CLIENT_WORKER) return;
+    const timer = setInterval(() => {
+      this.sampleMemory().catch(() => {});
+    }, WATCHDOG_INTERVAL_MS);
+    timer.unref(); // never keep the server alive just to sample
+  }
+
+  async sampleMemory() {
+    if (!chromiumProcess || chromiumProcess.exitCode !== null) return null;
+
+    const sample = {
+      timestamp: new Date().toISOString(),
+      rssMB: null,
+      jsHeapUsedMB: null,
+      jsHeapTotalMB: null,
+      pages: pagesSinceLaunch,
+    };
+    const rssKb = readProcessTreeRssKb(chromiumProcess.pid);
+    if (rssKb !== null) sample.rssMB = Math.round(rssKb / 1024);
+    if (wsConnection && wsConnection.readyState === WebSocket.OPEN) {
+      try {
+        const heap = await this.sendCDPCommand('Runtime.getHeapUsage');
+        sample.jsHeapUsedMB = Math.round(heap.usedSize / 1024 / 1024);
+        sample.jsHeapTotalMB = Math.round(heap.totalSize / 1024 / 1024);
+      } catch (e) {
+        // Page busy or navigating; RSS alone is still useful
+      }
+    }
+
+    memorySamples.push(sample);
+    if (memorySamples.length > 100) memorySamples.shift();
+
+    if (!recycleReason) {
+      if (WATCHDOG_MAX_RSS_MB && sample.rssMB !== null && sample.rssMB >= WATCHDOG_MAX_RSS_MB) {
+        recycleReason = `RSS ${sample.rssMB}MB >= ${WATCHDOG_MAX_RSS_MB}MB`;
+      } else if (WATCHDOG_MAX_JS_HEAP_MB && sample.jsHeapUsedMB !== null && sample.jsHeapUsedMB >= WATCHDOG_MAX_JS_HEAP_MB) {
+        recycleReason = `JS heap ${sample.jsHeapUsedMB}MB >= ${WATCHDOG_MAX_JS_HEAP_MB}MB`;
+      }
+    }
+    return sample;
+  }
+
+  async recycleBrowser() {
+    // Frames live in this process, but Page.stopScreencast would be lost with the
+    // old browser; wait until the recording is stopped.
+    if (screencastRecording) return;
+
+    const reason = recycleReason;
+    recycleReason = null;
+    const started = Date.now();
+    const before = memorySamples[memorySamples.length - 1] || null;
+    const pages = pagesSinceLaunch;
+
+    await this.refreshSessionJournal();
+    await this.shutdownBrowser();
+    sessionLost = true; // replayed by ensureChromium()
+    await this.ensureChromium();
+
+    recycleEvents.push({
+      timestamp: new Date().toISOString(),
+      reason,
+      pages,
+      rssMBBefore: before ? before.rssMB : null,
+      jsHeapUsedMBBefore: before ? before.jsHeapUsedMB : null,
+      cookiesRestored: sessionJournal.cookies.length,
+      emulationRestored: !!sessionJournal.emulation,
+      url: sessionJournal.url,
+      durationMs: Date.now() - started,
+    });
+    if (recycleEvents.length > 100) recycleEvents.shift();
+  }
+
+  async getMemoryStats() {
+    const stats = CLIENT_WORKER ? await requestMainThread('memory') : await this.memoryStats();
+    return {
+      content: [{ type: 'text', text: JSON.stringify(stats, null, 2) }],
+      structuredContent: stats,
+    };
+  }
+
+  async memoryStats() {
+    await this.sampleMemory();
+    return {
+      limits: {
+        intervalMs: WATCHDOG_INTERVAL_MS,
+        maxRssMB: WATCHDOG_MAX_RSS_MB || null,
+        maxJsHeapMB: WATCHDOG_MAX_JS_HEAP_MB || null,
+        recycleAfterPages: WATCHDOG_MAX_PAGES || null,
+      },
+      launchProfile: process.env.CHROMIUM_LAUNCH_PROFILE || 'default',
+      pagesSinceLaunch,
+      pendingRecycle: recycleReason,
+      samples: memorySamples,
+      recycleEvents,
+    };
+  }
+
+  getSchedulerStats() {
+    const queued = Object.fromEntries(SCHED_LANES.map(lane => [lane, schedQueue.filter(e => e.lane === lane).length]));
+    const stats = {
+      running: { writer: schedWriter, readers: schedReaders },
+      queued,
+      queueDepth: schedQueue.length,
+      maxQueueDepth: schedStats.maxQueueDepth,
+      lanes: schedStats.lanes,
+      free: schedStats.free,
+      cancelled: schedStats.cancelled,
+      deadlineExceeded: schedStats.deadlineExceeded,
+      waitMs: percentiles(schedStats.waitMs),
+      runMs: percentiles(schedStats.runMs),
+      agingMs: SCHED_AGING_MS,
+      defaultDeadlineMs: DEFAULT_DEADLINE_MS || null,
+    };
+    return {
+      content: [{ type: 'text', text: JSON.stringify(stats, null, 2) }],
+      structuredContent: stats,
+    };
+  }
+
+  // HeapProfiler.takeHeapSnapshot emits the snapshot as addHeapSnapshotChunk
+  // events before it answers; each chunk is appended to the file as it
+  // arrives. The snapshot forces a full GC first.
+  async writeHeapSnapshot() {
+    if (heapSnapshotSink) {
+      throw new Error('A heap snapshot is already being written');
+    }
+    await this.sendCDPCommand('HeapProfiler.enable');
+    const filePath = spoolFilePath('heap', 'heapsnapshot');
+    heapSnapshotSink = { fd: fs.openSync(filePath, 'w'), hash: crypto.createHash('sha256'), size: 0 };
+    const sink = heapSnapshotSink;
+    try {
+      await this.sendCDPCommand('HeapProfiler.takeHeapSnapshot', { reportProgress: false }, { timeoutMs: 300000 });
+    } finally {
+      heapSnapshotSink = null;
+      fs.closeSync(sink.fd);
+    }
+    const { usedSize } = await this.sendCDPCommand('Runtime.getHeapUsage');
+    return { path: filePath, size: sink.size, sha256: sink.hash.digest('hex'), jsHeapUsed: usedSize };
+  }
+
+  async takeHeapSnapshot() {
+    await this.ensureChromium();
+    const snapshot = await this.writeHeapSnapshot();
+    return {
+      content: [{ type: 'text', text: `Heap snapshot written to ${snapshot.path} (${snapshot.size} bytes, JS heap ${(snapshot.jsHeapUsed / 1048576).toFixed(1)} MB)\nsha256: ${snapshot.sha256}` }],
+      structuredContent: snapshot,
+    };
+  }
+
+  async runLeakCycleAction(action, settleMs) {
+    if (action.navigate) {
+      const loaded = this.waitForCDPEvent('Page.loadEventFired', 30000);
+      await this.sendCDPCommand('Page.navigate', { url: action.navigate });
+      countPage();
+      await loaded;
+    } else if (action.click || action.script) {
+      const expression = action.click
+        ? `(() => { const el = document.querySelector(${JSON.stringify(action.click)}); if (!el) throw new Error('No element matches ' + ${JSON.stringify(action.click)}); el.click(); })()`
+        : action.script;
+      const result = await this.sendCDPCommand('Runtime.evaluate', { expression, awaitPromise: true }, { timeoutMs: 30000 });
+      if (result.exceptionDetails) {
+        throw new Error(`leak_check action failed: ${result.exceptionDetails.exception?.description || result.exceptionDetails.text}`);
+      }
+    } else {
+      throw new Error('leak_check actions need navigate, click or script');
+    }
+    await new Promise(resolve => setTimeout(resolve, settleMs));
+  }
+
+  // Warm up once (caches, lazy modules, first-render allocations), snapshot,
+  // run the cycle N more times, snapshot again: what the second snapshot has
+  // on top of the first grows with every cycle.
+  async leakCheck(args = {}) {
+    await this.ensureChromium();
+    let cycle = args.cycle;
+    if (!cycle || cycle.length === 0) {
+      if (!args.urlA || !args.urlB) {
+        throw new Error('leak_check needs urlA and urlB, or a cycle of actions');
+      }
+      cycle = [{ navigate: args.urlB }, { navigate: args.urlA }];
+    }
+    const iterations = args.iterations || 5;
+    const settleMs = args.settleMs ?? 500;
+    const started = Date.now();
+
+    if (args.urlA) await this.runLeakCycleAction({ navigate: args.urlA }, settleMs);
+    for (const action of cycle) await this.runLeakCycleAction(action, settleMs);
+    const baseline = await this.writeHeapSnapshot();
+    for (let i = 0; i < iterations; i++) {
+      for (const action of cycle) await this.runLeakCycleAction(action, settleMs);
+    }
+    const final = await this.writeHeapSnapshot();
+
+    const growth = final.jsHeapUsed - baseline.jsHeapUsed;
+    const perIteration = Math.round(growth / iterations);
+    const summary = {
+      iterations,
+      cycle,
+      baseline,
+      final,
+      jsHeapGrowth: growth,
+      jsHeapGrowthPerIteration: perIteration,
+      elapsedMs: Date.now() - started,
+    };
+    const mb = (n) => `${(n / 1048576).toFixed(2)} MB`;
+    return {
+      content: [{ type: 'text', text: [
+        `Leak check: ${iterations} cycle(s) of ${cycle.length} action(s) in ${summary.elapsedMs}ms`,
+        `JS heap ${mb(baseline.jsHeapUsed)} -> ${mb(final.jsHeapUsed)} (${growth >= 0 ? '+' : ''}${mb(growth)}, ${perIteration} bytes per cycle)`,
+        `Baseline snapshot: ${baseline.path}`,
+        `Final snapshot: ${final.path}`,
+        `Diff: python3 heapsnap.py diff ${baseline.path} ${final.path}`,
+      ].join('\n') }],
+      structuredContent: summary,
     };
   }
 
   async closeBrowser() {
+    await this.shutdownBrowser();
+    // An explicit close starts the next session from scratch
+    sessionJournal = { cookies: [], emulation: null, userAgent: null, url: null };
+    sessionLost = false;
+
+    return {
+      content: [{ type: 'text', text: 'Browser closed successfully' }],
+      structuredContent: { closed: true },
+    };
+  }
+
+  async saveProfileTemplate(templatePath) {
+    await this.ensureChromium();
+    if (!templatePath) {
+      throw new Error('save_profile_template requires a "path"');
+    }
+    if (CLIENT_WORKER) {
+      throw new Error('save_profile_template needs a browser of its own; the HTTP server\'s browser is shared by all clients');
+    }
+    const profileDir = managedProfileDir || process.env.CHROMIUM_USER_DATA_DIR;
+    const target = path.resolve(templatePath);
+    if (path.resolve(profileDir) === target) {
+      throw new Error('Template path must differ from the live profile directory');
+    }
+
+    // A graceful exit flushes cookies / LevelDB to disk before we copy.
+    await this.refreshSessionJournal();
+    await this.shutdownBrowser({ keepProfile: true });
+
+    const started = Date.now();
+    const staging = `${target}.tmp-${process.pid}`;
+    let stats;
+    try {
+      fs.rmSync(staging, { recursive: true, force: true });
+      stats = cloneProfileTree(profileDir, staging, 'auto');
+      fs.rmSync(target, { recursive: true, force: true });
+      fs.renameSync(staging, target);
+    } finally {
+      fs.rmSync(staging, { recursive: true, force: true });
+      cleanupManagedProfile();
+      sessionLost = true; // relaunch and replay on the next call
+    }
+
+    const sizeMB = (stats.bytes / (1024 * 1024)).toFixed(1);
+    return {
+      content: [{ type: 'text', text: `Profile template saved to ${target} (${stats.files} files, ${sizeMB}MB, ${Date.now() - started}ms). Start sessions with CHROMIUM_PROFILE_TEMPLATE=${target} to clone it.` }],
+      structuredContent: { path: target, files: stats.files, bytes: stats.bytes },
+    };
+  }
+
+  async shutdownBrowser({ keepProfile = false } = {}) {
+    browserClosing = true;
+
     // Stop any active screencast
     if (screencastRecording) {
-      screencastRecording = false;
-      screencastFrames = [];
+      setScreencastRecording(false);
       try { await this.sendCDPCommand('Page.stopScreencast'); } catch (e) { /* ignore */ }
+      await Promise.all([...screencastPendingWrites]);
+      this.discardScreencastFrames();
     }
 
     if (wsConnection) {
       wsConnection.close();
       wsConnection = null;
     }
+    if (clientContextId) {
+      await this.disposeClientContext();
+    }
     
-    if (chromiumProcess && chromiumProcess.exitCode === null) {
-      chromiumProcess.kill('SIGTERM');
+    const proc = chromiumProcess;
+    if (proc && proc.exitCode === null) {
+      proc.kill('SIGTERM');
       
       // Wait for graceful shutdown
       await new Promise(resolve => {
-        chromiumProcess.on('exit', resolve);
-        setTimeout(() => {
-          chromiumProcess.kill('SIGKILL');
+        const timer = setTimeout(() => {
+          proc.kill('SIGKILL');
           resolve();
         }, 5000);
+        proc.on('exit', () => {
+          clearTimeout(timer);
+          resolve();
+        });
       });
-      
-      chromiumProcess = null;
     }
+    chromiumProcess = null;
     
-    cleanupManagedProfile();
+    if (!keepProfile) cleanupManagedProfile();
     currentTabId = null;
-    
-    return {
-      content: [{ type: 'text', text: 'Browser closed successfully' }],
-    };
+    browserClosing = false;
   }
 
   setupErrorHandling() {
@@ -1698,8 +4940,180 @@ class DirectChromiumMCPServer {
   }
 
   async run() {
+    if (CLIENT_WORKER) {
+      return this.runClientWorker();
+    }
+    if (TRANSPORT === 'http') {
+      return this.runHttp();
+    }
     const transport = new StdioServerTransport();
     await this.server.connect(transport);
+    // The client closing stdin is the stdio shutdown signal. One-shot callers
+    // close it right after their request, so first finish the calls and the
+    // screencast encodes they started.
+    process.stdin.once('end', () => this.shutdownWhenIdle());
+  }
+
+  async shutdownWhenIdle() {
+    while (activeToolCalls > 0) {
+      await new Promise(resolve => setTimeout(resolve, 100));
+    }
+    await Promise.all([...encodeJobs.values()].map(job => job.done));
+    await this.closeBrowser().catch(() => {});
+    process.exit(0);
+  }
+
+  // One long-running server for many clients: each MCP session gets a worker
+  // thread running this module with its own state and browser context, while
+  // this thread owns the browser and relays the session's messages.
+  async runHttp() {
+    await this.ensureChromium(); // warm browser before the first client
+    const sessions = new Map(); // Mcp-Session-Id -> session
+    let browserQueue = Promise.resolve();
+    let recycling = null; // settles once a watchdog recycle of the shared browser is done
+
+    // The watchdog samples the browser and counts its pages here, where the
+    // browser lives. A recycle drops every client's context, so it waits until
+    // no client (other than `except`, which is waiting for the browser) has a
+    // call in flight or a screencast running. Clients replay their session
+    // journals into a fresh context on their next call.
+    const recycleWhenIdle = (except = null) => {
+      if (!recycleReason || recycling) return;
+      for (const other of sessions.values()) {
+        if (other !== except && (other.pending > 0 || other.screencasting)) return;
+      }
+      recycling = browserQueue = browserQueue
+        .then(() => this.recycleBrowser())
+        .catch((error) => process.stderr.write(`[MCP] browser recycle failed: ${error.message}\n`))
+        .finally(() => { recycling = null; });
+    };
+    if (WATCHDOG_INTERVAL_MS) setInterval(() => recycleWhenIdle(), WATCHDOG_INTERVAL_MS).unref();
+
+    const closeSession = (session) => {
+      if (session.closed) return;
+      session.closed = true;
+      sessions.delete(session.transport.sessionId);
+      session.transport.close().catch(() => {});
+      session.worker.postMessage({ type: 'shutdown' });
+      // The worker disposes its context and exits; don't wait forever
+      setTimeout(() => session.worker.terminate(), 10000).unref();
+      recycleWhenIdle();
+    };
+
+    const openSession = async () => {
+      const worker = new Worker(new URL(import.meta.url), { workerData: { role: 'client' } });
+      const transport = new StreamableHTTPServerTransport({
+        sessionIdGenerator: () => crypto.randomUUID(),
+        onsessioninitialized: (sessionId) => sessions.set(sessionId, session),
+      });
+      const session = { transport, worker, lastActive: Date.now(), pending: 0, screencasting: false, closed: false };
+
+      transport.onmessage = (message) => {
+        session.lastActive = Date.now();
+        if (message.method && message.id !== undefined) session.pending++;
+        // Calls that arrive during a recycle start once the new browser is up
+        const forward = () => worker.postMessage({ type: 'mcp', message });
+        if (recycling) recycling.then(forward);
+        else forward();
+      };
+      transport.onclose = () => closeSession(session);
+      worker.on('message', (msg) => {
+        session.lastActive = Date.now();
+        if (msg.type === 'mcp') {
+          if (!msg.message.method && msg.message.id !== undefined && --session.pending === 0) recycleWhenIdle();
+          transport.send(msg.message, { relatedRequestId: msg.relatedRequestId }).catch(() => {});
+        } else if (msg.type === 'browser') {
+          // One (re)launch at a time, however many clients ask at once
+          recycleWhenIdle(session);
+          browserQueue = browserQueue.then(() => this.ensureChromium()).then(
+            () => worker.postMessage({ type: 'browser', id: msg.id }),
+            (error) => worker.postMessage({ type: 'browser', id: msg.id, error: error.message }),
+          );
+        } else if (msg.type === 'memory') {
+          this.memoryStats().then(
+            (result) => worker.postMessage({ type: 'memory', id: msg.id, result }),
+            (error) => worker.postMessage({ type: 'memory', id: msg.id, error: error.message }),
+          );
+        } else if (msg.type === 'page') {
+          countPage();
+        } else if (msg.type === 'screencast') {
+          session.screencasting = msg.active;
+          recycleWhenIdle();
+        }
+      });
+      worker.on('error', (error) => process.stderr.write(`[MCP] client worker failed: ${error.message}\n`));
+      worker.on('exit', () => closeSession(session));
+      await transport.start();
+      return session;
+    };
+
+    // host[:port] -> true when it names this server under an allowed host name
+    const allowedHost = (value) => {
+      const match = /^(\[[^\]]+\]|[^:]+)(?::(\d+))?$/.exec(value || '');
+      return !!match && HTTP_ALLOWED_HOSTS.has(match[1].toLowerCase()) && (!match[2] || match[2] === String(HTTP_PORT));
+    };
+
+    const httpServer = http.createServer(async (req, res) => {
+      const reply = (status, message) => {
+        res.writeHead(status, { 'content-type': 'application/json' });
+        res.end(JSON.stringify({ jsonrpc: '2.0', error: { code: -32000, message }, id: null }));
+      };
+      if (!allowedHost(req.headers.host)) {
+        return reply(403, `Forbidden: Host ${req.headers.host || '(none)'} is not allowed (see CHROMIUM_HTTP_ALLOWED_HOSTS)`);
+      }
+      const origin = req.headers.origin; // sent by browsers; absent for most MCP clients
+      if (origin !== undefined && !allowedHost(/^https?:\/\/(.+)$/.exec(origin)?.[1])) {
+        return reply(403, `Forbidden: Origin ${origin} is not allowed (see CHROMIUM_HTTP_ALLOWED_HOSTS)`);
+      }
+      try {
+        if (new URL(req.url, 'http://localhost').pathname !== '/mcp') {
+          return reply(404, 'Not found (the MCP endpoint is /mcp)');
+        }
+        const body = req.method === 'POST' ? JSON.parse((await readRequestBody(req)) || 'null') : undefined;
+        const sessionId = req.headers['mcp-session-id'];
+        let session = sessionId ? sessions.get(sessionId) : null;
+        if (!session) {
+          if (sessionId) return reply(404, 'Session not found or reclaimed; initialize a new one');
+          if (req.method !== 'POST' || !isInitializeRequest(body)) {
+            return reply(400, 'Bad request: no session ID and not an initialize request');
+          }
+          session = await openSession();
+        }
+        session.lastActive = Date.now();
+        await session.transport.handleRequest(req, res, body);
+      } catch (error) {
+        if (!res.headersSent) reply(error instanceof SyntaxError ? 400 : 500, error.message);
+      }
+    });
+
+    // Reclaim sessions (worker + browser context) idle for SESSION_IDLE_MS
+    if (SESSION_IDLE_MS > 0) {
+      const timer = setInterval(() => {
+        const now = Date.now();
+        for (const session of sessions.values()) {
+          if (session.pending <= 0 && now - session.lastActive > SESSION_IDLE_MS) {
+            process.stderr.write(`[MCP] reclaiming idle session ${session.transport.sessionId}\n`);
+            closeSession(session);
+          }
+        }
+      }, Math.min(30000, SESSION_IDLE_MS));
+      timer.unref();
+    }
+
+    await new Promise((resolve, reject) => {
+      httpServer.once('error', reject);
+      httpServer.listen(HTTP_PORT, HTTP_HOST, resolve);
+    });
+    process.stderr.write(`[MCP] listening on http://${HTTP_HOST}:${HTTP_PORT}/mcp\n`);
+  }
+
+  async runClientWorker() {
+    const transport = new ParentPortTransport();
+    transport.onshutdown = async () => {
+      await this.closeBrowser().catch(() => {});
+      process.exit(0);
+    };
+    await this.server.connect(transport);
   }
 }
 
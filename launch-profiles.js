@@ -0,0 +1,83 @@
+/**
+ * Named Chromium launch profiles, selected with CHROMIUM_LAUNCH_PROFILE.
+ *
+ * Each profile adds flags to the server's base launch arguments. Feature
+ * names are merged into the one --disable-features switch (Chromium honors
+ * only the last one given). An explicit CHROMIUM_DISK_CACHE_SIZE always wins
+ * over the profile's cache size. Compare profiles on your board with
+ * `npm run bench`.
+ */
+
+export const LAUNCH_PROFILES = {
+  // The historical flag set: one renderer per site, 100MB disk cache.
+  default: {
+    description: 'Stock flags: site isolation on, 100MB disk cache',
+    args: [],
+    disableFeatures: [],
+    diskCacheSize: 104857600,
+  },
+  // Fit more sessions on a 2-4GB board. Every tab and frame shares one
+  // renderer, V8 favors size over speed and its old space is capped, and
+  // caches that trade memory for speed are turned off.
+  lowmem: {
+    description: 'One shared renderer, 256MB V8 old space, no site isolation, no back/forward cache, 32MB disk cache',
+    args: [
+      '--renderer-process-limit=1',
+      '--process-per-site',
+      '--disable-site-isolation-trials',
+      '--js-flags=--max-old-space-size=256 --optimize-for-size',
+      '--disable-background-networking',
+      '--disable-component-update',
+      '--disable-default-apps',
+      '--disable-sync',
+      '--media-cache-size=1',
+      '--aggressive-cache-discard',
+    ],
+    disableFeatures: ['IsolateOrigins', 'site-per-process', 'BackForwardCache', 'Translate', 'OptimizationHints', 'MediaRouter'],
+    diskCacheSize: 33554432,
+  },
+  // Fastest page loads when memory is not the limit: no process spawn per
+  // cross-site navigation, no background traffic, a larger disk cache.
+  throughput: {
+    description: 'Renderers reused across sites, no background networking, 256MB disk cache',
+    args: [
+      '--process-per-site',
+      '--disable-site-isolation-trials',
+      '--disable-background-networking',
+      '--disable-component-update',
+      '--disable-default-apps',
+      '--disable-sync',
+    ],
+    disableFeatures: ['IsolateOrigins', 'site-per-process', 'Translate', 'OptimizationHints', 'MediaRouter'],
+    diskCacheSize: 268435456,
+  },
+};
+
+// The profile named by CHROMIUM_LAUNCH_PROFILE (default: default), with its name.
+export function resolveLaunchProfile(name = process.env.CHROMIUM_LAUNCH_PROFILE || 'default') {
+  const profile = LAUNCH_PROFILES[name];
+  if (!profile) {
+    throw new Error(`Unknown CHROMIUM_LAUNCH_PROFILE "${name}" (expected one of: ${Object.keys(LAUNCH_PROFILES).join(', ')})`);
+  }
+  return { name, ...profile };
+}
+
+// `args` plus the profile's flags, with every --disable-features merged into one.
+export function applyLaunchProfile(args, profile) {
+  const features = [];
+  const merged = [];
+  for (const arg of [...args, ...profile.args]) {
+    if (arg.startsWith('--disable-features=')) {
+      features.push(...arg.slice('--disable-features='.length).split(','));
+    } else {
+      merged.push(arg);
+    }
+  }
+  features.push(...profile.disableFeatures);
+  if (features.length > 0) {
+    merged.push(`--disable-features=${[...new Set(features)].join(',')}`);
+  }
+  const diskCacheSize = parseInt(process.env.CHROMIUM_DISK_CACHE_SIZE || String(profile.diskCacheSize), 10);
+  merged.push(`--disk-cache-size=${diskCacheSize}`);
+  return merged;
+}
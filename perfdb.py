@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Performance baseline store - regression detection for run_performance_audit
+
+Every audit sample is stored in SQLite keyed by URL, device and build. A
+candidate build is compared against a rolling baseline (the previous N builds
+of the same URL/device) with a statistical test on the median, so a single
+noisy run neither raises nor hides a regression.
+
+Usage:
+    import perfdb
+    db = perfdb.PerfDB()
+    db.record_audit("https://example.com", device="pixel-9", build="abc123", runs=5)
+    for r in db.compare("abc123", metric="lcp"):
+        print(r)
+
+CLI:
+    python3 perfdb.py record --url https://example.com --build abc123 --runs 5
+    python3 perfdb.py import samples.jsonl
+    python3 perfdb.py compare --build abc123 --metric lcp --threshold 0.10
+    python3 perfdb.py trend --url https://example.com --metric lcp
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+import warnings
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_DB_PATH = os.environ.get(
+    "CHROMIUM_PERFDB", os.path.join(os.path.expanduser("~"), ".mcp-chromium-arm64", "perfdb.sqlite")
+)
+
+# Metrics where a larger value is worse (all timings, CLS, counts).
+LOWER_IS_BETTER = {"lcp", "fcp", "ttfb", "cls", "domContentLoaded", "loadComplete", "firstPaint", "resourceCount"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    build TEXT PRIMARY KEY,
+    first_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS samples (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    device TEXT NOT NULL,
+    build TEXT NOT NULL REFERENCES builds(build),
+    metric TEXT NOT NULL,
+    value REAL NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_key ON samples (metric, build, url, device);
+"""
+
+
+@dataclass
+class Comparison:
+    """Result of comparing one URL/device/metric against its baseline."""
+    url: str
+    device: str
+    metric: str
+    baseline_median: float
+    candidate_median: float
+    change: float            # relative median shift, (candidate - baseline) / baseline
+    ci_low: float            # confidence interval of `change` (bootstrap test)
+    ci_high: float
+    p_value: Optional[float]  # permutation test only
+    baseline_n: int
+    candidate_n: int
+    regression: bool
+
+    def __str__(self) -> str:
+        flag = "REGRESSION" if self.regression else "ok"
+        stats = f"CI [{self.ci_low:+.1%}, {self.ci_high:+.1%}]" if self.p_value is None else f"p={self.p_value:.4f}"
+        return (f"{flag:10} {self.metric} {self.change:+.1%} ({self.baseline_median:g} -> {self.candidate_median:g}, "
+                f"{stats}, n={self.baseline_n}/{self.candidate_n}) {self.device} {self.url}")
+
+
+def flatten_metrics(metrics: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Flatten nested audit metrics to {"memoryUsage.used": 12.0, ...}, numbers only."""
+    flat: Dict[str, float] = {}
+    for key, value in metrics.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_metrics(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+            flat[name] = float(value)
+    return flat
+
+
+def _relative_shift(baseline: List[float], candidate: List[float]) -> float:
+    base = statistics.median(baseline)
+    cand = statistics.median(candidate)
+    if base == 0:
+        return 0.0 if cand == 0 else math.inf
+    return (cand - base) / abs(base)
+
+
+def bootstrap_shift_ci(baseline: List[float], candidate: List[float], confidence: float = 0.95,
+                       resamples: int = 2000, rng: Optional[random.Random] = None) -> Tuple[float, float]:
+    """Percentile bootstrap confidence interval of the relative median shift."""
+    rng = rng or random.Random(0)
+    shifts = sorted(
+        _relative_shift(rng.choices(baseline, k=len(baseline)), rng.choices(candidate, k=len(candidate)))
+        for _ in range(resamples)
+    )
+    tail = (1 - confidence) / 2
+    return shifts[int(tail * (resamples - 1))], shifts[int((1 - tail) * (resamples - 1))]
+
+
+def permutation_p_value(baseline: List[float], candidate: List[float], resamples: int = 2000,
+                        rng: Optional[random.Random] = None) -> float:
+    """One-sided permutation test that the candidate median is higher."""
+    rng = rng or random.Random(0)
+    observed = statistics.median(candidate) - statistics.median(baseline)
+    pooled = baseline + candidate
+    n = len(baseline)
+    hits = 0
+    for _ in range(resamples):
+        rng.shuffle(pooled)
+        if statistics.median(pooled[n:]) - statistics.median(pooled[:n]) >= observed:
+            hits += 1
+    return (hits + 1) / (resamples + 1)
+
+
+def benjamini_hochberg(p_values: List[float], alpha: float) -> List[bool]:
+    """Which hypotheses are rejected at false discovery rate alpha."""
+    order = sorted(range(len(p_values)), key=lambda i: p_values[i])
+    cutoff = -1
+    for rank, i in enumerate(order, start=1):
+        if p_values[i] <= alpha * rank / len(p_values):
+            cutoff = rank
+    rejected = [False] * len(p_values)
+    for rank, i in enumerate(order, start=1):
+        rejected[i] = rank <= cutoff
+    return rejected
+
+
+class PerfDB:
+    """SQLite store of performance samples with rolling-baseline comparisons."""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def record(self, url: str, metrics: Dict[str, Any], device: str = "desktop", build: str = "unversioned",
+               recorded_at: Optional[float] = None) -> int:
+        """Store one audit's metrics; returns the number of samples written."""
+        now = recorded_at if recorded_at is not None else time.time()
+        flat = flatten_metrics(metrics)
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO builds (build, first_seen) VALUES (?, ?)", (build, now))
+            self.conn.executemany(
+                "INSERT INTO samples (url, device, build, metric, value, recorded_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(url, device, build, metric, value, now) for metric, value in flat.items()],
+            )
+        return len(flat)
+
+    def record_audit(self, url: str, device: str = "desktop", build: str = "unversioned", runs: int = 1,
+                     conditioning: Optional[List[str]] = None, session: Any = None) -> List[Dict[str, Any]]:
+        """Load url (optionally under a device preset and conditioning) `runs` times and store each performance audit.
+
+        All calls go to one persistent server (`session`, a chromium_tool.MCPSession,
+        or a private one), so the emulation is still in effect when the page loads
+        and the audit measures the page just navigated to. A caller's session gets
+        its emulation reset afterwards. Conditioned samples are stored under
+        device "<device>@<profile+profile>" and never meet unthrottled baselines.
+        """
+        from chromium_tool import MCPSession
+
+        def call(session: MCPSession, name: str, **arguments: Any) -> Dict[str, Any]:
+            result = session.call_tool(name, arguments, timeout=120)
+            if "error" in result or result.get("isError"):
+                raise RuntimeError(result.get("error") or result.get("content", [{}])[0].get("text", f"{name} failed"))
+            return result.get("structuredContent") or {}
+
+        collected = []
+        emulation: Dict[str, Any] = {}
+        if device != "desktop":
+            emulation["device"] = device
+        if conditioning:
+            emulation["conditioning"] = conditioning
+        key = f"{device}@{'+'.join(conditioning)}" if conditioning else device
+        own = session is None
+        if own:
+            session = MCPSession()
+        try:
+            if emulation:
+                call(session, "emulate_device", **emulation)
+            for _ in range(runs):
+                call(session, "navigate", url=url)
+                # Throttled loads take a while; a page that never goes quiet is audited as is
+                session.call_tool("wait_for", {"networkIdle": True, "timeout": 60000}, timeout=90)
+                metrics = call(session, "run_performance_audit").get("metrics", {})
+                self.record(url, metrics, device=key, build=build)
+                collected.append(metrics)
+        finally:
+            if own:
+                session.close()
+            elif emulation:
+                session.call_tool("reset_emulation", {})
+        return collected
+
+    def builds(self) -> List[str]:
+        """All builds in the order they were first seen."""
+        return [row[0] for row in self.conn.execute("SELECT build FROM builds ORDER BY first_seen, build")]
+
+    def samples(self, metric: str, builds: Iterable[str], url: Optional[str] = None,
+                device: Optional[str] = None) -> Dict[Tuple[str, str], List[float]]:
+        """Sample values of one metric grouped by (url, device)."""
+        builds = list(builds)
+        if not builds:
+            return {}
+        query = f"SELECT url, device, value FROM samples WHERE metric = ? AND build IN ({','.join('?' * len(builds))})"
+        params: List[Any] = [metric, *builds]
+        if url is not None:
+            query += " AND url = ?"
+            params.append(url)
+        if device is not None:
+            query += " AND device = ?"
+            params.append(device)
+        grouped: Dict[Tuple[str, str], List[float]] = {}
+        for row_url, row_device, value in self.conn.execute(query, params):
+            grouped.setdefault((row_url, row_device), []).append(value)
+        return grouped
+
+    def compare(self, build: str, metric: str = "lcp", window: int = 5, threshold: float = 0.10,
+                test: str = "bootstrap", confidence: float = 0.95, resamples: int = 2000,
+                min_samples: int = 3, url: Optional[str] = None, device: Optional[str] = None) -> List[Comparison]:
+        """Compare `build` against the `window` builds before it, per URL and device.
+
+        A pair is a regression when the median got worse by at least `threshold`
+        and the test is significant: with ``test="bootstrap"`` the confidence
+        interval of the shift must exclude zero; with ``test="permutation"`` the
+        one-sided p-value must pass a Benjamini-Hochberg correction across all
+        compared pages at 1 - confidence.
+        """
+        if test not in ("bootstrap", "permutation"):
+            raise ValueError(f"Unknown test: {test} (use bootstrap or permutation)")
+        history = self.builds()
+        if build not in history:
+            raise ValueError(f"Unknown build: {build}")
+        baseline_builds = history[max(0, history.index(build) - window):history.index(build)]
+
+        baseline = self.samples(metric, baseline_builds, url, device)
+        candidate = self.samples(metric, [build], url, device)
+        sign = 1 if metric in LOWER_IS_BETTER or metric.startswith("memoryUsage.") else -1
+        rng = random.Random(0)
+
+        results: List[Comparison] = []
+        p_values: List[float] = []
+        for key in sorted(set(baseline) & set(candidate)):
+            base, cand = baseline[key], candidate[key]
+            if len(base) < min_samples or len(cand) < min_samples:
+                continue
+            # Orient every metric so that a positive shift means "worse"
+            base_o, cand_o = [sign * v for v in base], [sign * v for v in cand]
+            change = _relative_shift(base_o, cand_o)
+            ci_low, ci_high = bootstrap_shift_ci(base_o, cand_o, confidence, resamples, rng)
+            p_value = permutation_p_value(base_o, cand_o, resamples, rng) if test == "permutation" else None
+            if p_value is not None:
+                p_values.append(p_value)
+            results.append(Comparison(
+                url=key[0], device=key[1], metric=metric,
+                baseline_median=statistics.median(base), candidate_median=statistics.median(cand),
+                change=change, ci_low=ci_low, ci_high=ci_high, p_value=p_value,
+                baseline_n=len(base), candidate_n=len(cand),
+                regression=change >= threshold and ci_low > 0,
+            ))
+
+        if test == "permutation" and results:
+            # The smallest attainable p-value is 1/(resamples+1); BH needs
+            # alpha/pages for the strongest page to be significant at all.
+            if (resamples + 1) * (1 - confidence) < len(results):
+                warnings.warn(f"{resamples} resamples cannot reach significance across {len(results)} pages; "
+                              f"use at least {math.ceil(len(results) / (1 - confidence))}")
+            significant = benjamini_hochberg(p_values, 1 - confidence)
+            for result, sig in zip(results, significant):
+                result.regression = result.change >= threshold and sig
+        return results
+
+    def trend(self, url: str, metric: str = "lcp", device: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per-build sample count, median and p90 for one URL, oldest first."""
+        rows = []
+        for build in self.builds():
+            values = [v for vals in self.samples(metric, [build], url, device).values() for v in vals]
+            if not values:
+                continue
+            values.sort()
+            rows.append({
+                "build": build,
+                "n": len(values),
+                "median": statistics.median(values),
+                "p90": values[min(len(values) - 1, int(0.9 * len(values)))],
+            })
+        return rows
+
+
+def _sparkline(values: List[float]) -> str:
+    bars = "▁▂▃▄▅▆▇█"
+    low, high = min(values), max(values)
+    span = (high - low) or 1
+    return "".join(bars[int((v - low) / span * (len(bars) - 1))] for v in values)
+
+
+def main():
+    """CLI interface for the baseline store."""
+    parser = argparse.ArgumentParser(description="Performance baselines and regression detection")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="SQLite file (default: $CHROMIUM_PERFDB)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="Run performance audits through the MCP server and store them")
+    rec.add_argument("--url", required=True, action="append", help="URL to audit (repeatable)")
+    rec.add_argument("--device", default="desktop", help="Device preset (default: desktop)")
+    rec.add_argument("--conditioning", action="append",
+                     help="Network/CPU conditioning profile, e.g. mid-range-phone or slow-4g + cpu-4x (repeatable)")
+    rec.add_argument("--build", required=True, help="Build / commit identifier")
+    rec.add_argument("--runs", type=int, default=5, help="Samples per URL (default: 5)")
+
+    imp = sub.add_parser("import", help="Import JSONL lines of {url, device, build, metrics}")
+    imp.add_argument("file")
+
+    cmp_ = sub.add_parser("compare", help="Flag regressions of a build against its rolling baseline")
+    cmp_.add_argument("--build", required=True)
+    cmp_.add_argument("--metric", default="lcp")
+    cmp_.add_argument("--window", type=int, default=5, help="Baseline builds (default: 5)")
+    cmp_.add_argument("--threshold", type=float, default=0.10, help="Minimum relative median shift (default: 0.10)")
+    cmp_.add_argument("--test", choices=["bootstrap", "permutation"], default="bootstrap")
+    cmp_.add_argument("--confidence", type=float, default=0.95)
+    cmp_.add_argument("--resamples", type=int, default=2000)
+    cmp_.add_argument("--device")
+    cmp_.add_argument("--all", action="store_true", help="Show unchanged pages too")
+
+    tr = sub.add_parser("trend", help="Per-build median of a metric for one URL")
+    tr.add_argument("--url", required=True)
+    tr.add_argument("--metric", default="lcp")
+    tr.add_argument("--device")
+
+    args = parser.parse_args()
+    db = PerfDB(args.db)
+    try:
+        if args.command == "record":
+            for url in args.url:
+                db.record_audit(url, device=args.device, build=args.build, runs=args.runs, conditioning=args.conditioning)
+                conditions = f"@{'+'.join(args.conditioning)}" if args.conditioning else ""
+                print(f"Recorded {args.runs} runs of {url} ({args.device}{conditions}, build {args.build})")
+        elif args.command == "import":
+            count = 0
+            with open(args.file) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        db.record(entry["url"], entry["metrics"], entry.get("device", "desktop"),
+                                  entry.get("build", "unversioned"), entry.get("recorded_at"))
+                        count += 1
+            print(f"Imported {count} audits")
+        elif args.command == "compare":
+            try:
+                results = db.compare(args.build, args.metric, args.window, args.threshold, args.test,
+                                     args.confidence, args.resamples, device=args.device)
+            except ValueError as e:
+                parser.error(str(e))  # exits 2, like argparse's own usage errors
+            regressions = [r for r in results if r.regression]
+            for r in (results if args.all else regressions):
+                print(r)
+            print(f"{len(regressions)} regression(s) in {len(results)} page(s) compared for {args.metric}")
+            return 1 if regressions else 0
+        elif args.command == "trend":
+            rows = db.trend(args.url, args.metric, args.device)
+            if not rows:
+                print(f"No {args.metric} samples for {args.url}")
+                return 0
+            for row in rows:
+                print(f"{row['build']:>20}  n={row['n']:<4} median={row['median']:<10g} p90={row['p90']:g}")
+            print(f"{'trend':>20}  {_sparkline([row['median'] for row in rows])}")
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
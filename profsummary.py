@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Profile summarizer - read profile_page results and .cpuprofile files
+
+profile_page returns unused JS/CSS bytes per file and the hottest functions by
+self time, and writes the full CPU profile to a .cpuprofile spool file (the
+format Chrome DevTools loads). This module re-reads that file to add what the
+tool does not compute: inclusive (total) time per function and self time
+rolled up per script URL, so the bundles worth trimming stand out.
+
+Usage:
+    import profsummary
+    result = profsummary.profile("https://example.com")   # calls profile_page
+    print(profsummary.report(result))
+
+    prof = profsummary.load("/tmp/mcp-chromium-spool/profile-....cpuprofile")
+    prof.hot(20)                 # [(function, self_ms, total_ms), ...]
+    prof.by_url()                # [(url, self_ms), ...]
+
+CLI:
+    python3 profsummary.py profile https://example.com --top 15
+    python3 profsummary.py show /tmp/mcp-chromium-spool/profile-....cpuprofile --by url
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# Pseudo frames V8 reports that are not page code.
+IDLE_FRAMES = {"(root)", "(idle)"}
+
+
+@dataclass
+class Function:
+    """Aggregated timing of one function (name + script URL + line)."""
+    name: str
+    url: str
+    line: int
+    self_ms: float
+    total_ms: float
+
+    def __str__(self) -> str:
+        where = f"{self.url}:{self.line}" if self.url else "(native)"
+        return f"{self.self_ms:>9.2f}ms self {self.total_ms:>9.2f}ms total  {self.name}  {where}"
+
+
+class CpuProfile:
+    """A .cpuprofile as flat node tables: parent index and self time per node."""
+
+    def __init__(self, raw: Dict[str, Any]):
+        nodes = raw["nodes"]
+        index = {node["id"]: i for i, node in enumerate(nodes)}
+        self.frames = [node["callFrame"] for node in nodes]
+        self.parent = [-1] * len(nodes)
+        for i, node in enumerate(nodes):
+            for child in node.get("children", []):
+                self.parent[index[child]] = i
+        self.self_us = [0] * len(nodes)
+        samples, deltas = raw.get("samples", []), raw.get("timeDeltas", [])
+        # timeDeltas[i + 1] is the time between sample i and the next one.
+        for i, node_id in enumerate(samples):
+            self.self_us[index[node_id]] += deltas[i + 1] if i + 1 < len(deltas) else 0
+        self.duration_ms = (raw.get("endTime", 0) - raw.get("startTime", 0)) / 1000
+
+    def _key(self, i: int) -> Tuple[str, str, int]:
+        frame = self.frames[i]
+        return frame["functionName"] or "(anonymous)", frame["url"], frame["lineNumber"] + 1
+
+    def functions(self) -> List[Function]:
+        """Every function with self and total time, hottest self time first.
+
+        Total time counts each sample once per function even under recursion.
+        """
+        self_us: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        total_us: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        for i, us in enumerate(self.self_us):
+            if not us:
+                continue
+            self_us[self._key(i)] += us
+            seen = set()
+            node = i
+            while node >= 0:
+                key = self._key(node)
+                if key not in seen:
+                    seen.add(key)
+                    total_us[key] += us
+                node = self.parent[node]
+        found = [Function(name, url, line, self_us[(name, url, line)] / 1000, total / 1000)
+                 for (name, url, line), total in total_us.items() if name not in IDLE_FRAMES]
+        return sorted(found, key=lambda f: f.self_ms, reverse=True)
+
+    def hot(self, top: int = 20) -> List[Function]:
+        """The `top` functions by self time."""
+        return self.functions()[:top]
+
+    def by_url(self) -> List[Tuple[str, float]]:
+        """Self time summed per script URL, largest first."""
+        per_url: Dict[str, float] = defaultdict(float)
+        for i, us in enumerate(self.self_us):
+            url = self.frames[i]["url"]
+            if us and url:
+                per_url[url] += us / 1000
+        return sorted(per_url.items(), key=lambda item: item[1], reverse=True)
+
+
+def load(source: Any) -> CpuProfile:
+    """Load a .cpuprofile from a path or from a profile_page structuredContent dict."""
+    if isinstance(source, dict) and "cpuprofile" in source:
+        source = source["cpuprofile"]["path"]
+    with open(source) as f:
+        return CpuProfile(json.load(f))
+
+
+def profile(url: Optional[str] = None, script: Optional[str] = None, session: Any = None,
+            **kwargs: Any) -> Dict[str, Any]:
+    """Call the profile_page tool and return its structuredContent.
+
+    Without a url the current page is profiled, which needs a persistent
+    server: pass a chromium_tool.MCPSession or use arm64_browser.open_session().
+    """
+    import arm64_browser
+
+    if not url and session is None and not arm64_browser.session_active():
+        raise RuntimeError("profiling the current page needs a persistent session (pass session= or call arm64_browser.open_session())")
+    if url:
+        kwargs["url"] = url
+    if script:
+        kwargs["script"] = script
+    result = arm64_browser.call_mcp_tool_result("profile_page", _timeout=120, _session_override=session, **kwargs)
+    if result.is_error:
+        raise RuntimeError(result.text)
+    return result.data
+
+
+def _kb(n: float) -> str:
+    return f"{n / 1024:8.1f} KB"
+
+
+def report(result: Dict[str, Any], top: int = 20) -> str:
+    """Text report of a profile_page result: unused bytes per file, then CPU hot spots."""
+    totals = result["totals"]
+    lines = [f"Profiled {result.get('url') or 'current page'} for {result['elapsedMs']}ms", ""]
+    for kind in ("js", "css"):
+        lines.append(f"Unused {kind.upper()}: {_kb(totals[kind + 'UnusedBytes'])} of {_kb(totals[kind + 'Bytes'])}")
+        for f in result[kind][:top]:
+            lines.append(f"  {_kb(f['unusedBytes'])} of {_kb(f['totalBytes'])} ({f['unusedPct']:5.1f}%)  {f['url']}")
+        lines.append("")
+    if result.get("cpuprofile"):
+        prof = load(result)
+        lines.append("Self time per script:")
+        lines += [f"  {ms:>9.2f}ms  {url}" for url, ms in prof.by_url()[:top]]
+        lines.append("")
+        lines.append("Hot functions:")
+        lines += [f"  {fn}" for fn in prof.hot(top)]
+    return "\n".join(lines)
+
+
+def main():
+    """CLI interface for the profile summarizer."""
+    parser = argparse.ArgumentParser(description="Summarize profile_page results and .cpuprofile files")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("profile", help="Run profile_page through the MCP server and report")
+    run.add_argument("url", nargs="?", help="URL to load while profiling (default: profile the current page)")
+    run.add_argument("--script", help="JavaScript interaction to run while profiling")
+    run.add_argument("--settle-ms", type=int, default=1000)
+    run.add_argument("--top", type=int, default=20)
+    run.add_argument("--json", action="store_true", help="Print the raw structuredContent")
+
+    show = sub.add_parser("show", help="Summarize a .cpuprofile file")
+    show.add_argument("file")
+    show.add_argument("--top", type=int, default=20)
+    show.add_argument("--by", choices=["function", "url"], default="function")
+
+    args = parser.parse_args()
+    if args.command == "profile":
+        result = profile(args.url, args.script, settleMs=args.settle_ms, top=args.top)
+        print(json.dumps(result, indent=2) if args.json else report(result, args.top))
+    elif args.command == "show":
+        prof = load(args.file)
+        print(f"Recorded {prof.duration_ms:.0f}ms")
+        if args.by == "url":
+            for url, ms in prof.by_url()[:args.top]:
+                print(f"{ms:>9.2f}ms  {url}")
+        else:
+            for fn in prof.hot(args.top):
+                print(fn)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,8 +11,11 @@ import sys
 # Dynamically determine the server directory
 SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
 
-def _call(name, args, fallback):
-    """Send a JSON-RPC tools/call to index.js over stdin (no shell)."""
+def _call_result(name, args, timeout=15):
+    """Send a JSON-RPC tools/call to index.js over stdin (no shell).
+
+    Returns the decoded ``result`` object, or None if no response was found.
+    """
     request = {
         "jsonrpc": "2.0",
         "method": "tools/call",
@@ -20,33 +23,34 @@ def _call(name, args, fallback):
         "id": 1,
     }
 
-    try:
-        result = subprocess.run(
-            ["node", os.path.join(SERVER_DIR, "index.js")],
-            input=json.dumps(request),
-            text=True,
-            capture_output=True,
-            timeout=15,
-            cwd=SERVER_DIR,
-        )
-
-        # Look for JSON in both stdout and stderr
-        all_output = result.stdout + result.stderr
+    result = subprocess.run(
+        ["node", os.path.join(SERVER_DIR, "index.js")],
+        input=json.dumps(request),
+        text=True,
+        capture_output=True,
+        timeout=timeout,
+        cwd=SERVER_DIR,
+    )
 
-        # Find the JSON response line
-        for line in all_output.split('\n'):
-            if '{"result"' in line:
-                try:
-                    response = json.loads(line)
-                    content = response.get('result', {}).get('content', [{}])
-                    return content[0].get('text', fallback)
-                except json.JSONDecodeError:
-                    continue
-
-        return fallback
+    # The response is the last JSON line on stdout
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith('{"result"'):
+            try:
+                return json.loads(line)['result']
+            except json.JSONDecodeError:
+                continue
+    return None
 
+def _call(name, args, fallback):
+    """Call a tool and return its text content."""
+    try:
+        response = _call_result(name, args)
     except Exception as e:
         return f"Error: {e}"
+    if response is None:
+        return fallback
+    content = response.get('content', [{}])
+    return content[0].get('text', fallback)
 
 def browser_navigate(url):
     """Navigate to URL using ARM64 Chromium."""
@@ -60,6 +64,33 @@ def browser_evaluate(script):
     """Execute JavaScript using ARM64 Chromium."""
     return _call("evaluate", {"script": script}, "Script executed")
 
+def browser_evaluate_value(script):
+    """Execute JavaScript and return the native value (None on failure)."""
+    try:
+        response = _call_result("evaluate", {"script": script})
+    except Exception:
+        return None
+    if not response or response.get('isError'):
+        return None
+    return (response.get('structuredContent') or {}).get('value')
+
+def browser_emulate_matrix(url, devices=None, timeout=120):
+    """Render url under several device presets in parallel (default: all).
+
+    Returns the tool's structuredContent: {"url", "elapsedMs", "results": [...]}
+    with a screenshot path, overflow and CLS per device, or None on failure.
+    """
+    args = {"url": url}
+    if devices:
+        args["devices"] = list(devices)
+    try:
+        response = _call_result("emulate_matrix", args, timeout=timeout)
+    except Exception:
+        return None
+    if not response or response.get('isError'):
+        return None
+    return response.get('structuredContent')
+
 if __name__ == "__main__":
     print("=== Simple ARM64 Browser Demo ===")
     print()
@@ -0,0 +1,103 @@
+#!/usr/bin/env node
+/**
+ * Launch profile benchmark: browser RSS and page-load time per
+ * CHROMIUM_LAUNCH_PROFILE on the local fixture corpus (no external network).
+ *
+ * For each profile a fresh `node index.js` loads every fixture page `rounds`
+ * times, alternating between two sites (127.0.0.1 and localhost) so site
+ * isolation costs show up. Reported per profile: median / p95 page load
+ * (navigation start to loadEventEnd, from the page) and the browser
+ * process-tree RSS from get_memory_stats after each round (peak and final).
+ *
+ * Skips cleanly (exit 0) if no Chromium-family browser is installed.
+ * Run: npm run bench -- [profile ...] [--rounds N] [--json]
+ */
+import { startFixtureServer, openSession } from './fixtures.js';
+import { LAUNCH_PROFILES } from '../launch-profiles.js';
+
+const CORPUS = ['/', '/app', '/profiled', '/cookies'];
+
+function quantile(values, q) {
+  const sorted = [...values].sort((a, b) => a - b);
+  return sorted.length ? sorted[Math.min(sorted.length - 1, Math.floor(q * sorted.length))] : null;
+}
+
+async function benchProfile(name, origins, rounds) {
+  const session = openSession({ CHROMIUM_LAUNCH_PROFILE: name });
+  const loads = [];
+  const rss = [];
+  let heapMB = null;
+  try {
+    const first = session.text(await session.call('navigate', { url: origins[0] }, 60000));
+    if (/Could not find a Chromium-family browser/i.test(first)) return null;
+    if (/^Error:/.test(first)) throw new Error(`${name}: ${first}`);
+    for (let round = 0; round < rounds; round++) {
+      for (const [i, page] of CORPUS.entries()) {
+        await session.call('navigate', { url: origins[(round + i) % origins.length] + page }, 60000);
+        const timing = (await session.call('evaluate', {
+          script: "performance.getEntriesByType('navigation')[0]?.loadEventEnd || null",
+        })).result?.structuredContent?.value;
+        if (typeof timing === 'number' && timing > 0) loads.push(timing);
+      }
+      const sample = (await session.call('get_memory_stats', {})).result?.structuredContent?.samples?.at(-1);
+      if (sample?.rssMB != null) rss.push(sample.rssMB);
+      if (sample?.jsHeapUsedMB != null) heapMB = sample.jsHeapUsedMB;
+    }
+  } finally {
+    await session.close();
+  }
+  return {
+    profile: name,
+    pages: loads.length,
+    loadMsP50: Math.round(quantile(loads, 0.5)),
+    loadMsP95: Math.round(quantile(loads, 0.95)),
+    peakRssMB: rss.length ? Math.max(...rss) : null,
+    finalRssMB: rss.at(-1) ?? null,
+    jsHeapUsedMB: heapMB,
+  };
+}
+
+async function main() {
+  const argv = process.argv.slice(2);
+  const json = argv.includes('--json');
+  const roundsAt = argv.indexOf('--rounds');
+  const rounds = roundsAt !== -1 ? parseInt(argv[roundsAt + 1], 10) : 5;
+  const names = argv.filter((a, i) => !a.startsWith('--') && argv[i - 1] !== '--rounds');
+  const profiles = names.length ? names : Object.keys(LAUNCH_PROFILES);
+  for (const name of profiles) {
+    if (!LAUNCH_PROFILES[name]) throw new Error(`Unknown launch profile: ${name}`);
+  }
+
+  const fixture = await startFixtureServer();
+  const port = fixture.address().port;
+  const origins = [`http://127.0.0.1:${port}`, `http://localhost:${port}`];
+  const results = [];
+  try {
+    for (const name of profiles) {
+      const result = await benchProfile(name, origins, rounds);
+      if (!result) {
+        console.log('SKIP: no Chromium-family browser installed.');
+        return;
+      }
+      results.push(result);
+      if (!json) console.error(`  ${name}: done`);
+    }
+  } finally {
+    fixture.close();
+  }
+
+  if (json) {
+    console.log(JSON.stringify(results, null, 2));
+    return;
+  }
+  console.log(`\nLaunch profiles — ${rounds} rounds x ${CORPUS.length} pages\n`);
+  console.log('profile       load p50   load p95   peak RSS  final RSS   JS heap');
+  for (const r of results) {
+    console.log(
+      `${r.profile.padEnd(12)} ${String(r.loadMsP50).padStart(7)}ms ${String(r.loadMsP95).padStart(7)}ms ` +
+      `${String(r.peakRssMB).padStart(7)}MB ${String(r.finalRssMB).padStart(8)}MB ${String(r.jsHeapUsedMB).padStart(7)}MB`
+    );
+  }
+}
+
+main().then(() => process.exit(0), (e) => { console.error('benchmark crashed:', e); process.exit(1); });
@@ -0,0 +1,91 @@
+/**
+ * Shared test fixtures: a local HTTP fixture server (no external network) and
+ * an MCP client that drives `node index.js` over stdio. Used by smoke.js and
+ * bench-launch-profiles.js.
+ */
+import http from 'node:http';
+import { spawn } from 'node:child_process';
+import path from 'node:path';
+import { fileURLToPath } from 'node:url';
+
+export const SERVER_DIR = path.dirname(path.dirname(fileURLToPath(import.meta.url)));
+export const sleep = (ms) => new Promise((r) => setTimeout(r, ms));
+
+// Local fixture: tall page, cookie echo, an interactive page, a slow page, and 200/404 routes.
+export function startFixtureServer() {
+  const server = http.createServer((req, res) => {
+    const url = req.url.split('?')[0];
+    if (url === '/cookies') {
+      const jar = {};
+      (req.headers.cookie || '').split(';').forEach((p) => {
+        const i = p.indexOf('='); if (i > 0) jar[p.slice(0, i).trim()] = p.slice(i + 1).trim();
+      });
+      res.setHeader('content-type', 'application/json');
+      res.end(JSON.stringify({ cookies: jar }));
+    } else if (url === '/data') {
+      res.setHeader('content-type', 'application/json'); res.end('{"ok":true}');
+    } else if (url === '/bundle.js') {
+      res.setHeader('content-type', 'text/javascript');
+      res.end('function used(){let s=0;for(let i=0;i<2e6;i++)s+=i;return s}\nfunction neverCalled(){return "unused ".repeat(50)}\nused();');
+    } else if (url === '/bundle.css') {
+      res.setHeader('content-type', 'text/css');
+      res.end('body{margin:0}\n.never-matches-anything{color:red;padding:4px;border:1px solid blue}');
+    } else if (url === '/profiled') {
+      res.setHeader('content-type', 'text/html');
+      res.end('<!doctype html><link rel="stylesheet" href="/bundle.css"><body>profiled<script src="/bundle.js"></script></body>');
+    } else if (url === '/slow') {
+      // Holds the response for ?ms= (default 2000) so a job stays in flight.
+      const ms = parseInt(new URL(req.url, 'http://x').searchParams.get('ms') || '2000', 10);
+      setTimeout(() => { res.setHeader('content-type', 'text/html'); res.end('<!doctype html><body>slow</body>'); }, ms);
+    } else if (url === '/missing') {
+      res.statusCode = 404; res.end('nope');
+    } else if (url === '/app') {
+      res.setHeader('content-type', 'text/html');
+      res.end(
+        '<!doctype html><html><head></head><body>' +
+        '<button id="btn" onclick="document.title=\'CLICKED\'">Go</button>' +
+        '<input id="in">' +
+        '<form id="f"><input id="cb" type="checkbox"><input id="up" type="file">' +
+        '<input id="keys" onkeydown="window.__keys=(window.__keys||0)+1"></form>' +
+        '<select id="sel"><option value="a">A</option><option value="b">B</option></select>' +
+        '<div id="hov" onmouseover="window.__hov=1">hover</div>' +
+        '<img id="noalt" src="/data">' +
+        '<script>console.log("hello-log");console.error("boom-error");' +
+        'fetch("/data").catch(()=>{});fetch("/missing").catch(()=>{});</script>' +
+        '</body></html>'
+      );
+    } else {
+      res.setHeader('content-type', 'text/html');
+      res.end(
+        '<!doctype html><body style="margin:0;font:40px sans-serif;color:#fff">' +
+        '<div style="height:700px;background:#c0392b">TOP</div>' +
+        '<div style="height:1000px;background:#2980b9">MIDDLE</div>' +
+        '<div id="b" style="height:700px;background:#27ae60">BOTTOM_MARKER</div></body>'
+      );
+    }
+  });
+  return new Promise((resolve) => server.listen(0, '127.0.0.1', () => resolve(server)));
+}
+
+// One MCP server process over stdio, responses correlated by id.
+export function openSession(env = {}) {
+  const child = spawn('node', ['index.js'], { cwd: SERVER_DIR, env: { ...process.env, ...env } });
+  const pending = new Map();
+  let id = 0, buf = '';
+  const onLine = (line) => {
+    line = line.trim(); if (!line.startsWith('{')) return;
+    try { const m = JSON.parse(line); if (m.id != null && pending.has(m.id)) { pending.get(m.id)(m); pending.delete(m.id); } } catch {}
+  };
+  const feed = (d) => { buf += d; const parts = buf.split('\n'); buf = parts.pop(); parts.forEach(onLine); };
+  child.stdout.on('data', feed); child.stderr.on('data', feed);
+  const call = (name, args = {}, timeoutMs = 20000) => new Promise((resolve, reject) => {
+    const myId = ++id;
+    const t = setTimeout(() => { pending.delete(myId); reject(new Error(`timeout: ${name}`)); }, timeoutMs);
+    pending.set(myId, (m) => { clearTimeout(t); resolve(m); });
+    child.stdin.write(JSON.stringify({ jsonrpc: '2.0', method: 'tools/call', params: { name, arguments: args }, id: myId }) + '\n');
+  });
+  const text = (m) => m?.result?.content?.[0]?.text ?? '';
+  const evalText = async (expr) => text(await call('evaluate', { script: expr }));
+  const close = async () => { try { await call('close_browser', {}, 8000); } catch {} child.kill(); };
+  return { call, text, evalText, close };
+}
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Offline checks of the Python analysis modules, run by test/smoke.js.
+
+No browser and no network: every check builds its own fixture data (fixed
+seeds, temporary files) and prints one JSON line per assertion,
+{"name", "ok", "detail"}, which smoke.js reports like its own checks. Groups
+whose module needs NumPy print {"skip", "detail"} instead when it is missing.
+
+Run: python3 test/pychecks.py [group ...]
+"""
+
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+GROUPS = {}
+
+
+class Skip(Exception):
+    pass
+
+
+def group(fn):
+    """Register a check group: a generator of (name, ok, detail) tuples."""
+    GROUPS[fn.__name__] = fn
+    return fn
+
+
+def need_numpy():
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        raise Skip("NumPy not installed")
+
+
+@group
+def perfdb():
+    import perfdb as pdb
+
+    rng = random.Random(42)
+    db = pdb.PerfDB(":memory:")
+    # Five baseline builds and a candidate; /slow regresses LCP by 15%, /steady does not move
+    for i, build in enumerate(["b1", "b2", "b3", "b4", "b5", "b6"]):
+        for url in ("https://fixture/slow", "https://fixture/steady"):
+            factor = 1.15 if build == "b6" and url.endswith("/slow") else 1.0
+            for _ in range(5):
+                db.record(url, {"lcp": rng.gauss(2000, 40) * factor}, build=build, recorded_at=1000 + i)
+    for test in ("bootstrap", "permutation"):
+        results = {r.url: r for r in db.compare("b6", "lcp", test=test)}
+        slow, steady = results["https://fixture/slow"], results["https://fixture/steady"]
+        yield f"perfdb {test}: +15% LCP is flagged", slow.regression and 0.10 < slow.change < 0.20, str(slow)
+        yield f"perfdb {test}: unchanged metric is not flagged", not steady.regression, str(steady)
+
+    rejected = pdb.benjamini_hochberg([0.01, 0.04, 0.03, 0.5], 0.05)
+    yield "perfdb Benjamini-Hochberg keeps only the step-up survivors", rejected == [True, False, False, False], str(rejected)
+    low, high = pdb.bootstrap_shift_ci([100.0] * 8, [120.0] * 8)
+    yield "perfdb bootstrap CI of a constant shift is that shift", abs(low - 0.2) < 1e-9 and abs(high - 0.2) < 1e-9, f"{low} {high}"
+
+    trend = db.trend("https://fixture/slow")
+    yield "perfdb trend has one row per build, oldest first", [row["build"] for row in trend] == ["b1", "b2", "b3", "b4", "b5", "b6"], str(trend)
+    yield "perfdb trend shows the regressed median", trend[-1]["median"] > 1.1 * trend[0]["median"], str(trend[-1])
+    db.close()
+
+    cli = subprocess.run([sys.executable, os.path.join(ROOT, "perfdb.py"), "--db", ":memory:", "compare", "--build", "nope"],
+                         capture_output=True, text=True)
+    yield "perfdb compare --build <unknown> is a usage error (exit 2)", cli.returncode == 2 and "Unknown build: nope" in cli.stderr and "Traceback" not in cli.stderr, cli.stderr
+
+
+# Synthetic .heapsnapshot in V8's layout. Nodes: (type, name, id, self_size,
+# detached); edges: (from, to, type), listed in node order.
+HEAP_META = {
+    "node_fields": ["type", "name", "id", "self_size", "edge_count", "detachedness"],
+    "node_types": [["hidden", "array", "string", "object", "code", "closure", "regexp", "number", "native", "synthetic"]],
+    "edge_fields": ["type", "name_or_index", "to_node"],
+    "edge_types": [["context", "element", "property", "internal", "hidden", "shortcut", "weak"]],
+}
+
+
+def _heap_snapshot(nodes, edges, path, indent=None):
+    node_types, edge_types = HEAP_META["node_types"][0], HEAP_META["edge_types"][0]
+    strings = [""]
+    flat_nodes, flat_edges = [], []
+    for index, (kind, name, node_id, size, detached) in enumerate(nodes):
+        if name not in strings:
+            strings.append(name)
+        out = [e for e in edges if e[0] == index]
+        flat_nodes += [node_types.index(kind), strings.index(name), node_id, size, len(out), 2 if detached else 0]
+        for _, to, kind in out:
+            flat_edges += [edge_types.index(kind), 0, to * len(HEAP_META["node_fields"])]
+    snapshot = {"snapshot": {"meta": HEAP_META, "node_count": len(nodes), "edge_count": len(flat_edges) // 3},
+                "nodes": flat_nodes, "edges": flat_edges, "trace_function_infos": [], "trace_tree": [],
+                "samples": [], "locations": [], "strings": strings}
+    with open(path, "w") as f:
+        json.dump(snapshot, f, indent=indent, separators=None if indent else (",", ":"))
+    return path
+
+
+@group
+def heapsnap():
+    need_numpy()
+    import heapsnap as hs
+
+    # root -> Window -> A -> C and Window -> B -> C: C is shared, so Window dominates it.
+    # A weak A -> B edge must not count. "Detached HTMLSpanElement" is already detached before.
+    base_nodes = [
+        ("synthetic", "", 1, 0, False),
+        ("object", "Window", 3, 1, False),
+        ("object", "A", 5, 10, False),
+        ("object", "B", 7, 20, False),
+        ("object", "C", 9, 5, False),
+        ("native", "Detached HTMLSpanElement", 11, 3, True),
+    ]
+    base_edges = [(0, 1, "shortcut"), (1, 2, "property"), (1, 3, "property"), (1, 5, "property"),
+                  (2, 4, "property"), (2, 3, "weak"), (3, 4, "property")]
+    # After: Window -> Leaker -> a new detached div holding a detached text node
+    after_nodes = base_nodes + [
+        ("object", "Leaker", 13, 8, False),
+        ("native", "Detached HTMLDivElement", 15, 30, True),
+        ("native", "Detached Text", 17, 4, True),
+    ]
+    after_edges = base_edges + [(1, 6, "property"), (6, 7, "property"), (7, 8, "element")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before = hs.load(_heap_snapshot(base_nodes, base_edges, os.path.join(tmp, "before.heapsnapshot")))
+        after = hs.load(_heap_snapshot(after_nodes, after_edges, os.path.join(tmp, "after.heapsnapshot")))
+        pretty = hs.load(_heap_snapshot(after_nodes, after_edges, os.path.join(tmp, "pretty.heapsnapshot"), indent=2))
+
+    yield "heapsnap dominators: a shared child is dominated by the common parent", before.idom.tolist() == [0, 0, 1, 1, 1, 1], str(before.idom.tolist())
+    yield "heapsnap retained sizes sum the dominated subtree", before.retained.tolist() == [39, 39, 10, 20, 5, 3], str(before.retained.tolist())
+    yield "heapsnap loads a re-serialized (indented) snapshot", pretty.retained.tolist() == after.retained.tolist(), str(pretty.retained.tolist())
+
+    result = hs.diff(before, after)
+    trees = [(t.node_id, t.name, t.nodes, t.retained_size) for t in result.detached_trees]
+    yield "heapsnap diff reports only the new detached tree", trees == [(15, "Detached HTMLDivElement", 2, 34)], str(trees)
+    leaker = next((d for d in result.classes if d.name == "Leaker"), None)
+    yield "heapsnap diff attributes the growth to the new class", \
+        leaker is not None and (leaker.new_objects, leaker.retained_delta) == (1, 42) and result.classes[0].name in ("Window", "Leaker"), \
+        "; ".join(str(d) for d in result.classes)
+    yield "heapsnap diff totals are the root's retained size", (result.total_before, result.total_after) == (39, 81), \
+        f"{result.total_before} {result.total_after}"
+
+
+@group
+def cluster():
+    import socket
+    import cluster as cl
+
+    coordinator = cl.Coordinator("127.0.0.1", 0)
+    conns = []
+
+    def worker(name):
+        conn = cl._WorkerConn(socket.socket(), ("127.0.0.1", 0))
+        conn.id, conn.send = name, lambda message: True
+        coordinator.workers[name] = conn
+        conns.append(conn)
+        return conn
+
+    try:
+        a, b = worker("a"), worker("b")
+        job_id = coordinator.submit("capture", {"url": "https://fixture/"})
+        coordinator._assign(a, 1)   # a prefetches the job ...
+        coordinator._assign(b, 1)   # ... and b steals it before a starts
+        job = coordinator.jobs[job_id]
+        job.workers.add("a")        # a had already started: both now run it
+        a.jobs[job_id] = "running"
+        coordinator._complete(a, {"job_id": job_id, "ok": False, "error": "boom", "seconds": 9.0})
+        yield "cluster: a failed duplicate run leaves the job to the other worker", \
+            job.state == "assigned" and job.worker == "" and job.seconds == 0.0, job.summary()
+        coordinator._complete(b, {"job_id": job_id, "ok": True, "result": {"size": 1}, "seconds": 1.5})
+        yield "cluster: the winning run records its worker and time", \
+            (job.state, job.worker, job.seconds) == ("done", "b", 1.5), job.summary()
+    finally:
+        for conn in conns:
+            conn.sock.close()
+        coordinator.close()
+
+    yield "cluster: audit names are normalized", cl._audit_name("best-practices") == "best_practices", ""
+    try:
+        cl._audit_name("perf")
+        yield "cluster: unknown audit names are rejected", False, "no error"
+    except ValueError:
+        yield "cluster: unknown audit names are rejected", True, ""
+
+
+@group
+def artifact_store():
+    import artifact_store as store_mod
+
+    class Store(store_mod.ArtifactStore):
+        # Stand-in thumbnailer so the checks need neither Pillow nor ffmpeg: PNGs "render", anything else fails
+        def _pick_thumbnailer(self):
+            return self._thumb_fixture
+
+        def _thumb_fixture(self, src, dst):
+            with open(src, "rb") as f:
+                head = f.read(8)
+            if not head.startswith(b"\x89PNG"):
+                raise ValueError("not an image")
+            with open(dst, "wb") as f:
+                f.write(head)
+
+    png = lambda tag: b"\x89PNG\r\n\x1a\n" + tag * 100
+    with tempfile.TemporaryDirectory() as tmp:
+        store = Store(os.path.join(tmp, "store"), budget_mb=None)
+        try:
+            first = store.put(png(b"a"), url="https://fixture/a", captured_at=1)
+            again = store.put(png(b"a"), url="https://fixture/a", captured_at=2)
+            stats = store.stats()
+            yield "artifact_store: identical bytes are stored once", \
+                first.new and not again.new and (stats["blobs"], stats["captures"]) == (1, 2), str(stats)
+            yield "artifact_store: put() does not claim a thumbnail it has not rendered", \
+                first.thumbnail is None and again.thumbnail is None, f"{first.thumbnail} {again.thumbnail}"
+
+            opaque = store.put(b"not an image", url="https://fixture/bin", captured_at=3)
+            store.wait_thumbnails()
+            rendered = store.latest("https://fixture/a")
+            failed = store.latest("https://fixture/bin")
+            yield "artifact_store: history() reports the rendered thumbnail", \
+                rendered.thumbnail == store.thumb_path(first.hash) and os.path.exists(rendered.thumbnail), str(rendered.thumbnail)
+            yield "artifact_store: a blob that cannot be thumbnailed has none", \
+                failed.thumbnail is None and opaque.path.endswith(".bin"), str(failed.thumbnail)
+
+            # Touch a again so the .bin blob is now the least recently used
+            store.put(png(b"a"), url="https://fixture/a", captured_at=4)
+            removed = store.evict(store.total - 1)
+            evicted = store.history("https://fixture/bin")
+            yield "artifact_store: eviction drops the least recently used blob", \
+                removed == 1 and not os.path.exists(opaque.path) and os.path.exists(first.path), f"removed {removed}"
+            yield "artifact_store: evicted captures stay in history without a path", \
+                [(c.hash, c.path) for c in evicted] == [(opaque.hash, None)], str(evicted)
+
+            source = os.path.join(tmp, "home.png")
+            with open(source, "wb") as f:
+                f.write(png(b"a"))
+            moved = store.put(source, url="https://fixture/a", move=True, captured_at=5)
+            yield "artifact_store: move=True removes the source even when it deduplicates", \
+                not moved.new and not os.path.exists(source) and os.path.exists(moved.path), moved.path
+        finally:
+            store.close()
+
+
+def _dom_snapshot():
+    # document > html > body > div > [button#a > span, button#b, a]; #a overlaps #b, and so does
+    # the span inside #a. Layout rows: div, button#a, span, button#b, a.
+    strings = ["https://fixture/", "#document", "HTML", "BODY", "DIV", "BUTTON", "SPAN", "A", "block", "id", "a", "b"]
+    code = strings.index
+    names = ["#document", "HTML", "BODY", "DIV", "BUTTON", "SPAN", "BUTTON", "A"]
+    attributes = [[]] * 4 + [[code("id"), code("a")], [], [code("id"), code("b")], []]
+    bounds = [(0, 0, 400, 400), (10, 10, 100, 40), (70, 20, 30, 10), (80, 20, 100, 40), (300, 300, 50, 20)]
+    return {
+        "strings": strings,
+        "computedStyles": ["display"],
+        "documents": [{
+            "documentURL": 0,
+            "nodes": {
+                "parentIndex": [-1, 0, 1, 2, 3, 4, 3, 3],
+                "nodeType": [9] + [1] * 7,
+                "nodeName": [code(n) for n in names],
+                "backendNodeId": list(range(1, 9)),
+                "isClickable": {"index": [4, 6, 7]},
+                "attributes": attributes,
+            },
+            "layout": {
+                "nodeIndex": [3, 4, 5, 6, 7],
+                "bounds": [v for box in bounds for v in box],
+                "styles": [[code("block")]] * 5,
+                "text": [-1] * 5,
+            },
+        }],
+    }
+
+
+@group
+def domsnap():
+    need_numpy()
+    import domsnap as ds
+
+    snap = ds.load(_dom_snapshot())
+    end = snap.subtree_end().tolist()
+    yield "domsnap subtree_end spans each node's descendants", end == [8, 8, 8, 8, 6, 6, 7, 8], str(end)
+    pairs = snap.overlapping_pairs(snap.visible_rows()).tolist()
+    yield "domsnap overlapping_pairs skips ancestors but keeps a nested node's other overlaps", \
+        sorted(pairs) == [[1, 3], [2, 3]], str(pairs)
+    clickable = snap.overlapping_pairs(snap.clickable_rows(), chunk=1).tolist()
+    yield "domsnap overlapping_pairs gives the same answer in small chunks", clickable == [[1, 3]], str(clickable)
+    yield "domsnap describe labels rows as tag#id", [snap.describe(r) for r in (1, 3)] == ["button#a", "button#b"], ""
+
+    raw = _dom_snapshot()
+    raw["documents"][0]["nodes"]["parentIndex"] = [-1, 2, 0, 2, 3, 4, 3, 3]
+    try:
+        ds.load(raw).subtree_end()
+        yield "domsnap subtree_end rejects nodes out of document order", False, "no error"
+    except ValueError:
+        yield "domsnap subtree_end rejects nodes out of document order", True, ""
+
+
+@group
+def profsummary():
+    import profsummary as ps
+
+    def frame(name, line, url="https://fixture/app.js"):
+        return {"functionName": name, "url": url if name != "(root)" else "", "lineNumber": line, "columnNumber": 0, "scriptId": "1"}
+
+    # (root) > main > fib > fib > fib; every fib frame is the same function
+    raw = {
+        "nodes": [
+            {"id": 1, "callFrame": frame("(root)", -1), "children": [2]},
+            {"id": 2, "callFrame": frame("main", 0), "children": [3]},
+            {"id": 3, "callFrame": frame("fib", 9), "children": [4]},
+            {"id": 4, "callFrame": frame("fib", 9), "children": [5]},
+            {"id": 5, "callFrame": frame("fib", 9)},
+        ],
+        "startTime": 0,
+        "endTime": 5000,
+        "samples": [5, 5, 2, 4, 1],
+        "timeDeltas": [0, 1000, 1000, 1000, 1000],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "fixture.cpuprofile")
+        with open(path, "w") as f:
+            json.dump(raw, f)
+        prof = ps.load({"cpuprofile": {"path": path}})
+
+    timings = {f.name: (f.self_ms, f.total_ms, f.line) for f in prof.functions()}
+    yield "profsummary total time counts recursive samples once", timings.get("fib") == (3.0, 3.0, 10), str(timings)
+    yield "profsummary total time includes callees", timings.get("main") == (1.0, 4.0, 1), str(timings)
+    yield "profsummary leaves out (root)", "(root)" not in timings, str(timings)
+    yield "profsummary rolls self time up per script", prof.by_url() == [("https://fixture/app.js", 4.0)], str(prof.by_url())
+
+
+def main(argv):
+    names = argv or list(GROUPS)
+    failed = 0
+    for name in names:
+        try:
+            for check, ok, detail in GROUPS[name]():
+                failed += not ok
+                print(json.dumps({"name": check, "ok": bool(ok), "detail": "" if ok else str(detail)[:300]}), flush=True)
+        except Skip as e:
+            print(json.dumps({"skip": name, "detail": str(e)}), flush=True)
+        except Exception as e:
+            failed += 1
+            print(json.dumps({"name": f"{name} checks ran", "ok": False, "detail": f"{type(e).__name__}: {e}"}), flush=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
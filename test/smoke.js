@@ -4,25 +4,30 @@
  *
  * Spins up a local HTTP fixture server (no external network), drives
  * `node index.js` over stdio, and asserts the real behaviour of the tools:
- *   navigate, get_content (text+html), evaluate, fill, click, select, hover,
+ *   navigate, get_content (text+html), get_content_delta, evaluate, fill, fill_form,
+ *   click, select, hover, wait_for,
  *   screenshot (full-page + height cap), set_cookies (+cookieHeader),
- *   get_cookies, get_console_logs/errors, get_network_logs/errors, wipe_logs,
- *   emulate_device, reset_emulation, run_*_audit, screencast start/status(/stop),
- *   get_selected_element, and CHROMIUM_USER_DATA_DIR persistence across restart.
+ *   get_cookies, get_console_logs/errors, get_network_logs/errors, wipe_logs, set_capture_level,
+ *   emulate_device, reset_emulation, emulate_matrix, run_*_audit, profile_page,
+ *   take_heap_snapshot, leak_check, print_pdf(_batch), request scheduling (ordering, deadlineMs, scheduler_stats),
+ *   screencast start/status(/stop, job status),
+ *   get_selected_element, dom_snapshot, CHROMIUM_USER_DATA_DIR persistence across restart,
+ *   CHROMIUM_LAUNCH_PROFILE flag sets, and per-client isolation over the shared HTTP transport.
+ * The Python analysis modules are checked offline on fixture data first (test/pychecks.py).
  *
- * Skips cleanly (exit 0) if no Chromium-family browser is installed.
+ * Without a Chromium-family browser the browser checks are skipped (exit 0
+ * unless an offline check failed).
  * Run: npm test
  */
-import http from 'node:http';
 import { spawn, execFileSync } from 'node:child_process';
 import fs from 'node:fs';
+import crypto from 'node:crypto';
 import os from 'node:os';
 import path from 'node:path';
-import { fileURLToPath } from 'node:url';
+import { SERVER_DIR, sleep, startFixtureServer, openSession } from './fixtures.js';
 
-const SERVER_DIR = path.dirname(path.dirname(fileURLToPath(import.meta.url)));
-const sleep = (ms) => new Promise((r) => setTimeout(r, ms));
 const hasFfmpeg = (() => { try { execFileSync('which', ['ffmpeg'], { stdio: 'ignore' }); return true; } catch { return false; } })();
+const hasPython = (() => { try { execFileSync('python3', ['--version'], { stdio: 'ignore' }); return true; } catch { return false; } })();
 
 let passed = 0, failed = 0;
 function check(name, cond, detail = '') {
@@ -36,68 +41,48 @@ function pngSize(file) {
   return { w: b.readUInt32BE(16), h: b.readUInt32BE(20) };
 }
 
-// Local fixture: tall page, cookie echo, an interactive page, and 200/404 routes.
-function startFixtureServer() {
-  const server = http.createServer((req, res) => {
-    const url = req.url.split('?')[0];
-    if (url === '/cookies') {
-      const jar = {};
-      (req.headers.cookie || '').split(';').forEach((p) => {
-        const i = p.indexOf('='); if (i > 0) jar[p.slice(0, i).trim()] = p.slice(i + 1).trim();
-      });
-      res.setHeader('content-type', 'application/json');
-      res.end(JSON.stringify({ cookies: jar }));
-    } else if (url === '/data') {
-      res.setHeader('content-type', 'application/json'); res.end('{"ok":true}');
-    } else if (url === '/missing') {
-      res.statusCode = 404; res.end('nope');
-    } else if (url === '/app') {
-      res.setHeader('content-type', 'text/html');
-      res.end(
-        '<!doctype html><html><head></head><body>' +
-        '<button id="btn" onclick="document.title=\'CLICKED\'">Go</button>' +
-        '<input id="in">' +
-        '<select id="sel"><option value="a">A</option><option value="b">B</option></select>' +
-        '<div id="hov" onmouseover="window.__hov=1">hover</div>' +
-        '<img id="noalt" src="/data">' +
-        '<script>console.log("hello-log");console.error("boom-error");' +
-        'fetch("/data").catch(()=>{});fetch("/missing").catch(()=>{});</script>' +
-        '</body></html>'
-      );
-    } else {
-      res.setHeader('content-type', 'text/html');
-      res.end(
-        '<!doctype html><body style="margin:0;font:40px sans-serif;color:#fff">' +
-        '<div style="height:700px;background:#c0392b">TOP</div>' +
-        '<div style="height:1000px;background:#2980b9">MIDDLE</div>' +
-        '<div id="b" style="height:700px;background:#27ae60">BOTTOM_MARKER</div></body>'
-      );
-    }
-  });
-  return new Promise((resolve) => server.listen(0, '127.0.0.1', () => resolve(server)));
-}
-
-// One MCP server process over stdio, responses correlated by id.
-function openSession(env = {}) {
-  const child = spawn('node', ['index.js'], { cwd: SERVER_DIR, env: { ...process.env, ...env } });
-  const pending = new Map();
-  let id = 0, buf = '';
-  const onLine = (line) => {
-    line = line.trim(); if (!line.startsWith('{')) return;
-    try { const m = JSON.parse(line); if (m.id != null && pending.has(m.id)) { pending.get(m.id)(m); pending.delete(m.id); } } catch {}
+// One MCP client of a CHROMIUM_TRANSPORT=http server (Streamable HTTP, JSON or SSE replies).
+function openHttpClient(endpoint) {
+  let sessionId = null, id = 0;
+  const call = async (method, params) => {
+    const headers = { 'content-type': 'application/json', accept: 'application/json, text/event-stream' };
+    if (sessionId) headers['mcp-session-id'] = sessionId;
+    const res = await fetch(endpoint, { method: 'POST', headers, body: JSON.stringify({ jsonrpc: '2.0', method, params, id: ++id }) });
+    sessionId = res.headers.get('mcp-session-id') || sessionId;
+    const body = await res.text();
+    const data = body.split('\n').filter((l) => l.startsWith('data: ')).map((l) => l.slice(6));
+    return JSON.parse(data.length ? data[data.length - 1] : body);
   };
-  const feed = (d) => { buf += d; const parts = buf.split('\n'); buf = parts.pop(); parts.forEach(onLine); };
-  child.stdout.on('data', feed); child.stderr.on('data', feed);
-  const call = (name, args = {}, timeoutMs = 20000) => new Promise((resolve, reject) => {
-    const myId = ++id;
-    const t = setTimeout(() => { pending.delete(myId); reject(new Error(`timeout: ${name}`)); }, timeoutMs);
-    pending.set(myId, (m) => { clearTimeout(t); resolve(m); });
-    child.stdin.write(JSON.stringify({ jsonrpc: '2.0', method: 'tools/call', params: { name, arguments: args }, id: myId }) + '\n');
-  });
+  const init = () => call('initialize', { protocolVersion: '2025-06-18', capabilities: {}, clientInfo: { name: 'smoke', version: '1' } });
+  const tool = (name, args = {}) => call('tools/call', { name, arguments: args });
   const text = (m) => m?.result?.content?.[0]?.text ?? '';
-  const evalText = async (expr) => text(await call('evaluate', { script: expr }));
-  const close = async () => { try { await call('close_browser', {}, 8000); } catch {} child.kill(); };
-  return { call, text, evalText, close };
+  return { init, tool, text, get sessionId() { return sessionId; } };
+}
+
+// Run one of the repo's Python CLIs without blocking the fixture server in this
+// process; `child.done` resolves to { code, stdout, stderr } when it exits.
+function runPython(args) {
+  const child = spawn('python3', args, { cwd: SERVER_DIR });
+  let stdout = '', stderr = '';
+  child.stdout.on('data', (d) => { stdout += d; });
+  child.stderr.on('data', (d) => { stderr += d; });
+  child.done = new Promise((resolve) => child.on('close', (code) => resolve({ code, stdout, stderr })));
+  return child;
+}
+
+// PIDs of `parent`'s child processes whose command line contains every string in `parts` (Linux /proc).
+function childPids(parent, parts) {
+  const pids = [];
+  for (const entry of fs.readdirSync('/proc')) {
+    if (!/^\d+$/.test(entry)) continue;
+    try {
+      const stat = fs.readFileSync(`/proc/${entry}/stat`, 'utf8');
+      const ppid = parseInt(stat.slice(stat.lastIndexOf(')') + 2).split(' ')[1], 10);
+      const cmdline = fs.readFileSync(`/proc/${entry}/cmdline`, 'utf8').split('\0');
+      if (ppid === parent && parts.every((p) => cmdline.includes(p))) pids.push(parseInt(entry, 10));
+    } catch {}
+  }
+  return pids;
 }
 
 // Capture the exact args our server launches Chrome with, via a stub "browser"
@@ -137,13 +122,43 @@ async function main() {
   check('persistent dir used verbatim (not managed)', persist.includes('--user-data-dir=/tmp/smoke_persist_xyz'), persist.join(' '));
   const headful = await capturedArgs({ CHROMIUM_HEADLESS: 'false' });
   check('CHROMIUM_HEADLESS=false drops --headless', !headful.includes('--headless'));
+  const lowmem = await capturedArgs({ CHROMIUM_LAUNCH_PROFILE: 'lowmem' });
+  check('lowmem profile limits renderers and caps the V8 heap', lowmem.includes('--renderer-process-limit=1') && lowmem.some((a) => a.startsWith('--js-flags=--max-old-space-size=')), lowmem.join(' '));
+  const disabled = lowmem.filter((a) => a.startsWith('--disable-features='));
+  check('launch profile merges --disable-features into one switch', disabled.length === 1 && /VizDisplayCompositor/.test(disabled[0]) && /site-per-process/.test(disabled[0]), disabled.join(' '));
+  check('explicit CHROMIUM_DISK_CACHE_SIZE wins over the profile', (await capturedArgs({ CHROMIUM_LAUNCH_PROFILE: 'lowmem', CHROMIUM_DISK_CACHE_SIZE: '1234' })).includes('--disk-cache-size=1234'));
+  // A profile owned by a live process (this one) must survive another server's startup sweep.
+  const liveProfile = path.join(os.tmpdir(), `mcp-chromium-profile-${process.pid}-smoke`);
+  fs.mkdirSync(liveProfile, { recursive: true });
+  await capturedArgs({});
+  check('startup sweep keeps profiles of live servers', fs.existsSync(liveProfile));
+  const spoolDir = fs.mkdtempSync(path.join(os.tmpdir(), 'smoke_spool_'));
+  const staleSpool = path.join(spoolDir, 'content-1700000000000-deadbeef.html');
+  const foreign = path.join(spoolDir, 'notes.txt');
+  for (const f of [staleSpool, foreign]) { fs.writeFileSync(f, 'x'); fs.utimesSync(f, new Date(0), new Date(0)); }
+  await capturedArgs({ CHROMIUM_SPOOL_DIR: spoolDir, CHROMIUM_SPOOL_RETENTION_HOURS: '1' });
+  check('startup sweep drops expired spool files only', !fs.existsSync(staleSpool) && fs.existsSync(foreign));
+  fs.rmSync(spoolDir, { recursive: true, force: true });
+  fs.rmSync(liveProfile, { recursive: true, force: true });
+
+  if (hasPython) {
+    console.log('python modules (fixture data, no browser):');
+    const py = await runPython([path.join('test', 'pychecks.py')]).done;
+    for (const line of py.stdout.split('\n').filter(Boolean)) {
+      let r; try { r = JSON.parse(line); } catch { continue; }
+      if (r.skip) console.log(`  - ${r.skip}: skipped (${r.detail})`);
+      else check(r.name, r.ok, r.detail);
+    }
+    check('python checks ran to completion', py.stdout && !/Traceback/.test(py.stderr), py.stderr);
+  }
 
   const s1 = openSession();
   try {
     const nav0 = s1.text(await s1.call('navigate', { url: base }));
     if (/Could not find a Chromium-family browser/i.test(nav0)) {
       console.log('SKIP: no Chromium-family browser installed.');
-      await s1.close(); fixture.close(); process.exit(0);
+      console.log(`\n${passed} passed, ${failed} failed (browser checks skipped)`);
+      await s1.close(); fixture.close(); process.exit(failed === 0 ? 0 : 1);
     }
 
     console.log('cookies:');
@@ -171,16 +186,54 @@ async function main() {
     console.log('interaction:');
     await s1.call('navigate', { url: `${base}/app` }); await sleep(1300);
     check('evaluate returns a value', (await s1.evalText('1+2')) === 'Result: 3');
-    check('get_content html', /id="btn"|<button/.test(s1.text(await s1.call('get_content', { type: 'html' }))));
+    check('evaluate structuredContent carries the raw value', (await s1.call('evaluate', { script: '[1, {a: 2}]' })).result?.structuredContent?.value?.[1]?.a === 2);
+    const inlineHtml = s1.text(await s1.call('get_content', { type: 'html' }));
+    check('get_content html', /id="btn"|<button/.test(inlineHtml));
+    check('inline get_content html keeps the doctype like the spooled path', /^<!DOCTYPE html>/i.test(inlineHtml), inlineHtml.slice(0, 40));
+    const d0 = (await s1.call('get_content_delta', {})).result?.structuredContent;
+    check('get_content_delta starts with a full snapshot', d0?.full === true && Array.isArray(d0.lines) && typeof d0.docId === 'string', JSON.stringify(d0)?.slice(0, 200));
+    await s1.evalText("document.body.appendChild(document.createElement('p')).textContent = 'delta-line'; 1");
+    const d1 = (await s1.call('get_content_delta', { docId: d0?.docId, since: d0?.version })).result?.structuredContent;
+    check('get_content_delta returns only the new line', d1?.full === false && d1.hunks.length === 1 && d1.hunks[0].insert.includes('delta-line'), JSON.stringify(d1));
+    const d2 = (await s1.call('get_content_delta', { docId: d1?.docId, since: d1?.version })).result?.structuredContent;
+    check('get_content_delta reports no change when idle', d2?.full === false && d2.hunks.length === 0 && d2.version === d1?.version, JSON.stringify(d2));
+    const spooled = (await s1.call('get_content', { type: 'html', transfer: 'file' })).result?.structuredContent;
+    check('get_content transfer=file spools to disk', spooled?.transfer === 'file' && fs.existsSync(spooled.path) && fs.statSync(spooled.path).size === spooled.size, JSON.stringify(spooled));
+    check('spooled content hash matches', spooled?.sha256 === crypto.createHash('sha256').update(fs.readFileSync(spooled.path)).digest('hex'));
+    check('get_content auto stays inline for small pages', (await s1.call('get_content', { type: 'html' })).result?.structuredContent?.transfer === 'inline');
+    fs.rmSync(spooled?.path || '/nonexistent', { force: true });
     await s1.call('fill', { selector: '#in', value: 'typed' });
     check('fill sets input value', (await s1.evalText("document.querySelector('#in').value")) === 'Result: "typed"');
     await s1.call('click', { selector: '#btn' }); await sleep(200);
     check('click fires handler', (await s1.evalText('document.title')) === 'Result: "CLICKED"');
     await s1.call('select', { selector: '#sel', value: 'b' });
     check('select sets option', (await s1.evalText("document.querySelector('#sel').value")) === 'Result: "b"');
+    const upload = path.join(os.tmpdir(), `smoke_upload_${process.pid}.txt`);
+    fs.writeFileSync(upload, 'upload');
+    const form = (await s1.call('fill_form', {
+      fields: { '#in': 'bulk', '#sel': 'a', '#cb': true, '#up': upload, '#keys': 'abc', '#nope': 'x' }, typing: ['#keys'],
+    })).result?.structuredContent;
+    const byField = Object.fromEntries((form?.fields || []).map((f) => [f.selector, f.status]));
+    check('fill_form reports per-field status', byField['#in'] === 'filled' && byField['#cb'] === 'filled' && byField['#nope'] === 'not_found' && form.filled === 5, JSON.stringify(form));
+    check('fill_form sets values and files', (await s1.evalText("[document.querySelector('#in').value, document.querySelector('#sel').value, document.querySelector('#cb').checked, document.querySelector('#up').files.length].join()")) === 'Result: "bulk,a,true,1"');
+    check('fill_form typing mode sends key events', (await s1.evalText("[document.querySelector('#keys').value, window.__keys].join()")) === 'Result: "abc,3"');
+    const typedAll = (await s1.call('fill_form', { fields: { '#in': 'xy', '#cb': false, '#sel': 'b' }, typing: true })).result?.structuredContent;
+    const typedBy = Object.fromEntries((typedAll?.fields || []).map((f) => [f.selector, f.status]));
+    check('typing:true types text fields and sets checkboxes/selects as usual', typedBy['#in'] === 'typed' && typedBy['#cb'] === 'filled' && typedBy['#sel'] === 'filled', JSON.stringify(typedAll));
+    check('typing:true leaves the checkbox unchecked', (await s1.evalText("[document.querySelector('#in').value, document.querySelector('#cb').checked, document.querySelector('#sel').value].join()")) === 'Result: "xy,false,b"');
+    fs.rmSync(upload, { force: true });
     await s1.call('hover', { selector: '#hov' }); await sleep(200);
     check('hover fires mouseover', (await s1.evalText('window.__hov')) === 'Result: 1');
 
+    console.log('wait_for:');
+    await s1.evalText("setTimeout(() => { const d = document.createElement('div'); d.id = 'late'; d.textContent = 'arrived'; document.body.appendChild(d); }, 400); 1");
+    const waited = (await s1.call('wait_for', { selector: '#late', text: 'arrived', timeout: 5000 })).result?.structuredContent;
+    check('wait_for resolves when the element appears', waited?.ok === true && waited.waitedMs >= 200 && waited.waitedMs < 3000, JSON.stringify(waited));
+    const timedOut = await s1.call('wait_for', { selector: '#never', timeout: 300 });
+    check('wait_for times out with an error', timedOut.result?.isError === true && /Timed out/.test(s1.text(timedOut)));
+    const quiet = (await s1.call('wait_for', { networkIdle: true, idleMs: 200, timeout: 5000 })).result?.structuredContent;
+    check('wait_for networkIdle settles', quiet?.ok === true, JSON.stringify(quiet));
+
     console.log('logs:');
     check('console logs captured', /hello-log/.test(s1.text(await s1.call('get_console_logs', {}))));
     check('console errors captured', /boom-error/.test(s1.text(await s1.call('get_console_errors', {}))));
@@ -188,26 +241,109 @@ async function main() {
     check('network errors capture 404', /\/missing/.test(s1.text(await s1.call('get_network_errors', {}))));
     await s1.call('wipe_logs', {});
     check('wipe_logs clears console logs', !/hello-log/.test(s1.text(await s1.call('get_console_logs', {}))));
+    const level = (await s1.call('set_capture_level', { level: 'errors' })).result?.structuredContent;
+    check('capture level errors keeps Runtime + Network', level?.level === 'errors' && level.domains.includes('Network'), JSON.stringify(level));
+    await s1.evalText("console.log('quiet-log'); console.error('loud-error'); 1");
+    const kept = s1.text(await s1.call('get_console_logs', {}));
+    check('capture errors drops plain console.log', /loud-error/.test(kept) && !/quiet-log/.test(kept), kept);
+    await s1.call('set_capture_level', { level: 'off' });
+    await s1.call('evaluate', { script: "console.log('per-call-log'); 1", capture: 'full' });
+    check('per-call capture full records during that call', /per-call-log/.test(s1.text(await s1.call('get_console_logs', {}))));
+    await s1.call('set_capture_level', { level: 'full' });
     check('get_selected_element returns without error', !/^Error:/.test(s1.text(await s1.call('get_selected_element', {}))));
+    const snap = (await s1.call('dom_snapshot', { transfer: 'inline' })).result?.structuredContent;
+    const doc = snap?.snapshot?.documents?.[0];
+    check('dom_snapshot returns columnar nodes and layout', doc && doc.nodes.parentIndex.length === snap.nodes && doc.layout.bounds.length === doc.layout.nodeIndex.length, JSON.stringify(snap)?.slice(0, 200));
+    check('dom_snapshot styles follow computedStyles', doc && doc.layout.styles.every(row => row.length === snap.snapshot.computedStyles.length));
 
     console.log('emulation:');
     const emu = s1.text(await s1.call('emulate_device', { device: 'iphone-16' }));
     check('emulate_device reports preset', /Emulating iphone-16/.test(emu), emu);
     check('emulated UA is iPhone', /iPhone/.test(await s1.evalText('navigator.userAgent')));
     check('reset_emulation runs', !/^Error:/.test(s1.text(await s1.call('reset_emulation', {}))));
+    const conditioned = (await s1.call('emulate_device', { device: 'pixel-9', conditioning: ['fast-4g', 'cpu-2x'] })).result?.structuredContent;
+    check('emulate_device combines preset and conditioning', conditioned?.width === 412 && conditioned?.conditioning?.cpu === 2 && conditioned.conditioning.network?.latency === 165, JSON.stringify(conditioned));
+    const throttledAudit = (await s1.call('run_performance_audit', {}, 45000)).result?.structuredContent?.conditions;
+    check('performance audit records conditioning', throttledAudit?.device === 'pixel-9' && throttledAudit?.conditioning?.profiles?.join() === 'fast-4g,cpu-2x', JSON.stringify(throttledAudit));
+    check('unknown conditioning profile is rejected', /Unknown conditioning profile/.test(s1.text(await s1.call('emulate_device', { conditioning: 'dial-up' }))));
+    await s1.call('reset_emulation', {});
+    const unthrottled = (await s1.call('run_performance_audit', {}, 45000)).result?.structuredContent?.conditions;
+    check('reset_emulation clears conditioning', unthrottled?.device === 'desktop' && unthrottled.conditioning === null, JSON.stringify(unthrottled));
+    const matrix = (await s1.call('emulate_matrix', { url: `${base}/app`, devices: ['iphone-se', 'ipad-air-m2'], settleMs: 100 }, 45000)).result?.structuredContent;
+    check('emulate_matrix renders each device', matrix?.results?.length === 2 && matrix.results.every(r => !r.error && fs.existsSync(r.screenshot)), JSON.stringify(matrix));
+    check('emulate_matrix applies the preset', matrix?.results?.[0]?.width === 375 && typeof matrix.results[0].overflowX === 'boolean', JSON.stringify(matrix?.results?.[0]));
+    check('emulate_matrix reports CLS', typeof matrix?.results?.[0]?.cls === 'number');
+    check('emulate_matrix writes into its own run directory', matrix?.outputDir && matrix.results.every(r => path.dirname(r.screenshot) === matrix.outputDir), JSON.stringify(matrix?.outputDir));
+    check('emulate_matrix leaves the current tab alone', !/iPhone|iPad/.test(await s1.evalText('navigator.userAgent')));
 
     console.log('audits:');
     for (const a of ['run_seo_audit', 'run_accessibility_audit', 'run_best_practices_audit', 'run_performance_audit', 'run_nextjs_audit', 'run_debugger_mode', 'run_audit_mode']) {
       const out = s1.text(await s1.call(a, {}, 45000));
       check(`${a} returns a result`, out.length > 10 && !/^Error:/.test(out), out);
     }
+    const perf = (await s1.call('run_performance_audit', {}, 45000)).result?.structuredContent?.metrics;
+    check('performance audit reports web vitals', perf && 'lcp' in perf && 'fcp' in perf && typeof perf.cls === 'number', JSON.stringify(perf));
+    const seo = (await s1.call('run_seo_audit', {}, 45000)).result?.structuredContent;
+    check('audit structuredContent lists issues', Array.isArray(seo?.issues) && typeof seo?.passed === 'boolean', JSON.stringify(seo));
+    const prof = (await s1.call('profile_page', { url: `${base}/profiled`, settleMs: 200 }, 45000)).result?.structuredContent;
+    const bundle = prof?.js?.find(f => f.url.endsWith('/bundle.js'));
+    check('profile_page reports unused JS bytes per file', bundle && bundle.unusedBytes > 0 && bundle.unusedBytes < bundle.totalBytes, JSON.stringify(prof?.js));
+    const sheet = prof?.css?.find(f => f.url.endsWith('/bundle.css'));
+    check('profile_page reports unused CSS rules', sheet && sheet.unusedBytes > 0, JSON.stringify(prof?.css));
+    check('profile_page writes a .cpuprofile', prof?.cpuprofile && Array.isArray(JSON.parse(fs.readFileSync(prof.cpuprofile.path, 'utf8')).nodes), JSON.stringify(prof?.cpuprofile));
+    check('profile_page lists hot functions', Array.isArray(prof?.hotFunctions) && prof.hotFunctions.length > 0, JSON.stringify(prof?.hotFunctions));
+    const heap = (await s1.call('take_heap_snapshot', {}, 60000)).result?.structuredContent;
+    check('take_heap_snapshot streams the snapshot to a file', heap && fs.statSync(heap.path).size === heap.size && JSON.parse(fs.readFileSync(heap.path, 'utf8')).snapshot.node_count > 0, JSON.stringify(heap));
+    const leak = (await s1.call('leak_check', { urlA: `${base}/app`, urlB: `${base}/`, iterations: 2, settleMs: 100 }, 120000)).result?.structuredContent;
+    check('leak_check writes baseline and final snapshots', leak && fs.existsSync(leak.baseline.path) && fs.existsSync(leak.final.path) && typeof leak.jsHeapGrowth === 'number', JSON.stringify(leak)?.slice(0, 200));
+    const [, where] = await Promise.all([
+      s1.call('navigate', { url: `${base}/` }),
+      s1.call('evaluate', { script: 'location.pathname' }),
+    ]);
+    check('concurrent calls on the tab run in arrival order', /"\/"/.test(s1.text(where)), s1.text(where));
+    const late = s1.text(await s1.call('evaluate', { script: 'const t = Date.now(); while (Date.now() - t < 1500); 1', deadlineMs: 300 }));
+    check('deadlineMs fails a slow call', /Deadline of 300ms exceeded/.test(late), late);
+    const sched = (await s1.call('scheduler_stats', {})).result?.structuredContent;
+    check('scheduler_stats counts grants and deadline misses', sched?.lanes?.interactive?.granted > 0 && sched.deadlineExceeded >= 1 && sched.runMs?.n > 0, JSON.stringify(sched)?.slice(0, 200));
+    const pdf = (await s1.call('print_pdf', { url: base, paper: 'a4', margin: '1cm', footerTemplate: '<span class="pageNumber"></span>' }, 60000)).result?.structuredContent;
+    check('print_pdf streams a PDF to a file', pdf && fs.statSync(pdf.path).size === pdf.size && fs.readFileSync(pdf.path).subarray(0, 5).toString() === '%PDF-', JSON.stringify(pdf));
+    check('print_pdf rejects an unknown paper size', /Unknown paper size/.test(s1.text(await s1.call('print_pdf', { paper: 'b9' }))));
+    const pdfDir = fs.mkdtempSync(path.join(os.tmpdir(), 'smoke_pdf_'));
+    const batch = (await s1.call('print_pdf_batch', { urls: [`${base}/app`, `${base}/`], outputDir: pdfDir, pageRanges: '1' }, 90000)).result?.structuredContent;
+    check('print_pdf_batch prints every URL in order', batch?.failures === 0 && batch.results.length === 2 && /^001-/.test(path.basename(batch.results[0].path)) && batch.results.every((r) => fs.existsSync(r.path)), JSON.stringify(batch)?.slice(0, 200));
+    fs.rmSync(pdfDir, { recursive: true, force: true });
+    // Without outputDir, each batch gets its own spool run directory
+    const [runA, runB] = (await Promise.all([0, 1].map(() => s1.call('print_pdf_batch', { urls: [base], pageRanges: '1' }, 90000))))
+      .map((m) => m.result?.structuredContent);
+    check('print_pdf_batch defaults to a per-run spool directory',
+      runA && runB && runA.outputDir !== runB.outputDir && [runA, runB].every((r) => /^pdf-\d{13}-[0-9a-f]{8}$/.test(path.basename(r.outputDir)) && fs.existsSync(r.results[0].path)),
+      `${runA?.outputDir} / ${runB?.outputDir}`);
+    for (const r of [runA, runB]) if (r?.outputDir) fs.rmSync(r.outputDir, { recursive: true, force: true });
 
     console.log('screencast:');
     s1.text(await s1.call('start_screencast', {})); await sleep(900);
     check('screencast_status shows recording', /^Recording:/.test(s1.text(await s1.call('screencast_status', {}))));
     if (hasFfmpeg) {
-      const stop = s1.text(await s1.call('stop_screencast', { output: 'gif' }, 30000));
+      const stopped = await s1.call('stop_screencast', { output: 'gif' }, 30000);
+      const stop = s1.text(stopped);
       check('stop_screencast encodes a file', /\.(gif|mp4|webm)/.test(stop), stop);
+      check('stop_screencast reports dropped duplicates', typeof stopped.result?.structuredContent?.droppedFrames === 'number');
+      // Encoding runs in the background; the server keeps answering meanwhile
+      const jobId = stopped.result?.structuredContent?.jobId;
+      check('stop_screencast returns a job id', typeof jobId === 'number', JSON.stringify(stopped.result?.structuredContent));
+      check('server answers while encoding', (await s1.evalText('1+1')) === 'Result: 2');
+      let job;
+      for (let i = 0; i < 60; i++) {
+        job = (await s1.call('screencast_job_status', { jobId })).result?.structuredContent;
+        if (job?.status === 'done' || job?.status === 'failed') break;
+        await sleep(500);
+      }
+      check('screencast job finishes with a file', job?.status === 'done' && fs.existsSync(job.path), JSON.stringify(job));
+      // Frames are written to disk as they arrive and encoded with their real durations
+      await s1.call('start_screencast', { dedupe: 'near' });
+      await s1.evalText("let n = 0; const t = setInterval(() => { document.title = 'T' + (++n); if (n > 10) clearInterval(t); }, 50); 1"); await sleep(900);
+      const vfr = (await s1.call('stop_screencast', { output: 'mp4', wait: true }, 30000)).result?.structuredContent;
+      check('variable-rate mp4 encodes', vfr?.frames === 0 || (vfr?.variableFrameRate === true && fs.existsSync(vfr.path)), JSON.stringify(vfr));
     } else {
       console.log('  – stop_screencast: skipped (no ffmpeg)');
     }
@@ -240,6 +376,171 @@ async function main() {
     check('cookie survives a full restart', after.persist_ck === 'SURVIVES', JSON.stringify(after));
   } finally { await s3b.close(); }
 
+  console.log('storage state:');
+  const stateFile = path.join(os.tmpdir(), `smoke_state_${process.pid}.json.gz`);
+  const s7a = openSession();
+  try {
+    await s7a.call('set_cookies', { url: base, cookies: [{ name: 'state_ck', value: 'S1', domain: '127.0.0.1', path: '/' }] });
+    await s7a.call('navigate', { url: `${base}/app` }); await sleep(1000);
+    await s7a.evalText("localStorage.setItem('token', 'LS1'); const r = indexedDB.open('smoke', 1); r.onupgradeneeded = () => r.result.createObjectStore('kv'); r.onsuccess = () => { const tx = r.result.transaction('kv', 'readwrite'); tx.objectStore('kv').put('IDB1', 'k'); tx.oncomplete = () => { window.__idbDone = 1; }; }; 1");
+    await sleep(500);
+    const saved = s7a.text(await s7a.call('save_storage_state', { path: stateFile }));
+    check('save_storage_state captures cookies + origin storage', /1 local/.test(saved) && /1 IndexedDB/.test(saved), saved);
+  } finally { await s7a.close(); }
+  const s7b = openSession();
+  try {
+    const loaded = s7b.text(await s7b.call('load_storage_state', { path: stateFile }));
+    check('load_storage_state restores', /Loaded \d+ cookie/.test(loaded), loaded);
+    await s7b.call('navigate', { url: `${base}/app` }); await sleep(1000);
+    check('localStorage seeded before first navigation', (await s7b.evalText("localStorage.getItem('token')")) === 'Result: "LS1"');
+    await s7b.evalText("const r = indexedDB.open('smoke'); r.onsuccess = () => { const g = r.result.transaction('kv').objectStore('kv').get('k'); g.onsuccess = () => { window.__idb = g.result; }; }; 1");
+    await sleep(500);
+    check('IndexedDB seeded', (await s7b.evalText('window.__idb')) === 'Result: "IDB1"');
+    check('cookie restored from state file', /state_ck/.test(await s7b.evalText('document.cookie')));
+  } finally { await s7b.close(); }
+  try { fs.unlinkSync(stateFile); } catch {}
+
+  console.log('profile template:');
+  const templateDir = path.join(os.tmpdir(), `smoke_template_${process.pid}`);
+  const s6a = openSession();
+  try {
+    await s6a.call('set_cookies', { url: base, cookies: [{ name: 'tpl_ck', value: 'WARM', domain: '127.0.0.1', path: '/', expirationDate: 4102444800 }] });
+    await s6a.call('navigate', { url: base }); await sleep(500);
+    const saved = s6a.text(await s6a.call('save_profile_template', { path: templateDir }, 40000));
+    check('save_profile_template writes a template', /Profile template saved/.test(saved) && fs.existsSync(templateDir), saved);
+  } finally { await s6a.close(); }
+  const s6b = openSession({ CHROMIUM_PROFILE_TEMPLATE: templateDir });
+  try {
+    await s6b.call('navigate', { url: `${base}/cookies` }); await sleep(1000);
+    let warm = {}; try { warm = JSON.parse(s6b.text(await s6b.call('get_content', { type: 'text' }))).cookies; } catch {}
+    check('session cloned from template starts authenticated', warm.tpl_ck === 'WARM', JSON.stringify(warm));
+  } finally { await s6b.close(); }
+  check('template clone cleaned with the managed profile', profileCount() === 0, `${profileCount()} left`);
+  fs.rmSync(templateDir, { recursive: true, force: true });
+
+  console.log('memory watchdog:');
+  const s4 = openSession({ CHROMIUM_RECYCLE_AFTER_PAGES: '2' });
+  try {
+    await s4.call('set_cookies', { url: base, cookies: [{ name: 'recycle_ck', value: 'KEPT', domain: '127.0.0.1', path: '/' }] });
+    await s4.call('emulate_device', { device: 'pixel-9' });
+    await s4.call('navigate', { url: base });
+    await s4.call('navigate', { url: `${base}/cookies` }); await sleep(800);
+    let stats = { samples: [], recycleEvents: [] };
+    try { stats = JSON.parse(s4.text(await s4.call('get_memory_stats', {}, 40000))); } catch {}
+    check('page limit triggers one recycle', stats.recycleEvents.length === 1, JSON.stringify(stats.recycleEvents));
+    check('memory sample reports process-tree RSS', os.platform() !== 'linux' || stats.samples.some((x) => x.rssMB > 0), JSON.stringify(stats.samples));
+    await sleep(800);
+    let kept = {}; try { kept = JSON.parse(s4.text(await s4.call('get_content', { type: 'text' }))).cookies; } catch {}
+    check('cookies restored after recycle', kept.recycle_ck === 'KEPT', JSON.stringify(kept));
+    check('emulation restored after recycle', /Pixel 9/.test(await s4.evalText('navigator.userAgent')));
+  } finally { await s4.close(); }
+
+  console.log('shared HTTP transport:');
+  const httpPort = 20000 + (process.pid % 20000);
+  const hs = spawn('node', ['index.js'], { cwd: SERVER_DIR, env: { ...process.env, CHROMIUM_TRANSPORT: 'http', CHROMIUM_HTTP_PORT: String(httpPort), CHROMIUM_DEBUGGING_PORT: '9333', CHROMIUM_RECYCLE_AFTER_PAGES: '2' } });
+  try {
+    const endpoint = `http://127.0.0.1:${httpPort}/mcp`;
+    for (let i = 0; i < 60; i++) { try { await fetch(endpoint); break; } catch { await sleep(250); } }
+    const ca = openHttpClient(endpoint), cb = openHttpClient(endpoint);
+    await ca.init(); await cb.init();
+    check('each HTTP client gets its own session', ca.sessionId && cb.sessionId && ca.sessionId !== cb.sessionId);
+    await ca.tool('set_cookies', { url: base, cookies: [{ name: 'client_a', value: 'A', domain: '127.0.0.1', path: '/' }] });
+    await ca.tool('navigate', { url: `${base}/cookies` }); await cb.tool('navigate', { url: `${base}/cookies` }); await sleep(800);
+    let ja = {}, jb = {};
+    try { ja = JSON.parse(ca.text(await ca.tool('get_content', { type: 'text' }))).cookies; } catch {}
+    try { jb = JSON.parse(cb.text(await cb.tool('get_content', { type: 'text' }))).cookies; } catch {}
+    check('cookies stay in the client\'s own browser context', ja.client_a === 'A' && !jb.client_a, `${JSON.stringify(ja)} / ${JSON.stringify(jb)}`);
+    // Two clients' navigations hit the shared browser's page limit: the main
+    // thread recycles it and each client replays its journal on its next call.
+    const shared = (await cb.tool('get_memory_stats', {})).result?.structuredContent;
+    check('HTTP watchdog recycles the shared browser once', shared?.recycleEvents?.length === 1, JSON.stringify(shared?.recycleEvents));
+    check('HTTP clients see the shared browser\'s memory samples', shared?.samples?.length > 0, JSON.stringify(shared?.samples));
+    const initWithOrigin = (origin) => fetch(endpoint, {
+      method: 'POST',
+      headers: { 'content-type': 'application/json', accept: 'application/json, text/event-stream', origin },
+      body: JSON.stringify({ jsonrpc: '2.0', method: 'initialize', params: { protocolVersion: '2025-06-18', capabilities: {}, clientInfo: { name: 'smoke', version: '1' } }, id: 1 }),
+    });
+    const foreign = await initWithOrigin('https://rebind.example');
+    check('request from a foreign Origin is refused with 403', foreign.status === 403, foreign.status);
+    const local = await initWithOrigin(`http://127.0.0.1:${httpPort}`);
+    check('request from the server\'s own origin is served', local.status === 200, local.status);
+  } finally { hs.kill('SIGTERM'); await sleep(1500); }
+
+  console.log('crash recovery:');
+  const s5 = openSession();
+  try {
+    await s5.call('set_cookies', { url: base, cookies: [{ name: 'crash_ck', value: 'REPLAYED', domain: '127.0.0.1', path: '/' }] });
+    await s5.call('emulate_device', { device: 'iphone-se' });
+    await s5.call('navigate', { url: `${base}/cookies` }); await sleep(800);
+    await s5.call('navigate', { url: 'chrome://crash' }).catch(() => {}); await sleep(1000);
+    let replayed = {}; try { replayed = JSON.parse(s5.text(await s5.call('get_content', { type: 'text' }, 40000))).cookies; } catch {}
+    check('session replayed after renderer crash (cookie + URL)', replayed.crash_ck === 'REPLAYED', JSON.stringify(replayed));
+    check('emulation replayed after renderer crash', /iPhone/.test(await s5.evalText('navigator.userAgent')));
+  } finally { await s5.close(); }
+
+  if (hasPython) {
+    console.log('scenario runner:');
+    const scenarioDir = fs.mkdtempSync(path.join(os.tmpdir(), 'smoke_scenarios_'));
+    const writeScenario = (name, steps) => {
+      const file = path.join(scenarioDir, `${name}.jsonl`);
+      fs.writeFileSync(file, steps.map((step) => JSON.stringify(step)).join('\n') + '\n');
+      return file;
+    };
+    const good = writeScenario('good', [{ action: 'navigate', url: base }, { action: 'assert', text: 'BOTTOM_MARKER' }]);
+    const bad = writeScenario('bad', [{ action: 'navigate', url: `${base}/app` }, { action: 'assert', selector: '#no-such-element' }]);
+    const junit = path.join(scenarioDir, 'junit.xml');
+    const run = await runPython(['chromium_tool.py', 'run', '--instances', '2', '--base-port', '9440', '--junit', junit, good, bad]).done;
+    check('runner exits 1 when a scenario fails', run.code === 1, run.stdout + run.stderr);
+    let xml = ''; try { xml = fs.readFileSync(junit, 'utf8'); } catch {}
+    check('JUnit XML counts every step and the one failure', /<testsuites [^>]*tests="4"[^>]*failures="1"/.test(xml), xml);
+    const hosts = [...xml.matchAll(/<testsuite [^>]*hostname="(instance-\d+)"/g)].map((m) => m[1]);
+    check('scenarios ran on both instances', hosts.length === 2 && new Set(hosts).size === 2, hosts.join(' '));
+    check('failing assert step is reported as a JUnit failure',
+      /<testcase [^>]*classname="bad"[^>]*name="02 assert #no-such-element"[^>]*>\s*<failure message="no element matches #no-such-element"/.test(xml), xml);
+    check('passing scenario has no failures', /<testsuite name="good"[^>]*failures="0"/.test(xml), xml);
+    fs.rmSync(scenarioDir, { recursive: true, force: true });
+  }
+
+  if (hasPython && os.platform() === 'linux') {
+    console.log('cluster requeue:');
+    const clusterDir = fs.mkdtempSync(path.join(os.tmpdir(), 'smoke_cluster_'));
+    const jobsFile = path.join(clusterDir, 'jobs.jsonl');
+    const outFile = path.join(clusterDir, 'results.jsonl');
+    const jobCount = 6;
+    fs.writeFileSync(jobsFile, Array.from({ length: jobCount }, (_, i) =>
+      JSON.stringify({ kind: 'capture', payload: { url: `${base}/slow?ms=3000&job=${i}` } })).join('\n') + '\n');
+    // Kill worker local-1 once both workers have a job loading, so it dies holding
+    // a running job and a prefetched one.
+    let inFlight = 0, maxInFlight = 0;
+    const track = (req, res) => {
+      if (!req.url.startsWith('/slow')) return;
+      maxInFlight = Math.max(maxInFlight, ++inFlight);
+      res.on('close', () => { inFlight--; });
+    };
+    fixture.on('request', track);
+    const cluster = runPython(['cluster.py', 'local', '--workers', '2', '--base-port', '9460',
+      '--jobs', jobsFile, '--out', outFile, '--captures-dir', clusterDir]);
+    let killed = false;
+    for (let i = 0; i < 240 && !killed && cluster.exitCode === null; i++) {
+      await sleep(250);
+      if (inFlight < 2) continue;
+      for (const pid of childPids(cluster.pid, ['worker', 'local-1'])) { process.kill(pid, 'SIGKILL'); killed = true; }
+    }
+    const done = await Promise.race([cluster.done, sleep(180000).then(() => null)]);
+    if (!done) cluster.kill('SIGKILL');
+    fixture.off('request', track);
+    check('worker local-1 killed with jobs in flight', killed, `max in flight ${maxInFlight}`);
+    const requeued = /worker local-1 left, (\d+) job\(s\) requeued/.exec(done?.stderr || '');
+    check('killed worker\'s jobs are requeued', requeued && parseInt(requeued[1], 10) > 0, done?.stderr);
+    let results = []; try { results = fs.readFileSync(outFile, 'utf8').trim().split('\n').map((l) => JSON.parse(l)); } catch {}
+    const ids = results.map((r) => r.id);
+    check('every job reports exactly one result', ids.length === jobCount && new Set(ids).size === jobCount, ids.join(' '));
+    check('all jobs succeed on the surviving worker', done?.code === 0 && results.every((r) => r.ok),
+      results.filter((r) => !r.ok).map((r) => `${r.id}: ${r.error}`).join('; ') || done?.stdout);
+    check('requeued jobs were retried', results.some((r) => r.attempts > 1), JSON.stringify(results.map((r) => [r.id, r.worker, r.attempts])));
+    fs.rmSync(clusterDir, { recursive: true, force: true });
+  }
+
   fixture.close();
   fs.rmSync(profileDir, { recursive: true, force: true });
   try { fs.unlinkSync(STUB); } catch {}